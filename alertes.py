@@ -0,0 +1,522 @@
+"""
+🔔 FINANCELAB - Règles d'alerte et veille
+Description: Règles d'alerte définies par chaque utilisateur (franchissement de
+cours, seuil de ratio, changement de zone du score de défaillance, pic de
+volatilité), stockées dans SQLite et évaluées par un planificateur contre les
+séries de cours et de fondamentaux en cache. L'évaluation est incrémentale :
+seules les règles dont une série d'entrée a reçu de nouvelles données sont
+réévaluées, par paquets vectorisés, et chaque déclenchement est consigné dans
+la table des notifications de son propriétaire.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:     # Windows : pas de verrou entre processus
+    fcntl = None
+
+import numpy as np
+import pandas as pd
+
+import calculs_financiers
+import etats_financiers
+import passerelle_marche
+import series_temporelles
+
+# =============================================================================
+# PARAMÈTRES
+# =============================================================================
+
+CHEMIN_ALERTES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "donnees", "alertes.sqlite")
+DOSSIER_COURS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "donnees", "cours")
+
+INTERVALLE_EVALUATION = 60      # Secondes entre deux passages du planificateur
+DUREE_CACHE_COURS = 15 * 60     # Secondes avant de retélécharger les cours d'un symbole
+FENETRE_VOLATILITE = 20         # Séances de la volatilité récente
+FENETRE_REFERENCE = 250         # Séances de la volatilité de référence
+
+# Type de règle : libellé et série d'entrée (None = l'indicateur choisi par l'utilisateur)
+TYPES_REGLES = {
+    'cours': ("Franchissement de cours", 'cours'),
+    'ratio': ("Seuil de ratio", None),
+    'score': ("Zone du score de défaillance", 'score'),
+    'volatilite': ("Pic de volatilité", 'cours'),
+}
+
+OPERATEURS = {'>': "passe au-dessus de", '<': "passe en dessous de"}
+ZONES_SCORE = {0: "risquée", 1: "à surveiller", 2: "saine"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS regles (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    proprietaire TEXT NOT NULL,
+    type TEXT NOT NULL,
+    symbole TEXT NOT NULL,
+    indicateur TEXT NOT NULL,
+    operateur TEXT NOT NULL DEFAULT '>',
+    seuil REAL,
+    active INTEGER NOT NULL DEFAULT 1,
+    etat REAL,
+    evaluee TEXT,
+    cree TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS notifications (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    proprietaire TEXT NOT NULL,
+    regle_id INTEGER,
+    type TEXT NOT NULL,
+    message TEXT NOT NULL,
+    date TEXT NOT NULL,
+    lue INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS notifications_proprietaire ON notifications (proprietaire, id);
+"""
+
+COLONNES_REGLES = ['id', 'proprietaire', 'type', 'symbole', 'indicateur', 'operateur', 'seuil',
+                   'active', 'etat', 'evaluee', 'cree']
+
+
+def _connexion(chemin):
+    connexion = sqlite3.connect(chemin, timeout=30)
+    connexion.row_factory = sqlite3.Row
+    return connexion
+
+
+def _maintenant():
+    return datetime.now().isoformat(timespec='seconds')
+
+
+def identifiant_anonyme():
+    """Identifiant propre à une session anonyme : ses règles, notifications et scénarios ne sont pas partagés"""
+    return f"invite-{uuid.uuid4().hex[:12]}"
+
+
+# =============================================================================
+# MESURES DÉRIVÉES DES SÉRIES
+# =============================================================================
+
+def ratio_volatilite(cours, fenetre=FENETRE_VOLATILITE, reference=FENETRE_REFERENCE):
+    """Volatilité des `fenetre` dernières séances rapportée à celle des `reference` dernières"""
+    rendements = np.log(cours.astype(float)).diff().dropna()
+    if len(rendements) < fenetre + 2:
+        return np.nan
+    recente = rendements.iloc[-fenetre:].std()
+    normale = rendements.iloc[-reference:].std()
+    return recente / normale if normale > 0 else np.nan
+
+
+def zone_score(score):
+    """Zone du score Conan-Holder : 0 risquée, 1 à surveiller, 2 saine"""
+    score = np.asarray(score, dtype=float)
+    return np.select(
+        [score > calculs_financiers.SEUIL_SCORE_SAIN, score > calculs_financiers.SEUIL_SCORE_RISQUE], [2, 1], 0
+    ).astype(float)
+
+
+def indicateurs_fondamentaux(modele):
+    """
+    Séries de ratios et de score Conan-Holder d'un modèle etats_financiers
+    (une ligne par clôture).
+    """
+    indicateurs = series_temporelles.calculer_indicateurs(modele)
+    poste = lambda nom: modele[nom].astype(float) if nom in modele else pd.Series(np.nan, index=modele.index)
+    score = calculs_financiers.score_conan_holder(
+        indicateurs['ebe'],
+        poste('dettes_financieres').fillna(0) + poste('dettes_ct').fillna(0),
+        poste('capitaux_propres') + poste('dettes_lt').fillna(0),
+        poste('total_actif'),
+        poste('charges_financieres').fillna(0),
+        poste('chiffre_affaires'),
+        poste('charges_personnel').fillna(0),
+        indicateurs['valeur_ajoutee'],
+    )['score']
+    return indicateurs.assign(score=score)
+
+
+# =============================================================================
+# MOTEUR D'ÉVALUATION
+# =============================================================================
+
+class MoteurAlertes:
+    """
+    Règles, séries d'entrée et notifications. Les séries sont publiées par
+    `publier` ; seules celles dont le contenu a changé marquent leurs règles à
+    réévaluer au prochain appel de `evaluer`.
+    """
+
+    def __init__(self, chemin=CHEMIN_ALERTES):
+        self.chemin = chemin
+        os.makedirs(os.path.dirname(chemin), exist_ok=True)
+        with _connexion(chemin) as connexion:
+            connexion.execute("PRAGMA journal_mode=WAL")
+            connexion.executescript(_SCHEMA)
+        self._verrou = threading.Lock()
+        self._series = {}         # (symbole, indicateur) -> série
+        self._signatures = {}     # (symbole, indicateur) -> (longueur, dernière date, dernière valeur)
+        self._a_evaluer = set()   # Séries ayant reçu de nouvelles données
+        self._regles = None       # Règles actives en mémoire (rechargées après modification)
+
+    # -------------------------------------------------------------------------
+    # Règles
+    # -------------------------------------------------------------------------
+
+    def ajouter_regle(self, proprietaire, type_regle, symbole, seuil=None, operateur='>', indicateur=None):
+        """Enregistre une règle et retourne son identifiant"""
+        if type_regle not in TYPES_REGLES:
+            raise ValueError(f"Type de règle inconnu : {type_regle}")
+        if operateur not in OPERATEURS:
+            raise ValueError(f"Opérateur inconnu : {operateur}")
+        indicateur = TYPES_REGLES[type_regle][1] or indicateur
+        if indicateur not in series_temporelles.INDICATEURS and indicateur not in ('cours', 'score'):
+            raise ValueError(f"Indicateur inconnu : {indicateur}")
+        if type_regle != 'score' and seuil is None:
+            raise ValueError("Un seuil est requis pour ce type de règle")
+
+        with _connexion(self.chemin) as connexion:
+            curseur = connexion.execute(
+                "INSERT INTO regles (proprietaire, type, symbole, indicateur, operateur, seuil, cree) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (proprietaire, type_regle, symbole.strip().upper(), indicateur, operateur, seuil, _maintenant())
+            )
+        with self._verrou:
+            self._regles = None
+            # La nouvelle règle est évaluée dès le prochain passage si sa série est déjà connue
+            if (symbole.strip().upper(), indicateur) in self._series:
+                self._a_evaluer.add((symbole.strip().upper(), indicateur))
+        return curseur.lastrowid
+
+    def supprimer_regle(self, id_regle, proprietaire):
+        with _connexion(self.chemin) as connexion:
+            connexion.execute("DELETE FROM regles WHERE id = ? AND proprietaire = ?", (id_regle, proprietaire))
+        with self._verrou:
+            self._regles = None
+
+    def activer_regle(self, id_regle, proprietaire, active=True):
+        with _connexion(self.chemin) as connexion:
+            connexion.execute(
+                "UPDATE regles SET active = ? WHERE id = ? AND proprietaire = ?", (int(active), id_regle, proprietaire)
+            )
+        with self._verrou:
+            self._regles = None
+
+    def regles(self, proprietaire=None):
+        """Tableau des règles, éventuellement d'un seul propriétaire"""
+        requete, parametres = f"SELECT {', '.join(COLONNES_REGLES)} FROM regles", ()
+        if proprietaire is not None:
+            requete, parametres = requete + " WHERE proprietaire = ?", (proprietaire,)
+        with _connexion(self.chemin) as connexion:
+            lignes = connexion.execute(requete + " ORDER BY id", parametres).fetchall()
+        return pd.DataFrame([dict(ligne) for ligne in lignes], columns=COLONNES_REGLES)
+
+    def symboles_suivis(self):
+        """Symboles des règles actives et indicateurs nécessaires pour chacun"""
+        regles = self._regles_actives()
+        return regles.groupby('symbole')['indicateur'].agg(lambda s: sorted(set(s))).to_dict()
+
+    def _regles_actives(self):
+        with self._verrou:
+            if self._regles is None:
+                regles = self.regles()
+                self._regles = regles[regles['active'] == 1].set_index('id')
+            return self._regles
+
+    # -------------------------------------------------------------------------
+    # Séries d'entrée
+    # -------------------------------------------------------------------------
+
+    def publier(self, symbole, indicateur, serie):
+        """
+        Publie la série d'un indicateur. Retourne True si elle apporte de
+        nouvelles données (ses règles seront réévaluées), False sinon.
+        """
+        serie = serie.dropna()
+        if serie.empty:
+            return False
+        cle = (symbole.strip().upper(), indicateur)
+        signature = (len(serie), serie.index[-1], float(serie.iloc[-1]))
+        with self._verrou:
+            if self._signatures.get(cle) == signature:
+                return False
+            self._signatures[cle] = signature
+            self._series[cle] = serie
+            self._a_evaluer.add(cle)
+        return True
+
+    def connait(self, symbole, indicateur):
+        """Indique si la série a déjà été publiée"""
+        return (symbole.strip().upper(), indicateur) in self._series
+
+    def _mesure(self, cle, type_regle):
+        """Valeur observée par une règle : dernière valeur, ou ratio de volatilité des cours"""
+        serie = self._series[cle]
+        return ratio_volatilite(serie) if type_regle == 'volatilite' else float(serie.iloc[-1])
+
+    # -------------------------------------------------------------------------
+    # Évaluation
+    # -------------------------------------------------------------------------
+
+    def evaluer(self):
+        """
+        Réévalue les règles actives dont une série d'entrée a changé depuis le
+        dernier appel. Retourne les notifications émises.
+        """
+        regles = self._regles_actives()
+        with self._verrou:
+            cles, self._a_evaluer = self._a_evaluer, set()
+        vide = pd.DataFrame(columns=['proprietaire', 'regle_id', 'type', 'message', 'date'])
+        if not cles or regles.empty:
+            return vide
+
+        entrees = pd.MultiIndex.from_arrays([regles['symbole'], regles['indicateur']])
+        concernees = regles[entrees.isin(list(cles))].copy()
+        if concernees.empty:
+            return vide
+
+        # Une mesure par (série, type de règle), partagée par toutes les règles qui l'observent
+        with self._verrou:
+            mesures = {
+                (symbole, indicateur, type_regle): self._mesure((symbole, indicateur), type_regle)
+                for symbole, indicateur, type_regle in set(zip(
+                    concernees['symbole'], concernees['indicateur'], concernees['type']
+                ))
+            }
+        mesure = np.array([
+            mesures[cle] for cle in zip(concernees['symbole'], concernees['indicateur'], concernees['type'])
+        ], dtype=float)
+        seuil = concernees['seuil'].astype(float).to_numpy()
+        precedent = concernees['etat'].astype(float).to_numpy()
+        au_dessus = (concernees['operateur'] == '>').to_numpy()
+
+        with np.errstate(invalid='ignore'):
+            condition = np.where(au_dessus, mesure > seuil, mesure < seuil)
+            condition_precedente = np.where(au_dessus, precedent > seuil, precedent < seuil)
+            zone = zone_score(mesure)
+            type_regle = concernees['type'].to_numpy()
+
+            # Franchissement de cours : la condition devient vraie entre deux valeurs observées
+            # Seuil de ratio et volatilité : la condition devient vraie (la règle se réarme ensuite)
+            # Score : la zone change par rapport à la dernière évaluation
+            declenchee = np.select(
+                [type_regle == 'cours', type_regle == 'score'],
+                [~np.isnan(precedent) & condition & ~condition_precedente,
+                 ~np.isnan(precedent) & (zone != precedent)],
+                condition & (precedent != 1)
+            )
+            nouvel_etat = np.select(
+                [type_regle == 'cours', type_regle == 'score'], [mesure, zone], condition.astype(float)
+            )
+        mesurable = ~np.isnan(mesure)
+        declenchee &= mesurable
+
+        # Mise à jour des états (en base et en mémoire)
+        date = _maintenant()
+        ids = concernees.index[mesurable]
+        with _connexion(self.chemin) as connexion:
+            connexion.executemany(
+                "UPDATE regles SET etat = ?, evaluee = ? WHERE id = ?",
+                [(float(etat), date, int(i)) for etat, i in zip(nouvel_etat[mesurable], ids)]
+            )
+        with self._verrou:
+            if self._regles is not None:
+                self._regles.loc[self._regles.index.intersection(ids), 'etat'] = pd.Series(
+                    nouvel_etat[mesurable], index=ids
+                )
+                self._regles.loc[self._regles.index.intersection(ids), 'evaluee'] = date
+
+        emises = concernees[declenchee].assign(mesure=mesure[declenchee], zone=zone[declenchee])
+        notifications = pd.DataFrame({
+            'proprietaire': emises['proprietaire'],
+            'regle_id': emises.index,
+            'type': [self._gravite(regle) for regle in emises.itertuples()],
+            'message': [self._message(regle) for regle in emises.itertuples()],
+            'date': date,
+        }, columns=['proprietaire', 'regle_id', 'type', 'message', 'date'])
+        if not notifications.empty:
+            with _connexion(self.chemin) as connexion:
+                connexion.executemany(
+                    "INSERT INTO notifications (proprietaire, regle_id, type, message, date) VALUES (?, ?, ?, ?, ?)",
+                    notifications.itertuples(index=False, name=None)
+                )
+        return notifications.reset_index(drop=True)
+
+    @staticmethod
+    def _gravite(regle):
+        """Type de notification (info, warning, success) d'un déclenchement"""
+        if regle.type == 'score':
+            return {0: "warning", 1: "info", 2: "success"}[int(regle.zone)]
+        if regle.type == 'volatilite':
+            return "warning"
+        return "info"
+
+    @staticmethod
+    def _message(regle):
+        if regle.type == 'cours':
+            return f"📈 {regle.symbole} {OPERATEURS[regle.operateur]} {regle.seuil:,.2f} ({regle.mesure:,.2f})"
+        if regle.type == 'score':
+            return (f"🎯 {regle.symbole} : score Conan-Holder en zone {ZONES_SCORE[int(regle.zone)]} "
+                    f"({regle.mesure:.2f})")
+        if regle.type == 'volatilite':
+            return (f"🌪️ {regle.symbole} : volatilité {FENETRE_VOLATILITE} séances = {regle.mesure:.1f} × "
+                    f"la normale (seuil {regle.seuil:g})")
+        return f"📊 {regle.symbole} : {regle.indicateur} {OPERATEURS[regle.operateur]} {regle.seuil:g} ({regle.mesure:.2f})"
+
+    # -------------------------------------------------------------------------
+    # Notifications
+    # -------------------------------------------------------------------------
+
+    def notifications(self, proprietaire, apres=0, limite=50):
+        """Notifications d'un propriétaire d'identifiant supérieur à `apres` (les plus récentes d'abord)"""
+        with _connexion(self.chemin) as connexion:
+            lignes = connexion.execute(
+                "SELECT id, regle_id, type, message, date, lue FROM notifications "
+                "WHERE proprietaire = ? AND id > ? ORDER BY id DESC LIMIT ?",
+                (proprietaire, apres, limite)
+            ).fetchall()
+        return pd.DataFrame([dict(ligne) for ligne in lignes],
+                            columns=['id', 'regle_id', 'type', 'message', 'date', 'lue'])
+
+    def marquer_lues(self, proprietaire, jusqua):
+        with _connexion(self.chemin) as connexion:
+            connexion.execute(
+                "UPDATE notifications SET lue = 1 WHERE proprietaire = ? AND id <= ?", (proprietaire, jusqua)
+            )
+
+
+# =============================================================================
+# COLLECTE DES DONNÉES EN CACHE
+# =============================================================================
+
+def _chemin_cours(symbole):
+    return os.path.join(DOSSIER_COURS, f"{symbole.upper()}.parquet")
+
+
+def charger_cours(symboles, duree_cache=DUREE_CACHE_COURS):
+    """
+    Cours de clôture d'un an par symbole, depuis le cache local tant qu'il a
+    moins de `duree_cache` secondes. Les symboles périmés sont téléchargés en
+    un seul appel ; en cas d'échec, la dernière version connue est servie.
+    """
+    cours, a_telecharger = {}, []
+    for symbole in symboles:
+        chemin = _chemin_cours(symbole)
+        if os.path.exists(chemin):
+            cours[symbole] = pd.read_parquet(chemin)['cours']
+            if time.time() - os.path.getmtime(chemin) < duree_cache:
+                continue
+        a_telecharger.append(symbole)
+
+    if a_telecharger:
+        try:
+            telecharges = passerelle_marche.cours_cloture(a_telecharger, "1y")
+        except passerelle_marche.SourceIndisponible:
+            telecharges = pd.DataFrame()
+        os.makedirs(DOSSIER_COURS, exist_ok=True)
+        for symbole in a_telecharger:
+            if symbole in telecharges and telecharges[symbole].notna().any():
+                serie = telecharges[symbole].dropna().rename('cours')
+                temporaire = _chemin_cours(symbole) + ".tmp"
+                serie.to_frame().to_parquet(temporaire)
+                os.replace(temporaire, _chemin_cours(symbole))
+                cours[symbole] = serie
+    return cours
+
+
+def collecter_donnees(moteur):
+    """
+    Publie dans le moteur les séries des symboles suivis : cours (cache de
+    15 minutes) et ratios / score issus des états financiers en cache.
+    Retourne les erreurs par symbole.
+    """
+    suivis = moteur.symboles_suivis()
+    erreurs = {}
+
+    avec_cours = [symbole for symbole, indicateurs in suivis.items() if 'cours' in indicateurs]
+    for symbole, serie in charger_cours(avec_cours).items():
+        moteur.publier(symbole, 'cours', serie)
+    erreurs.update({symbole: "Cours indisponibles" for symbole in avec_cours if not moteur.connait(symbole, 'cours')})
+
+    for symbole, indicateurs in suivis.items():
+        fondamentaux = [indicateur for indicateur in indicateurs if indicateur != 'cours']
+        if not fondamentaux:
+            continue
+        try:
+            serie_indicateurs = indicateurs_fondamentaux(etats_financiers.etats_financelab(symbole))
+        except Exception as e:
+            erreurs[symbole] = str(e)
+            continue
+        for indicateur in fondamentaux:
+            moteur.publier(symbole, indicateur, serie_indicateurs[indicateur])
+    return erreurs
+
+
+# =============================================================================
+# PLANIFICATEUR
+# =============================================================================
+
+class PlanificateurAlertes:
+    """
+    Collecte puis évaluation périodiques dans un fil d'exécution de fond.
+    Une seule instance évalue une base donnée, même si plusieurs applications
+    (processus) la partagent : celle qui détient le verrou <base>.planificateur ;
+    les autres restent en attente et prennent le relais si elle s'arrête.
+    """
+
+    def __init__(self, moteur, collecteur=collecter_donnees, intervalle=INTERVALLE_EVALUATION):
+        self.moteur = moteur
+        self.collecteur = collecteur
+        self.intervalle = intervalle
+        self.dernier_passage = None
+        self.erreurs = {}
+        self._arret = threading.Event()
+        self._fil = None
+        self._verrou = None
+
+    def _verrouiller(self):
+        """Prend (sans attendre) le verrou d'évaluation de la base ; False s'il est détenu par une autre instance"""
+        if self._verrou is None:
+            fichier = open(f"{self.moteur.chemin}.planificateur", 'a')
+            if fcntl is not None:
+                try:
+                    fcntl.flock(fichier, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    fichier.close()
+                    return False
+            self._verrou = fichier
+        return True
+
+    def passage(self):
+        """Un cycle de collecte et d'évaluation ; retourne les notifications émises"""
+        if not self._verrouiller():
+            self.erreurs = {'planificateur': "Règles évaluées par le planificateur d'une autre instance"}
+            return pd.DataFrame(columns=['proprietaire', 'regle_id', 'type', 'message', 'date'])
+        try:
+            self.erreurs = self.collecteur(self.moteur) or {}
+        except Exception as e:
+            self.erreurs = {'collecte': str(e)}
+        notifications = self.moteur.evaluer()
+        self.dernier_passage = _maintenant()
+        return notifications
+
+    def _boucle(self):
+        while not self._arret.is_set():
+            self.passage()
+            self._arret.wait(self.intervalle)
+
+    def demarrer(self):
+        if self._fil is None or not self._fil.is_alive():
+            self._arret.clear()
+            self._fil = threading.Thread(target=self._boucle, name="planificateur-alertes", daemon=True)
+            self._fil.start()
+        return self
+
+    def arreter(self):
+        self._arret.set()
+        if self._verrou is not None:
+            self._verrou.close()   # Libère le verrou d'évaluation pour une autre instance
+            self._verrou = None
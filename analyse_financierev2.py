@@ -7,6 +7,10 @@ import io
 from io import BytesIO
 from datetime import datetime, timedelta
 
+import calculs_financiers
+import export_excel
+import sensibilite
+
 # Configuration de la page
 st.set_page_config(
     page_title="Maîtrise de l'Analyse Financière",
@@ -4758,25 +4762,9 @@ def show_calculateur_van_tir():
             flux.append(st.number_input(f"Année {i+1} (€)", value=30000, key=f"van_flux_{i}"))
     
     if st.button("📈 Calculer VAN et TIR", key="van_btn"):
-        # Calcul VAN
-        van = -investissement_initial
-        for i, flux_annuel in enumerate(flux):
-            van += flux_annuel / ((1 + taux_actualisation) ** (i + 1))
-        
-        # Estimation TIR (méthode simplifiée)
-        def calcul_van(taux):
-            van_calc = -investissement_initial
-            for i, flux_annuel in enumerate(flux):
-                van_calc += flux_annuel / ((1 + taux) ** (i + 1))
-            return van_calc
-        
-        # Recherche du TIR par approximation
-        tir = taux_actualisation
-        for taux_test in np.arange(0.01, 1.0, 0.01):
-            if calcul_van(taux_test) >= 0:
-                tir = taux_test
-            else:
-                break
+        # Calcul VAN et TIR (même code que l'API et l'analyse en lot)
+        van = float(calculs_financiers.van(investissement_initial, flux, taux_actualisation))
+        tir = float(calculs_financiers.tir(investissement_initial, flux))
         
         st.subheader("🎯 Résultats")
         
@@ -4790,7 +4778,25 @@ def show_calculateur_van_tir():
                 delta_color=delta_color
             )
         with col2:
-            st.metric("TIR approximatif", f"{tir*100:.1f}%")
+            st.metric("TIR", f"{tir*100:.1f}%" if np.isfinite(tir) else "Non défini")
+        
+        # Sensibilité de la VAN à chaque hypothèse (± 10 %), toutes évaluées en un seul calcul
+        reference, tableau = sensibilite.tornade(
+            lambda investissement, taux, **annees: calculs_financiers.van(investissement, np.stack(list(annees.values()), axis=-1), taux / 100),
+            {'investissement': investissement_initial, 'taux': taux_actualisation * 100,
+             **{f"annee_{i + 1}": flux_annuel for i, flux_annuel in enumerate(flux)}},
+            libelles={'investissement': "Investissement", 'taux': "Taux d'actualisation",
+                      **{f"annee_{i + 1}": f"Flux année {i + 1}" for i in range(len(flux))}}
+        )
+        tableau = tableau.iloc[::-1]
+        fig_tornade = go.Figure()
+        fig_tornade.add_trace(go.Bar(y=tableau['hypothese'], x=tableau['ecart_bas'], base=reference, orientation='h',
+                                     name="-10 %", marker_color='indianred'))
+        fig_tornade.add_trace(go.Bar(y=tableau['hypothese'], x=tableau['ecart_haut'], base=reference, orientation='h',
+                                     name="+10 %", marker_color='seagreen'))
+        fig_tornade.add_vline(x=reference, line_color="black")
+        fig_tornade.update_layout(barmode='overlay', title="Sensibilité de la VAN (± 10 % par hypothèse)", xaxis_title="€")
+        st.plotly_chart(fig_tornade, use_container_width=True)
 
 def show_calculateur_score():
     st.subheader("🎯 Calculateur de Score Financier")
@@ -4812,20 +4818,17 @@ def show_calculateur_score():
         valeur_ajoutee = st.number_input("Valeur ajoutée (€)", value=500000, key="score_va")
     
     # Calcul du score Conan et Holder
-    X1 = ebe / endettement_global if endettement_global > 0 else 0
-    X2 = capitaux_permanents / actif_total if actif_total > 0 else 0
-    X3 = 0.3  # Approximation pour réalisable et disponible
-    X4 = frais_financiers / ca if ca > 0 else 0
-    X5 = charges_personnel / valeur_ajoutee if valeur_ajoutee > 0 else 0
-    
-    score = 24*X1 + 22*X2 + 16*X3 - 87*X4 - 10*X5
+    score = float(calculs_financiers.score_conan_holder(
+        ebe, endettement_global, capitaux_permanents, actif_total,
+        frais_financiers, ca, charges_personnel, valeur_ajoutee
+    )['score'])
     
     st.metric("Score financier", f"{score:.2f}")
     
     # Interprétation
-    if score > 9.5:
+    if score > calculs_financiers.SEUIL_SCORE_SAIN:
         st.success("✅ Situation financière saine")
-    elif score > -4.5:
+    elif score > calculs_financiers.SEUIL_SCORE_RISQUE:
         st.warning("⚠️ Situation à surveiller")
     else:
         st.error("❌ Situation risquée - Attention !")
@@ -6731,24 +6734,15 @@ def analyse_bilan_personnalise():
                 st.error(f"❌ Erreur lors du chargement: {e}")
     
     if st.button("📈 Analyser le bilan", key="btn_analyse_bilan"):
-        # Calculs d'analyse
-        total_actif = immob_corporelles + stocks + clients + disponibilites
-        total_passif = capital + reserves + resultat + dettes_lt + dettes_ct
-        
-        # Équilibre financier
-        ressources_stables = capital + reserves + resultat + dettes_lt
-        emplois_stables = immob_corporelles
-        frng = ressources_stables - emplois_stables
-        
-        actif_circulant = stocks + clients + disponibilites
-        passif_circulant = dettes_ct
-        bfr = actif_circulant - passif_circulant
-        tresorerie = frng - bfr
-        
-        # Ratios
-        taux_endettement = (dettes_lt + dettes_ct) / (capital + reserves + resultat) * 100
-        autonomie_financiere = (capital + reserves + resultat) / total_passif * 100
-        liquidite_generale = actif_circulant / passif_circulant * 100
+        # Calculs d'analyse (équilibre financier et ratios)
+        analyse = calculs_financiers.analyser_bilan(
+            immob_corporelles, stocks, clients, disponibilites, capital, reserves, resultat, dettes_lt, dettes_ct
+        )
+        total_actif, total_passif = analyse['total_actif'], analyse['total_passif']
+        frng, bfr, tresorerie = analyse['frng'], analyse['bfr'], analyse['tresorerie']
+        taux_endettement = float(analyse['taux_endettement'])
+        autonomie_financiere = float(analyse['autonomie_financiere'])
+        liquidite_generale = float(analyse['liquidite_generale'])
         
         # Affichage des résultats
         st.subheader("📊 Résultats de l'Analyse du Bilan")
@@ -6778,28 +6772,7 @@ def analyse_bilan_personnalise():
         # Diagnostic
         st.subheader("🔍 Diagnostic Financier")
         
-        points_forts = []
-        points_faibles = []
-        
-        if frng > 0:
-            points_forts.append("FRNG positif - Bon équilibre financier")
-        else:
-            points_faibles.append("FRNG négatif - Risque de structure")
-            
-        if tresorerie > 0:
-            points_forts.append("Trésorerie excédentaire")
-        else:
-            points_faibles.append("Trésorerie déficitaire")
-            
-        if taux_endettement < 100:
-            points_forts.append("Endettement maîtrisé")
-        else:
-            points_faibles.append("Endettement élevé")
-            
-        if liquidite_generale > 100:
-            points_forts.append("Bonne liquidité")
-        else:
-            points_faibles.append("Liquidité insuffisante")
+        points_forts, points_faibles = calculs_financiers.diagnostic_bilan(analyse)
         
         col1, col2 = st.columns(2)
         
@@ -6843,18 +6816,14 @@ def analyse_compte_resultat_personnalise():
                 st.error(f"❌ Erreur lors du chargement: {e}")
     
     if st.button("📊 Analyser la rentabilité", key="btn_analyse_cr"):
-        # Calcul des SIG
-        marge_commerciale = ca - achats
-        valeur_ajoutee = marge_commerciale - autres_charges
-        ebe = valeur_ajoutee - charges_personnel
-        resultat_exploitation = ebe - dotations
-        resultat_courant = resultat_exploitation - charges_financieres
-        
-        # Ratios de rentabilité
-        taux_marge = (marge_commerciale / ca * 100) if ca > 0 else 0
-        taux_ebe = (ebe / ca * 100) if ca > 0 else 0
-        taux_resultat_exploitation = (resultat_exploitation / ca * 100) if ca > 0 else 0
-        taux_resultat_courant = (resultat_courant / ca * 100) if ca > 0 else 0
+        # Calcul des SIG et des ratios de rentabilité
+        sig = calculs_financiers.analyser_compte_resultat(ca, achats, charges_personnel, autres_charges, dotations, charges_financieres)
+        marge_commerciale, valeur_ajoutee, ebe = sig['marge_commerciale'], sig['valeur_ajoutee'], sig['ebe']
+        resultat_exploitation, resultat_courant = sig['resultat_exploitation'], sig['resultat_courant']
+        taux_marge = float(sig['taux_marge'])
+        taux_ebe = float(sig['taux_ebe'])
+        taux_resultat_exploitation = float(sig['taux_resultat_exploitation'])
+        taux_resultat_courant = float(sig['taux_resultat_courant'])
         
         # Affichage des résultats
         st.subheader("📈 Soldes Intermédiaires de Gestion")
@@ -6862,7 +6831,7 @@ def analyse_compte_resultat_personnalise():
         sig_data = {
             'Solde': ['Marge commerciale', 'Valeur ajoutée', 'EBE', 'Résultat exploitation', 'Résultat courant'],
             'Montant (k€)': [marge_commerciale, valeur_ajoutee, ebe, resultat_exploitation, resultat_courant],
-            'Taux (%)': [taux_marge, (valeur_ajoutee/ca*100) if ca>0 else 0, taux_ebe, taux_resultat_exploitation, taux_resultat_courant]
+            'Taux (%)': [taux_marge, float(sig['taux_valeur_ajoutee']), taux_ebe, taux_resultat_exploitation, taux_resultat_courant]
         }
         
         df_sig = pd.DataFrame(sig_data)
@@ -6877,37 +6846,17 @@ def analyse_compte_resultat_personnalise():
         # Diagnostic de rentabilité
         st.subheader("🔍 Diagnostic de Rentabilité")
         
-        normes_sectorielles = {
-            'Taux de marge': {'min': 30, 'bon': 40},
-            'Taux EBE': {'min': 10, 'bon': 15},
-            'Taux résultat exploitation': {'min': 5, 'bon': 8}
+        niveaux = calculs_financiers.niveaux_rentabilite(sig)
+        affichage_niveau = {'bon': st.success, 'acceptable': st.warning, 'faible': st.error}
+        libelles = {
+            'taux_marge': "Taux de marge",
+            'taux_ebe': "Taux EBE",
+            'taux_resultat_exploitation': "Taux résultat exploitation",
         }
         
-        col1, col2, col3 = st.columns(3)
-        
-        with col1:
-            if taux_marge >= normes_sectorielles['Taux de marge']['bon']:
-                st.success(f"Taux de marge: {taux_marge:.1f}%")
-            elif taux_marge >= normes_sectorielles['Taux de marge']['min']:
-                st.warning(f"Taux de marge: {taux_marge:.1f}%")
-            else:
-                st.error(f"Taux de marge: {taux_marge:.1f}%")
-        
-        with col2:
-            if taux_ebe >= normes_sectorielles['Taux EBE']['bon']:
-                st.success(f"Taux EBE: {taux_ebe:.1f}%")
-            elif taux_ebe >= normes_sectorielles['Taux EBE']['min']:
-                st.warning(f"Taux EBE: {taux_ebe:.1f}%")
-            else:
-                st.error(f"Taux EBE: {taux_ebe:.1f}%")
-        
-        with col3:
-            if taux_resultat_exploitation >= normes_sectorielles['Taux résultat exploitation']['bon']:
-                st.success(f"Taux résultat exploitation: {taux_resultat_exploitation:.1f}%")
-            elif taux_resultat_exploitation >= normes_sectorielles['Taux résultat exploitation']['min']:
-                st.warning(f"Taux résultat exploitation: {taux_resultat_exploitation:.1f}%")
-            else:
-                st.error(f"Taux résultat exploitation: {taux_resultat_exploitation:.1f}%")
+        for col, (taux, libelle) in zip(st.columns(3), libelles.items()):
+            with col:
+                affichage_niveau[str(niveaux[taux])](f"{libelle}: {float(sig[taux]):.1f}%")
 
 def analyse_flux_personnalise():
     st.subheader("💧 Analyse Personnalisée des Tableaux de Flux")
@@ -6930,10 +6879,9 @@ def analyse_flux_personnalise():
     
     if st.button("💰 Analyser les flux", key="btn_analyse_flux"):
         # Calcul des flux nets
-        flux_exploitation = resultat_net + dotations + variation_bfr
-        flux_investissement = acquisitions
-        flux_financement = emprunts + remboursements
-        variation_tresorerie = flux_exploitation + flux_investissement + flux_financement
+        flux = calculs_financiers.analyser_flux(resultat_net, dotations, variation_bfr, acquisitions, emprunts, remboursements)
+        flux_exploitation, flux_investissement = flux['flux_exploitation'], flux['flux_investissement']
+        flux_financement, variation_tresorerie = flux['flux_financement'], flux['variation_tresorerie']
         
         # Affichage des résultats
         st.subheader("📊 Synthèse des Flux de Trésorerie")
@@ -7015,6 +6963,7 @@ def show_modeles_telechargeables():
     
     st.info("Téléchargez des modèles Excel fonctionnels pour vos analyses financières")
     
+    # Les modèles (à formules) ne sont générés qu'au premier téléchargement, puis servis depuis le cache
     col1, col2, col3 = st.columns(3)
     
     with col1:
@@ -7027,48 +6976,11 @@ def show_modeles_telechargeables():
         - Graphiques de synthèse
         """)
         
-        # Création d'un modèle Excel simple
-        def create_bilan_template():
-            output = io.BytesIO()
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                # Feuille Actif
-                actif_data = {
-                    'ACTIF': ['ACTIF IMMOBILISÉ', '', 'Immobilisations incorporelles', 'Immobilisations corporelles', 
-                             'Immobilisations financières', 'TOTAL ACTIF IMMOBILISÉ', '',
-                             'ACTIF CIRCULANT', '', 'Stocks', 'Créances clients', 'Disponibilités',
-                             'TOTAL ACTIF CIRCULANT', '', 'TOTAL ACTIF'],
-                    'Montant (k€)': ['', '', 500, 1500, 300, 2300, '', '', '', 800, 1200, 300, 2300, '', 4600]
-                }
-                df_actif = pd.DataFrame(actif_data)
-                df_actif.to_excel(writer, sheet_name='Actif', index=False)
-                
-                # Feuille Passif
-                passif_data = {
-                    'PASSIF': ['CAPITAUX PROPRES', '', 'Capital social', 'Réserves', 'Résultat de l\'exercice',
-                              'TOTAL CAPITAUX PROPRES', '', 'DETTES', '', 'Dettes financières LT', 'Dettes fournisseurs',
-                              'Autres dettes', 'TOTAL DETTES', '', 'TOTAL PASSIF'],
-                    'Montant (k€)': ['', '', 1000, 800, 200, 2000, '', '', '', 1000, 800, 800, 2600, '', 4600]
-                }
-                df_passif = pd.DataFrame(passif_data)
-                df_passif.to_excel(writer, sheet_name='Passif', index=False)
-                
-                # Feuille Analyse
-                analyse_data = {
-                    'RATIOS FINANCIERS': ['FRNG', 'BFR', 'Trésorerie nette', 'Taux d\'endettement', 'Autonomie financière'],
-                    'Valeur': ['700 k€', '500 k€', '200 k€', '65.8%', '43.5%'],
-                    'Analyse': ['✅ Bon', '📈 À surveiller', '✅ Bon', '✅ Acceptable', '✅ Correct']
-                }
-                df_analyse = pd.DataFrame(analyse_data)
-                df_analyse.to_excel(writer, sheet_name='Analyse', index=False)
-            
-            return output.getvalue()
-        
-        bilan_excel = create_bilan_template()
         st.download_button(
             label="📥 Télécharger le modèle Bilan",
-            data=bilan_excel,
+            data=lambda: export_excel.modele_excel('bilan'),
             file_name="modele_bilan_complet.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            mime=export_excel.MIME_XLSX
         )
     
     with col2:
@@ -7081,37 +6993,11 @@ def show_modeles_telechargeables():
         - Analyse horizontale/verticale
         """)
         
-        def create_cr_template():
-            output = io.BytesIO()
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                # Feuille Compte de résultat
-                cr_data = {
-                    'COMPTE DE RÉSULTAT': ['PRODUITS', '', 'Chiffre d\'affaires', 'Autres produits', 'TOTAL PRODUITS', '',
-                                          'CHARGES', '', 'Achats consommés', 'Charges de personnel', 'Autres charges',
-                                          'Dotations aux amortissements', 'Charges financières', 'TOTAL CHARGES', '',
-                                          'RÉSULTAT NET'],
-                    'Montant (k€)': ['', '', 5000, 200, 5200, '', '', '', 3000, 1200, 300, 200, 100, 4800, '', 400]
-                }
-                df_cr = pd.DataFrame(cr_data)
-                df_cr.to_excel(writer, sheet_name='Compte de résultat', index=False)
-                
-                # Feuille SIG
-                sig_data = {
-                    'SOLDES INTERMÉDIAIRES': ['Marge commerciale', 'Valeur ajoutée', 'EBE', 'Résultat d\'exploitation', 'Résultat courant'],
-                    'Montant (k€)': [2000, 1700, 500, 300, 200],
-                    'Taux (%)': [40.0, 34.0, 10.0, 6.0, 4.0]
-                }
-                df_sig = pd.DataFrame(sig_data)
-                df_sig.to_excel(writer, sheet_name='SIG', index=False)
-            
-            return output.getvalue()
-        
-        cr_excel = create_cr_template()
         st.download_button(
             label="📥 Télécharger modèle Compte de résultat",
-            data=cr_excel,
+            data=lambda: export_excel.modele_excel('compte_resultat'),
             file_name="modele_compte_resultat.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            mime=export_excel.MIME_XLSX
         )
     
     with col3:
@@ -7124,31 +7010,11 @@ def show_modeles_telechargeables():
         - Synthèse automatique
         """)
         
-        def create_flux_template():
-            output = io.BytesIO()
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                # Feuille Flux
-                flux_data = {
-                    'TABLEAU DES FLUX': ['FLUX D\'EXPLOITATION', '', 'Résultat net', 'Dotations aux amortissements',
-                                        'Variation du BFR', 'FLUX NET EXPLOITATION', '',
-                                        'FLUX D\'INVESTISSEMENT', '', 'Acquisitions d\'immobilisations',
-                                        'Cessions d\'immobilisations', 'FLUX NET INVESTISSEMENT', '',
-                                        'FLUX DE FINANCEMENT', '', 'Augmentations de capital', 'Emprunts nouveaux',
-                                        'Remboursements d\'emprunts', 'FLUX NET FINANCEMENT', '',
-                                        'VARIATION DE TRÉSORERIE'],
-                    'Montant (k€)': ['', '', 400, 200, -150, 450, '', '', '', -1000, 50, -950, '', '', '', 0, 500, -300, 200, '', -300]
-                }
-                df_flux = pd.DataFrame(flux_data)
-                df_flux.to_excel(writer, sheet_name='Tableau des flux', index=False)
-            
-            return output.getvalue()
-        
-        flux_excel = create_flux_template()
         st.download_button(
             label="📥 Télécharger modèle Tableaux de flux",
-            data=flux_excel,
+            data=lambda: export_excel.modele_excel('flux'),
             file_name="modele_tableaux_flux.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            mime=export_excel.MIME_XLSX
         )
 
 def show_quiz_complets():
@@ -0,0 +1,334 @@
+"""
+🗂️ FINANCELAB - Analyse en lot des états financiers
+Description: Point d'entrée en ligne de commande, sans navigateur, qui parcourt
+un dossier de classeurs XLSX, de fichiers CSV et de FEC, les lit en parallèle
+dans un pool de processus, calcule en une passe le diagnostic complet (bilan,
+soldes intermédiaires de gestion, flux) et écrit un fichier consolidé
+(Parquet ou Excel) accompagné d'un journal des erreurs par fichier, et au besoin
+le rapport de diagnostic HTML / PDF de chaque client.
+
+Usage :
+    python analyse_lot.py dossier_clients --sortie diagnostics.parquet --processus 8
+    python analyse_lot.py dossier_clients --rapports rapports_clients --formats pdf
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+import calculs_financiers
+import export_excel
+import rapports
+
+# =============================================================================
+# PARAMÈTRES
+# =============================================================================
+
+EXTENSIONS = ('.xlsx', '.xls', '.csv', '.txt', '.fec')
+
+# Libellés reconnus dans les classeurs (normalisés : minuscules, sans accents ni unité)
+LIBELLES = {
+    'actif_immobilise': ['immobilisations', 'immobilisations corporelles', 'actif immobilise', 'immobilisations nettes'],
+    'stocks': ['stocks', 'stocks et en cours'],
+    'clients': ['clients', 'creances clients'],
+    'disponibilites': ['disponibilites', 'tresorerie actif'],
+    'capital': ['capital', 'capital social'],
+    'reserves': ['reserves'],
+    'resultat_net': ['resultat', 'resultat net', 'resultat de l exercice'],
+    'dettes_lt': ['dettes long terme', 'dettes a long terme', 'dettes lt', 'emprunts et dettes financieres'],
+    'dettes_ct': ['dettes court terme', 'dettes a court terme', 'dettes ct', 'passif circulant'],
+    'concours_bancaires': ['concours bancaires', 'dont concours bancaires', 'concours bancaires courants', 'decouverts bancaires'],
+    'chiffre_affaires': ['chiffre d affaires', 'ca', 'ventes'],
+    'achats': ['achats', 'achats consommes'],
+    'charges_personnel': ['charges de personnel', 'salaires et charges'],
+    'autres_charges': ['autres charges', 'charges externes'],
+    'dotations': ['dotations', 'dotations aux amortissements'],
+    'charges_financieres': ['charges financieres'],
+    'variation_bfr': ['variation bfr', 'variation du bfr', 'delta bfr'],
+    'acquisitions': ['acquisitions', 'investissements'],
+    'emprunts': ['emprunts', 'nouveaux emprunts'],
+    'remboursements': ['remboursements'],
+}
+
+# Plan comptable -> postes (préfixe de compte, poste, signe). Le préfixe le plus
+# long l'emporte : le compte 519 (concours bancaires) va aux dettes et non aux disponibilités.
+COMPTES_FEC = [
+    *[(prefixe, 'actif_immobilise', 1) for prefixe in ('20', '21', '22', '23', '26', '27', '28', '29')],
+    ('3', 'stocks', 1),
+    ('41', 'clients', 1),
+    *[(prefixe, 'disponibilites', 1) for prefixe in ('50', '51', '53', '54')],
+    *[(prefixe, 'capital', -1) for prefixe in ('101', '104', '108')],
+    *[(prefixe, 'reserves', -1) for prefixe in ('105', '106', '107', '11', '13', '14')],
+    *[(prefixe, 'resultat_net', -1) for prefixe in ('12', '6', '7')],
+    *[(prefixe, 'dettes_lt', -1) for prefixe in ('16', '17')],
+    *[(prefixe, 'dettes_ct', -1) for prefixe in ('40', '42', '43', '44', '45', '46', '47', '519')],
+]
+
+# Comptes de gestion (classe 6 et 7) détaillés pour le compte de résultat
+COMPTES_RESULTAT_FEC = [
+    ('70', 'chiffre_affaires', -1),
+    ('60', 'achats', 1),
+    ('64', 'charges_personnel', 1),
+    *[(prefixe, 'autres_charges', 1) for prefixe in ('61', '62', '63')],
+    ('681', 'dotations', 1),
+    ('66', 'charges_financieres', 1),
+]
+
+JOURNAUX_A_NOUVEAUX = {'AN', 'RAN', 'ANO'}
+POSTES_BFR = {'stocks': 1, 'clients': 1, 'dettes_ct': -1, 'concours_bancaires': 1}
+PREFIXE_CONCOURS = '519'   # Concours bancaires courants, inclus dans dettes_ct
+
+
+def _normaliser(libelle):
+    """Minuscules, sans accents, sans unité entre parenthèses ni ponctuation"""
+    texte = str(libelle).replace('Δ', 'delta ')
+    texte = unicodedata.normalize('NFKD', texte).encode('ascii', 'ignore').decode()
+    texte = re.sub(r"\(.*?\)", " ", texte.lower())
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", texte).split())
+
+
+_POSTE_PAR_LIBELLE = {
+    _normaliser(libelle): poste
+    for poste, libelles in LIBELLES.items()
+    for libelle in libelles + [poste]
+}
+
+
+# =============================================================================
+# LECTURE DES FICHIERS
+# =============================================================================
+
+def _montant(serie):
+    """Montants au format français ou anglais -> float"""
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie.astype(float)
+    texte = serie.astype(str).str.replace(r"[\s €]", "", regex=True).str.replace(",", ".")
+    return pd.to_numeric(texte, errors='coerce')
+
+
+def _separateur(chemin):
+    with open(chemin, encoding='utf-8', errors='ignore') as fichier:
+        entete = fichier.readline()
+    return max(['\t', '|', ';', ','], key=entete.count)
+
+
+def _est_fec(colonnes):
+    colonnes = {str(c).lower() for c in colonnes}
+    return 'comptenum' in colonnes and ({'debit', 'credit'} <= colonnes or {'montant', 'sens'} <= colonnes)
+
+
+def lire_fec(chemin):
+    """
+    Agrège un Fichier des Écritures Comptables (montants en €) en postes (k€).
+    Les journaux d'à-nouveaux donnent le bilan d'ouverture, d'où la variation
+    du BFR ; les mouvements des comptes 16 et 20-23 donnent emprunts,
+    remboursements et acquisitions.
+    """
+    ecritures = pd.read_csv(chemin, sep=_separateur(chemin), dtype=str, encoding='utf-8', encoding_errors='ignore')
+    ecritures.columns = [c.strip().lower() for c in ecritures.columns]
+    if 'debit' in ecritures:
+        debit, credit = _montant(ecritures['debit']).fillna(0), _montant(ecritures['credit']).fillna(0)
+    else:
+        montant = _montant(ecritures['montant']).fillna(0)
+        est_debit = ecritures['sens'].str.upper().str.startswith('D')
+        debit, credit = montant.where(est_debit, 0), montant.where(~est_debit, 0)
+
+    comptes = ecritures['comptenum'].str.strip()
+    a_nouveaux = ecritures.get('journalcode', pd.Series('', index=ecritures.index)).str.strip().str.upper().isin(JOURNAUX_A_NOUVEAUX)
+    mouvements = pd.DataFrame({'compte': comptes, 'debit': debit, 'credit': credit, 'a_nouveaux': a_nouveaux})
+
+    def agreger(lignes, correspondances):
+        """Soldes des comptes répartis entre postes (préfixe le plus long)"""
+        soldes = (lignes['debit'] - lignes['credit']).groupby(lignes['compte']).sum()
+        postes = dict.fromkeys({poste for _, poste, _ in correspondances}, 0.0)
+        tri = sorted(correspondances, key=lambda c: -len(c[0]))
+        for compte, solde in soldes.items():
+            correspondance = next((c for c in tri if compte.startswith(c[0])), None)
+            if correspondance is not None:
+                postes[correspondance[1]] += correspondance[2] * solde
+        return postes
+
+    def concours_bancaires(lignes):
+        """Solde créditeur des concours bancaires, part des dettes à court terme exclue du BFR"""
+        concours = lignes['compte'].str.startswith(PREFIXE_CONCOURS)
+        return (lignes.loc[concours, 'credit'] - lignes.loc[concours, 'debit']).sum()
+
+    postes = {**agreger(mouvements, COMPTES_FEC), **agreger(mouvements, COMPTES_RESULTAT_FEC)}
+    postes['concours_bancaires'] = concours_bancaires(mouvements)
+    ouverture = agreger(mouvements[mouvements['a_nouveaux']], COMPTES_FEC)
+    ouverture['concours_bancaires'] = concours_bancaires(mouvements[mouvements['a_nouveaux']])
+    bfr_cloture = sum(signe * postes[poste] for poste, signe in POSTES_BFR.items())
+    bfr_ouverture = sum(signe * ouverture[poste] for poste, signe in POSTES_BFR.items())
+    postes['variation_bfr'] = -(bfr_cloture - bfr_ouverture)
+
+    exercice = mouvements[~mouvements['a_nouveaux']]
+    immobilisations = exercice['compte'].str.match(r"2[0-3]")
+    emprunts = exercice['compte'].str.startswith('16')
+    postes['acquisitions'] = -exercice.loc[immobilisations, 'debit'].sum()
+    postes['emprunts'] = exercice.loc[emprunts, 'credit'].sum()
+    postes['remboursements'] = -exercice.loc[emprunts, 'debit'].sum()
+
+    ligne = pd.DataFrame([{poste: valeur / 1000 for poste, valeur in postes.items()}])
+    if 'ecrituredate' in ecritures:
+        ligne['exercice'] = str(ecritures['ecrituredate'].dropna().str[:4].max())
+    return ligne
+
+
+def _lire_tableau(tableau):
+    """
+    Tableau d'un classeur ou d'un CSV (montants en k€) : soit en colonnes
+    (une colonne par poste, une ligne par exercice), soit en lignes
+    (libellé, montant).
+    """
+    tableau = tableau.dropna(how='all').dropna(axis=1, how='all')
+    postes_en_colonnes = {c: _POSTE_PAR_LIBELLE[_normaliser(c)] for c in tableau.columns if _normaliser(c) in _POSTE_PAR_LIBELLE}
+
+    if len(postes_en_colonnes) >= 2:
+        lignes = pd.DataFrame({poste: _montant(tableau[c]) for c, poste in postes_en_colonnes.items()})
+        colonne_exercice = next((c for c in tableau.columns if _normaliser(c) in ('exercice', 'annee', 'periode')), None)
+        if colonne_exercice is not None:
+            lignes['exercice'] = tableau[colonne_exercice].astype(str).values
+        return lignes
+
+    # Format libellé / montant : première colonne texte, première colonne numérique ensuite
+    libelles = tableau.iloc[:, 0].map(_normaliser).map(_POSTE_PAR_LIBELLE)
+    montants = next((_montant(tableau[c]) for c in tableau.columns[1:] if _montant(tableau[c]).notna().any()), None)
+    if montants is None or libelles.notna().sum() == 0:
+        return pd.DataFrame()
+    valeurs = montants[libelles.notna()].groupby(libelles[libelles.notna()]).sum()
+    return pd.DataFrame([valeurs.to_dict()])
+
+
+def lire_fichier(chemin):
+    """Postes (k€) d'un fichier : une ligne par exercice. Lève ValueError si rien n'est reconnu."""
+    extension = os.path.splitext(chemin)[1].lower()
+    if extension in ('.xlsx', '.xls'):
+        # Bilan, compte de résultat et flux peuvent occuper des feuilles distinctes
+        feuilles = [_lire_tableau(f) for f in pd.read_excel(chemin, sheet_name=None).values()]
+        feuilles = [f for f in feuilles if not f.empty]
+        postes = pd.concat(feuilles, axis=1) if feuilles else pd.DataFrame()
+        postes = postes.loc[:, ~postes.columns.duplicated()]
+    else:
+        entete = pd.read_csv(chemin, sep=_separateur(chemin), nrows=0, encoding_errors='ignore').columns
+        postes = lire_fec(chemin) if _est_fec(entete) else _lire_tableau(
+            pd.read_csv(chemin, sep=_separateur(chemin), encoding_errors='ignore')
+        )
+
+    if postes.empty or not set(postes.columns) & set(calculs_financiers.POSTES):
+        raise ValueError("Aucun poste reconnu")
+    return postes
+
+
+def _lire_fichier_sans_erreur(chemin):
+    """Exécuté dans le pool : (chemin, postes ou None, erreur ou None)"""
+    try:
+        return chemin, lire_fichier(chemin), None
+    except Exception as e:
+        return chemin, None, f"{type(e).__name__}: {e}"
+
+
+# =============================================================================
+# TRAITEMENT D'UN DOSSIER
+# =============================================================================
+
+def lister_fichiers(dossier, recursif=True):
+    """Fichiers d'états financiers du dossier (triés pour un résultat reproductible)"""
+    if not recursif:
+        return sorted(
+            os.path.join(dossier, nom) for nom in os.listdir(dossier)
+            if nom.lower().endswith(EXTENSIONS) and not nom.startswith('~$')
+        )
+    return sorted(
+        os.path.join(racine, nom)
+        for racine, _, noms in os.walk(dossier)
+        for nom in noms
+        if nom.lower().endswith(EXTENSIONS) and not nom.startswith('~$')
+    )
+
+
+def analyser_dossier(dossier, processus=None, recursif=True):
+    """
+    Lit tous les fichiers du dossier en parallèle puis calcule le diagnostic
+    complet en une passe. Retourne (diagnostics, erreurs).
+    """
+    chemins = lister_fichiers(dossier, recursif)
+    processus = processus or os.cpu_count() or 1
+    lots, erreurs = [], []
+
+    if chemins:
+        taille_lot = max(1, len(chemins) // (processus * 4))
+        with ProcessPoolExecutor(max_workers=processus) as executor:
+            for chemin, postes, erreur in executor.map(_lire_fichier_sans_erreur, chemins, chunksize=taille_lot):
+                fichier = os.path.relpath(chemin, dossier)
+                if erreur is None:
+                    lots.append(postes.assign(fichier=fichier))
+                else:
+                    erreurs.append({'fichier': fichier, 'erreur': erreur})
+
+    erreurs = pd.DataFrame(erreurs, columns=['fichier', 'erreur'])
+    if not lots:
+        return pd.DataFrame(), erreurs
+
+    postes = pd.concat(lots, ignore_index=True)
+    if 'exercice' not in postes:
+        postes['exercice'] = None
+    identifiants = postes[['fichier', 'exercice']]
+    diagnostics = calculs_financiers.diagnostic_complet(postes)
+    postes = postes.reindex(columns=calculs_financiers.POSTES).astype(float)
+    return pd.concat([identifiants, postes, diagnostics], axis=1), erreurs
+
+
+def ecrire_resultats(diagnostics, erreurs, sortie):
+    """Écrit le fichier consolidé (Parquet ou Excel selon l'extension) et le journal des erreurs"""
+    dossier_sortie = os.path.dirname(os.path.abspath(sortie))
+    os.makedirs(dossier_sortie, exist_ok=True)
+    if sortie.lower().endswith(('.xlsx', '.xls')):
+        export_excel.ecrire_tableaux({"Diagnostics": diagnostics}, sortie)
+    else:
+        diagnostics.to_parquet(sortie, index=False)
+
+    journal = os.path.splitext(sortie)[0] + "_erreurs.csv"
+    erreurs.to_csv(journal, index=False)
+    return journal
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(
+        description="Diagnostic financier en lot d'un dossier de fichiers XLSX, CSV et FEC"
+    )
+    parser.add_argument("dossier", help="Dossier contenant les fichiers à analyser")
+    parser.add_argument("--sortie", default="diagnostics.parquet", help="Fichier consolidé (.parquet ou .xlsx)")
+    parser.add_argument("--processus", type=int, default=None, help="Nombre de processus (défaut : nombre de cœurs)")
+    parser.add_argument("--non-recursif", action="store_true", help="Ne pas parcourir les sous-dossiers")
+    parser.add_argument("--rapports", default=None, help="Dossier où écrire le rapport de chaque fichier (dernier exercice)")
+    parser.add_argument("--formats", nargs="+", choices=rapports.FORMATS, default=list(rapports.FORMATS),
+                        help="Formats des rapports (défaut : html pdf)")
+    args = parser.parse_args(arguments)
+
+    if not os.path.isdir(args.dossier):
+        parser.error(f"Dossier introuvable : {args.dossier}")
+
+    debut = time.perf_counter()
+    diagnostics, erreurs = analyser_dossier(args.dossier, args.processus, not args.non_recursif)
+    journal = ecrire_resultats(diagnostics, erreurs, args.sortie)
+
+    nb_fichiers = diagnostics['fichier'].nunique() if not diagnostics.empty else 0
+    print(f"✅ {nb_fichiers} fichier(s) analysé(s), {len(diagnostics)} exercice(s) -> {args.sortie}")
+    print(f"⚠️ {len(erreurs)} fichier(s) en erreur -> {journal}")
+    if args.rapports and not diagnostics.empty:
+        derniers_exercices = diagnostics.groupby('fichier', sort=False).tail(1).set_index('fichier')
+        resultat = rapports.generer_rapports(derniers_exercices, args.rapports, tuple(args.formats), args.processus)
+        print(f"📑 {resultat['erreur'].isna().sum()} rapport(s), "
+              f"{resultat['sections_en_cache'].sum()} section(s) reprises du cache -> {args.rapports}")
+    print(f"⏱️ {time.perf_counter() - debut:.1f} s")
+    return 1 if diagnostics.empty and len(erreurs) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
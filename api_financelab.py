@@ -0,0 +1,387 @@
+"""
+🔌 FINANCELAB - API JSON locale
+Description: Service HTTP (bibliothèque standard uniquement) exposant aux autres
+systèmes les moteurs de calcul des pages : DCF, score Conan-Holder, VAN/TIR et
+diagnostic du bilan. Chaque point d'entrée accepte un objet ou un lot
+(`{"lot": [...]}`) calculé en une passe vectorisée. Les requêtes sont servies
+par un pool de fils, les réponses mises en cache selon le corps de la requête
+et les temps de traitement mesurés par point d'entrée.
+
+Usage :
+    python api_financelab.py --port 8765 --fils 8
+    python api_financelab.py --test-charge http://127.0.0.1:8765/dcf --requetes 2000 --concurrence 16
+"""
+
+import argparse
+import hashlib
+import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib import request as requete_http
+
+import numpy as np
+import pandas as pd
+
+import calculs_financiers
+from gestion_session import CachePartage
+
+# =============================================================================
+# PARAMÈTRES
+# =============================================================================
+
+PORT = 8765
+NB_FILS = 8
+PLAFOND_CACHE = 64 * 1024 ** 2     # Octets de réponses conservées
+TAILLE_MAX_CORPS = 16 * 1024 ** 2  # Octets acceptés par requête
+FENETRE_METRIQUES = 1000           # Durées conservées par point d'entrée
+
+
+# =============================================================================
+# POINTS D'ENTRÉE (un lot d'objets -> un lot de résultats)
+# =============================================================================
+
+def _colonne(elements, champ, defaut=None):
+    """Valeurs d'un champ pour tout le lot (KeyError si un champ obligatoire manque)"""
+    if defaut is None:
+        return np.array([element[champ] for element in elements], dtype=float)
+    return np.array([element.get(champ, defaut) for element in elements], dtype=float)
+
+
+def _lignes(resultats, nb):
+    """Dictionnaire de tableaux -> liste de dictionnaires (une ligne par élément)"""
+    colonnes = {cle: np.broadcast_to(np.asarray(valeur), (nb,)) for cle, valeur in resultats.items()}
+    return [{cle: valeurs[i] for cle, valeurs in colonnes.items()} for i in range(nb)]
+
+
+def calculer_dcf(elements):
+    """Champs : fcf_actuel, croissance, croissance_perpetuite, wacc (%), dette_nette, annees (5)"""
+    resultats = [None] * len(elements)
+    annees = [int(element.get('annees', 5)) for element in elements]
+    for horizon in set(annees):
+        positions = [i for i, a in enumerate(annees) if a == horizon]
+        groupe = [elements[i] for i in positions]
+        valorisation = calculs_financiers.valoriser_dcf(
+            _colonne(groupe, 'fcf_actuel'),
+            _colonne(groupe, 'croissance'),
+            _colonne(groupe, 'croissance_perpetuite'),
+            _colonne(groupe, 'wacc'),
+            _colonne(groupe, 'dette_nette', 0.0),
+            annees=horizon
+        )
+        for position, ligne in zip(positions, _lignes(valorisation, len(groupe))):
+            resultats[position] = ligne
+    return resultats
+
+
+def calculer_score(elements):
+    """Champs : ebe, endettement_global, capitaux_permanents, actif_total, frais_financiers,
+    chiffre_affaires, charges_personnel, valeur_ajoutee, realisable_disponible (0,3)"""
+    score = calculs_financiers.score_conan_holder(
+        _colonne(elements, 'ebe'),
+        _colonne(elements, 'endettement_global'),
+        _colonne(elements, 'capitaux_permanents'),
+        _colonne(elements, 'actif_total'),
+        _colonne(elements, 'frais_financiers'),
+        _colonne(elements, 'chiffre_affaires'),
+        _colonne(elements, 'charges_personnel'),
+        _colonne(elements, 'valeur_ajoutee'),
+        _colonne(elements, 'realisable_disponible', 0.3),
+    )
+    return _lignes(score, len(elements))
+
+
+def calculer_van_tir(elements):
+    """Champs : investissement, flux (liste annuelle), taux (%). Les flux plus courts sont complétés par des zéros."""
+    duree = max(len(element['flux']) for element in elements)
+    flux = np.zeros((len(elements), duree))
+    for i, element in enumerate(elements):
+        flux[i, :len(element['flux'])] = element['flux']
+    investissement = _colonne(elements, 'investissement')
+    taux = _colonne(elements, 'taux') / 100
+
+    tir = calculs_financiers.tir(investissement, flux)
+    return _lignes({
+        'van': calculs_financiers.van(investissement, flux, taux),
+        'tir': tir * 100,
+        'indice_profitabilite': (calculs_financiers.van(investissement, flux, taux) + investissement) / investissement,
+    }, len(elements))
+
+
+def calculer_bilan(elements):
+    """Champs : postes de calculs_financiers.POSTES (k€ ; un poste absent rend inconnus les indicateurs qui en dépendent)"""
+    diagnostic = calculs_financiers.diagnostic_complet(pd.DataFrame(elements))
+    return diagnostic.to_dict(orient='records')
+
+
+POINTS_ENTREE = {
+    '/dcf': calculer_dcf,
+    '/score': calculer_score,
+    '/van-tir': calculer_van_tir,
+    '/bilan': calculer_bilan,
+}
+
+
+def _en_json(valeur):
+    """Types numpy -> types JSON (NaN et infinis -> null)"""
+    if isinstance(valeur, dict):
+        return {cle: _en_json(v) for cle, v in valeur.items()}
+    if isinstance(valeur, (list, tuple)):
+        return [_en_json(v) for v in valeur]
+    if isinstance(valeur, np.ndarray):
+        return _en_json(valeur.tolist())
+    if isinstance(valeur, (np.generic,)):
+        valeur = valeur.item()
+    if isinstance(valeur, float) and not np.isfinite(valeur):
+        return None
+    return valeur
+
+
+def traiter(chemin, corps):
+    """
+    Calcule la réponse d'un point d'entrée pour un corps JSON déjà décodé :
+    un objet -> un résultat, `{"lot": [...]}` -> `{"resultats": [...]}`.
+    """
+    calcul = POINTS_ENTREE[chemin]
+    if isinstance(corps, dict) and 'lot' in corps:
+        if not isinstance(corps['lot'], list) or not corps['lot']:
+            raise ValueError("« lot » doit être une liste non vide")
+        return {'resultats': _en_json(calcul(corps['lot']))}
+    if not isinstance(corps, dict):
+        raise ValueError("Le corps doit être un objet JSON")
+    return _en_json(calcul([corps])[0])
+
+
+# =============================================================================
+# MÉTRIQUES
+# =============================================================================
+
+class Metriques:
+    """Compteurs et durées récentes par point d'entrée"""
+
+    def __init__(self, fenetre=FENETRE_METRIQUES):
+        self._verrou = threading.Lock()
+        self._fenetre = fenetre
+        self._points = {}
+        self.demarrage = time.time()
+
+    def enregistrer(self, chemin, duree, statut, depuis_cache):
+        with self._verrou:
+            point = self._points.setdefault(chemin, {
+                'requetes': 0, 'erreurs': 0, 'cache': 0, 'durees': deque(maxlen=self._fenetre)
+            })
+            point['requetes'] += 1
+            point['erreurs'] += statut >= 400
+            point['cache'] += depuis_cache
+            point['durees'].append(duree)
+
+    def synthese(self):
+        with self._verrou:
+            points = {chemin: (dict(point), np.array(point['durees'])) for chemin, point in self._points.items()}
+        return {
+            'duree_fonctionnement_s': round(time.time() - self.demarrage, 1),
+            'points_entree': {
+                chemin: {
+                    'requetes': point['requetes'],
+                    'erreurs': point['erreurs'],
+                    'taux_cache': point['cache'] / point['requetes'],
+                    'duree_moyenne_ms': float(durees.mean() * 1000),
+                    'duree_p50_ms': float(np.percentile(durees, 50) * 1000),
+                    'duree_p95_ms': float(np.percentile(durees, 95) * 1000),
+                    'duree_max_ms': float(durees.max() * 1000),
+                }
+                for chemin, (point, durees) in points.items()
+            },
+        }
+
+
+# =============================================================================
+# SERVEUR
+# =============================================================================
+
+class GestionnaireRequetes(BaseHTTPRequestHandler):
+    server_version = "FinanceLabAPI/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass  # Les métriques remplacent le journal d'accès
+
+    def _repondre(self, statut, contenu, depuis_cache=False, debut=None):
+        if not isinstance(contenu, bytes):
+            contenu = json.dumps(contenu, ensure_ascii=False).encode('utf-8')
+        self.send_response(statut)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(contenu)))
+        self.send_header("X-Cache", "HIT" if depuis_cache else "MISS")
+        if debut is not None:
+            self.send_header("X-Temps-Traitement-ms", f"{(time.perf_counter() - debut) * 1000:.2f}")
+        self.end_headers()
+        self.wfile.write(contenu)
+
+    def do_GET(self):
+        if self.path == '/sante':
+            self._repondre(200, {'statut': 'ok', 'points_entree': list(POINTS_ENTREE)})
+        elif self.path == '/metriques':
+            synthese = self.server.metriques.synthese()
+            synthese['cache'] = {
+                'entrees': len(self.server.cache),
+                'occupation_octets': self.server.cache.occupation,
+                'liberations': self.server.cache.liberations,
+            }
+            self._repondre(200, synthese)
+        else:
+            self._repondre(404, {'erreur': f"Point d'entrée inconnu : {self.path}"})
+
+    def do_POST(self):
+        debut = time.perf_counter()
+        chemin = self.path.rstrip('/')
+        statut, depuis_cache = 200, False
+        try:
+            if chemin not in POINTS_ENTREE:
+                statut, reponse = 404, {'erreur': f"Point d'entrée inconnu : {self.path}"}
+            else:
+                entete = self.headers.get('Content-Length', '0').strip()
+                longueur = int(entete) if entete.isdigit() else -1
+                # Corps non lu : la connexion est fermée pour ne pas le prendre pour la requête suivante
+                if longueur < 0:
+                    statut, reponse = 400, {'erreur': f"Content-Length invalide : {entete!r}"}
+                    self.close_connection = True
+                elif longueur > TAILLE_MAX_CORPS:
+                    statut, reponse = 413, {'erreur': "Corps de requête trop volumineux"}
+                    self.close_connection = True
+                else:
+                    corps = self.rfile.read(longueur)
+                    cle = f"{chemin}:{hashlib.sha256(corps).hexdigest()}"
+                    reponse = self.server.cache.obtenir(cle)
+                    depuis_cache = reponse is not None
+                    if not depuis_cache:
+                        reponse = json.dumps(traiter(chemin, json.loads(corps)), ensure_ascii=False).encode('utf-8')
+                        self.server.cache.deposer(cle, reponse)
+        except json.JSONDecodeError as e:
+            statut, reponse = 400, {'erreur': f"JSON invalide : {e}"}
+        except KeyError as e:
+            statut, reponse = 400, {'erreur': f"Champ manquant : {e}"}
+        except (TypeError, ValueError) as e:
+            statut, reponse = 400, {'erreur': str(e)}
+        except Exception as e:
+            statut, reponse = 500, {'erreur': f"{type(e).__name__}: {e}"}
+
+        self._repondre(statut, reponse, depuis_cache, debut)
+        self.server.metriques.enregistrer(chemin, time.perf_counter() - debut, statut, depuis_cache)
+
+
+class ServeurAPI(HTTPServer):
+    """Serveur HTTP dont les connexions sont servies par un pool de fils borné"""
+
+    daemon_threads = True
+
+    def __init__(self, adresse, nb_fils=NB_FILS, plafond_cache=PLAFOND_CACHE):
+        super().__init__(adresse, GestionnaireRequetes)
+        self.pool = ThreadPoolExecutor(max_workers=nb_fils, thread_name_prefix="api")
+        self.cache = CachePartage(plafond_cache)
+        self.metriques = Metriques()
+
+    def process_request(self, requete, adresse_client):
+        self.pool.submit(self._servir, requete, adresse_client)
+
+    def _servir(self, requete, adresse_client):
+        try:
+            self.finish_request(requete, adresse_client)
+        except Exception:
+            self.handle_error(requete, adresse_client)
+        finally:
+            self.shutdown_request(requete)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+def demarrer(hote="127.0.0.1", port=PORT, nb_fils=NB_FILS):
+    """Démarre le serveur dans un fil d'arrière-plan et le retourne (tests, intégration)"""
+    serveur = ServeurAPI((hote, port), nb_fils)
+    threading.Thread(target=serveur.serve_forever, daemon=True).start()
+    return serveur
+
+
+# =============================================================================
+# TEST DE CHARGE
+# =============================================================================
+
+CORPS_EXEMPLE = {
+    '/dcf': {'fcf_actuel': 500, 'croissance': 5, 'croissance_perpetuite': 2, 'wacc': 9, 'dette_nette': 800},
+    '/score': {'ebe': 150, 'endettement_global': 500, 'capitaux_permanents': 800, 'actif_total': 1000,
+               'frais_financiers': 20, 'chiffre_affaires': 1000, 'charges_personnel': 350, 'valeur_ajoutee': 500},
+    '/van-tir': {'investissement': 100000, 'flux': [30000] * 5, 'taux': 8},
+    '/bilan': {'actif_immobilise': 1500, 'stocks': 800, 'clients': 1200, 'disponibilites': 300, 'capital': 1000,
+               'reserves': 800, 'resultat_net': 200, 'dettes_lt': 1000, 'dettes_ct': 800,
+               'concours_bancaires': 100},
+}
+
+
+def tester_charge(url, corps, requetes=1000, concurrence=16, varier=True):
+    """
+    Envoie `requetes` requêtes POST avec `concurrence` clients simultanés.
+    `varier` modifie légèrement chaque corps pour mesurer le calcul plutôt que le cache.
+    Retourne débit, latences et nombre d'erreurs.
+    """
+    def envoyer(numero):
+        contenu = dict(corps, _requete=numero) if varier else corps
+        donnees = json.dumps(contenu).encode('utf-8')
+        debut = time.perf_counter()
+        try:
+            appel = requete_http.Request(url, data=donnees, headers={'Content-Type': 'application/json'})
+            with requete_http.urlopen(appel, timeout=30) as reponse:
+                reponse.read()
+            return time.perf_counter() - debut, False
+        except Exception:
+            return time.perf_counter() - debut, True
+
+    debut = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrence) as executor:
+        mesures = list(executor.map(envoyer, range(requetes)))
+    duree = time.perf_counter() - debut
+
+    latences = np.array([latence for latence, _ in mesures]) * 1000
+    return {
+        'requetes': requetes,
+        'erreurs': sum(erreur for _, erreur in mesures),
+        'debit_req_s': requetes / duree,
+        'latence_p50_ms': float(np.percentile(latences, 50)),
+        'latence_p95_ms': float(np.percentile(latences, 95)),
+        'latence_max_ms': float(latences.max()),
+    }
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="API JSON locale des moteurs FinanceLab")
+    parser.add_argument("--hote", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--fils", type=int, default=NB_FILS, help="Taille du pool de fils")
+    parser.add_argument("--test-charge", metavar="URL", help="Mesurer un point d'entrée au lieu de servir")
+    parser.add_argument("--requetes", type=int, default=1000)
+    parser.add_argument("--concurrence", type=int, default=16)
+    args = parser.parse_args(arguments)
+
+    if args.test_charge:
+        chemin = "/" + args.test_charge.split("/", 3)[-1].rstrip("/")
+        print(json.dumps(
+            tester_charge(args.test_charge, CORPS_EXEMPLE.get(chemin, {}), args.requetes, args.concurrence),
+            indent=2
+        ))
+        return
+
+    serveur = ServeurAPI((args.hote, args.port), args.fils)
+    print(f"🔌 API FinanceLab sur http://{args.hote}:{args.port} ({', '.join(POINTS_ENTREE)})")
+    try:
+        serveur.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        serveur.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,8 @@ import plotly.graph_objects as go
 import plotly.express as px
 from plotly.subplots import make_subplots
 
+import export_excel
+
 # Configuration de la page
 st.set_page_config(
     page_title="FinanceLab - Analyse Financière",
@@ -716,17 +718,13 @@ def exporter_analyse(nom_analyse, données):
     col1, col2 = st.columns(2)
     
     with col1:
-        if st.button(f"📊 Exporter {nom_analyse} en Excel"):
-            # Créer le fichier Excel
-            output = BytesIO()
-            with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-                df.to_excel(writer, sheet_name='Analyse', index=False)
-            st.download_button(
-                label="📥 Télécharger Excel",
-                data=output.getvalue(),
-                file_name=f"analyse_{nom_analyse}_{pd.Timestamp.now().strftime('%Y%m%d')}.xlsx",
-                mime="application/vnd.ms-excel"
-            )
+        # Le classeur n'est écrit (en flux, à mémoire constante) qu'au clic sur le bouton
+        st.download_button(
+            label=f"📊 Exporter {nom_analyse} en Excel",
+            data=lambda: export_excel.ecrire_tableaux({'Analyse': df}),
+            file_name=f"analyse_{nom_analyse}_{pd.Timestamp.now().strftime('%Y%m%d')}.xlsx",
+            mime=export_excel.MIME_XLSX
+        )
     
     with col2:
         if st.button(f"📄 Exporter {nom_analyse} en PDF"):
@@ -9,9 +9,30 @@ import requests
 from datetime import datetime, timedelta
 from sklearn.linear_model import LinearRegression
 from sklearn.ensemble import RandomForestRegressor
+import os
 import pickle
 from io import BytesIO
 
+import alertes
+import balance_agee
+import benchmark_sectoriel
+import calculs_financiers
+import endettement
+import etats_financiers
+import gestion_session
+import lettrage
+import multiples_marche
+import passerelle_marche
+import prevision_tresorerie
+import rapports
+import recherche_objectif
+import screener_ratios
+import scenarios
+import sensibilite
+import series_temporelles
+import seuil_multiproduits
+import travaux
+
 # Configuration de la page
 st.set_page_config(
     page_title="FinanceLab - Analyse Financière",
@@ -59,15 +80,55 @@ if 'progression' not in st.session_state:
 if 'analyses_sauvegardees' not in st.session_state:
     st.session_state.analyses_sauvegardees = []
 
+# Dernières hypothèses saisies dans chaque calculateur (instantanés des scénarios)
+if 'hypotheses' not in st.session_state:
+    st.session_state.hypotheses = {}
+
 if 'watchlist' not in st.session_state:
     st.session_state.watchlist = []
 
 if 'notifications' not in st.session_state:
-    st.session_state.notifications = [
-        {"type": "info", "message": "📚 Module Fondamentaux à compléter", "date": "2024-01-15"},
-        {"type": "warning", "message": "⚡ Quiz Ratios à réviser", "date": "2024-01-14"},
-        {"type": "success", "message": "🎉 Bienvenue dans FinanceLab !", "date": "2024-01-13"}
-    ]
+    # Tampon circulaire : les notifications les plus récentes sont en fin de file
+    st.session_state.notifications = gestion_session.file_notifications([
+        {"type": "info", "message": "📚 Module Fondamentaux à compléter", "date": datetime.now().strftime("%Y-%m-%d")},
+        {"type": "success", "message": "🎉 Bienvenue dans FinanceLab !", "date": datetime.now().strftime("%Y-%m-%d")}
+    ])
+
+if 'utilisateur' not in st.session_state:
+    # Propriétaire des règles d'alerte et des scénarios : propre à chaque session anonyme
+    st.session_state.utilisateur = alertes.identifiant_anonyme()
+    st.session_state.derniere_notification = 0
+
+# Objets volumineux partagés entre toutes les sessions (la session ne garde que leurs clés)
+@st.cache_resource
+def cache_partage():
+    return gestion_session.CachePartage(gestion_session.PLAFOND_GLOBAL)
+
+if 'ressources' not in st.session_state:
+    st.session_state.ressources = gestion_session.RessourcesSession(cache_partage(), gestion_session.PLAFOND_SESSION)
+
+# Scénarios de l'utilisateur, lus sur disque modèle par modèle au premier accès
+# (recueil reconstruit lorsque l'identifiant change)
+dossier_scenarios = scenarios.dossier_utilisateur(st.session_state.utilisateur)
+if 'scenarios' not in st.session_state or st.session_state.scenarios.dossier != dossier_scenarios:
+    st.session_state.scenarios = scenarios.RecueilScenarios(dossier_scenarios)
+
+# Règles d'alerte évaluées chaque minute par un planificateur unique, partagé entre les sessions
+@st.cache_resource
+def planificateur_alertes():
+    return alertes.PlanificateurAlertes(alertes.MoteurAlertes()).demarrer()
+
+# Relève des notifications émises par les règles de l'utilisateur depuis le dernier affichage
+def relever_notifications():
+    nouvelles = planificateur_alertes().moteur.notifications(
+        st.session_state.utilisateur, apres=st.session_state.derniere_notification
+    )
+    for notif in nouvelles.iloc[::-1].itertuples():
+        st.session_state.notifications.append({"type": notif.type, "message": notif.message, "date": notif.date[:10]})
+    if not nouvelles.empty:
+        st.session_state.derniere_notification = int(nouvelles['id'].max())
+
+relever_notifications()
 
 # Titre principal
 st.markdown('<h1 class="main-header">🎯 FinanceLab - Maîtrisez l\'Analyse Financière</h1>', unsafe_allow_html=True)
@@ -87,7 +148,7 @@ def afficher_notifications():
         st.sidebar.markdown("---")
         st.sidebar.subheader("🔔 Notifications")
         
-        for notif in st.session_state.notifications[:3]:
+        for notif in list(st.session_state.notifications)[-3:][::-1]:
             if notif["type"] == "info":
                 st.sidebar.info(notif["message"])
             elif notif["type"] == "warning":
@@ -98,6 +159,177 @@ def afficher_notifications():
 # Appel de la fonction notifications
 afficher_notifications()
 
+# Référentiel sectoriel (None tant qu'aucun benchmark n'a été construit)
+benchmark = benchmark_sectoriel.charger_benchmark()
+
+# Univers du screener, partagé entre les sessions et indexé une seule fois par fichier
+@st.cache_resource(max_entries=2)
+def charger_screener(file_id, _fichier, nom_fichier):
+    return screener_ratios.ScreenerRatios(screener_ratios.charger_univers(_fichier, nom_fichier))
+
+# Lettrage d'un grand livre (partagé entre sessions, résultats en lecture seule)
+@st.cache_resource(max_entries=2)
+def lettrer_grand_livre(file_id, _contenu, nom_fichier):
+    return lettrage.lettrer(lettrage.charger_grand_livre(_contenu, nom_fichier))
+
+
+@st.cache_resource
+def lettrer_exemple():
+    return lettrage.lettrer(lettrage.normaliser_ecritures(lettrage.exemple_grand_livre()))
+
+
+@st.cache_resource(max_entries=4)
+def pieces_a_prevoir(cle_lettrage, _factures, date_debut):
+    """Pièces ouvertes au début de la prévision (clients, fournisseurs) et retards historiques des tiers"""
+    ouvertes = balance_agee.encours_lettre(_factures, date_debut)
+    return (ouvertes[ouvertes['nature'] == 'client'], ouvertes[ouvertes['nature'] == 'fournisseur'],
+            prevision_tresorerie.retards_historiques(_factures))
+
+
+@st.cache_data(max_entries=16)
+def echeances_emprunts(montant, taux, duree, debut, jour):
+    """Mensualités (date, montant en €) d'un emprunt amortissable, tirées de son tableau d'amortissement"""
+    portefeuille = pd.DataFrame([{'montant': montant, 'taux': taux, 'duree': duree, 'debut': pd.Timestamp(debut)}])
+    return endettement.echeances_datees(endettement.echeancier(portefeuille), jour)
+
+
+# Calculs longs exécutés hors du script, suivis dans une table SQLite (travaux anciens purgés)
+@st.cache_resource
+def gestionnaire_travaux():
+    return travaux.GestionnaireTravaux()
+
+if 'travaux' not in st.session_state:
+    st.session_state.travaux = {}  # nom -> identifiant du dernier travail lancé
+
+def _suivi_travail(id_travail, etait_actif, afficher_resultat):
+    etat = gestionnaire_travaux().etat(id_travail)
+    if etat is None:
+        return
+    if etat['statut'] in travaux.STATUTS_ACTIFS:
+        st.progress(etat['progression'], text=etat['message'] or "En attente d'un processus de calcul...")
+        if st.button("⏹️ Annuler", key=f"annuler_{id_travail}"):
+            gestionnaire_travaux().annuler(id_travail)
+    elif etait_actif:
+        st.rerun()  # Travail achevé : la page est réaffichée une fois avec son résultat
+    elif etat['statut'] == travaux.TERMINE:
+        afficher_resultat(gestionnaire_travaux().resultat(id_travail))
+    elif etat['statut'] == travaux.ERREUR:
+        st.error(f"Erreur : {etat['erreur'].splitlines()[0]}")
+    else:
+        st.info(f"Travail {etat['statut'].replace('_', ' ')}")
+
+# Fonction pour suivre un travail sans bloquer (rafraîchi toutes les 2 s tant qu'il est actif)
+def suivre_travail(id_travail, afficher_resultat):
+    etat = gestionnaire_travaux().etat(id_travail)
+    actif = etat is not None and etat['statut'] in travaux.STATUTS_ACTIFS
+    st.fragment(_suivi_travail, run_every=2 if actif else None)(id_travail, actif, afficher_resultat)
+
+# Travaux de la session : on peut naviguer pendant le calcul et revenir chercher le résultat
+if st.session_state.travaux:
+    st.sidebar.markdown("---")
+    st.sidebar.subheader("⏳ Mes travaux")
+    for nom_travail, id_travail in st.session_state.travaux.items():
+        etat_travail = gestionnaire_travaux().etat(id_travail)
+        if etat_travail is not None:
+            st.sidebar.caption(f"{nom_travail} : {etat_travail['statut'].replace('_', ' ')} ({etat_travail['progression']:.0%})")
+
+# Calculateurs mémorisés : une même combinaison d'hypothèses n'est calculée qu'une fois
+calculer_dcf = st.cache_data(max_entries=256)(calculs_financiers.valoriser_dcf)
+calculer_levier = st.cache_data(max_entries=256)(calculs_financiers.effet_levier)
+calculer_seuil = st.cache_data(max_entries=256)(calculs_financiers.seuil_rentabilite)
+
+# Diagramme en tornade : toutes les hypothèses d'un calculateur variées une à une, en un seul calcul vectorisé
+def afficher_tornade(calculateur, entrees, sortie, libelles, titre, unite="k€", cle="tornade", bornes=None):
+    variation = st.slider("Variation de chaque hypothèse (± %)", 1, 50, 10, key=f"variation_{cle}")
+    reference, tableau = sensibilite.tornade(calculateur, entrees, sortie, variation, bornes, libelles=libelles)
+    tableau = tableau.iloc[::-1]  # La plus influente en haut du graphique
+    fig_tornade = go.Figure()
+    fig_tornade.add_trace(go.Bar(y=tableau['hypothese'], x=tableau['ecart_bas'], base=reference, orientation='h',
+                                 name=f"-{variation} %", marker_color='indianred'))
+    fig_tornade.add_trace(go.Bar(y=tableau['hypothese'], x=tableau['ecart_haut'], base=reference, orientation='h',
+                                 name=f"+{variation} %", marker_color='seagreen'))
+    fig_tornade.add_vline(x=reference, line_color="black")
+    fig_tornade.update_layout(barmode='overlay', title=f"{titre} : {reference:,.0f} {unite}",
+                              xaxis_title=unite, height=120 + 40 * len(tableau))
+    st.plotly_chart(fig_tornade, use_container_width=True)
+    st.caption(f"{2 * len(tableau) + 1} jeux d'hypothèses évalués en un seul calcul")
+
+# Recherche d'objectif : valeur d'une (ou de deux) hypothèse(s) donnant un résultat cible
+def afficher_recherche_objectif(calculateur, entrees, sorties, libelles, unite="k€", cle="objectif", bornes=None):
+    # Intervalle de recherche : bornes données (plages des curseurs), sinon de 0 à 3 fois la valeur actuelle
+    # (côté négatif si la valeur actuelle l'est, ex. trésorerie nette)
+    bornes = {
+        nom: (bornes or {}).get(nom, (min(0.0, 3 * float(valeur)), max(0.0, 3 * float(valeur)) or 1.0))
+        for nom, valeur in entrees.items()
+    }
+    col_obj1, col_obj2 = st.columns(2)
+    with col_obj1:
+        sortie = st.selectbox("Résultat visé", list(sorties), format_func=sorties.get, key=f"sortie_{cle}")
+        actuel = float(sensibilite.evaluer(calculateur, pd.DataFrame([entrees]), sortie)[0])
+        cible = st.number_input(f"Valeur cible ({unite})", value=round(actuel * 1.1, 2) if np.isfinite(actuel) else 0.0,
+                                key=f"cible_{cle}")
+    with col_obj2:
+        variable = st.selectbox("Hypothèse à ajuster", list(entrees), format_func=lambda nom: libelles.get(nom, nom),
+                                key=f"variable_{cle}")
+        bas, haut = bornes[variable]
+        st.caption(f"Recherche entre {bas:,.2f} et {haut:,.2f} (actuel : {float(entrees[variable]):,.2f})")
+
+    try:
+        recherche = recherche_objectif.chercher(calculateur, entrees, variable, cible, bornes[variable], sortie)
+    except ValueError as e:
+        st.warning(str(e))
+        return
+    if recherche['atteint']:
+        st.success(f"🎯 {libelles.get(variable, variable)} = **{recherche['solution']:,.2f}** "
+                   f"(actuel : {float(entrees[variable]):,.2f}) → {sorties[sortie]} = {recherche['resultat']:,.0f} {unite}")
+        if len(recherche['solutions']) > 1:
+            st.caption("Autres solutions : " + ", ".join(f"{s:,.2f}" for s in recherche['solutions']
+                                                          if s != recherche['solution']))
+    else:
+        st.warning(f"Cible inatteignable dans l'intervalle : au mieux {recherche['resultat']:,.0f} {unite} "
+                   f"avec {libelles.get(variable, variable)} = {recherche['solution']:,.2f}")
+
+    if st.checkbox("Ajuster deux hypothèses à la fois", key=f"deux_{cle}"):
+        seconde = st.selectbox("Seconde hypothèse", [nom for nom in entrees if nom != variable],
+                               format_func=lambda nom: libelles.get(nom, nom), key=f"seconde_{cle}_{variable}")
+        courbe = recherche_objectif.frontiere(calculateur, entrees, (variable, seconde), cible, bornes, sortie)
+        atteignables = courbe.dropna(subset=[seconde])
+        if atteignables.empty:
+            st.warning("Aucune combinaison des deux hypothèses n'atteint la cible")
+            return
+        minimal = atteignables[atteignables['minimal']].iloc[0]
+        fig_frontiere = go.Figure()
+        fig_frontiere.add_trace(go.Scatter(x=atteignables[variable], y=atteignables[seconde], mode='lines',
+                                           name="Combinaisons atteignant la cible"))
+        fig_frontiere.add_trace(go.Scatter(x=[entrees[variable]], y=[entrees[seconde]], mode='markers',
+                                           name="Situation actuelle", marker=dict(size=12, color='black')))
+        fig_frontiere.add_trace(go.Scatter(x=[minimal[variable]], y=[minimal[seconde]], mode='markers',
+                                           name="Effort minimal", marker=dict(size=12, symbol='star', color='gold')))
+        fig_frontiere.update_layout(title=f"{sorties[sortie]} = {cible:,.0f} {unite}",
+                                    xaxis_title=libelles.get(variable, variable), yaxis_title=libelles.get(seconde, seconde))
+        st.plotly_chart(fig_frontiere, use_container_width=True)
+        st.info(f"Effort minimal : {libelles.get(variable, variable)} = {minimal[variable]:,.2f} et "
+                f"{libelles.get(seconde, seconde)} = {minimal[seconde]:,.2f} ({minimal['effort']:.0f} % d'écart cumulé)")
+
+# Rapport d'une entreprise (les sections déjà rendues sont reprises du cache disque)
+@st.cache_data(max_entries=32)
+def generer_rapport_entreprise(nom_entreprise, postes):
+    return rapports.rapport_entreprise(nom_entreprise, dict(postes))
+
+# Fonction pour positionner un ratio dans son secteur
+def afficher_position_sectorielle(ratio, valeur):
+    if benchmark is None or 'secteur_benchmark' not in st.session_state:
+        return
+    position = benchmark_sectoriel.position_sectorielle(
+        benchmark,
+        st.session_state.secteur_benchmark,
+        st.session_state.taille_benchmark,
+        ratio,
+        valeur
+    )
+    if position:
+        st.caption(position)
+
 # Section Accueil
 if section == "🏠 Accueil":
     st.header("🏠 Bienvenue dans FinanceLab !")
@@ -175,9 +407,10 @@ elif section == "📋 Fondamentaux":
             })
             st.rerun()
     
-    tab1, tab2, tab3, tab4 = st.tabs(["📊 Principes Comptables", "🏦 Le Bilan", "📈 Compte de Résultat", "🧮 Soldes Intermédiaires"])
+    # Seul l'onglet affiché est calculé (st.tabs exécuterait tous les onglets)
+    onglet = st.radio("Thème :", ["📊 Principes Comptables", "🏦 Le Bilan", "📈 Compte de Résultat", "🧮 Soldes Intermédiaires"], horizontal=True, key="onglet_fondamentaux")
     
-    with tab1:
+    if onglet == "📊 Principes Comptables":
         st.subheader("Les 10 Principes Comptables Fondamentaux")
         
         principles = {
@@ -204,7 +437,7 @@ elif section == "📋 Fondamentaux":
                 with st.expander(f"✅ {principle}"):
                     st.write(description)
     
-    with tab2:
+    elif onglet == "🏦 Le Bilan":
         st.subheader("🔄 Reclassement du Bilan Interactif")
         
         col1, col2 = st.columns(2)
@@ -278,7 +511,7 @@ elif section == "📋 Fondamentaux":
                 Cette vision facilite l'analyse de l'équilibre financier.
                 """)
 
-    with tab3:
+    elif onglet == "📈 Compte de Résultat":
         st.subheader("📈 Structure du Compte de Résultat")
         
         col1, col2 = st.columns(2)
@@ -344,7 +577,7 @@ elif section == "📋 Fondamentaux":
         )
         st.plotly_chart(fig_soldes, use_container_width=True)
 
-    with tab4:
+    elif onglet == "🧮 Soldes Intermédiaires":
         st.subheader("🧮 Calculateur de Soldes Intermédiaires de Gestion")
         
         st.markdown("""
@@ -421,9 +654,10 @@ elif section == "💰 Performance":
             })
             st.rerun()
     
-    tab1, tab2, tab3 = st.tabs(["📈 Création de Valeur (EVA)", "⚖️ Levier Financier", "🎯 Seuil de Rentabilité"])
+    # Seul l'outil affiché est calculé (st.tabs exécuterait tous les onglets)
+    onglet = st.radio("Outil d'analyse:", ['📈 Création de Valeur (EVA)', '⚖️ Levier Financier', '🎯 Seuil de Rentabilité'], horizontal=True)
     
-    with tab1:
+    if onglet == '📈 Création de Valeur (EVA)':
         st.subheader("📈 Simulateur de Création de Valeur (EVA)")
         
         st.markdown("""
@@ -488,182 +722,274 @@ elif section == "💰 Performance":
             L'EVA est un indicateur plus exigeant que le simple bénéfice comptable.
             """)
     
-    with tab2:
-        st.subheader("⚖️ Calculateur de Levier Financier")
-        
-        st.markdown("""
-        Le **levier financier** mesure l'impact de l'endettement sur la rentabilité des capitaux propres.
-        Il peut amplifier les gains... mais aussi les pertes !
-        """)
+    elif onglet == '⚖️ Levier Financier':
+        @st.fragment
+        def calculateur_levier():
+            st.subheader("⚖️ Calculateur de Levier Financier")
         
-        col1, col2 = st.columns(2)
+            st.markdown("""
+            Le **levier financier** mesure l'impact de l'endettement sur la rentabilité des capitaux propres.
+            Il peut amplifier les gains... mais aussi les pertes !
+            """)
         
-        with col1:
-            st.markdown("### 📥 Données financières")
-            resultat_expl = st.number_input("Résultat d'exploitation (k€)", value=800, key="res_expl_levier")
-            charges_financieres = st.number_input("Charges financières (k€)", value=100, key="charges_fin_levier")
-            capitaux_propres = st.number_input("Capitaux propres (k€)", value=2000, key="cap_propres_levier")
-            dette_financiere = st.number_input("Dettes financières (k€)", value=1000, key="dette_fin_levier")
-            taux_imposition_levier = st.slider("Taux d'imposition (%)", 15.0, 35.0, 25.0, key="taux_imp_levier")
+            col1, col2 = st.columns(2)
+        
+            with col1:
+                st.markdown("### 📥 Données financières")
+                resultat_expl = st.number_input("Résultat d'exploitation (k€)", value=800, key="res_expl_levier")
+                charges_financieres = st.number_input("Charges financières (k€)", value=100, key="charges_fin_levier")
+                capitaux_propres = st.number_input("Capitaux propres (k€)", value=2000, key="cap_propres_levier")
+                dette_financiere = st.number_input("Dettes financières (k€)", value=1000, key="dette_fin_levier")
+                taux_imposition_levier = st.slider("Taux d'imposition (%)", 15.0, 35.0, 25.0, key="taux_imp_levier")
+        
+            with col2:
+                st.markdown("### 📊 Impact du levier")
+            
+                # Calculs (ROE avec dette, sans dette pour comparaison, effet de levier)
+                levier = calculer_levier(resultat_expl, charges_financieres, capitaux_propres,
+                                         dette_financiere, taux_imposition_levier)
+                st.session_state.hypotheses['levier'] = {
+                    'resultat_exploitation': resultat_expl, 'charges_financieres': charges_financieres,
+                    'capitaux_propres': capitaux_propres, 'dette_financiere': dette_financiere,
+                    'taux_imposition': taux_imposition_levier,
+                }
+                roe_avec_dette = float(levier['roe_avec_dette'])
+                roe_sans_dette = float(levier['roe_sans_dette'])
+                effet_levier = float(levier['effet_levier'])
+            
+                st.metric("ROE avec endettement", f"{roe_avec_dette:.1f}%")
+                st.metric("ROE sans endettement", f"{roe_sans_dette:.1f}%")
+                st.metric("Effet de levier", f"{effet_levier:+.1f} points")
+            
+                if effet_levier > 0:
+                    st.success("✅ Le levier financier est positif")
+                else:
+                    st.warning("📉 Le levier financier est négatif")
+            
+                # Graphique comparatif
+                fig_levier = go.Figure()
+                fig_levier.add_trace(go.Bar(
+                    name='Avec endettement',
+                    x=['ROE'],
+                    y=[roe_avec_dette],
+                    marker_color='blue'
+                ))
+                fig_levier.add_trace(go.Bar(
+                    name='Sans endettement',
+                    x=['ROE'],
+                    y=[roe_sans_dette],
+                    marker_color='lightblue'
+                ))
+                fig_levier.update_layout(
+                    title="Impact de l'endettement sur la rentabilité",
+                    barmode='group',
+                    height=300
+                )
+                st.plotly_chart(fig_levier, use_container_width=True)
         
-        with col2:
-            st.markdown("### 📊 Impact du levier")
-            
-            # Calculs
-            resultat_courant = resultat_expl - charges_financieres
-            resultat_net = resultat_courant * (1 - taux_imposition_levier/100)
-            roe_avec_dette = (resultat_net / capitaux_propres) * 100
-            
-            # Sans dette (pour comparaison)
-            resultat_net_sans_dette = resultat_expl * (1 - taux_imposition_levier/100)
-            roe_sans_dette = (resultat_net_sans_dette / (capitaux_propres + dette_financiere)) * 100
-            
-            # Effet de levier
-            effet_levier = roe_avec_dette - roe_sans_dette
-            
-            st.metric("ROE avec endettement", f"{roe_avec_dette:.1f}%")
-            st.metric("ROE sans endettement", f"{roe_sans_dette:.1f}%")
-            st.metric("Effet de levier", f"{effet_levier:+.1f} points")
-            
-            if effet_levier > 0:
-                st.success("✅ Le levier financier est positif")
-            else:
-                st.warning("📉 Le levier financier est négatif")
-            
-            # Graphique comparatif
-            fig_levier = go.Figure()
-            fig_levier.add_trace(go.Bar(
-                name='Avec endettement',
-                x=['ROE'],
-                y=[roe_avec_dette],
-                marker_color='blue'
-            ))
-            fig_levier.add_trace(go.Bar(
-                name='Sans endettement',
-                x=['ROE'],
-                y=[roe_sans_dette],
-                marker_color='lightblue'
-            ))
-            fig_levier.update_layout(
-                title="Impact de l'endettement sur la rentabilité",
-                barmode='group',
-                height=300
-            )
-            st.plotly_chart(fig_levier, use_container_width=True)
+            # Analyse de sensibilité
+            st.markdown("### 🎚️ Analyse de Sensibilité")
         
-        # Analyse de sensibilité
-        st.markdown("### 🎚️ Analyse de Sensibilité")
+            taux_interet = st.slider("Taux d'intérêt sur la dette (%)", 1.0, 10.0, 5.0)
         
-        taux_interet = st.slider("Taux d'intérêt sur la dette (%)", 1.0, 10.0, 5.0)
+            # Calcul du point d'équilibre
+            roe_minimal = roe_sans_dette
+            resultat_expl_minimal = (roe_minimal / 100) * (capitaux_propres + dette_financiere) / (1 - taux_imposition_levier/100)
         
-        # Calcul du point d'équilibre
-        roe_minimal = roe_sans_dette
-        resultat_expl_minimal = (roe_minimal / 100) * (capitaux_propres + dette_financiere) / (1 - taux_imposition_levier/100)
+            st.metric("Résultat d'exploitation minimum requis", f"{resultat_expl_minimal:,.0f} k€")
         
-        st.metric("Résultat d'exploitation minimum requis", f"{resultat_expl_minimal:,.0f} k€")
+            if resultat_expl > resultat_expl_minimal:
+                st.success("✅ Niveau de résultat suffisant pour un levier positif")
+            else:
+                st.warning("⚠️ Résultat d'exploitation insuffisant pour justifier l'endettement")
         
-        if resultat_expl > resultat_expl_minimal:
-            st.success("✅ Niveau de résultat suffisant pour un levier positif")
-        else:
-            st.warning("⚠️ Résultat d'exploitation insuffisant pour justifier l'endettement")
+        calculateur_levier()
     
-    with tab3:
-        st.subheader("🎯 Calculateur de Seuil de Rentabilité")
-        
-        st.markdown("""
-        Le **seuil de rentabilité** (ou point mort) est le niveau d'activité à partir duquel l'entreprise 
-        commence à réaliser des bénéfices. Il se calcule en distinguant les coûts fixes et variables.
-        """)
+    elif onglet == '🎯 Seuil de Rentabilité':
+        @st.fragment
+        def calculateur_seuil():
+            st.subheader("🎯 Calculateur de Seuil de Rentabilité")
         
-        col1, col2 = st.columns(2)
+            st.markdown("""
+            Le **seuil de rentabilité** (ou point mort) est le niveau d'activité à partir duquel l'entreprise 
+            commence à réaliser des bénéfices. Il se calcule en distinguant les coûts fixes et variables.
+            """)
         
-        with col1:
-            st.markdown("### 📥 Données de coûts")
-            couts_fixes = st.number_input("Coûts fixes annuels (k€)", value=300)
-            cout_variable_unitaire = st.number_input("Coût variable unitaire (€)", value=40)
-            prix_vente_unitaire = st.number_input("Prix de vente unitaire (€)", value=100)
-            capacite_production = st.number_input("Capacité de production (unités)", value=10000)
+            col1, col2 = st.columns(2)
+        
+            with col1:
+                st.markdown("### 📥 Données de coûts")
+                couts_fixes = st.number_input("Coûts fixes annuels (k€)", value=300)
+                cout_variable_unitaire = st.number_input("Coût variable unitaire (€)", value=40)
+                prix_vente_unitaire = st.number_input("Prix de vente unitaire (€)", value=100)
+                capacite_production = st.number_input("Capacité de production (unités)", value=10000)
+        
+            with col2:
+                st.markdown("### 📊 Résultats")
+            
+                # Calculs (seuil nul si la marge unitaire n'est pas positive)
+                seuil = calculer_seuil(couts_fixes, cout_variable_unitaire, prix_vente_unitaire, capacite_production)
+                marge_unitaire = float(seuil['marge_unitaire'])
+                taux_marge = float(seuil['taux_marge'])
+                seuil_volume = float(np.nan_to_num(seuil['seuil_volume']))
+                seuil_ca = seuil_volume * prix_vente_unitaire / 1000  # en k€
+                marge_securite = ((capacite_production - seuil_volume) / capacite_production) * 100
+            
+                st.metric("Seuil de rentabilité (volume)", f"{seuil_volume:,.0f} unités")
+                st.metric("Seuil de rentabilité (CA)", f"{seuil_ca:,.1f} k€")
+                st.metric("Taux de marge", f"{taux_marge:.1f}%")
+                st.metric("Marge de sécurité", f"{marge_securite:.1f}%")
+            
+                if marge_securite > 20:
+                    st.success("✅ Bonne marge de sécurité")
+                elif marge_securite > 10:
+                    st.warning("⚠️ Marge de sécurité modérée")
+                else:
+                    st.error("❌ Marge de sécurité faible")
+        
+            # Graphique du seuil de rentabilité
+            volumes = np.linspace(0, capacite_production * 1.2, 100)
+            couts_totaux = couts_fixes * 1000 + cout_variable_unitaire * volumes
+            chiffre_affaires = prix_vente_unitaire * volumes
+        
+            fig_seuil = go.Figure()
+        
+            fig_seuil.add_trace(go.Scatter(
+                x=volumes, y=couts_totaux,
+                mode='lines',
+                name='Coûts totaux',
+                line=dict(color='red', width=3)
+            ))
         
-        with col2:
-            st.markdown("### 📊 Résultats")
-            
-            # Calculs
-            marge_unitaire = prix_vente_unitaire - cout_variable_unitaire
-            taux_marge = (marge_unitaire / prix_vente_unitaire) * 100
-            seuil_volume = couts_fixes * 1000 / marge_unitaire if marge_unitaire > 0 else 0
-            seuil_ca = seuil_volume * prix_vente_unitaire / 1000  # en k€
-            marge_securite = ((capacite_production - seuil_volume) / capacite_production) * 100
-            
-            st.metric("Seuil de rentabilité (volume)", f"{seuil_volume:,.0f} unités")
-            st.metric("Seuil de rentabilité (CA)", f"{seuil_ca:,.1f} k€")
-            st.metric("Taux de marge", f"{taux_marge:.1f}%")
-            st.metric("Marge de sécurité", f"{marge_securite:.1f}%")
-            
-            if marge_securite > 20:
-                st.success("✅ Bonne marge de sécurité")
-            elif marge_securite > 10:
-                st.warning("⚠️ Marge de sécurité modérée")
-            else:
-                st.error("❌ Marge de sécurité faible")
+            fig_seuil.add_trace(go.Scatter(
+                x=volumes, y=chiffre_affaires,
+                mode='lines',
+                name='Chiffre d\'affaires',
+                line=dict(color='green', width=3)
+            ))
         
-        # Graphique du seuil de rentabilité
-        volumes = np.linspace(0, capacite_production * 1.2, 100)
-        couts_totaux = couts_fixes * 1000 + cout_variable_unitaire * volumes
-        chiffre_affaires = prix_vente_unitaire * volumes
+            # Point de seuil
+            fig_seuil.add_trace(go.Scatter(
+                x=[seuil_volume], y=[seuil_ca * 1000],
+                mode='markers',
+                name='Seuil de rentabilité',
+                marker=dict(color='black', size=10, symbol='x')
+            ))
         
-        fig_seuil = go.Figure()
+            fig_seuil.update_layout(
+                title="Graphique du Seuil de Rentabilité",
+                xaxis_title="Volume (unités)",
+                yaxis_title="Montant (€)",
+                showlegend=True,
+                height=400
+            )
         
-        fig_seuil.add_trace(go.Scatter(
-            x=volumes, y=couts_totaux,
-            mode='lines',
-            name='Coûts totaux',
-            line=dict(color='red', width=3)
-        ))
+            st.plotly_chart(fig_seuil, use_container_width=True)
         
-        fig_seuil.add_trace(go.Scatter(
-            x=volumes, y=chiffre_affaires,
-            mode='lines',
-            name='Chiffre d\'affaires',
-            line=dict(color='green', width=3)
-        ))
+            # Analyse de sensibilité
+            st.markdown("### 🎚️ Analyse de Sensibilité")
         
-        # Point de seuil
-        fig_seuil.add_trace(go.Scatter(
-            x=[seuil_volume], y=[seuil_ca * 1000],
-            mode='markers',
-            name='Seuil de rentabilité',
-            marker=dict(color='black', size=10, symbol='x')
-        ))
+            col_sens1, col_sens2 = st.columns(2)
         
-        fig_seuil.update_layout(
-            title="Graphique du Seuil de Rentabilité",
-            xaxis_title="Volume (unités)",
-            yaxis_title="Montant (€)",
-            showlegend=True,
-            height=400
-        )
+            with col_sens1:
+                variation_prix = st.slider("Variation du prix de vente (%)", -20, 20, 0)
+                nouveau_prix = prix_vente_unitaire * (1 + variation_prix/100)
+                nouvelle_marge = nouveau_prix - cout_variable_unitaire
+                nouveau_seuil = couts_fixes * 1000 / nouvelle_marge if nouvelle_marge > 0 else 0
+            
+                st.metric(f"Seuil avec prix {variation_prix:+}%", f"{nouveau_seuil:,.0f} unités")
         
-        st.plotly_chart(fig_seuil, use_container_width=True)
+            with col_sens2:
+                variation_couts_fixes = st.slider("Variation des coûts fixes (%)", -20, 20, 0)
+                nouveaux_couts_fixes = couts_fixes * (1 + variation_couts_fixes/100)
+                nouveau_seuil_cf = nouveaux_couts_fixes * 1000 / marge_unitaire if marge_unitaire > 0 else 0
+            
+                st.metric(f"Seuil avec CF {variation_couts_fixes:+}%", f"{nouveau_seuil_cf:,.0f} unités")
         
-        # Analyse de sensibilité
-        st.markdown("### 🎚️ Analyse de Sensibilité")
+            # Hypothèses de la page, reprises par le gestionnaire de scénarios (Mes Analyses)
+            hypotheses_seuil = {'couts_fixes': couts_fixes, 'cout_variable_unitaire': cout_variable_unitaire,
+                                'prix_vente_unitaire': prix_vente_unitaire, 'volume_reference': capacite_production}
+            st.session_state.hypotheses['seuil'] = hypotheses_seuil
         
-        col_sens1, col_sens2 = st.columns(2)
+            with st.expander("🌪️ Sensibilité du seuil à chaque hypothèse"):
+                afficher_tornade(
+                    calculs_financiers.seuil_rentabilite,
+                    hypotheses_seuil,
+                    'seuil_ca',
+                    {'couts_fixes': "Coûts fixes", 'cout_variable_unitaire': "Coût variable unitaire",
+                     'prix_vente_unitaire': "Prix de vente unitaire", 'volume_reference': "Capacité"},
+                    "Seuil de rentabilité (CA)", cle="seuil"
+                )
         
-        with col_sens1:
-            variation_prix = st.slider("Variation du prix de vente (%)", -20, 20, 0)
-            nouveau_prix = prix_vente_unitaire * (1 + variation_prix/100)
-            nouvelle_marge = nouveau_prix - cout_variable_unitaire
-            nouveau_seuil = couts_fixes * 1000 / nouvelle_marge if nouvelle_marge > 0 else 0
-            
-            st.metric(f"Seuil avec prix {variation_prix:+}%", f"{nouveau_seuil:,.0f} unités")
+            with st.expander("🎯 Recherche d'objectif : quelle hypothèse pour un seuil ou une marge cible ?"):
+                afficher_recherche_objectif(
+                    calculs_financiers.seuil_rentabilite,
+                    hypotheses_seuil,
+                    {'seuil_ca': "Seuil de rentabilité (CA, k€)", 'marge_securite': "Marge de sécurité (%)",
+                     'seuil_volume': "Seuil de rentabilité (unités)"},
+                    {'couts_fixes': "Coûts fixes", 'cout_variable_unitaire': "Coût variable unitaire",
+                     'prix_vente_unitaire': "Prix de vente unitaire", 'volume_reference': "Capacité"},
+                    unite="k€, % ou unités", cle="seuil"
+                )
         
-        with col_sens2:
-            variation_couts_fixes = st.slider("Variation des coûts fixes (%)", -20, 20, 0)
-            nouveaux_couts_fixes = couts_fixes * (1 + variation_couts_fixes/100)
-            nouveau_seuil_cf = nouveaux_couts_fixes * 1000 / marge_unitaire if marge_unitaire > 0 else 0
-            
-            st.metric(f"Seuil avec CF {variation_couts_fixes:+}%", f"{nouveau_seuil_cf:,.0f} unités")
+            with st.expander("📦 Seuil multi-produits et mix optimal"):
+                st.markdown("""
+                Plusieurs produits partagent les coûts fixes : le seuil dépend du **mix de ventes**.
+                Renseignez prix et coût variable unitaires (€), volume actuel, capacité, volume minimal
+                et consommation de la ressource partagée (heures machine...) par unité.
+                """)
+                nb_produits = st.slider("Nombre de produits du catalogue d'exemple", 2, 500, 6, key="nb_produits_seuil")
+                catalogue = seuil_multiproduits.exemple_produits(nb_produits)
+                if nb_produits <= 20:
+                    catalogue = st.data_editor(catalogue, num_rows="dynamic", use_container_width=True,
+                                               key=f"catalogue_seuil_{nb_produits}")
+                
+                col_mp1, col_mp2 = st.columns(2)
+                with col_mp1:
+                    couts_fixes_communs = st.number_input("Coûts fixes communs (k€)", value=300, key="cf_multiproduits")
+                with col_mp2:
+                    ressource_actuelle = float((catalogue['volume'] * catalogue['consommation']).sum())
+                    ressource = st.number_input("Ressource partagée disponible", value=round(ressource_actuelle), key=f"ressource_seuil_{nb_produits}",
+                                               help="Par défaut, la ressource consommée par les volumes actuels")
+                
+                try:
+                    seuil_mix = seuil_multiproduits.seuil_multiproduits(catalogue, couts_fixes_communs)
+                    col_r1, col_r2, col_r3, col_r4 = st.columns(4)
+                    col_r1.metric("Seuil (CA)", f"{seuil_mix['seuil_ca']:,.1f} k€")
+                    col_r2.metric("Marge du panier moyen", f"{seuil_mix['marge_panier']:,.2f} €",
+                                  f"{seuil_mix['taux_marge']:.1f} % du prix", delta_color="off")
+                    col_r3.metric("Résultat", f"{seuil_mix['resultat']:,.1f} k€")
+                    col_r4.metric("Marge de sécurité", f"{seuil_mix['marge_securite']:.1f}%")
+                    
+                    detail = seuil_multiproduits.detail_par_produit(catalogue, couts_fixes_communs)
+                    st.dataframe(detail.round(1), use_container_width=True)
+                    
+                    try:
+                        optimal, resultat_optimal = seuil_multiproduits.mix_optimal(catalogue, couts_fixes_communs, ressource)
+                        st.markdown(f"**Mix optimal sous capacité** : résultat {resultat_optimal:,.1f} k€ "
+                                    f"({resultat_optimal - seuil_mix['resultat']:+,.1f} k€ par rapport au mix actuel)")
+                        fig_mix = go.Figure()
+                        fig_mix.add_trace(go.Bar(x=optimal.index, y=optimal['volume'], name="Mix actuel"))
+                        fig_mix.add_trace(go.Bar(x=optimal.index, y=optimal['volume_optimal'], name="Mix optimal"))
+                        fig_mix.update_layout(barmode='group', title="Volumes par produit", yaxis_title="Unités", height=350)
+                        st.plotly_chart(fig_mix, use_container_width=True)
+                    except ValueError as e:
+                        st.warning(f"Mix optimal impossible : {e}")
+                    
+                    # Mix simulés autour du mix actuel, évalués en un seul appel
+                    simulations = seuil_multiproduits.seuil_multiproduits(
+                        catalogue, couts_fixes_communs, seuil_multiproduits.mix_aleatoires(catalogue, 1000)
+                    )
+                    fig_simulations = px.histogram(x=simulations['seuil_ca'], nbins=50,
+                                                   title="Seuil (k€ de CA) pour 1 000 mix de ventes simulés",
+                                                   labels={'x': "Seuil de rentabilité (k€)"})
+                    fig_simulations.add_vline(x=seuil_mix['seuil_ca'], line_dash="dash", line_color="red",
+                                              annotation_text="Mix actuel")
+                    st.plotly_chart(fig_simulations, use_container_width=True)
+                except ValueError as e:
+                    st.error(f"Catalogue invalide : {e}")
+        
+        calculateur_seuil()
 
 # Section Équilibre Financier
 elif section == "⚖️ Équilibre Financier":
@@ -775,17 +1101,191 @@ elif section == "⚖️ Équilibre Financier":
     # Analyse des délais
     st.subheader("⏱️ Analyse des Délais d'Exploitation")
     
+    with st.expander("🧾 Délais réels depuis le grand livre (lettrage)"):
+        st.markdown("""
+        Chargez l'export des comptes clients (41x) et fournisseurs (40x) : FEC, ou fichier avec les colonnes
+        **tiers**, **date**, **reference**, **debit**, **credit** (et au besoin **nature**, **echeance**).
+        Factures et règlements sont lettrés pour mesurer les DSO / DPO réels, qui deviennent les valeurs par défaut des délais.
+        """)
+        fichier_grand_livre = st.file_uploader(
+            "Grand livre", type=['csv', 'txt', 'xlsx', 'parquet'], key="grand_livre"
+        )
+        exemple_grand_livre = st.checkbox("Utiliser un grand livre d'exemple", key="grand_livre_exemple")
+        
+        lettre = None
+        try:
+            if fichier_grand_livre is not None:
+                lettre = lettrer_grand_livre(fichier_grand_livre.file_id, fichier_grand_livre.getvalue(), fichier_grand_livre.name)
+            elif exemple_grand_livre:
+                lettre = lettrer_exemple()
+        except Exception as e:
+            st.error(f"Grand livre illisible : {e}")
+        # Contenu des factures lettrées : clé des calculs conservés d'un affichage à l'autre
+        empreinte_lettrage = prevision_tresorerie.empreinte(lettre[0]) if lettre is not None else None
+        
+        if lettre is not None:
+            factures, reglements = lettre
+            indicateurs_lettrage = lettrage.indicateurs_delais(factures, reglements)
+            if indicateurs_lettrage.empty:
+                st.warning("Aucune facture client ou fournisseur trouvée")
+            else:
+                st.session_state.delais_reels = indicateurs_lettrage['delai_pondere'].dropna().to_dict()
+                
+                colonnes_nature = st.columns(len(indicateurs_lettrage))
+                for col, (nature, ligne) in zip(colonnes_nature, indicateurs_lettrage.iterrows()):
+                    with col:
+                        st.markdown(f"**{'Clients (DSO)' if nature == 'client' else 'Fournisseurs (DPO)'}**")
+                        st.metric("Délai de paiement pondéré", f"{ligne['delai_pondere']:.0f} j")
+                        st.metric("Délai selon l'encours", f"{ligne['delai_encours']:.0f} j")
+                        st.metric("Retard moyen pondéré", f"{ligne['retard_pondere']:.0f} j")
+                        st.write(f"Payé après l'échéance : {ligne['part_en_retard']:.0f} % des montants")
+                        st.write(f"Lettré : {ligne['taux_lettrage']:.1f} % — encours : {ligne['encours']:,.0f} €")
+                
+                distribution = lettrage.distribution_retards(factures).reset_index()
+                fig_retards = px.bar(distribution, x='retard', y='montant', color='nature', barmode='group',
+                                     title="Montants réglés par tranche de retard",
+                                     labels={'retard': "Retard sur l'échéance", 'montant': "Montant (€)"})
+                st.plotly_chart(fig_retards, use_container_width=True)
+                
+                st.markdown("**Tiers aux retards les plus lourds**")
+                st.dataframe(lettrage.retards_par_tiers(factures, 10).round(1), use_container_width=True)
+                st.caption(f"{len(factures):,} factures lettrées · méthodes : " + ", ".join(
+                    f"{methode} {nb:,}" for methode, nb in factures['methode'].value_counts().items()
+                ))
+    
+    with st.expander("📅 Balance âgée clients / fournisseurs"):
+        if lettre is None:
+            st.info("ℹ️ Chargez un grand livre (ou l'exemple) dans le lettrage ci-dessus pour obtenir la balance âgée")
+        else:
+            factures = lettre[0]
+            col_ba1, col_ba2, col_ba3 = st.columns(3)
+            with col_ba1:
+                date_arrete = st.date_input("Date d'arrêté", value=factures['date'].max().date(), key="arrete_balance")
+            with col_ba2:
+                base_age = st.radio("Ancienneté depuis", list(balance_agee.BASES), key="base_balance",
+                                    format_func=balance_agee.BASES.get, horizontal=True)
+            with col_ba3:
+                projection = st.slider("Projection sans encaissement (jours)", 0, 90, 0, step=15, key="projection_balance",
+                                       help="Vieillit l'encours de l'arrêté comme si rien n'était encaissé")
+            
+            # La balance de l'arrêté est conservée : la projection ne déplace que les pièces qui changent de tranche
+            cle_balance = (empreinte_lettrage, pd.Timestamp(date_arrete), base_age)
+            if st.session_state.get('balance_agee', (None,))[0] != cle_balance:
+                encours_arrete = balance_agee.encours_lettre(factures, date_arrete)
+                st.session_state.balance_agee = (cle_balance, balance_agee.BalanceAgee(encours_arrete, base_age))
+            balance = st.session_state.balance_agee[1].vieillir(pd.Timestamp(date_arrete) + pd.Timedelta(days=projection))
+            
+            synthese_balance = balance.synthese()
+            if synthese_balance.empty:
+                st.info("Aucun encours ouvert à cette date")
+            else:
+                st.dataframe(synthese_balance.round(1), use_container_width=True)
+                fig_balance = px.bar(
+                    synthese_balance[balance.tranches].reset_index().melt(id_vars='nature', var_name='tranche', value_name='montant'),
+                    x='nature', y='montant', color='tranche', title="Encours par ancienneté",
+                    labels={'montant': "Montant (€)", 'nature': ""}
+                )
+                st.plotly_chart(fig_balance, use_container_width=True)
+                
+                nb_principaux = st.slider("Nombre de premiers tiers", 3, 50, balance_agee.NB_PRINCIPAUX, key="top_balance")
+                st.markdown("**Concentration de l'encours**")
+                st.dataframe(balance.concentration(nb_principaux).round(1), use_container_width=True)
+                st.markdown("**Balance par tiers**")
+                st.dataframe(balance.par_tiers().head(nb_principaux).round(0), use_container_width=True)
+                
+                st.markdown("**Évolution sur les 12 derniers mois**")
+                historique_balance = balance_agee.evolution_lettree(factures, balance_agee.arretes_mensuels(factures), base_age)
+                fig_evolution = px.line(historique_balance.reset_index(), x='arrete', y='part > 90 j', color='nature',
+                                        title="Part de l'encours à plus de 90 jours (%)", labels={'arrete': ""})
+                st.plotly_chart(fig_evolution, use_container_width=True)
+    
+    with st.expander("📆 Prévision de trésorerie à 13 semaines"):
+        st.caption("Factures ouvertes encaissées / payées selon le retard historique de chaque tiers (lettrage ci-dessus), "
+                   "plus la paie, la fiscalité, les échéances d'emprunt (tableau d'amortissement) et les flux récurrents")
+        col_pr1, col_pr2, col_pr3 = st.columns(3)
+        with col_pr1:
+            tresorerie_ouverture = st.number_input("Trésorerie d'ouverture (€)", value=500_000, step=10_000, key="prev_tresorerie")
+            salaires_nets = st.number_input("Salaires nets mensuels (€)", value=150_000, step=5_000, key="prev_salaires")
+            taux_charges = st.slider("Charges sociales (% des nets)", 0, 80, 45, key="prev_charges") / 100
+        with col_pr2:
+            tva_mensuelle = st.number_input("TVA nette mensuelle (€)", value=40_000, step=5_000, key="prev_tva")
+            acompte_is = st.number_input("Acompte d'IS trimestriel (€)", value=25_000, step=5_000, key="prev_is")
+        with col_pr3:
+            loyer = st.number_input("Loyer mensuel (€)", value=15_000, step=1_000, key="prev_loyer")
+            seuil_alerte = st.number_input("Trésorerie minimale (€)", value=0, step=10_000, key="prev_seuil")
+            debut_prevision = st.date_input(
+                "Début de la prévision",
+                value=(lettre[0]['date'].max() if lettre is not None else pd.Timestamp.today()).date(),
+                key="prev_debut"
+            )
+        col_em1, col_em2, col_em3, col_em4 = st.columns(4)
+        with col_em1:
+            montant_emprunt = st.number_input("Emprunt (€)", value=1_000_000, step=50_000, key="prev_emprunt_montant")
+        with col_em2:
+            taux_emprunt = st.number_input("Taux (%)", value=4.5, step=0.1, key="prev_emprunt_taux")
+        with col_em3:
+            duree_emprunt = st.slider("Durée (années)", 1, 25, 5, key="prev_emprunt_duree")
+        with col_em4:
+            debut_emprunt = st.date_input("Déblocage", value=pd.Timestamp(pd.Timestamp.today().year, 1, 1).date(),
+                                          key="prev_emprunt_debut")
+        
+        # La prévision est conservée : seule la source modifiée est recalculée, à partir de sa première semaine changée
+        cle_prevision = (pd.Timestamp(debut_prevision), empreinte_lettrage)
+        if st.session_state.get('prevision_tresorerie', (None,))[0] != cle_prevision:
+            st.session_state.prevision_tresorerie = (
+                cle_prevision, prevision_tresorerie.PrevisionTresorerie(debut_prevision, tresorerie_ouverture)
+            )
+        prevision = st.session_state.prevision_tresorerie[1]
+        prevision.modifier_tresorerie_initiale(tresorerie_ouverture)
+        if lettre is not None:
+            clients, fournisseurs, retards = pieces_a_prevoir(empreinte_lettrage, lettre[0], pd.Timestamp(debut_prevision))
+            prevision.encaissements_clients(clients, retards)
+            prevision.fournisseurs(fournisseurs, retards)
+        recalculees = {}
+        for source, nb in [
+            ("Paie", prevision.paie(salaires_nets, taux_charges=taux_charges)),
+            ("Fiscalité", prevision.fiscalite(tva_mensuelle, acompte_is=acompte_is)),
+            ("Emprunts", prevision.emprunts(
+                echeances_emprunts(montant_emprunt, taux_emprunt, duree_emprunt, debut_emprunt, 10))),
+            ("Loyer", prevision.recurrent("Loyer", -loyer, 'mensuel', 5)),
+        ]:
+            if nb:
+                recalculees[source] = nb
+        
+        tableau_prevision = prevision.tableau()
+        fig_prevision = go.Figure()
+        fig_prevision.add_trace(go.Bar(x=tableau_prevision.index, y=tableau_prevision['Flux net'], name="Flux net"))
+        fig_prevision.add_trace(go.Scatter(x=tableau_prevision.index, y=tableau_prevision['Trésorerie fin de semaine'],
+                                           name="Trésorerie", mode='lines+markers'))
+        fig_prevision.add_hline(y=seuil_alerte, line_dash="dash", line_color="red")
+        fig_prevision.update_layout(title="Trésorerie prévisionnelle par semaine", yaxis_title="€")
+        st.plotly_chart(fig_prevision, use_container_width=True)
+        
+        semaine_basse, solde_bas = prevision.point_bas()
+        alertes_prevision = prevision.alertes(seuil_alerte)
+        col_pb1, col_pb2 = st.columns(2)
+        col_pb1.metric("Point bas", f"{solde_bas:,.0f} €", f"semaine du {semaine_basse:%d/%m/%Y}", delta_color="off")
+        col_pb2.metric("Semaines sous le seuil", len(alertes_prevision))
+        if len(alertes_prevision):
+            st.warning(f"⚠️ Trésorerie sous {seuil_alerte:,.0f} € à partir de la semaine du {alertes_prevision.index[0]:%d/%m/%Y}")
+        st.dataframe(tableau_prevision.round(0), use_container_width=True)
+        if recalculees:
+            st.caption("Semaines recalculées : " + ", ".join(f"{source} {nb}" for source, nb in recalculees.items()))
+    
+    delais_reels = st.session_state.get('delais_reels', {})
+    
     col_del1, col_del2, col_del3 = st.columns(3)
     
     with col_del1:
         ca_annuel = st.number_input("CA annuel (k€)", value=1200, key="ca_delais")
-        delai_clients = st.slider("Délai clients (jours)", 0, 120, 60)
+        delai_clients = st.slider("Délai clients (jours)", 0, 120, int(np.clip(round(delais_reels.get('client', 60)), 0, 120)))
     
     with col_del2:
         delai_stocks = st.slider("Délai stocks (jours)", 0, 90, 45)
     
     with col_del3:
-        delai_fournisseurs = st.slider("Délai fournisseurs (jours)", 0, 90, 30)
+        delai_fournisseurs = st.slider("Délai fournisseurs (jours)", 0, 90,
+                                       int(np.clip(round(delais_reels.get('fournisseur', 30)), 0, 90)))
     
     # Calcul du cycle de trésorerie
     cycle_exploitation = delai_stocks + delai_clients
@@ -817,9 +1317,20 @@ elif section == "⚖️ Équilibre Financier":
 elif section == "📊 Analyse par Ratios":
     st.header("📊 Analyse Financière par les Ratios")
     
-    tab1, tab2, tab3, tab4 = st.tabs(["💰 Rentabilité", "⚖️ Structure", "📈 Activité", "🧮 Liquidité"])
+    # Secteur de comparaison
+    if benchmark is not None:
+        col_bench1, col_bench2 = st.columns(2)
+        with col_bench1:
+            secteur_benchmark = st.selectbox("Secteur de comparaison:", benchmark.secteurs, key="secteur_benchmark")
+        with col_bench2:
+            st.selectbox("Classe de taille:", benchmark.tailles(secteur_benchmark), key="taille_benchmark")
+    else:
+        st.info("ℹ️ Construisez un référentiel dans « 🌍 Données Réelles > 📊 Benchmark Sectoriel » pour vous situer dans votre secteur")
+    
+    # Seul l'onglet affiché est calculé (st.tabs exécuterait tous les onglets)
+    onglet = st.radio("Famille de ratios :", ["💰 Rentabilité", "⚖️ Structure", "📈 Activité", "🧮 Liquidité"], horizontal=True, key="onglet_ratios")
     
-    with tab1:
+    if onglet == "💰 Rentabilité":
         st.subheader("Ratios de Rentabilité")
         
         col1, col2 = st.columns(2)
@@ -843,6 +1354,11 @@ elif section == "📊 Analyse par Ratios":
             st.metric("ROS (Return on Sales)", f"{ros:.1f}%")
             st.metric("Marge d'exploitation (EBIT)", f"{marge_ebit:.1f}%")
             
+            afficher_position_sectorielle('roe', roe)
+            afficher_position_sectorielle('roa', roa)
+            afficher_position_sectorielle('ros', ros)
+            afficher_position_sectorielle('marge_ebit', marge_ebit)
+            
             # Benchmarking
             st.markdown("#### 📊 Référentiels")
             st.write("**ROE souhaitable**: > 8-10%")
@@ -857,7 +1373,7 @@ elif section == "📊 Analyse par Ratios":
             else:
                 st.warning("⚠️ Rentabilité à améliorer")
     
-    with tab2:
+    elif onglet == "⚖️ Structure":
         st.subheader("Ratios de Structure Financière")
         
         col1, col2 = st.columns(2)
@@ -878,6 +1394,10 @@ elif section == "📊 Analyse par Ratios":
             st.metric("Autonomie financière", f"{autonomie_financiere:.1f}%")
             st.metric("Couverture des immobilisations", f"{couverture_immobilisation:.2f}")
             
+            afficher_position_sectorielle('endettement', leverage)
+            afficher_position_sectorielle('autonomie_financiere', autonomie_financiere)
+            afficher_position_sectorielle('couverture_immobilisations', couverture_immobilisation)
+            
             # Interprétation
             if leverage < 1:
                 st.success("✅ Structure financière saine")
@@ -891,7 +1411,7 @@ elif section == "📊 Analyse par Ratios":
             else:
                 st.warning("⚠️ Autonomie financière faible")
     
-    with tab3:
+    elif onglet == "📈 Activité":
         st.subheader("Ratios d'Activité et d'Efficacité")
         
         col1, col2 = st.columns(2)
@@ -914,6 +1434,10 @@ elif section == "📊 Analyse par Ratios":
             st.metric("Délai fournisseurs (jours)", f"{dpo:.0f} j")
             st.metric("Cycle de trésorerie", f"{ccc:.0f} j")
             
+            afficher_position_sectorielle('delai_clients', dso)
+            afficher_position_sectorielle('delai_stocks', dio)
+            afficher_position_sectorielle('delai_fournisseurs', dpo)
+            
             if ccc < 0:
                 st.success("🎉 Trésorerie générée par le cycle d'exploitation")
             else:
@@ -925,7 +1449,7 @@ elif section == "📊 Analyse par Ratios":
             st.write("**Délai stocks**: 30-90 jours")
             st.write("**Délai fournisseurs**: 30-60 jours")
     
-    with tab4:
+    elif onglet == "🧮 Liquidité":
         st.subheader("Ratios de Liquidité")
         
         col1, col2 = st.columns(2)
@@ -946,6 +1470,10 @@ elif section == "📊 Analyse par Ratios":
             st.metric("Liquidité réduite", f"{liquidite_reduite:.2f}")
             st.metric("Liquidité immédiate", f"{liquidite_immediate:.2f}")
             
+            afficher_position_sectorielle('liquidite_generale', liquidite_generale)
+            afficher_position_sectorielle('liquidite_reduite', liquidite_reduite)
+            afficher_position_sectorielle('liquidite_immediate', liquidite_immediate)
+            
             # Seuils de référence
             st.markdown("#### 📈 Seuils de référence")
             st.write("**Liquidité générale > 1.2**")
@@ -978,56 +1506,76 @@ elif section == "🎯 Évaluation d'Entreprise":
     )
     
     if method == "Flux de Trésorerie Actualisés (DCF)":
-        st.subheader("💎 Calculateur DCF")
-        
-        col1, col2 = st.columns(2)
+        @st.fragment
+        def calculateur_dcf():
+            st.subheader("💎 Calculateur DCF")
+        
+            col1, col2 = st.columns(2)
+        
+            with col1:
+                st.markdown("### Hypothèses")
+                fcf_actuel = st.number_input("Free Cash Flow actuel (k€)", value=500)
+                croissance_5ans = st.slider("Croissance 5 premières années (%)", 1.0, 15.0, 5.0)
+                croissance_perpetuite = st.slider("Croissance à perpétuité (%)", 0.0, 5.0, 2.0)
+                wacc = st.slider("WACC (%)", 5.0, 15.0, 9.0)
+                dette_financiere = st.number_input("Dette financière nette (k€)", value=800)
+        
+            with col2:
+                st.markdown("### Calcul de la Valeur")
+            
+                # Calcul DCF simplifié (5 ans de flux explicites + valeur terminale)
+                dcf = calculer_dcf(fcf_actuel, croissance_5ans, croissance_perpetuite, wacc, dette_financiere)
+                valeur_flux_explicites = float(dcf['valeur_flux_explicites'])
+                valeur_terminale_actualisee = float(dcf['valeur_terminale_actualisee'])
+                valeur_entreprise = float(dcf['valeur_entreprise'])
+                valeur_actions = float(dcf['valeur_actions'])
+                fcf_annee5 = fcf_actuel * ((1 + croissance_5ans/100) ** 5)
+            
+                st.metric("Valeur de l'entreprise", f"{valeur_entreprise:,.0f} k€")
+                st.metric("Valeur des flux explicites", f"{valeur_flux_explicites:,.0f} k€")
+                st.metric("Valeur terminale actualisée", f"{valeur_terminale_actualisee:,.0f} k€")
+                st.metric("Valeur des actions", f"{valeur_actions:,.0f} k€")
+            
+                # Sensibilité
+                st.markdown("#### 🎚️ Analyse de Sensibilité")
+                sensibilite_croissance = st.slider("Variation croissance (%)", -2.0, 2.0, 0.0)
+                sensibilite_wacc = st.slider("Variation WACC (%)", -1.0, 1.0, 0.0)
+            
+                nouvelle_croissance = croissance_perpetuite + sensibilite_croissance
+                nouveau_wacc = wacc + sensibilite_wacc
+            
+                if nouveau_wacc/100 > nouvelle_croissance/100:
+                    nouvelle_valeur_terminale = (fcf_annee5 * (1 + nouvelle_croissance/100)) / ((nouveau_wacc/100) - (nouvelle_croissance/100))
+                    nouvelle_valeur_entreprise = valeur_flux_explicites + (nouvelle_valeur_terminale / ((1 + nouveau_wacc/100) ** 5))
+                    variation = ((nouvelle_valeur_entreprise - valeur_entreprise) / valeur_entreprise) * 100
+                
+                    st.metric("Nouvelle valeur entreprise", f"{nouvelle_valeur_entreprise:,.0f} k€", f"{variation:+.1f}%")
+        
+            hypotheses_dcf = {'fcf_actuel': fcf_actuel, 'croissance': croissance_5ans, 'croissance_perpetuite': croissance_perpetuite,
+                              'wacc': wacc, 'dette_nette': dette_financiere}
+            st.session_state.hypotheses['dcf'] = hypotheses_dcf
+        
+            with st.expander("🌪️ Sensibilité de la valeur des actions à chaque hypothèse"):
+                afficher_tornade(
+                    calculs_financiers.valoriser_dcf,
+                    hypotheses_dcf,
+                    'valeur_actions',
+                    {'fcf_actuel': "FCF actuel", 'croissance': "Croissance 5 ans", 'croissance_perpetuite': "Croissance à perpétuité",
+                     'wacc': "WACC", 'dette_nette': "Dette nette"},
+                    "Valeur des actions", cle="dcf"
+                )
         
-        with col1:
-            st.markdown("### Hypothèses")
-            fcf_actuel = st.number_input("Free Cash Flow actuel (k€)", value=500)
-            croissance_5ans = st.slider("Croissance 5 premières années (%)", 1.0, 15.0, 5.0)
-            croissance_perpetuite = st.slider("Croissance à perpétuité (%)", 0.0, 5.0, 2.0)
-            wacc = st.slider("WACC (%)", 5.0, 15.0, 9.0)
-            dette_financiere = st.number_input("Dette financière nette (k€)", value=800)
+            with st.expander("🎯 Recherche d'objectif : quelle hypothèse pour une valeur cible ?"):
+                afficher_recherche_objectif(
+                    calculs_financiers.valoriser_dcf,
+                    hypotheses_dcf,
+                    {'valeur_actions': "Valeur des actions", 'valeur_entreprise': "Valeur de l'entreprise"},
+                    {'fcf_actuel': "FCF actuel", 'croissance': "Croissance 5 ans", 'croissance_perpetuite': "Croissance à perpétuité",
+                     'wacc': "WACC", 'dette_nette': "Dette nette"},
+                    cle="dcf", bornes={'croissance': (-10.0, 30.0), 'croissance_perpetuite': (0.0, 5.0), 'wacc': (5.0, 15.0)}
+                )
         
-        with col2:
-            st.markdown("### Calcul de la Valeur")
-            
-            # Calcul DCF simplifié
-            valeur_flux_explicites = 0
-            fcf = fcf_actuel
-            
-            for annee in range(1, 6):
-                fcf *= (1 + croissance_5ans/100)
-                valeur_flux_explicites += fcf / ((1 + wacc/100) ** annee)
-            
-            # Valeur terminale
-            fcf_annee5 = fcf_actuel * ((1 + croissance_5ans/100) ** 5)
-            valeur_terminale = (fcf_annee5 * (1 + croissance_perpetuite/100)) / ((wacc/100) - (croissance_perpetuite/100))
-            valeur_terminale_actualisee = valeur_terminale / ((1 + wacc/100) ** 5)
-            
-            valeur_entreprise = valeur_flux_explicites + valeur_terminale_actualisee
-            valeur_actions = valeur_entreprise - dette_financiere
-            
-            st.metric("Valeur de l'entreprise", f"{valeur_entreprise:,.0f} k€")
-            st.metric("Valeur des flux explicites", f"{valeur_flux_explicites:,.0f} k€")
-            st.metric("Valeur terminale actualisée", f"{valeur_terminale_actualisee:,.0f} k€")
-            st.metric("Valeur des actions", f"{valeur_actions:,.0f} k€")
-            
-            # Sensibilité
-            st.markdown("#### 🎚️ Analyse de Sensibilité")
-            sensibilite_croissance = st.slider("Variation croissance (%)", -2.0, 2.0, 0.0)
-            sensibilite_wacc = st.slider("Variation WACC (%)", -1.0, 1.0, 0.0)
-            
-            nouvelle_croissance = croissance_perpetuite + sensibilite_croissance
-            nouveau_wacc = wacc + sensibilite_wacc
-            
-            if nouveau_wacc/100 > nouvelle_croissance/100:
-                nouvelle_valeur_terminale = (fcf_annee5 * (1 + nouvelle_croissance/100)) / ((nouveau_wacc/100) - (nouvelle_croissance/100))
-                nouvelle_valeur_entreprise = valeur_flux_explicites + (nouvelle_valeur_terminale / ((1 + nouveau_wacc/100) ** 5))
-                variation = ((nouvelle_valeur_entreprise - valeur_entreprise) / valeur_entreprise) * 100
-                
-                st.metric("Nouvelle valeur entreprise", f"{nouvelle_valeur_entreprise:,.0f} k€", f"{variation:+.1f}%")
+        calculateur_dcf()
     
     elif method == "Multiples de Marché":
         st.subheader("📊 Évaluation par les Multiples")
@@ -1062,6 +1610,95 @@ elif section == "🎯 Évaluation d'Entreprise":
             st.metric("Valeur par CA", f"{valeur_ca:,.0f} k€")
             st.metric("Valeur moyenne entreprise", f"{valeur_entreprise:,.0f} k€")
             st.metric("Valeur des actions", f"{valeur_actions:,.0f} k€")
+        
+        # Multiples issus d'un panel de comparables cotés
+        st.markdown("### 🏢 Multiples d'un panel de comparables")
+        
+        col_panel1, col_panel2 = st.columns(2)
+        
+        with col_panel1:
+            capitaux_propres_cible = st.number_input("Capitaux propres (k€)", value=1200, key="cp_multiples")
+            mode_panel = st.radio(
+                "Construction du panel:",
+                ["Secteur de la référence", "Industrie de la référence", "Liste personnalisée"],
+                key="mode_panel"
+            )
+            if mode_panel == "Liste personnalisée":
+                liste_pairs = st.text_input("Tickers des comparables (séparés par des virgules)",
+                                            "MC.PA, KER.PA, RMS.PA, OR.PA", key="liste_pairs")
+            else:
+                ticker_reference = st.text_input("Ticker de référence", "MC.PA", key="ticker_reference")
+            
+            if st.button("🔄 Construire le panel"):
+                with st.spinner("Récupération des multiples des comparables..."):
+                    try:
+                        if mode_panel == "Liste personnalisée":
+                            panel = multiples_marche.construire_panel(
+                                mode="liste", liste_personnalisee=liste_pairs.split(",")
+                            )
+                        else:
+                            panel = multiples_marche.construire_panel(
+                                ticker_reference,
+                                mode="industrie" if mode_panel.startswith("Industrie") else "secteur"
+                            )
+                        cle_panel = f"panel:{mode_panel}:{liste_pairs if mode_panel == 'Liste personnalisée' else ticker_reference}"
+                        st.session_state.ressources.conserver(cle_panel, panel)
+                        st.session_state.panel_comparables = cle_panel
+                    except Exception as e:
+                        st.error(f"Erreur lors du chargement: {e}")
+        
+        with col_panel2:
+            panel = st.session_state.ressources.obtenir(st.session_state.get('panel_comparables'))
+            if panel is not None and not panel.empty:
+                stats_multiples = multiples_marche.statistiques_multiples(panel)
+                valorisation = multiples_marche.valoriser_par_multiples(
+                    {
+                        'ebitda': ebitda,
+                        'chiffre_affaires': chiffre_affaires,
+                        'resultat_net': resultat_net,
+                        'capitaux_propres': capitaux_propres_cible
+                    },
+                    stats_multiples,
+                    dette_nette
+                )
+                fourchette = multiples_marche.fourchette_valorisation(valorisation)
+                
+                st.write(f"**{len(panel)} comparables**")
+                st.dataframe(stats_multiples.round(2), use_container_width=True)
+                
+                if fourchette:
+                    st.metric("Valeur des actions (médiane)", f"{fourchette['central']:,.0f} k€")
+                    st.write(f"**Fourchette**: {fourchette['bas']:,.0f} k€ - {fourchette['haut']:,.0f} k€")
+                    
+                    fig_fourchette = go.Figure()
+                    fig_fourchette.add_trace(go.Bar(
+                        y=valorisation.index,
+                        x=valorisation['actions_haut'] - valorisation['actions_bas'],
+                        base=valorisation['actions_bas'],
+                        orientation='h',
+                        name='Q1 - Q3',
+                        marker_color='lightblue'
+                    ))
+                    fig_fourchette.add_trace(go.Scatter(
+                        y=valorisation.index,
+                        x=valorisation['actions_central'],
+                        mode='markers',
+                        name='Médiane',
+                        marker=dict(color='blue', size=12)
+                    ))
+                    fig_fourchette.update_layout(
+                        title="Fourchette de valorisation des actions par multiple",
+                        xaxis_title="Valeur des actions (k€)",
+                        height=300
+                    )
+                    st.plotly_chart(fig_fourchette, use_container_width=True)
+                else:
+                    st.warning("⚠️ Aucun multiple exploitable pour cette cible")
+                
+                with st.expander("📋 Détail du panel"):
+                    st.dataframe(panel, use_container_width=True)
+            else:
+                st.info("ℹ️ Construisez un panel pour obtenir une fourchette de valorisation")
     
     else:  # Approche Patrimoniale
         st.subheader("🏛️ Approche Patrimoniale")
@@ -1144,10 +1781,10 @@ elif section == "🏢 Cas Pratiques":
         
         with col2:
             # Calculs automatiques
-            marge_absolue = ca * marge_brute / 100
-            resultat_operationnel = marge_absolue - frais_fixes
-            bfr_absolu = (ca * besoin_bfr) / 12
-            ca_an_prochain = ca * (1 + croissance/100)
+            startup = calculs_financiers.cas_startup(ca, croissance, marge_brute, frais_fixes, besoin_bfr)
+            resultat_operationnel = float(startup['resultat_operationnel'])
+            bfr_absolu = float(startup['bfr'])
+            ca_an_prochain = float(startup['ca_suivant'])
             
             st.metric("Résultat opérationnel", f"{resultat_operationnel:,.0f} k€")
             st.metric("BFR à financer", f"{bfr_absolu:,.0f} k€")
@@ -1182,6 +1819,20 @@ elif section == "🏢 Cas Pratiques":
                 height=300
             )
             st.plotly_chart(fig_startup, use_container_width=True)
+        
+        hypotheses_startup = {'ca': ca, 'croissance': croissance, 'marge_brute': marge_brute, 'frais_fixes': frais_fixes,
+                              'besoin_bfr': besoin_bfr}
+        st.session_state.hypotheses['startup'] = hypotheses_startup
+        
+        with st.expander("🌪️ Sensibilité du résultat opérationnel"):
+            afficher_tornade(
+                calculs_financiers.cas_startup,
+                hypotheses_startup,
+                'resultat_operationnel',
+                {'ca': "Chiffre d'affaires", 'croissance': "Croissance", 'marge_brute': "Marge brute",
+                 'frais_fixes': "Frais fixes", 'besoin_bfr': "BFR (mois de CA)"},
+                "Résultat opérationnel", cle="startup"
+            )
     
     elif cas_choice == "🏭 PMI Industrielle":
         st.subheader("🏭 PMI Industrielle - Optimisation du BFR")
@@ -1195,9 +1846,12 @@ elif section == "🏢 Cas Pratiques":
         
         with col1:
             st.markdown("**Délais actuels**")
-            delai_clients = st.slider("Délai clients (jours)", 30, 120, 75)
+            # Délais mesurés par lettrage du grand livre (Équilibre Financier) lorsqu'ils sont disponibles
+            delais_reels = st.session_state.get('delais_reels', {})
+            delai_clients = st.slider("Délai clients (jours)", 30, 120, int(np.clip(round(delais_reels.get('client', 75)), 30, 120)))
             delai_stocks = st.slider("Délai stocks (jours)", 15, 90, 45)
-            delai_fournisseurs = st.slider("Délai fournisseurs (jours)", 20, 90, 30)
+            delai_fournisseurs = st.slider("Délai fournisseurs (jours)", 20, 90,
+                                           int(np.clip(round(delais_reels.get('fournisseur', 30)), 20, 90)))
             ca_journalier = st.number_input("CA journalier (k€)", value=10.0)
         
         with col2:
@@ -1207,12 +1861,13 @@ elif section == "🏢 Cas Pratiques":
             objectif_fournisseurs = st.slider("Objectif délai fournisseurs", 20, 90, 40)
         
         with col3:
-            # Calcul des gains
-            gain_clients = (delai_clients - objectif_clients) * ca_journalier
-            gain_stocks = (delai_stocks - objectif_stocks) * ca_journalier * 0.6  # Coût des stocks
-            gain_fournisseurs = (objectif_fournisseurs - delai_fournisseurs) * ca_journalier * 0.8  # Achats
-            
-            gain_total = gain_clients + gain_stocks + gain_fournisseurs
+            # Calcul des gains (stocks valorisés au coût, délais fournisseurs sur les achats)
+            gains = calculs_financiers.gains_bfr(delai_clients, delai_stocks, delai_fournisseurs, ca_journalier,
+                                                 objectif_clients, objectif_stocks, objectif_fournisseurs)
+            gain_clients = float(gains['gain_clients'])
+            gain_stocks = float(gains['gain_stocks'])
+            gain_fournisseurs = float(gains['gain_fournisseurs'])
+            gain_total = float(gains['gain_total'])
             
             st.metric("Gain sur clients", f"{gain_clients:,.0f} k€")
             st.metric("Gain sur stocks", f"{gain_stocks:,.0f} k€")
@@ -1236,6 +1891,36 @@ elif section == "🏢 Cas Pratiques":
         
         for action in actions:
             st.write(f"• {action}")
+        
+        hypotheses_bfr = {'delai_clients': delai_clients, 'delai_stocks': delai_stocks, 'delai_fournisseurs': delai_fournisseurs,
+                          'ca_journalier': ca_journalier, 'objectif_clients': objectif_clients, 'objectif_stocks': objectif_stocks,
+                          'objectif_fournisseurs': objectif_fournisseurs}
+        st.session_state.hypotheses['bfr'] = hypotheses_bfr
+        
+        with st.expander("🌪️ Sensibilité du gain de trésorerie"):
+            afficher_tornade(
+                calculs_financiers.gains_bfr,
+                hypotheses_bfr,
+                'gain_total',
+                {'delai_clients': "Délai clients", 'delai_stocks': "Délai stocks", 'delai_fournisseurs': "Délai fournisseurs",
+                 'ca_journalier': "CA journalier", 'objectif_clients': "Objectif clients", 'objectif_stocks': "Objectif stocks",
+                 'objectif_fournisseurs': "Objectif fournisseurs"},
+                "Gain total de trésorerie", cle="pmi"
+            )
+        
+        with st.expander("🎯 Recherche d'objectif : quel délai pour dégager la trésorerie visée ?"):
+            afficher_recherche_objectif(
+                calculs_financiers.gains_bfr,
+                hypotheses_bfr,
+                {'gain_total': "Gain total de trésorerie", 'gain_clients': "Gain sur clients",
+                 'gain_stocks': "Gain sur stocks", 'gain_fournisseurs': "Gain sur fournisseurs"},
+                {'delai_clients': "Délai clients", 'delai_stocks': "Délai stocks", 'delai_fournisseurs': "Délai fournisseurs",
+                 'ca_journalier': "CA journalier", 'objectif_clients': "Objectif clients", 'objectif_stocks': "Objectif stocks",
+                 'objectif_fournisseurs': "Objectif fournisseurs"},
+                cle="pmi", bornes={'delai_clients': (0.0, 180.0), 'delai_stocks': (0.0, 180.0), 'delai_fournisseurs': (0.0, 180.0),
+                                   'objectif_clients': (0.0, 180.0), 'objectif_stocks': (0.0, 180.0),
+                                   'objectif_fournisseurs': (0.0, 180.0)}
+            )
 
 # Section Prévisions IA (limité pour la démo)
 elif section == "🤖 Prévisions IA":
@@ -1246,9 +1931,10 @@ elif section == "🤖 Prévisions IA":
     basées sur des données historiques et des indicateurs économiques.
     """)
     
-    tab1, tab2 = st.tabs(["📊 Prévision de CA", "🎯 Modèle Prédictif Avancé"])
+    # Seul l'onglet affiché est calculé (st.tabs exécuterait tous les onglets)
+    onglet = st.radio("Outil :", ["📊 Prévision de CA", "🎯 Modèle Prédictif Avancé"], horizontal=True, key="onglet_previsions")
     
-    with tab1:
+    if onglet == "📊 Prévision de CA":
         st.subheader("Prévision de Chiffre d'Affaires par Régression")
         
         # Génération de données historiques simulées
@@ -1324,9 +2010,10 @@ elif section == "🤖 Prévisions IA":
 elif section == "🌍 Données Réelles":
     st.header("🌍 Analyse avec Données Réelles du Marché")
     
-    tab1, tab2 = st.tabs(["📈 Actions Cotées", "📊 Benchmark Sectoriel"])
+    # Seul l'onglet affiché est calculé (st.tabs exécuterait tous les onglets)
+    onglet = st.radio("Source :", ["📈 Actions Cotées", "📊 Benchmark Sectoriel", "🔎 Screener"], horizontal=True, key="onglet_donnees_reelles")
     
-    with tab1:
+    if onglet == "📈 Actions Cotées":
         st.subheader("📈 Analyse d'Entreprises Cotées")
         
         col1, col2 = st.columns([1, 2])
@@ -1351,25 +2038,30 @@ elif section == "🌍 Données Réelles":
             if st.button("🔄 Charger les données"):
                 with st.spinner("Chargement des données financières..."):
                     try:
-                        # Récupération des données
-                        stock = yf.Ticker(ticker)
-                        historique = stock.history(period=periode)
-                        info = stock.info
+                        # Récupération des données (partagées entre sessions pendant l'heure en cours ;
+                        # les clics simultanés sur un même ticker ne font qu'un appel à la source)
+                        def telecharger_donnees_marche():
+                            return {
+                                'historique': passerelle_marche.historique(ticker, periode),
+                                'info': passerelle_marche.info(ticker),
+                                'ticker': ticker
+                            }
                         
-                        # Sauvegarde dans la session
-                        st.session_state.stock_data = {
-                            'historique': historique,
-                            'info': info,
-                            'ticker': ticker
-                        }
+                        cle_marche = f"marche:{ticker}:{periode}:{datetime.now():%Y%m%d%H}"
+                        st.session_state.ressources.charger(cle_marche, telecharger_donnees_marche)
+                        
+                        # La session ne conserve qu'une référence
+                        st.session_state.stock_data = cle_marche
                         st.success("Données chargées avec succès !")
                         
                     except Exception as e:
                         st.error(f"Erreur lors du chargement: {e}")
         
         with col2:
-            if 'stock_data' in st.session_state:
-                data = st.session_state.stock_data
+            data = st.session_state.ressources.obtenir(st.session_state.get('stock_data'))
+            if data is None and 'stock_data' in st.session_state:
+                st.info("ℹ️ Données libérées pour économiser la mémoire : rechargez-les")
+            if data is not None:
                 historique = data['historique']
                 info = data['info']
                 
@@ -1379,8 +2071,8 @@ elif section == "🌍 Données Réelles":
                 col_met1, col_met2, col_met3, col_met4 = st.columns(4)
                 
                 with col_met1:
-                    prix_actuel = historique['Close'][-1]
-                    variation = ((prix_actuel - historique['Close'][0]) / historique['Close'][0]) * 100
+                    prix_actuel = historique['Close'].iloc[-1]
+                    variation = ((prix_actuel - historique['Close'].iloc[0]) / historique['Close'].iloc[0]) * 100
                     st.metric("Prix Actuel", f"{prix_actuel:.2f} $", f"{variation:+.2f}%")
                 
                 with col_met2:
@@ -1414,14 +2106,216 @@ elif section == "🌍 Données Réelles":
                 )
                 
                 st.plotly_chart(fig, use_container_width=True)
+        
+        # États financiers publiés
+        st.markdown("---")
+        st.subheader("📑 États Financiers Publiés")
+        
+        col_etats1, col_etats2 = st.columns([1, 3])
+        
+        with col_etats1:
+            frequence_etats = st.radio("Fréquence:", ["annuel", "trimestriel"], key="frequence_etats")
+            if st.button("📥 Charger les états financiers"):
+                with st.spinner("Récupération des états financiers..."):
+                    try:
+                        cle_etats = f"etats:{ticker}:{frequence_etats}"
+                        st.session_state.ressources.charger(
+                            cle_etats,
+                            lambda: {'ticker': ticker, 'modele': etats_financiers.etats_financelab(ticker, frequence_etats)}
+                        )
+                        st.session_state.etats_financiers = cle_etats
+                    except Exception as e:
+                        st.error(f"Erreur lors du chargement: {e}")
+        
+        with col_etats2:
+            etats = st.session_state.ressources.obtenir(st.session_state.get('etats_financiers'))
+            if etats is not None:
+                modele = etats['modele']
+                
+                st.write(f"**{etats['ticker']}** - {len(modele)} périodes (k, devise de cotation)")
+                st.dataframe(modele.T.style.format("{:,.0f}", na_rep="-"), use_container_width=True)
+                
+                # Tendances pluriannuelles
+                historique_entreprise = series_temporelles.HistoriqueEntreprise(
+                    modele, frequence=st.session_state.get('frequence_etats', 'annuel')
+                )
+                indicateurs_choisis = st.multiselect(
+                    "Indicateurs à suivre:",
+                    series_temporelles.INDICATEURS,
+                    default=['roe', 'marge_ebit', 'liquidite_generale']
+                )
+                if indicateurs_choisis:
+                    fig_tendances = go.Figure()
+                    for indicateur in indicateurs_choisis:
+                        fig_tendances.add_trace(go.Scatter(
+                            x=historique_entreprise.indicateurs.index,
+                            y=historique_entreprise.indicateurs[indicateur],
+                            mode='lines+markers',
+                            name=indicateur
+                        ))
+                    fig_tendances.update_layout(
+                        title=f"Tendances pluriannuelles - {etats['ticker']}",
+                        xaxis_title="Clôture",
+                        height=350
+                    )
+                    st.plotly_chart(fig_tendances, use_container_width=True)
+                    st.dataframe(historique_entreprise.tableau(indicateurs_choisis).round(2), use_container_width=True)
+                
+                periode_choisie = st.selectbox(
+                    "Période à analyser:",
+                    modele.index[::-1],
+                    format_func=lambda d: d.strftime("%d/%m/%Y")
+                )
+                if st.button("🔄 Utiliser cette période dans les pages d'analyse"):
+                    for cle, valeur in etats_financiers.valeurs_pour_pages(modele.loc[periode_choisie]).items():
+                        st.session_state[cle] = valeur
+                    st.success("✅ Les pages Ratios, Équilibre et Levier utilisent désormais ces comptes")
+        
+        # Analyse en lot de la watchlist
+        with st.expander("👀 Analyse de la watchlist"):
+            tickers_watchlist = st.multiselect(
+                "Sociétés suivies:",
+                list(entreprises.values()),
+                default=st.session_state.watchlist or [ticker]
+            )
+            if st.button("📊 Analyser la watchlist"):
+                st.session_state.watchlist = tickers_watchlist
+                st.session_state.travaux["Analyse de la watchlist"] = gestionnaire_travaux().soumettre(
+                    etats_financiers.analyser_watchlist, tickers_watchlist, nom="Analyse de la watchlist"
+                )
+            
+            def afficher_watchlist(resultat):
+                synthese, erreurs = resultat
+                if not synthese.empty:
+                    st.dataframe(synthese, use_container_width=True)
+                for ticker_erreur, erreur in erreurs.items():
+                    st.warning(f"⚠️ {ticker_erreur}: {erreur}")
+            
+            if "Analyse de la watchlist" in st.session_state.travaux:
+                suivre_travail(st.session_state.travaux["Analyse de la watchlist"], afficher_watchlist)
+    
+    elif onglet == "📊 Benchmark Sectoriel":
+        st.subheader("📊 Benchmark Sectoriel")
+        
+        with st.expander("🛠️ Construire le référentiel", expanded=benchmark is None):
+            st.markdown(f"""
+            Chargez un fichier d'entreprises (CSV ou Excel) avec une colonne **secteur**, une colonne
+            **chiffre_affaires** (k€) et une colonne par ratio parmi : {", ".join(benchmark_sectoriel.RATIOS)}.
+            """)
+            fichier_benchmark = st.file_uploader("Fichier d'entreprises", type=['csv', 'xlsx'], key="file_benchmark")
+            
+            if fichier_benchmark is not None and st.button("🏗️ Construire le référentiel"):
+                st.session_state.travaux["Référentiel sectoriel"] = gestionnaire_travaux().soumettre(
+                    benchmark_sectoriel.construire_depuis_fichier,
+                    fichier_benchmark.getvalue(),
+                    fichier_benchmark.name,
+                    nom="Référentiel sectoriel"
+                )
+            
+            if "Référentiel sectoriel" in st.session_state.travaux:
+                suivre_travail(
+                    st.session_state.travaux["Référentiel sectoriel"],
+                    lambda nb_entreprises: st.success(f"✅ Référentiel construit avec succès ({nb_entreprises:,} entreprises) !")
+                )
+        
+        if benchmark is not None:
+            col1, col2 = st.columns([1, 2])
+            
+            with col1:
+                secteur = st.selectbox("Secteur:", benchmark.secteurs, key="secteur_bench_tab")
+                taille = st.selectbox("Classe de taille:", benchmark.tailles(secteur), key="taille_bench_tab")
+                ratio = st.selectbox(
+                    "Ratio:",
+                    list(benchmark_sectoriel.RATIOS),
+                    format_func=lambda r: benchmark_sectoriel.RATIOS[r][0]
+                )
+                valeur_entreprise = st.number_input("Valeur de votre entreprise", value=10.0)
+                
+                percentile = benchmark.percentile(secteur, taille, ratio, valeur_entreprise)
+                if percentile is not None:
+                    st.metric("Percentile sectoriel", f"{percentile:.0f}e")
+                    position = benchmark_sectoriel.position_sectorielle(benchmark, secteur, taille, ratio, valeur_entreprise)
+                    st.write(position)
+            
+            with col2:
+                deciles = benchmark.deciles_de(secteur, taille, ratio)
+                if deciles is not None:
+                    fig_deciles = go.Figure()
+                    fig_deciles.add_trace(go.Bar(
+                        x=benchmark_sectoriel.DECILES,
+                        y=deciles[benchmark_sectoriel.DECILES],
+                        name='Déciles',
+                        marker_color='lightblue'
+                    ))
+                    fig_deciles.add_hline(y=valeur_entreprise, line_dash="dash", line_color="red",
+                                          annotation_text="Votre entreprise")
+                    fig_deciles.update_layout(
+                        title=f"Déciles du secteur {secteur} ({taille}) - {benchmark_sectoriel.RATIOS[ratio][0]}",
+                        xaxis_title="Décile",
+                        height=400
+                    )
+                    st.plotly_chart(fig_deciles, use_container_width=True)
+                    st.caption(f"Distribution calculée sur {int(deciles['fin'] - deciles['debut']):,} entreprises")
+                else:
+                    st.info("ℹ️ Aucune donnée pour ce ratio dans ce secteur")
+    
+    elif onglet == "🔎 Screener":
+        st.subheader("🔎 Screener d'Entreprises par Ratios")
+        
+        fichier_univers = st.file_uploader(
+            "Univers d'entreprises (une ligne par entreprise, une colonne par ratio)",
+            type=['parquet', 'csv', 'xlsx'],
+            key="file_univers"
+        )
+        
+        if fichier_univers is not None:
+            try:
+                screener = charger_screener(fichier_univers.file_id, fichier_univers, fichier_univers.name)
+            except Exception as e:
+                st.error(f"Erreur lors du chargement: {e}")
+                screener = None
+            
+            if screener is not None:
+                st.write(f"**{len(screener):,} entreprises** - Ratios disponibles: {', '.join(screener.colonnes)}")
+                
+                col1, col2, col3 = st.columns([3, 1, 1])
+                with col1:
+                    requete = st.text_input(
+                        "Critères (séparés par « et »)",
+                        "roe > 12 et endettement < 60 et score_conan_holder > 9.5"
+                    )
+                with col2:
+                    colonne_tri = st.selectbox("Trier par", screener.colonnes)
+                with col3:
+                    taille_page = st.selectbox("Lignes par page", [25, 50, 100], index=1)
+                
+                try:
+                    debut_recherche = datetime.now()
+                    positions = screener.filtrer(screener_ratios.analyser_requete(requete))
+                    positions = screener.trier(positions, colonne_tri)
+                    duree_ms = (datetime.now() - debut_recherche).total_seconds() * 1000
+                    
+                    nb_pages = screener_ratios.nombre_pages(len(positions), taille_page)
+                    st.write(f"**{len(positions):,} résultats** en {duree_ms:.0f} ms")
+                    
+                    # Clé liée aux critères : un nouveau filtre repart de la page 1 (jamais au-delà de nb_pages)
+                    numero_page = st.number_input("Page", min_value=1, max_value=nb_pages, value=1,
+                                                  key=f"page_screener_{requete}|{colonne_tri}|{taille_page}")
+                    st.dataframe(screener.page(positions, numero_page, taille_page), use_container_width=True)
+                    st.caption(f"Page {numero_page} / {nb_pages}")
+                except (KeyError, ValueError) as e:
+                    st.error(f"❌ {e}")
+        else:
+            st.info("ℹ️ Chargez un univers d'entreprises pour lancer une recherche")
 
 # Section Mes Analyses
 elif section == "💾 Mes Analyses":
     st.header("💾 Gestion de Mes Analyses")
     
-    tab1, tab2, tab3 = st.tabs(["📁 Sauvegardes", "👥 Collaboration", "📤 Export"])
+    # Seul l'onglet affiché est calculé (st.tabs exécuterait tous les onglets)
+    onglet = st.radio("Rubrique :", ["📁 Sauvegardes", "🧪 Scénarios", "👥 Collaboration", "📤 Export"], horizontal=True, key="onglet_analyses")
     
-    with tab1:
+    if onglet == "📁 Sauvegardes":
         st.subheader("Sauvegarde des Analyses")
         
         # Formulaire de sauvegarde
@@ -1431,18 +2325,26 @@ elif section == "💾 Mes Analyses":
             tags = st.text_input("Tags (séparés par des virgules)", "ratios, performance, valuation")
             
             if st.form_submit_button("💾 Sauvegarder l'analyse actuelle"):
+                # Instantané des hypothèses de chaque calculateur utilisé, aussi enregistré comme scénario
+                hypotheses = {modele: dict(entrees) for modele, entrees in st.session_state.hypotheses.items()}
+                resultats = {}
+                for modele, entrees in hypotheses.items():
+                    st.session_state.scenarios.ajouter(modele, nom_analyse, entrees)
+                    resultats[modele] = scenarios.evaluer_table(modele, pd.DataFrame([entrees])).iloc[0].to_dict()
+                st.session_state.scenarios.enregistrer()
                 nouvelle_analyse = {
-                    'id': len(st.session_state.analyses_sauvegardees) + 1,
+                    'id': max((a['id'] for a in st.session_state.analyses_sauvegardees), default=0) + 1,
                     'nom': nom_analyse,
                     'description': description,
                     'tags': tags,
                     'date': datetime.now().strftime("%d/%m/%Y %H:%M"),
                     'data': {
-                        'ratios': {},
-                        'equilibre': {}
+                        'hypotheses': hypotheses,
+                        'resultats': resultats
                     }
                 }
                 st.session_state.analyses_sauvegardees.append(nouvelle_analyse)
+                del st.session_state.analyses_sauvegardees[:-gestion_session.NB_ANALYSES]
                 st.success("✅ Analyse sauvegardée avec succès !")
         
         # Liste des analyses sauvegardées
@@ -1453,6 +2355,15 @@ elif section == "💾 Mes Analyses":
                 with st.expander(f"📊 {analyse['nom']} - {analyse['date']}"):
                     st.write(f"**Description**: {analyse['description']}")
                     st.write(f"**Tags**: {analyse['tags']}")
+                    for modele, entrees in analyse['data'].get('hypotheses', {}).items():
+                        definition = scenarios.MODELES[modele]
+                        st.markdown(f"**{definition['libelle']}**")
+                        st.dataframe(pd.DataFrame({
+                            'Hypothèse': [definition['entrees'][nom] for nom in entrees],
+                            'Valeur': list(entrees.values()),
+                        }), hide_index=True, use_container_width=True)
+                        st.caption(" · ".join(f"{definition['sorties'][sortie]} : {valeur:,.2f}"
+                                              for sortie, valeur in analyse['data']['resultats'][modele].items()))
                     
                     col_act1, col_act2 = st.columns(2)
                     with col_act1:
@@ -1468,6 +2379,99 @@ elif section == "💾 Mes Analyses":
                             st.rerun()
         else:
             st.info("ℹ️ Aucune analyse sauvegardée pour le moment")
+    
+    elif onglet == "🧪 Scénarios":
+        st.subheader("🧪 Gestionnaire de Scénarios")
+        st.markdown("""
+        Enregistrez les hypothèses d'un calculateur sous un nom, importez-en des centaines,
+        évaluez-les toutes en un seul calcul et expliquez l'écart entre deux scénarios.
+        """)
+        recueil = st.session_state.scenarios
+        modele = st.selectbox("Modèle", list(scenarios.MODELES), format_func=lambda m: scenarios.MODELES[m]['libelle'],
+                              key="modele_scenarios")
+        definition = scenarios.MODELES[modele]
+        
+        col_sc1, col_sc2 = st.columns(2)
+        with col_sc1:
+            nom_scenario = st.text_input("Nom du scénario", "Scénario central", key="nom_scenario")
+            actuelles = st.session_state.hypotheses.get(modele)
+            if st.button("📸 Capturer les hypothèses actuelles", disabled=actuelles is None):
+                recueil.ajouter(modele, nom_scenario, actuelles)
+                recueil.enregistrer()
+                st.success(f"✅ Scénario « {nom_scenario} » enregistré")
+            if actuelles is None:
+                st.caption("Ouvrez d'abord le calculateur correspondant pour en capturer les hypothèses")
+        with col_sc2:
+            fichier_scenarios = st.file_uploader(
+                "Importer des scénarios (une ligne par scénario, colonne « scenario » pour le nom)",
+                type=['csv', 'xlsx', 'parquet'], key=f"fichier_scenarios_{modele}"
+            )
+            if fichier_scenarios is not None and st.button("📥 Importer"):
+                try:
+                    if fichier_scenarios.name.endswith('.parquet'):
+                        importes = pd.read_parquet(fichier_scenarios)
+                    elif fichier_scenarios.name.endswith('.xlsx'):
+                        importes = pd.read_excel(fichier_scenarios)
+                    else:
+                        importes = pd.read_csv(fichier_scenarios, sep=None, engine='python')
+                    if 'scenario' in importes.columns:
+                        importes = importes.set_index('scenario')
+                    recueil.importer(modele, importes)
+                    recueil.enregistrer()
+                    st.success(f"✅ {len(importes)} scénarios importés")
+                except ValueError as e:
+                    st.error(f"Import impossible : {e}")
+        
+        noms_scenarios = recueil.noms(modele)
+        if not noms_scenarios:
+            st.info("ℹ️ Aucun scénario enregistré pour ce modèle")
+        else:
+            # Tous les scénarios du modèle évalués ensemble
+            resultats_scenarios = recueil.evaluer(modele)
+            tableau_scenarios = recueil.table(modele).rename(columns=definition['entrees']).join(
+                resultats_scenarios.rename(columns=definition['sorties'])
+            )
+            st.dataframe(tableau_scenarios.head(1000).style.format("{:,.2f}"), use_container_width=True)
+            st.caption(f"{len(noms_scenarios)} scénarios évalués en un seul calcul"
+                       + (" (1 000 premiers affichés)" if len(noms_scenarios) > 1000 else ""))
+            
+            col_sup1, col_sup2 = st.columns([3, 1])
+            with col_sup1:
+                a_supprimer = st.selectbox("Scénario à supprimer", noms_scenarios, key=f"suppression_{modele}")
+            with col_sup2:
+                if st.button("🗑️ Supprimer le scénario"):
+                    recueil.supprimer(modele, a_supprimer)
+                    recueil.enregistrer()
+                    st.rerun()
+            
+            if len(noms_scenarios) >= 2:
+                st.markdown("### 🔍 Comparer deux scénarios")
+                col_cmp1, col_cmp2, col_cmp3 = st.columns(3)
+                with col_cmp1:
+                    depart = st.selectbox("Scénario de départ", noms_scenarios, key=f"depart_{modele}")
+                with col_cmp2:
+                    arrivee = st.selectbox("Scénario d'arrivée", noms_scenarios, index=1, key=f"arrivee_{modele}")
+                with col_cmp3:
+                    sortie_comparee = st.selectbox("Résultat", list(definition['sorties']),
+                                                   format_func=definition['sorties'].get, key=f"sortie_comparee_{modele}")
+                
+                resultat_depart, resultat_arrivee, ecarts = recueil.comparer(modele, depart, arrivee, sortie_comparee)
+                st.metric(definition['sorties'][sortie_comparee], f"{resultat_arrivee:,.2f}",
+                          f"{resultat_arrivee - resultat_depart:+,.2f} par rapport à « {depart} »")
+                if ecarts.empty:
+                    st.info("Les deux scénarios ont les mêmes hypothèses")
+                else:
+                    principale = ecarts.iloc[0]
+                    st.success(f"Principal facteur d'écart : **{principale['hypothese']}** "
+                               f"({principale['contribution']:+,.2f})")
+                    fig_ecarts = go.Figure(go.Waterfall(
+                        x=[depart] + list(ecarts['hypothese']) + [arrivee],
+                        y=[resultat_depart] + list(ecarts['contribution']) + [resultat_arrivee],
+                        measure=['absolute'] + ['relative'] * len(ecarts) + ['total'],
+                    ))
+                    fig_ecarts.update_layout(title=f"Du scénario « {depart} » au scénario « {arrivee} »", height=400)
+                    st.plotly_chart(fig_ecarts, use_container_width=True)
+                    st.dataframe(ecarts.round(2), hide_index=True, use_container_width=True)
 
 # Section Mon Dashboard
 elif section == "📊 Mon Dashboard":
@@ -1537,6 +2541,210 @@ elif section == "📊 Mon Dashboard":
             st.info("**💡 Astuce**: Sauvegardez vos premières analyses pour les retrouver plus tard")
         else:
             st.success(f"**📊 Actif**: Vous avez {analyses_count} analyses sauvegardées")
+    
+    # Mémoire occupée par la session
+    with st.expander("🧠 Mémoire de la session"):
+        ressources = st.session_state.ressources
+        col_mem1, col_mem2, col_mem3 = st.columns(3)
+        with col_mem1:
+            st.metric("Données de la session", f"{gestion_session.empreinte_session(st.session_state) / 1024:,.0f} Ko")
+        with col_mem2:
+            st.metric("Données partagées référencées", f"{ressources.empreinte() / 1024 ** 2:,.1f} Mo",
+                      f"plafond {ressources.plafond / 1024 ** 2:,.0f} Mo", delta_color="off")
+        with col_mem3:
+            st.metric("Cache partagé (toutes sessions)", f"{ressources.cache.occupation / 1024 ** 2:,.1f} Mo",
+                      f"{len(ressources.cache)} objets", delta_color="off")
+        st.dataframe(ressources.references(), use_container_width=True)
+    
+    # Appels aux données de marché partagés par toutes les sessions
+    with st.expander("🌐 Appels aux données de marché"):
+        st.caption("Demandes reçues, appels réellement envoyés à la source, demandes fusionnées ou servies "
+                   "depuis le cache, et état du disjoncteur de chaque point d'accès")
+        st.dataframe(passerelle_marche.metriques(), use_container_width=True, hide_index=True)
+
+# Section Alertes & Veille
+elif section == "🔔 Alertes & Veille":
+    st.header("🔔 Alertes & Veille")
+    st.markdown("""
+    Définissez vos règles d'alerte : elles sont vérifiées **chaque minute** contre les cours et les
+    états financiers en cache, et chaque déclenchement arrive dans vos notifications.
+    """)
+    
+    planificateur = planificateur_alertes()
+    moteur = planificateur.moteur
+    
+    identifiant = st.text_input("👤 Identifiant de veille", st.session_state.utilisateur,
+                                help="Vos règles et notifications sont rattachées à cet identifiant")
+    if identifiant.strip() and identifiant.strip() != st.session_state.utilisateur:
+        st.session_state.utilisateur = identifiant.strip()
+        st.session_state.derniere_notification = 0
+        st.rerun()
+    
+    regles_utilisateur = moteur.regles(st.session_state.utilisateur)
+    historique_notifications = moteur.notifications(st.session_state.utilisateur, limite=200)
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("📋 Règles actives", int(regles_utilisateur['active'].sum()) if not regles_utilisateur.empty else 0)
+    with col2:
+        st.metric("🔔 Notifications non lues", int((historique_notifications['lue'] == 0).sum()))
+    with col3:
+        st.metric("⏱️ Dernière vérification", (planificateur.dernier_passage or "en cours")[-8:])
+    
+    # Seul l'onglet affiché est calculé (st.tabs exécuterait tous les onglets)
+    onglet = st.radio("Rubrique :", ["➕ Nouvelle règle", "📋 Mes règles", "🔔 Historique"], horizontal=True, key="onglet_alertes")
+    
+    if onglet == "➕ Nouvelle règle":
+        type_regle = st.selectbox("Type de règle", list(alertes.TYPES_REGLES),
+                                  format_func=lambda t: alertes.TYPES_REGLES[t][0])
+        with st.form("nouvelle_regle"):
+            col_r1, col_r2 = st.columns(2)
+            with col_r1:
+                symbole_regle = st.text_input("Symbole", "AAPL")
+                indicateur_regle = None
+                if type_regle == 'ratio':
+                    indicateur_regle = st.selectbox(
+                        "Ratio", series_temporelles.INDICATEURS_RATIOS,
+                        format_func=lambda r: benchmark_sectoriel.RATIOS[r][0]
+                    )
+            with col_r2:
+                operateur_regle, seuil_regle = '>', None
+                if type_regle in ('cours', 'ratio'):
+                    operateur_regle = st.radio("Déclencher quand la valeur", list(alertes.OPERATEURS),
+                                               format_func=alertes.OPERATEURS.get, horizontal=True)
+                    seuil_regle = st.number_input("Seuil", value=100.0 if type_regle == 'cours' else 10.0)
+                elif type_regle == 'volatilite':
+                    seuil_regle = st.number_input(
+                        f"Multiple de la volatilité normale ({alertes.FENETRE_VOLATILITE} séances / "
+                        f"{alertes.FENETRE_REFERENCE} séances)", value=2.0, min_value=1.0, step=0.5
+                    )
+                else:
+                    st.info("Notification à chaque changement de zone : saine, à surveiller, risquée")
+            
+            if st.form_submit_button("➕ Ajouter la règle"):
+                try:
+                    moteur.ajouter_regle(st.session_state.utilisateur, type_regle, symbole_regle,
+                                         seuil_regle, operateur_regle, indicateur_regle)
+                    st.success("✅ Règle enregistrée : elle sera vérifiée au prochain passage")
+                except ValueError as e:
+                    st.error(f"❌ {e}")
+    
+    elif onglet == "📋 Mes règles":
+        if regles_utilisateur.empty:
+            st.info("ℹ️ Aucune règle définie pour le moment")
+        else:
+            st.dataframe(
+                regles_utilisateur.assign(type=regles_utilisateur['type'].map(lambda t: alertes.TYPES_REGLES[t][0]))
+                [['id', 'type', 'symbole', 'indicateur', 'operateur', 'seuil', 'active', 'evaluee']],
+                use_container_width=True, hide_index=True
+            )
+            col_g1, col_g2, col_g3 = st.columns([2, 1, 1])
+            with col_g1:
+                id_regle = st.selectbox("Règle", regles_utilisateur['id'].tolist())
+            active_regle = bool(regles_utilisateur.set_index('id').loc[id_regle, 'active'])
+            with col_g2:
+                if st.button("⏸️ Suspendre" if active_regle else "▶️ Réactiver"):
+                    moteur.activer_regle(id_regle, st.session_state.utilisateur, not active_regle)
+                    st.rerun()
+            with col_g3:
+                if st.button("🗑️ Supprimer"):
+                    moteur.supprimer_regle(id_regle, st.session_state.utilisateur)
+                    st.rerun()
+        
+        if st.button("🔄 Vérifier maintenant"):
+            with st.spinner("Collecte des données et évaluation des règles..."):
+                planificateur.passage()
+            for symbole_erreur, erreur in planificateur.erreurs.items():
+                st.warning(f"⚠️ {symbole_erreur} : {erreur}")
+            relever_notifications()
+    
+    elif onglet == "🔔 Historique":
+        if historique_notifications.empty:
+            st.info("ℹ️ Aucune alerte déclenchée pour le moment")
+        else:
+            st.dataframe(historique_notifications[['date', 'message', 'lue']], use_container_width=True, hide_index=True)
+            if st.button("✅ Tout marquer comme lu"):
+                moteur.marquer_lues(st.session_state.utilisateur, int(historique_notifications['id'].max()))
+                st.rerun()
+
+# Section Reporting
+elif section == "📑 Reporting":
+    st.header("📑 Générateur de Rapports")
+    st.markdown("""
+    Rapport de diagnostic complet (bilan, SIG, ratios, équilibre financier, score de défaillance)
+    en **HTML** et en **PDF**, pour une entreprise ou pour tout un portefeuille de clients.
+    """)
+    
+    # Seul l'onglet affiché est calculé (st.tabs exécuterait tous les onglets)
+    onglet = st.radio("Rapport :", ["🏢 Une entreprise", "📚 Portefeuille"], horizontal=True, key="onglet_reporting")
+    
+    if onglet == "🏢 Une entreprise":
+        with st.form("formulaire_rapport"):
+            nom_entreprise = st.text_input("Entreprise", "Société X")
+            st.caption("Postes en k€ (sorties de trésorerie en négatif)")
+            colonnes_postes = st.columns(3)
+            postes_saisis = {}
+            for i, poste in enumerate(calculs_financiers.POSTES):
+                with colonnes_postes[i % 3]:
+                    postes_saisis[poste] = st.number_input(
+                        rapports.LIBELLES[poste], value=float(rapports.EXEMPLE[poste]), step=10.0, key=f"rapport_{poste}"
+                    )
+            if st.form_submit_button("📑 Générer le rapport"):
+                st.session_state.rapport_entreprise = (nom_entreprise, postes_saisis)
+        
+        if 'rapport_entreprise' in st.session_state:
+            nom_entreprise, postes_saisis = st.session_state.rapport_entreprise
+            documents = generer_rapport_entreprise(nom_entreprise, tuple(postes_saisis.items()))
+            
+            col1, col2 = st.columns(2)
+            with col1:
+                st.download_button("📥 Rapport HTML", documents['html'], f"{rapports.nom_fichier(nom_entreprise)}.html",
+                                   mime=rapports.MIME['html'])
+            with col2:
+                st.download_button("📥 Rapport PDF", documents['pdf'], f"{rapports.nom_fichier(nom_entreprise)}.pdf",
+                                   mime=rapports.MIME['pdf'])
+    
+    elif onglet == "📚 Portefeuille":
+        st.markdown("""
+        Importez le fichier consolidé produit par `analyse_lot.py` (Parquet ou Excel), ou un fichier
+        CSV / Excel avec une colonne **entreprise** et une colonne par poste. Les rapports sont rendus
+        en parallèle en arrière-plan ; les sections inchangées depuis la dernière génération sont
+        reprises du cache.
+        """)
+        fichier_portefeuille = st.file_uploader("Portefeuille", type=['csv', 'xlsx', 'parquet'], key="portefeuille_rapports")
+        
+        if fichier_portefeuille is not None:
+            try:
+                portefeuille = rapports.charger_portefeuille(fichier_portefeuille.getvalue(), fichier_portefeuille.name)
+            except Exception as e:
+                st.error(f"Fichier illisible : {e}")
+                portefeuille = None
+            
+            if portefeuille is not None:
+                st.info(f"📚 {len(portefeuille):,} entreprise(s) dans le portefeuille")
+                formats_rapport = st.multiselect("Formats", list(rapports.FORMATS), default=list(rapports.FORMATS))
+                if st.button("🚀 Générer tous les rapports", disabled=not formats_rapport):
+                    dossier_rapports = os.path.join(
+                        os.path.dirname(rapports.CHEMIN_CACHE), "rapports", datetime.now().strftime("%Y%m%d_%H%M%S")
+                    )
+                    st.session_state.dossier_rapports = dossier_rapports
+                    st.session_state.travaux["Rapports du portefeuille"] = gestionnaire_travaux().soumettre(
+                        rapports.generer_rapports, portefeuille, dossier_rapports, tuple(formats_rapport),
+                        nom="Rapports du portefeuille"
+                    )
+        
+        if "Rapports du portefeuille" in st.session_state.travaux:
+            def afficher_rapports(resultat):
+                erreurs_rapports = resultat['erreur'].notna().sum()
+                st.success(f"✅ {len(resultat) - erreurs_rapports} rapport(s) générés "
+                           f"({resultat['sections_en_cache'].sum()} sections reprises du cache)")
+                if erreurs_rapports:
+                    st.dataframe(resultat[resultat['erreur'].notna()], use_container_width=True)
+                dossier_rapports = st.session_state.dossier_rapports
+                st.download_button("📦 Télécharger les rapports (ZIP)", lambda: rapports.archiver(dossier_rapports),
+                                   f"rapports_{os.path.basename(dossier_rapports)}.zip", mime="application/zip")
+            
+            suivre_travail(st.session_state.travaux["Rapports du portefeuille"], afficher_rapports)
 
 # Section Aide & Support
 elif section == "❓ Aide & Support":
@@ -15,6 +15,15 @@ import yfinance as yf
 from datetime import datetime, timedelta
 import requests
 from io import BytesIO
+import tempfile
+
+import alertes
+import calculs_financiers
+import endettement
+import gestion_session
+import rapports
+import series_temporelles
+import structure_capital
 
 # =============================================================================
 # CONFIGURATION GÉNÉRALE DE L'APPLICATION
@@ -98,23 +107,47 @@ if 'watchlist' not in st.session_state:
 if 'quiz_score' not in st.session_state:
     st.session_state.quiz_score = 0
 
+if 'utilisateur' not in st.session_state:
+    # Propriétaire des règles d'alerte et des scénarios : propre à chaque session anonyme
+    st.session_state.utilisateur = alertes.identifiant_anonyme()
+    st.session_state.derniere_notification = 0
+
 # =============================================================================
 # FONCTIONS UTILITAIRES
 # =============================================================================
 
+@st.cache_resource
+def planificateur_alertes():
+    """Planificateur unique des règles d'alerte, partagé entre les sessions"""
+    return alertes.PlanificateurAlertes(alertes.MoteurAlertes()).demarrer()
+
+# Calculateurs mémorisés : une même combinaison d'hypothèses n'est calculée qu'une fois
+calculer_levier = st.cache_data(max_entries=256)(calculs_financiers.effet_levier)
+calculer_seuil = st.cache_data(max_entries=256)(calculs_financiers.seuil_rentabilite)
+
 def afficher_notifications():
     """Affiche les notifications dans la sidebar"""
     if 'notifications' not in st.session_state:
-        st.session_state.notifications = [
+        # Tampon circulaire : les notifications les plus récentes sont en fin de file
+        st.session_state.notifications = gestion_session.file_notifications([
             {"type": "info", "message": "📚 Commencez par les fondamentaux", "date": datetime.now().strftime("%d/%m/%Y")},
             {"type": "success", "message": "🎉 Bienvenue dans FinanceLab !", "date": datetime.now().strftime("%d/%m/%Y")}
-        ]
+        ])
+    
+    # Alertes déclenchées depuis le dernier affichage (les plus récentes en tête)
+    nouvelles = planificateur_alertes().moteur.notifications(
+        st.session_state.utilisateur, apres=st.session_state.derniere_notification
+    )
+    for notif in nouvelles.iloc[::-1].itertuples():
+        st.session_state.notifications.append({"type": notif.type, "message": notif.message, "date": notif.date[:10]})
+    if not nouvelles.empty:
+        st.session_state.derniere_notification = int(nouvelles['id'].max())
     
     if st.session_state.notifications:
         st.sidebar.markdown("---")
         st.sidebar.subheader("🔔 Notifications")
         
-        for notif in st.session_state.notifications[:3]:
+        for notif in list(st.session_state.notifications)[-3:][::-1]:
             if notif["type"] == "info":
                 st.sidebar.info(notif["message"])
             elif notif["type"] == "warning":
@@ -292,9 +325,10 @@ elif section == "📋 Fondamentaux":
     </div>
     """, unsafe_allow_html=True)
     
-    tab1, tab2, tab3, tab4 = st.tabs(["📊 Principes Comptables", "🏦 Le Bilan", "📈 Compte de Résultat", "🧮 Soldes Intermédiaires"])
+    # Seul l'onglet affiché est calculé (st.tabs exécuterait tous les onglets)
+    onglet = st.radio("Thème :", ['📊 Principes Comptables', '🏦 Le Bilan', '📈 Compte de Résultat', '🧮 Soldes Intermédiaires'], horizontal=True)
     
-    with tab1:
+    if onglet == '📊 Principes Comptables':
         st.markdown("""
         <div class="concept-box">
         <h3>📊 Les 10 Principes Comptables Fondamentaux</h3>
@@ -387,7 +421,7 @@ elif section == "📋 Fondamentaux":
                 else:
                     st.error("❌ Ce n'est pas la bonne réponse. Réessayez !")
     
-    with tab2:
+    elif onglet == '🏦 Le Bilan':
         st.markdown("""
         <div class="concept-box">
         <h3>🏦 Le Bilan Comptable</h3>
@@ -468,7 +502,7 @@ elif section == "📋 Fondamentaux":
                 - Excédent de ressources stables = Fonds de Roulement positif
                 """)
     
-    with tab3:
+    elif onglet == '📈 Compte de Résultat':
         st.markdown("""
         <div class="concept-box">
         <h3>📈 Le Compte de Résultat</h3>
@@ -529,7 +563,7 @@ elif section == "📋 Fondamentaux":
             
             st.plotly_chart(fig, use_container_width=True)
     
-    with tab4:
+    elif onglet == '🧮 Soldes Intermédiaires':
         st.markdown("""
         <div class="concept-box">
         <h3>🧮 Les Soldes Intermédiaires de Gestion (SIG)</h3>
@@ -611,9 +645,10 @@ elif section == "💰 Performance":
     </div>
     """, unsafe_allow_html=True)
     
-    tab1, tab2, tab3 = st.tabs(["📈 Création de Valeur (EVA)", "⚖️ Levier Financier", "🎯 Seuil de Rentabilité"])
+    # Seul l'outil affiché est calculé (st.tabs exécuterait tous les onglets)
+    onglet = st.radio("Outil d'analyse:", ['📈 Création de Valeur (EVA)', '⚖️ Levier Financier', '🎯 Seuil de Rentabilité'], horizontal=True)
     
-    with tab1:
+    if onglet == '📈 Création de Valeur (EVA)':
         st.markdown("""
         <div class="concept-box">
         <h3>📈 Economic Value Added (EVA) - Création de Valeur</h3>
@@ -703,172 +738,268 @@ elif section == "💰 Performance":
             - Aligne les intérêts des managers et des actionnaires
             """)
     
-    with tab2:
-        st.markdown("""
-        <div class="concept-box">
-        <h3>⚖️ L'Effet de Levier Financier</h3>
-        <p>L'endettement peut amplifier la rentabilité des capitaux propres... ou les pertes !</p>
-        <p><strong>ROE = ROA + (ROA - i) × D/E</strong></p>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            st.subheader("Données de l'entreprise")
-            resultat_expl = st.number_input("Résultat d'exploitation (k€)", value=800, step=50)
-            charges_financieres = st.number_input("Charges financières (k€)", value=100, step=10)
-            capitaux_propres = st.number_input("Capitaux propres (k€)", value=2000, step=100)
-            dette_financiere = st.number_input("Dettes financières (k€)", value=1000, step=100)
-            taux_imposition_levier = st.slider("Taux d'imposition (%)", 15.0, 35.0, 25.0, step=0.5, key="levier")
+    elif onglet == '⚖️ Levier Financier':
+        @st.fragment
+        def calculateur_levier():
+            st.markdown("""
+            <div class="concept-box">
+            <h3>⚖️ L'Effet de Levier Financier</h3>
+            <p>L'endettement peut amplifier la rentabilité des capitaux propres... ou les pertes !</p>
+            <p><strong>ROE = ROA + (ROA - i) × D/E</strong></p>
+            </div>
+            """, unsafe_allow_html=True)
+        
+            with st.expander("🏦 Échéancier de la dette"):
+                st.markdown("""
+                Décrivez vos emprunts pour remplacer les charges financières saisies par celles de l'échéancier :
+                un emprunt, un portefeuille d'exemple ou un fichier (colonnes **montant**, **taux**, **duree**,
+                et au besoin **type**, **differe**, **periodicite**, **variable**, **debut**).
+                """)
+                source_dette = st.radio("Source", ["Un emprunt", "Portefeuille d'exemple", "Fichier"],
+                                        horizontal=True, key="source_dette")
+                portefeuille = None
+                if source_dette == "Un emprunt":
+                    col_em1, col_em2, col_em3 = st.columns(3)
+                    with col_em1:
+                        montant_emprunt = st.number_input("Montant (k€)", value=1000, step=100, key="emprunt_montant")
+                        duree_emprunt = st.slider("Durée (années)", 1, 25, 7, key="emprunt_duree")
+                    with col_em2:
+                        type_emprunt = st.selectbox("Amortissement", list(endettement.TYPES), key="emprunt_type",
+                                                    format_func=endettement.TYPES.get)
+                        differe_emprunt = st.slider("Différé (années)", 0.0, 3.0, 0.0, step=0.5, key="emprunt_differe")
+                    with col_em3:
+                        taux_variable = st.checkbox("Taux variable (index + marge)", key="emprunt_variable")
+                        taux_emprunt = st.number_input("Marge (%)" if taux_variable else "Taux (%)",
+                                                       value=1.5 if taux_variable else 4.5, step=0.1, key="emprunt_taux")
+                        periodicite = st.selectbox("Échéances", list(endettement.PERIODICITES), key="emprunt_periodicite",
+                                                   format_func=endettement.PERIODICITES.get)
+                    portefeuille = pd.DataFrame([{
+                        'montant': montant_emprunt, 'taux': taux_emprunt, 'duree': duree_emprunt, 'type': type_emprunt,
+                        'differe': differe_emprunt, 'periodicite': periodicite, 'variable': taux_variable,
+                        'debut': pd.Timestamp(datetime.now().year, 1, 1),
+                    }])
+                elif source_dette == "Portefeuille d'exemple":
+                    portefeuille = endettement.exemple_portefeuille(st.slider("Nombre d'emprunts", 10, 5000, 50, key="nb_emprunts"))
+                else:
+                    fichier_dette = st.file_uploader("Portefeuille d'emprunts", type=['csv', 'xlsx', 'parquet'], key="fichier_dette")
+                    if fichier_dette is not None:
+                        try:
+                            portefeuille = endettement.charger_portefeuille(fichier_dette.getvalue(), fichier_dette.name)
+                        except Exception as e:
+                            st.error(f"Portefeuille illisible : {e}")
+                
+                utiliser_echeancier = False
+                if portefeuille is not None and len(portefeuille):
+                    echeanciers = endettement.echeancier(portefeuille, date_reference=datetime.now())
+                    annuel = endettement.par_annee(echeanciers)
+                    annee_dette = endettement.annee_courante(annuel)
+                    
+                    fig_dette = make_subplots(specs=[[{"secondary_y": True}]])
+                    fig_dette.add_trace(go.Bar(x=annuel.index, y=annuel['interets'], name="Intérêts"))
+                    fig_dette.add_trace(go.Bar(x=annuel.index, y=annuel['remboursements'], name="Remboursements"))
+                    fig_dette.add_trace(go.Scatter(x=annuel.index, y=annuel['dette_fin'], name="Dette fin d'année",
+                                                   mode='lines+markers'), secondary_y=True)
+                    fig_dette.update_layout(barmode='stack', title="Service de la dette par année", height=350)
+                    st.plotly_chart(fig_dette, use_container_width=True)
+                    
+                    col_ca1, col_ca2 = st.columns(2)
+                    with col_ca1:
+                        ebe_dette = st.number_input("EBE annuel (k€)", value=1100, step=50, key="ebe_dette")
+                    with col_ca2:
+                        dotations_dette = st.number_input("Dotations annuelles (k€)", value=300, step=10, key="dotations_dette")
+                    impact = endettement.impact_financier(annuel, ebe_dette, dotations_dette)
+                    st.markdown("**Charges financières, CAF et flux de financement par année (k€)**")
+                    st.dataframe(annuel[['dette_debut', 'nouveaux_emprunts', 'taux_apparent']].join(
+                        impact.drop(columns='dette_fin')).round(2), use_container_width=True)
+                    if source_dette == "Un emprunt":
+                        st.markdown("**Tableau d'amortissement**")
+                        st.dataframe(endettement.tableau_emprunt(echeanciers).round(3), use_container_width=True)
+                    
+                    utiliser_echeancier = st.checkbox(f"Utiliser l'échéancier de {annee_dette.name} pour le levier",
+                                                      value=False, key="utiliser_echeancier")
+        
+            col1, col2 = st.columns(2)
+        
+            with col1:
+                st.subheader("Données de l'entreprise")
+                resultat_expl = st.number_input("Résultat d'exploitation (k€)", value=800, step=50)
+                if utiliser_echeancier:
+                    # Charges et dette de l'année en cours d'après l'échéancier
+                    charges_financieres = float(annee_dette['interets'])
+                    dette_financiere = float(annee_dette['dette_debut'] + annee_dette['nouveaux_emprunts'])
+                    st.metric("Charges financières (échéancier)", f"{charges_financieres:,.1f} k€")
+                    capitaux_propres = st.number_input("Capitaux propres (k€)", value=2000, step=100)
+                    st.metric("Dettes financières (échéancier)", f"{dette_financiere:,.0f} k€")
+                else:
+                    charges_financieres = st.number_input("Charges financières (k€)", value=100, step=10)
+                    capitaux_propres = st.number_input("Capitaux propres (k€)", value=2000, step=100)
+                    dette_financiere = st.number_input("Dettes financières (k€)", value=1000, step=100)
+                taux_imposition_levier = st.slider("Taux d'imposition (%)", 15.0, 35.0, 25.0, step=0.5, key="levier")
         
-        with col2:
-            st.subheader("Analyse de l'effet de levier")
+            with col2:
+                st.subheader("Analyse de l'effet de levier")
             
-            # Calculs
-            resultat_courant = resultat_expl - charges_financieres
-            resultat_net = resultat_courant * (1 - taux_imposition_levier/100)
-            roe_avec_dette = (resultat_net / capitaux_propres) * 100
+                # Calculs (sans dette, le ROE est égal au ROA)
+                levier = calculer_levier(resultat_expl, charges_financieres, capitaux_propres,
+                                         dette_financiere, taux_imposition_levier)
+                roe_avec_dette = float(levier['roe_avec_dette'])
+                roe_sans_dette = roa = float(levier['roe_sans_dette'])
+                effet_levier = float(levier['effet_levier'])
             
-            # Sans dette (pour comparaison)
-            actif_total = capitaux_propres + dette_financiere
-            roa = (resultat_expl * (1 - taux_imposition_levier/100) / actif_total) * 100
-            roe_sans_dette = roa  # Si pas de dette, ROE = ROA
+                st.metric("ROE avec endettement", f"{roe_avec_dette:.1f}%")
+                st.metric("ROE sans endettement", f"{roe_sans_dette:.1f}%")
+                st.metric("ROA (Return on Assets)", f"{roa:.1f}%")
+                st.metric("Effet de levier", f"{effet_levier:+.1f} points")
             
-            # Effet de levier
-            effet_levier = roe_avec_dette - roe_sans_dette
-            
-            st.metric("ROE avec endettement", f"{roe_avec_dette:.1f}%")
-            st.metric("ROE sans endettement", f"{roe_sans_dette:.1f}%")
-            st.metric("ROA (Return on Assets)", f"{roa:.1f}%")
-            st.metric("Effet de levier", f"{effet_levier:+.1f} points")
-            
-            # Diagnostic
-            if effet_levier > 0:
-                st.success("✅ Le levier financier est positif - L'endettement améliore la rentabilité")
-            elif effet_levier == 0:
-                st.info("⚖️ Le levier est neutre - L'endettement n'a pas d'impact")
-            else:
-                st.error("📉 Le levier financier est négatif - L'endettement détruit de la valeur")
-        
-        # Visualisation de l'effet de levier
-        st.subheader("📊 Simulation de l'effet de levier")
-        
-        niveaux_dette = np.linspace(0, 3000, 20)
-        roe_simulation = []
-        
-        for dette in niveaux_dette:
-            capitaux_totaux = capitaux_propres + dette
-            if capitaux_totaux > 0:
-                charges_fin_sim = dette * 0.05  # Taux d'intérêt supposé à 5%
-                resultat_net_sim = (resultat_expl - charges_fin_sim) * (1 - taux_imposition_levier/100)
-                roe_sim = (resultat_net_sim / capitaux_propres) * 100
-                roe_simulation.append(roe_sim)
-        
-        fig_levier = go.Figure()
-        fig_levier.add_trace(go.Scatter(
-            x=niveaux_dette,
-            y=roe_simulation,
-            mode='lines',
-            name='ROE',
-            line=dict(color='blue', width=3)
-        ))
-        
-        fig_levier.add_vline(x=dette_financiere, line_dash="dash", line_color="red", 
-                           annotation_text="Dette actuelle")
-        
-        fig_levier.update_layout(
-            title="Impact de l'endettement sur le ROE",
-            xaxis_title="Dette financière (k€)",
-            yaxis_title="ROE (%)",
-            height=400
-        )
-        
-        st.plotly_chart(fig_levier, use_container_width=True)
-    
-    with tab3:
-        st.markdown("""
-        <div class="concept-box">
-        <h3>🎯 Seuil de Rentabilité (Point Mort)</h3>
-        <p>Le seuil de rentabilité est le niveau d'activité à partir duquel l'entreprise commence à réaliser des bénéfices.</p>
-        <p><strong>Seuil = Charges Fixes / Taux de Marge sur Coût Variable</strong></p>
-        </div>
-        """, unsafe_allow_html=True)
+                # Diagnostic
+                if effet_levier > 0:
+                    st.success("✅ Le levier financier est positif - L'endettement améliore la rentabilité")
+                elif effet_levier == 0:
+                    st.info("⚖️ Le levier est neutre - L'endettement n'a pas d'impact")
+                else:
+                    st.error("📉 Le levier financier est négatif - L'endettement détruit de la valeur")
+        
+            # Visualisation de l'effet de levier
+            st.subheader("📊 Structure financière optimale")
+            st.caption("La valeur de l'entreprise est répartie entre dette et fonds propres ; le taux de la dette suit la "
+                       "notation synthétique tirée de la couverture des intérêts, le coût des fonds propres le bêta réendetté")
+        
+            col_sf1, col_sf2, col_sf3, col_sf4 = st.columns(4)
+            with col_sf1:
+                taux_sans_risque = st.number_input("Taux sans risque (%)", value=3.0, step=0.25, key="sf_taux_sans_risque")
+            with col_sf2:
+                beta_desendette = st.number_input("Bêta désendetté", value=0.9, step=0.05, key="sf_beta")
+            with col_sf3:
+                prime_risque = st.number_input("Prime de risque (%)", value=5.5, step=0.25, key="sf_prime")
+            with col_sf4:
+                defaut_max = st.slider("Probabilité de défaut max (%)", 0.5, 100.0, 100.0, step=0.5, key="sf_defaut_max")
+        
+            # Tout le balayage dette / fonds propres en un seul calcul vectorisé
+            exploration = structure_capital.explorer_structure(
+                resultat_expl, capitaux_propres + dette_financiere, taux_imposition_levier,
+                taux_sans_risque, beta_desendette, prime_risque
+            )
+            meilleur = structure_capital.optimum(exploration, defaut_max)
+            actuel = structure_capital.point_actuel(exploration, dette_financiere)
+        
+            col_op1, col_op2, col_op3, col_op4 = st.columns(4)
+            col_op1.metric("Dette optimale", f"{meilleur['dette']:,.0f} k€", f"{meilleur['dette'] - dette_financiere:+,.0f} k€")
+            col_op2.metric("CMPC minimal", f"{meilleur['cmpc']:.2f}%", f"{meilleur['cmpc'] - actuel['cmpc']:+.2f} pt",
+                           delta_color="inverse")
+            col_op3.metric("Notation synthétique", meilleur['notation'], f"actuelle : {actuel['notation']}", delta_color="off")
+            col_op4.metric("Gain de valeur", f"{meilleur['valeur_entreprise'] - actuel['valeur_entreprise']:+,.0f} k€")
+        
+            fig_levier = make_subplots(specs=[[{"secondary_y": True}]])
+            fig_levier.add_trace(go.Scatter(x=exploration['dette'], y=exploration['roe'], mode='lines', name='ROE',
+                                            line=dict(color='blue', width=3)))
+            fig_levier.add_trace(go.Scatter(x=exploration['dette'], y=exploration['cmpc'], mode='lines', name='CMPC',
+                                            line=dict(color='orange', width=3)), secondary_y=True)
+            fig_levier.add_trace(go.Scatter(x=exploration['dette'], y=exploration['probabilite_defaut'], mode='lines',
+                                            name='Probabilité de défaut', line=dict(color='gray', dash='dot')))
+            fig_levier.add_vline(x=dette_financiere, line_dash="dash", line_color="red", annotation_text="Dette actuelle")
+            fig_levier.add_vline(x=meilleur['dette'], line_dash="dash", line_color="green", annotation_text="Optimum")
+        
+            fig_levier.update_layout(
+                title="Impact de l'endettement sur le ROE, le CMPC et le risque de défaut",
+                xaxis_title="Dette financière (k€)",
+                height=450
+            )
+            fig_levier.update_yaxes(title_text="ROE / probabilité de défaut (%)", secondary_y=False)
+            fig_levier.update_yaxes(title_text="CMPC (%)", secondary_y=True)
         
-        col1, col2 = st.columns(2)
+            st.plotly_chart(fig_levier, use_container_width=True)
         
-        with col1:
-            st.subheader("Paramètres de calcul")
-            charges_fixes = st.number_input("Charges fixes annuelles (k€)", value=500, step=50)
-            prix_vente_unitaire = st.number_input("Prix de vente unitaire (€)", value=100, step=10)
-            cout_variable_unitaire = st.number_input("Coût variable unitaire (€)", value=40, step=5)
-            ca_actuel = st.number_input("Chiffre d'affaires actuel (k€)", value=800, step=50)
-        
-        with col2:
-            st.subheader("Résultats")
+        calculateur_levier()
+    
+    elif onglet == '🎯 Seuil de Rentabilité':
+        @st.fragment
+        def calculateur_seuil():
+            st.markdown("""
+            <div class="concept-box">
+            <h3>🎯 Seuil de Rentabilité (Point Mort)</h3>
+            <p>Le seuil de rentabilité est le niveau d'activité à partir duquel l'entreprise commence à réaliser des bénéfices.</p>
+            <p><strong>Seuil = Charges Fixes / Taux de Marge sur Coût Variable</strong></p>
+            </div>
+            """, unsafe_allow_html=True)
+        
+            col1, col2 = st.columns(2)
+        
+            with col1:
+                st.subheader("Paramètres de calcul")
+                charges_fixes = st.number_input("Charges fixes annuelles (k€)", value=500, step=50)
+                prix_vente_unitaire = st.number_input("Prix de vente unitaire (€)", value=100, step=10)
+                cout_variable_unitaire = st.number_input("Coût variable unitaire (€)", value=40, step=5)
+                ca_actuel = st.number_input("Chiffre d'affaires actuel (k€)", value=800, step=50)
+        
+            with col2:
+                st.subheader("Résultats")
             
-            # Calculs du seuil
-            marge_unitaire = prix_vente_unitaire - cout_variable_unitaire
-            taux_marge = marge_unitaire / prix_vente_unitaire * 100
-            seuil_ca = charges_fixes / (taux_marge / 100)
-            seuil_quantite = charges_fixes / marge_unitaire
+                # Calculs du seuil (volume de référence : celui du chiffre d'affaires actuel)
+                seuil = calculer_seuil(charges_fixes, cout_variable_unitaire, prix_vente_unitaire,
+                                       ca_actuel * 1000 / prix_vente_unitaire)
+                marge_unitaire = float(seuil['marge_unitaire'])
+                taux_marge = float(seuil['taux_marge'])
+                seuil_ca = float(seuil['seuil_ca'])
+                seuil_quantite = float(seuil['seuil_volume'])
             
-            st.metric("Marge unitaire", f"{marge_unitaire:.0f} €")
-            st.metric("Taux de marge", f"{taux_marge:.1f}%")
-            st.metric("Seuil de rentabilité (CA)", f"{seuil_ca:,.0f} k€")
-            st.metric("Seuil de rentabilité (quantité)", f"{seuil_quantite:,.0f} unités")
+                st.metric("Marge unitaire", f"{marge_unitaire:.0f} €")
+                st.metric("Taux de marge", f"{taux_marge:.1f}%")
+                st.metric("Seuil de rentabilité (CA)", f"{seuil_ca:,.0f} k€")
+                st.metric("Seuil de rentabilité (quantité)", f"{seuil_quantite:,.0f} unités")
             
-            # Marge de sécurité
-            marge_securite = ((ca_actuel - seuil_ca) / ca_actuel) * 100
-            st.metric("Marge de sécurité", f"{marge_securite:.1f}%")
+                # Marge de sécurité
+                marge_securite = float(seuil['marge_securite'])
+                st.metric("Marge de sécurité", f"{marge_securite:.1f}%")
             
-            if marge_securite > 20:
-                st.success("✅ Bonne marge de sécurité")
-            elif marge_securite > 0:
-                st.warning("⚠️ Marge de sécurité faible")
-            else:
-                st.error("❌ Entreprise en dessous du seuil de rentabilité")
-        
-        # Graphique du seuil de rentabilité
-        quantites = np.linspace(0, seuil_quantite * 2, 100)
-        ca_total = quantites * prix_vente_unitaire / 1000  # Conversion en k€
-        couts_total = (charges_fixes + quantites * cout_variable_unitaire / 1000)
-        
-        fig_seuil = go.Figure()
-        
-        fig_seuil.add_trace(go.Scatter(
-            x=quantites, y=ca_total,
-            mode='lines',
-            name='Chiffre d\'affaires',
-            line=dict(color='green', width=3)
-        ))
-        
-        fig_seuil.add_trace(go.Scatter(
-            x=quantites, y=couts_total,
-            mode='lines',
-            name='Coûts totaux',
-            line=dict(color='red', width=3)
-        ))
-        
-        fig_seuil.add_trace(go.Scatter(
-            x=quantites, y=[charges_fixes] * len(quantites),
-            mode='lines',
-            name='Charges fixes',
-            line=dict(color='orange', width=2, dash='dash')
-        ))
-        
-        # Point mort
-        fig_seuil.add_vline(x=seuil_quantite, line_dash="dash", line_color="purple",
-                          annotation_text=f"Point mort: {seuil_quantite:.0f} unités")
-        
-        fig_seuil.update_layout(
-            title="Graphique du seuil de rentabilité",
-            xaxis_title="Quantités vendues",
-            yaxis_title="Montant (k€)",
-            height=400
-        )
-        
-        st.plotly_chart(fig_seuil, use_container_width=True)
+                if marge_securite > 20:
+                    st.success("✅ Bonne marge de sécurité")
+                elif marge_securite > 0:
+                    st.warning("⚠️ Marge de sécurité faible")
+                else:
+                    st.error("❌ Entreprise en dessous du seuil de rentabilité")
+        
+            # Graphique du seuil de rentabilité
+            quantites = np.linspace(0, seuil_quantite * 2, 100)
+            ca_total = quantites * prix_vente_unitaire / 1000  # Conversion en k€
+            couts_total = (charges_fixes + quantites * cout_variable_unitaire / 1000)
+        
+            fig_seuil = go.Figure()
+        
+            fig_seuil.add_trace(go.Scatter(
+                x=quantites, y=ca_total,
+                mode='lines',
+                name='Chiffre d\'affaires',
+                line=dict(color='green', width=3)
+            ))
+        
+            fig_seuil.add_trace(go.Scatter(
+                x=quantites, y=couts_total,
+                mode='lines',
+                name='Coûts totaux',
+                line=dict(color='red', width=3)
+            ))
+        
+            fig_seuil.add_trace(go.Scatter(
+                x=quantites, y=[charges_fixes] * len(quantites),
+                mode='lines',
+                name='Charges fixes',
+                line=dict(color='orange', width=2, dash='dash')
+            ))
+        
+            # Point mort
+            fig_seuil.add_vline(x=seuil_quantite, line_dash="dash", line_color="purple",
+                              annotation_text=f"Point mort: {seuil_quantite:.0f} unités")
+        
+            fig_seuil.update_layout(
+                title="Graphique du seuil de rentabilité",
+                xaxis_title="Quantités vendues",
+                yaxis_title="Montant (k€)",
+                height=400
+            )
+        
+            st.plotly_chart(fig_seuil, use_container_width=True)
+        
+        calculateur_seuil()
 
 # =============================================================================
 # SECTION ÉQUILIBRE FINANCIER
@@ -1113,12 +1244,126 @@ elif section == "📊 Mon Dashboard":
     st.info("Section Dashboard - Code détaillé disponible dans la version complète")
 
 elif section == "🔔 Alertes & Veille":
-    st.markdown("<h2 class='section-header'>❓ Centre d'Aide et Support</h2>", unsafe_allow_html=True)
-    st.info("Section Alertes - Code détaillé disponible dans la version complète")
+    st.markdown('<h2 class="section-header">🔔 Alertes & Veille</h2>', unsafe_allow_html=True)
+    
+    st.markdown("""
+    <div class="concept-box">
+    <h3>🔔 Règles d'alerte</h3>
+    <p>Franchissement de cours, seuil de ratio, changement de zone du score de défaillance ou pic de
+    volatilité : vos règles sont vérifiées chaque minute et les déclenchements arrivent dans vos notifications.</p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    moteur = planificateur_alertes().moteur
+    utilisateur = st.text_input("👤 Identifiant de veille", st.session_state.utilisateur).strip() or st.session_state.utilisateur
+    if utilisateur != st.session_state.utilisateur:
+        st.session_state.utilisateur = utilisateur
+        st.session_state.derniere_notification = 0
+        st.rerun()
+    
+    col1, col2 = st.columns([1, 2])
+    
+    with col1:
+        st.subheader("➕ Nouvelle règle")
+        type_regle = st.selectbox("Type de règle", list(alertes.TYPES_REGLES),
+                                  format_func=lambda t: alertes.TYPES_REGLES[t][0])
+        symbole_regle = st.text_input("Symbole", "AAPL")
+        indicateur_regle, operateur_regle, seuil_regle = None, '>', None
+        if type_regle == 'ratio':
+            indicateur_regle = st.selectbox("Ratio", series_temporelles.INDICATEURS_RATIOS)
+        if type_regle in ('cours', 'ratio'):
+            operateur_regle = st.radio("Déclencher quand la valeur", list(alertes.OPERATEURS),
+                                       format_func=alertes.OPERATEURS.get)
+            seuil_regle = st.number_input("Seuil", value=100.0 if type_regle == 'cours' else 10.0)
+        elif type_regle == 'volatilite':
+            seuil_regle = st.number_input("Multiple de la volatilité normale", value=2.0, min_value=1.0, step=0.5)
+        
+        if st.button("➕ Ajouter la règle"):
+            try:
+                moteur.ajouter_regle(utilisateur, type_regle, symbole_regle, seuil_regle, operateur_regle, indicateur_regle)
+                st.success("✅ Règle enregistrée")
+            except ValueError as e:
+                st.error(f"❌ {e}")
+    
+    with col2:
+        st.subheader("📋 Mes règles")
+        regles_utilisateur = moteur.regles(utilisateur)
+        if regles_utilisateur.empty:
+            st.info("ℹ️ Aucune règle définie pour le moment")
+        else:
+            st.dataframe(regles_utilisateur[['id', 'type', 'symbole', 'indicateur', 'operateur', 'seuil', 'evaluee']],
+                         use_container_width=True, hide_index=True)
+            id_regle = st.selectbox("Règle à supprimer", regles_utilisateur['id'].tolist())
+            if st.button("🗑️ Supprimer la règle"):
+                moteur.supprimer_regle(id_regle, utilisateur)
+                st.rerun()
+        
+        st.subheader("🔔 Alertes déclenchées")
+        historique_notifications = moteur.notifications(utilisateur, limite=100)
+        if historique_notifications.empty:
+            st.info("ℹ️ Aucune alerte déclenchée pour le moment")
+        else:
+            st.dataframe(historique_notifications[['date', 'message']], use_container_width=True, hide_index=True)
 
 elif section == "📑 Reporting":
     st.markdown('<h2 class="section-header">📑 Générateur de Rapports Automatisés</h2>', unsafe_allow_html=True)
-    st.info("Section Reporting - Code détaillé disponible dans la version complète")
+    
+    st.markdown("""
+    <div class="concept-box">
+    <h3>📑 Rapport de diagnostic complet</h3>
+    <p>Bilan, soldes intermédiaires de gestion, ratios, équilibre financier et score de défaillance,
+    graphiques compris, en HTML et en PDF — pour une entreprise ou pour tout un portefeuille.</p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    # Seul l'onglet affiché est calculé (st.tabs exécuterait tous les onglets)
+    onglet = st.radio("Rapport :", ['🏢 Une entreprise', '📚 Portefeuille'], horizontal=True)
+    
+    if onglet == '🏢 Une entreprise':
+        with st.form("formulaire_rapport"):
+            nom_entreprise = st.text_input("Entreprise", "Société X")
+            colonnes_postes = st.columns(3)
+            postes_saisis = {}
+            for i, poste in enumerate(calculs_financiers.POSTES):
+                with colonnes_postes[i % 3]:
+                    postes_saisis[poste] = st.number_input(
+                        f"{rapports.LIBELLES[poste]} (k€)", value=float(rapports.EXEMPLE[poste]), step=10.0
+                    )
+            genere = st.form_submit_button("📑 Générer le rapport")
+        
+        if genere:
+            documents = rapports.rapport_entreprise(nom_entreprise, postes_saisis)
+            col1, col2 = st.columns(2)
+            with col1:
+                st.download_button("📥 Rapport HTML", documents['html'], f"{rapports.nom_fichier(nom_entreprise)}.html",
+                                   mime=rapports.MIME['html'])
+            with col2:
+                st.download_button("📥 Rapport PDF", documents['pdf'], f"{rapports.nom_fichier(nom_entreprise)}.pdf",
+                                   mime=rapports.MIME['pdf'])
+    
+    elif onglet == '📚 Portefeuille':
+        st.markdown("""
+        Fichier consolidé de `analyse_lot.py` (Parquet ou Excel), ou fichier CSV / Excel avec une colonne
+        **entreprise** et une colonne par poste. Les sections inchangées depuis la dernière génération
+        sont reprises du cache.
+        """)
+        fichier_portefeuille = st.file_uploader("Portefeuille", type=['csv', 'xlsx', 'parquet'])
+        
+        if fichier_portefeuille is not None and st.button("🚀 Générer tous les rapports"):
+            barre = st.progress(0.0, text="Préparation des rapports...")
+            try:
+                portefeuille = rapports.charger_portefeuille(fichier_portefeuille.getvalue(), fichier_portefeuille.name)
+                with tempfile.TemporaryDirectory() as dossier_rapports:
+                    resultat = rapports.generer_rapports(
+                        portefeuille, dossier_rapports,
+                        progression=lambda fraction, message=None: barre.progress(fraction, text=message)
+                    )
+                    archive = rapports.archiver(dossier_rapports)
+                st.success(f"✅ {resultat['erreur'].isna().sum()} rapport(s) générés "
+                           f"({resultat['sections_en_cache'].sum()} sections reprises du cache)")
+                st.download_button("📦 Télécharger les rapports (ZIP)", archive, "rapports.zip", mime="application/zip")
+            except Exception as e:
+                st.error(f"❌ Génération impossible : {e}")
 
 elif section == "❓ Aide & Support":
     st.markdown('<h2 class="section-header">❓ Centre d\'Aide et Support</h2>', unsafe_allow_html=True)
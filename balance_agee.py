@@ -0,0 +1,213 @@
+"""
+📅 FINANCELAB - Balance âgée clients et fournisseurs
+Description: Répartit l'encours non lettré par ancienneté (0-30, 31-60, 61-90,
+plus de 90 jours) pour chaque tiers et au global, mesure la concentration
+(part des N premiers tiers) et suit l'évolution de la balance d'un instantané
+à l'autre. Les pièces sont triées une fois par date : changer de date de
+référence ne déplace que les pièces qui franchissent une borne de tranche,
+sans reparcourir tout l'encours.
+"""
+
+import numpy as np
+import pandas as pd
+
+import lettrage
+
+# =============================================================================
+# PARAMÈTRES
+# =============================================================================
+
+# Bornes d'ancienneté (jours) et libellés des tranches, de la plus récente à la plus ancienne
+BORNES = [30, 60, 90]
+TRANCHES = ["0-30 j", "31-60 j", "61-90 j", "> 90 j"]
+NON_ECHU = "Non échu"
+BASES = {'date': "Date de facture", 'echeance': "Date d'échéance"}
+NB_PRINCIPAUX = 10
+
+
+def _jours(dates):
+    """Dates -> nombre de jours depuis l'origine Unix (entiers)"""
+    return pd.DatetimeIndex(dates).to_numpy(dtype='datetime64[D]').astype(np.int64)
+
+
+# =============================================================================
+# BALANCE ÂGÉE
+# =============================================================================
+
+class BalanceAgee:
+    """
+    Balance âgée d'un encours (une ligne par pièce ouverte : nature, tiers,
+    date, echeance, montant). L'ancienneté se mesure depuis la date de
+    facture ou depuis l'échéance (`base`). Depuis la date de facture, les
+    pièces postérieures à la date de référence ne sont pas encore dans la
+    balance ; depuis l'échéance, elles forment la tranche « Non échu ».
+    """
+
+    def __init__(self, encours, base='date'):
+        encours = encours[encours['montant'] != 0]
+        ordre = np.argsort(_jours(encours[base]), kind='stable')
+        encours = encours.iloc[ordre]
+        self.base = base
+        self.tranches = [NON_ECHU] + TRANCHES if base == 'echeance' else TRANCHES
+        self._dates = _jours(encours[base])
+        self._montants = encours['montant'].to_numpy(dtype=float)
+        self._codes, self._tiers = pd.MultiIndex.from_arrays(
+            [encours['nature'].astype(str), encours['tiers'].astype(str)]
+        ).factorize()
+        self._tiers = self._tiers.set_names(['nature', 'tiers'])
+        self._cumul = np.concatenate([[0.0], np.cumsum(self._montants)])
+        self.date_reference = None
+        self._positions = None
+        # Montants par tiers et par tranche, de la plus ancienne à la plus récente, puis pièces futures
+        self._matrice = np.zeros((len(self._tiers), len(TRANCHES) + 1))
+
+    def _bornes(self, date_reference):
+        """Position dans l'encours trié de chaque borne de tranche, de la plus ancienne à la date de référence"""
+        jour = _jours([date_reference])[0]
+        seuils = [jour - borne for borne in reversed(BORNES)]
+        return np.concatenate([np.searchsorted(self._dates, seuils, side='left'),
+                               np.searchsorted(self._dates, [jour], side='right')])
+
+    def _ajouter(self, debut, fin, colonne, signe):
+        if fin > debut:
+            self._matrice[:, colonne] += signe * np.bincount(
+                self._codes[debut:fin], weights=self._montants[debut:fin], minlength=len(self._tiers)
+            )
+
+    def vieillir(self, date_reference):
+        """
+        Place la balance à `date_reference`. La première fois, toutes les
+        pièces sont réparties ; ensuite, seules celles situées entre
+        l'ancienne et la nouvelle position d'une borne changent de tranche.
+        """
+        date_reference = pd.Timestamp(date_reference).normalize()
+        nouvelles = self._bornes(date_reference)
+
+        if self._positions is None:
+            limites = np.concatenate([[0], nouvelles, [len(self._dates)]])
+            for colonne in range(len(limites) - 1):
+                self._ajouter(limites[colonne], limites[colonne + 1], colonne, 1)
+        else:
+            # La borne j sépare les colonnes j (plus ancienne) et j + 1
+            for j, (avant, apres) in enumerate(zip(self._positions, nouvelles)):
+                if apres > avant:
+                    self._ajouter(avant, apres, j + 1, -1)
+                    self._ajouter(avant, apres, j, 1)
+                elif apres < avant:
+                    self._ajouter(apres, avant, j, -1)
+                    self._ajouter(apres, avant, j + 1, 1)
+
+        self._positions = nouvelles
+        self.date_reference = date_reference
+        return self
+
+    def _verifier(self):
+        if self.date_reference is None:
+            raise ValueError("Balance non vieillie : appeler vieillir(date_reference)")
+
+    def totaux(self):
+        """Encours par tranche, toutes natures confondues (sommes cumulées : sans parcourir les pièces)"""
+        self._verifier()
+        limites = np.concatenate([[0], self._positions, [len(self._dates)]])
+        montants = np.diff(self._cumul[limites])[::-1]
+        return pd.Series(montants[-len(self.tranches):], index=self.tranches)
+
+    def par_tiers(self):
+        """Encours de chaque tiers par tranche, du plus gros encours au plus petit"""
+        self._verifier()
+        balance = pd.DataFrame(self._matrice[:, ::-1][:, -len(self.tranches):], index=self._tiers, columns=self.tranches)
+        balance['total'] = balance[self.tranches].sum(axis=1)
+        balance = balance[~np.isclose(balance['total'], 0)]
+        return balance.sort_values('total', ascending=False)
+
+    def synthese(self):
+        """Encours par nature et par tranche, avec la part de chaque tranche (%)"""
+        balance = self.par_tiers()
+        synthese = balance.groupby(level='nature').sum()
+        for tranche in self.tranches:
+            synthese[f"part {tranche}"] = synthese[tranche] / synthese['total'] * 100
+        return synthese
+
+    def concentration(self, nb=NB_PRINCIPAUX):
+        """Part de l'encours portée par les `nb` premiers tiers, et indice de Herfindahl, par nature"""
+        balance = self.par_tiers()
+        lignes = {}
+        for nature, groupe in balance.groupby(level='nature'):
+            encours = groupe['total'].clip(lower=0)
+            if encours.sum() <= 0:
+                # Aucun encours positif (tout soldé ou créditeur) : concentration non définie
+                lignes[nature] = {'nb_tiers': len(groupe), f'part_top_{nb}': np.nan, 'herfindahl': np.nan,
+                                  'premier_tiers': None}
+                continue
+            parts = encours / encours.sum()
+            lignes[nature] = {
+                'nb_tiers': len(groupe),
+                f'part_top_{nb}': float(parts.nlargest(nb).sum() * 100),
+                'herfindahl': float((parts ** 2).sum() * 10_000),
+                'premier_tiers': parts.idxmax()[1],
+            }
+        return pd.DataFrame.from_dict(lignes, orient='index')
+
+
+# =============================================================================
+# ENCOURS ET ÉVOLUTION
+# =============================================================================
+
+def encours_lettre(factures, date_reference=None):
+    """
+    Pièces ouvertes à `date_reference` d'après un lettrage : factures émises
+    à cette date et non encore soldées (reste final, ou montant entier si la
+    facture a été soldée plus tard).
+    """
+    if date_reference is None:
+        return factures.loc[factures['reste'] > 0, ['nature', 'tiers', 'date', 'echeance']].assign(
+            montant=factures['reste'])
+    date_reference = pd.Timestamp(date_reference)
+    emises = factures[factures['date'] <= date_reference]
+    montant = emises['montant'].where(emises['date_reglement'] > date_reference, emises['reste'])
+    ouvertes = montant > 0
+    return emises.loc[ouvertes, ['nature', 'tiers', 'date', 'echeance']].assign(montant=montant[ouvertes])
+
+
+def charger_encours(contenu, nom_fichier):
+    """
+    Lit un fichier de pièces ouvertes (tiers, date, montant...), un grand
+    livre ou un FEC, et retourne les factures lettrées (les pièces d'une
+    simple liste d'encours restent ouvertes, faute de règlement).
+    """
+    factures, _ = lettrage.lettrer(lettrage.charger_grand_livre(contenu, nom_fichier))
+    return factures
+
+
+def evolution(instantanes, base='date'):
+    """
+    Évolution de la balance sur des instantanés successifs : `instantanes`
+    associe une date d'arrêté à l'encours de cette date. Retourne, par
+    arrêté et par nature, les montants par tranche, la part à plus de 90
+    jours et la variation de l'encours total.
+    """
+    lignes = []
+    for date_arrete, encours in sorted(instantanes.items()):
+        synthese = BalanceAgee(encours, base).vieillir(date_arrete).synthese()
+        lignes.append(synthese.filter(regex=r"^(?!part )").assign(arrete=pd.Timestamp(date_arrete)))
+    if not lignes:
+        return pd.DataFrame()
+    historique = pd.concat(lignes).reset_index().set_index(['nature', 'arrete']).sort_index()
+    historique['part > 90 j'] = historique[TRANCHES[-1]] / historique['total'] * 100
+    historique['variation'] = historique.groupby(level='nature')['total'].diff()
+    return historique
+
+
+def evolution_lettree(factures, arretes, base='date'):
+    """
+    Évolution reconstituée depuis un seul lettrage : l'encours de chaque
+    arrêté est celui des factures émises et non encore soldées à cette date.
+    """
+    arretes = sorted(pd.Timestamp(a) for a in arretes)
+    return evolution({arrete: encours_lettre(factures, arrete) for arrete in arretes}, base)
+
+
+def arretes_mensuels(factures, nb=12):
+    """Fins de mois des `nb` derniers mois couverts par les factures"""
+    fin = factures['date'].max().normalize()
+    return list(pd.date_range(end=fin, periods=nb, freq='ME'))
@@ -0,0 +1,208 @@
+"""
+📊 FINANCELAB - Référentiel sectoriel de ratios
+Description: Stocke localement (Parquet) les distributions de ratios par secteur
+et classe de taille, avec déciles précalculés, et positionne une entreprise
+dans sa distribution (percentile) par recherche dichotomique.
+"""
+
+import os
+from functools import lru_cache
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+# =============================================================================
+# PARAMÈTRES
+# =============================================================================
+
+CHEMIN_BENCHMARK = os.path.join(os.path.dirname(os.path.abspath(__file__)), "donnees", "benchmark_sectoriel.parquet")
+
+# Ratios suivis : libellé et sens favorable (True = plus c'est haut, mieux c'est)
+RATIOS = {
+    'roe': ("ROE (%)", True),
+    'roa': ("ROA (%)", True),
+    'ros': ("ROS (%)", True),
+    'marge_ebit': ("Marge d'exploitation (%)", True),
+    'endettement': ("Ratio d'endettement", False),
+    'autonomie_financiere': ("Autonomie financière (%)", True),
+    'couverture_immobilisations': ("Couverture des immobilisations", True),
+    'delai_clients': ("Délai clients (jours)", False),
+    'delai_stocks': ("Délai stocks (jours)", False),
+    'delai_fournisseurs': ("Délai fournisseurs (jours)", True),
+    'liquidite_generale': ("Liquidité générale", True),
+    'liquidite_reduite': ("Liquidité réduite", True),
+    'liquidite_immediate': ("Liquidité immédiate", True),
+}
+
+# Classes de taille selon le chiffre d'affaires (k€)
+CLASSES_TAILLE = [
+    ("TPE", 2_000),
+    ("PME", 50_000),
+    ("ETI", 1_500_000),
+    ("GE", np.inf),
+]
+
+TOUTES_TAILLES = "Toutes tailles"
+DECILES = [f"d{i}" for i in range(1, 10)]
+
+
+def classe_taille(chiffre_affaires):
+    """Retourne la classe de taille correspondant à un chiffre d'affaires (k€)"""
+    for classe, plafond in CLASSES_TAILLE:
+        if chiffre_affaires < plafond:
+            return classe
+    return CLASSES_TAILLE[-1][0]
+
+
+# =============================================================================
+# CONSTRUCTION DU RÉFÉRENTIEL
+# =============================================================================
+
+def construire_benchmark(entreprises, chemin=CHEMIN_BENCHMARK):
+    """
+    Construit le référentiel à partir d'un DataFrame d'entreprises.
+
+    `entreprises` contient une colonne `secteur`, une colonne `chiffre_affaires`
+    (k€) ou `taille`, et une colonne par ratio de RATIOS. Les valeurs sont
+    écrites triées par (secteur, taille, ratio, valeur) : chaque distribution
+    occupe ainsi une plage contiguë du fichier, repérée dans le fichier des
+    déciles par ses bornes [debut, fin).
+    """
+    df = entreprises.copy()
+    if 'taille' not in df:
+        df['taille'] = df['chiffre_affaires'].map(classe_taille)
+
+    ratios = [r for r in RATIOS if r in df]
+    long = df.melt(id_vars=['secteur', 'taille'], value_vars=ratios, var_name='ratio', value_name='valeur')
+    long = long[np.isfinite(long['valeur'].astype(float))]
+
+    # Distribution « toutes tailles » de chaque secteur
+    long = pd.concat([long, long.assign(taille=TOUTES_TAILLES)], ignore_index=True)
+    for colonne in ['secteur', 'taille', 'ratio']:
+        long[colonne] = pd.Categorical(long[colonne].astype(str), ordered=True)
+    long = long.sort_values(['secteur', 'taille', 'ratio', 'valeur'], ignore_index=True)
+    long['valeur'] = long['valeur'].astype('float64')
+
+    groupes = long.groupby(['secteur', 'taille', 'ratio'], observed=True, sort=True)['valeur']
+    deciles = groupes.quantile(np.arange(1, 10) / 10).unstack()
+    deciles.columns = DECILES
+
+    # Plage [debut, fin) de chaque distribution dans le tableau trié des valeurs
+    effectifs = groupes.size().reindex(deciles.index)
+    deciles['fin'] = effectifs.cumsum()
+    deciles['debut'] = deciles['fin'] - effectifs
+
+    os.makedirs(os.path.dirname(chemin), exist_ok=True)
+    long[['valeur']].to_parquet(chemin, index=False)
+    deciles.reset_index().to_parquet(_chemin_deciles(chemin), index=False)
+    return charger_benchmark(chemin)
+
+
+def construire_depuis_fichier(contenu, nom_fichier, chemin=CHEMIN_BENCHMARK, progression=None):
+    """
+    Construit le référentiel à partir du contenu d'un fichier CSV ou Excel
+    (exécutable en arrière-plan). Retourne le nombre d'entreprises lues.
+    """
+    if progression is not None:
+        progression(0.1, "Lecture du fichier")
+    fichier = BytesIO(contenu)
+    entreprises = pd.read_csv(fichier) if nom_fichier.endswith('.csv') else pd.read_excel(fichier)
+
+    if progression is not None:
+        progression(0.4, f"Calcul des distributions ({len(entreprises):,} entreprises)")
+    construire_benchmark(entreprises, chemin)
+    return len(entreprises)
+
+
+def _chemin_deciles(chemin):
+    """Chemin du fichier des déciles associé au référentiel"""
+    racine, extension = os.path.splitext(chemin)
+    return f"{racine}_deciles{extension}"
+
+
+# =============================================================================
+# CONSULTATION
+# =============================================================================
+
+class BenchmarkSectoriel:
+    """Référentiel chargé en mémoire : un tableau de valeurs triées par distribution"""
+
+    def __init__(self, valeurs, bornes, deciles):
+        self.valeurs = valeurs
+        self.bornes = bornes
+        self.deciles = deciles
+
+    @property
+    def secteurs(self):
+        return sorted({cle[0] for cle in self.bornes})
+
+    def tailles(self, secteur):
+        return sorted({cle[1] for cle in self.bornes if cle[0] == secteur})
+
+    def distribution(self, secteur, taille, ratio):
+        """Valeurs triées de la distribution (vue sans copie)"""
+        bornes = self.bornes.get((secteur, taille, ratio))
+        if bornes is None:
+            return None
+        return self.valeurs[bornes[0]:bornes[1]]
+
+    def percentile(self, secteur, taille, ratio, valeur):
+        """
+        Rang centile (0-100) de `valeur` dans la distribution, en O(log n).
+        Retourne None si la distribution n'existe pas.
+        """
+        distribution = self.distribution(secteur, taille, ratio)
+        if distribution is None or distribution.size == 0:
+            return None
+        gauche = np.searchsorted(distribution, valeur, side='left')
+        droite = np.searchsorted(distribution, valeur, side='right')
+        return 100.0 * (gauche + droite) / (2 * distribution.size)
+
+    def deciles_de(self, secteur, taille, ratio):
+        """Déciles précalculés d'une distribution"""
+        try:
+            return self.deciles.loc[(secteur, taille, ratio)]
+        except KeyError:
+            return None
+
+
+@lru_cache(maxsize=4)
+def _charger(chemin, date_modification):
+    """Lit le référentiel en mémoire projetée et indexe les plages de chaque distribution"""
+    valeurs = pq.read_table(chemin, memory_map=True).column('valeur').to_numpy()
+
+    deciles = pd.read_parquet(_chemin_deciles(chemin))
+    deciles[['secteur', 'taille', 'ratio']] = deciles[['secteur', 'taille', 'ratio']].astype(str)
+    deciles = deciles.set_index(['secteur', 'taille', 'ratio'])
+    bornes = {
+        cle: (int(debut), int(fin))
+        for cle, debut, fin in zip(deciles.index, deciles['debut'], deciles['fin'])
+    }
+    return BenchmarkSectoriel(valeurs, bornes, deciles)
+
+
+def charger_benchmark(chemin=CHEMIN_BENCHMARK):
+    """Charge le référentiel (mis en cache tant que le fichier n'est pas modifié)"""
+    if not os.path.exists(chemin) or not os.path.exists(_chemin_deciles(chemin)):
+        return None
+    return _charger(chemin, os.path.getmtime(chemin))
+
+
+def position_sectorielle(benchmark, secteur, taille, ratio, valeur):
+    """
+    Texte de positionnement d'une entreprise dans son secteur, ou None.
+    Le rang est exprimé dans le sens favorable du ratio.
+    """
+    if benchmark is None:
+        return None
+    percentile = benchmark.percentile(secteur, taille, ratio, valeur)
+    if percentile is None:
+        percentile = benchmark.percentile(secteur, TOUTES_TAILLES, ratio, valeur)
+    if percentile is None:
+        return None
+
+    libelle, plus_haut_mieux = RATIOS[ratio]
+    rang = percentile if plus_haut_mieux else 100 - percentile
+    return f"📊 {libelle} : {percentile:.0f}e percentile du secteur {secteur} (meilleur que {rang:.0f}% des entreprises)"
@@ -0,0 +1,363 @@
+"""
+🧮 FINANCELAB - Calculateurs financiers
+Description: Fonctions de calcul pures utilisées par les pages de l'application
+et par l'analyse en lot (diagnostics du bilan, du compte de résultat et des flux).
+Elles acceptent des scalaires ou des tableaux numpy (calcul vectorisé de
+nombreuses hypothèses en un seul appel). Montants en k€, taux en %.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def resultat_calculateur(resultat, sortie=None):
+    """Résultat retenu d'un calculateur, en tableau de flottants (clé d'un dictionnaire ou colonne, sinon le résultat lui-même)"""
+    return np.asarray(resultat[sortie] if sortie is not None else resultat, dtype=float)
+
+
+def valoriser_dcf(fcf_actuel, croissance, croissance_perpetuite, wacc, dette_nette, annees=5):
+    """
+    Valorisation par les flux de trésorerie actualisés.
+
+    Retourne un dictionnaire : valeur des flux explicites, valeur terminale
+    actualisée, valeur d'entreprise et valeur des actions. La valeur
+    terminale est NaN lorsque le WACC n'excède pas la croissance à l'infini.
+    """
+    fcf_actuel = np.asarray(fcf_actuel, dtype=float)
+    g = np.asarray(croissance, dtype=float) / 100
+    g_infini = np.asarray(croissance_perpetuite, dtype=float) / 100
+    w = np.asarray(wacc, dtype=float) / 100
+
+    t = np.arange(1, annees + 1)
+    actualisation = (1 + w[..., None]) ** t
+    flux = fcf_actuel[..., None] * (1 + g[..., None]) ** t
+    valeur_flux_explicites = (flux / actualisation).sum(axis=-1)
+
+    fcf_final = fcf_actuel * (1 + g) ** annees
+    with np.errstate(divide='ignore', invalid='ignore'):
+        valeur_terminale = np.where(w > g_infini, fcf_final * (1 + g_infini) / (w - g_infini), np.nan)
+    valeur_terminale_actualisee = valeur_terminale / (1 + w) ** annees
+
+    valeur_entreprise = valeur_flux_explicites + valeur_terminale_actualisee
+    return {
+        'valeur_flux_explicites': valeur_flux_explicites,
+        'valeur_terminale_actualisee': valeur_terminale_actualisee,
+        'valeur_entreprise': valeur_entreprise,
+        'valeur_actions': valeur_entreprise - dette_nette,
+    }
+
+
+def effet_levier(resultat_exploitation, charges_financieres, capitaux_propres, dette_financiere, taux_imposition):
+    """
+    ROE avec et sans endettement et effet de levier (en points).
+    Le ROE sans dette rapporte le résultat d'exploitation après impôt à
+    l'ensemble des capitaux investis.
+    """
+    resultat_exploitation = np.asarray(resultat_exploitation, dtype=float)
+    capitaux_propres = np.asarray(capitaux_propres, dtype=float)
+    impot = 1 - np.asarray(taux_imposition, dtype=float) / 100
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        roe_avec_dette = (resultat_exploitation - charges_financieres) * impot / capitaux_propres * 100
+        roe_sans_dette = resultat_exploitation * impot / (capitaux_propres + dette_financiere) * 100
+    return {
+        'roe_avec_dette': roe_avec_dette,
+        'roe_sans_dette': roe_sans_dette,
+        'effet_levier': roe_avec_dette - roe_sans_dette,
+    }
+
+
+def seuil_rentabilite(couts_fixes, cout_variable_unitaire, prix_vente_unitaire, volume_reference):
+    """
+    Seuil de rentabilité d'un produit.
+
+    `couts_fixes` en k€, prix et coût variable unitaires en €, volume de
+    référence (capacité ou volume actuel) en unités. Le seuil est NaN lorsque
+    la marge unitaire n'est pas positive.
+    """
+    prix = np.asarray(prix_vente_unitaire, dtype=float)
+    marge_unitaire = prix - cout_variable_unitaire
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        seuil_volume = np.where(marge_unitaire > 0, np.asarray(couts_fixes, dtype=float) * 1000 / marge_unitaire, np.nan)
+        taux_marge = marge_unitaire / prix * 100
+        marge_securite = (np.asarray(volume_reference, dtype=float) - seuil_volume) / volume_reference * 100
+    return {
+        'marge_unitaire': marge_unitaire,
+        'taux_marge': taux_marge,
+        'seuil_volume': seuil_volume,
+        'seuil_ca': seuil_volume * prix / 1000,
+        'marge_securite': marge_securite,
+    }
+
+
+def van(investissement_initial, flux, taux):
+    """
+    Valeur actuelle nette. `flux` contient les flux annuels (années 1 à n),
+    une ligne par projet pour un calcul en lot ; `taux` est un taux décimal.
+    """
+    flux = np.atleast_1d(np.asarray(flux, dtype=float))
+    taux = np.asarray(taux, dtype=float)
+    t = np.arange(1, flux.shape[-1] + 1)
+    return (flux / (1 + taux[..., None]) ** t).sum(axis=-1) - investissement_initial
+
+
+def tir(investissement_initial, flux, iterations=100):
+    """
+    Taux de rendement interne (décimal) par dichotomie, en lot. NaN lorsque la
+    VAN ne change pas de signe entre -99 % et 1000 %.
+    """
+    investissement_initial = np.asarray(investissement_initial, dtype=float)
+    flux = np.asarray(flux, dtype=float)
+    forme = np.broadcast_shapes(investissement_initial.shape, flux.shape[:-1])
+    bas, haut = np.full(forme, -0.99), np.full(forme, 10.0)
+    valide = np.sign(van(investissement_initial, flux, bas)) != np.sign(van(investissement_initial, flux, haut))
+
+    for _ in range(iterations):
+        milieu = (bas + haut) / 2
+        positive = van(investissement_initial, flux, milieu) > 0
+        bas = np.where(positive, milieu, bas)
+        haut = np.where(positive, haut, milieu)
+    return np.where(valide, (bas + haut) / 2, np.nan)
+
+
+def cas_startup(ca, croissance, marge_brute, frais_fixes, besoin_bfr):
+    """
+    Startup en croissance : résultat opérationnel, BFR à financer (en mois de
+    CA) et CA de l'année suivante. Marge brute et croissance en %.
+    """
+    ca = np.asarray(ca, dtype=float)
+    resultat_operationnel = ca * np.asarray(marge_brute, dtype=float) / 100 - frais_fixes
+    return {
+        'resultat_operationnel': resultat_operationnel,
+        'bfr': ca * besoin_bfr / 12,
+        'ca_suivant': ca * (1 + np.asarray(croissance, dtype=float) / 100),
+    }
+
+
+# Part du CA représentée par le coût des stocks et par les achats
+PART_COUT_STOCKS = 0.6
+PART_ACHATS = 0.8
+
+
+def gains_bfr(delai_clients, delai_stocks, delai_fournisseurs, ca_journalier,
+              objectif_clients, objectif_stocks, objectif_fournisseurs):
+    """
+    Trésorerie dégagée (k€) en ramenant les délais clients, stocks et
+    fournisseurs (jours) à leurs objectifs, pour un CA journalier en k€.
+    """
+    ca_journalier = np.asarray(ca_journalier, dtype=float)
+    gain_clients = (np.asarray(delai_clients, dtype=float) - objectif_clients) * ca_journalier
+    gain_stocks = (np.asarray(delai_stocks, dtype=float) - objectif_stocks) * ca_journalier * PART_COUT_STOCKS
+    gain_fournisseurs = (np.asarray(objectif_fournisseurs, dtype=float) - delai_fournisseurs) * ca_journalier * PART_ACHATS
+    return {
+        'gain_clients': gain_clients,
+        'gain_stocks': gain_stocks,
+        'gain_fournisseurs': gain_fournisseurs,
+        'gain_total': gain_clients + gain_stocks + gain_fournisseurs,
+    }
+
+
+# Seuils d'interprétation du score Conan-Holder
+SEUIL_SCORE_SAIN = 9.5
+SEUIL_SCORE_RISQUE = -4.5
+
+
+def score_conan_holder(ebe, endettement_global, capitaux_permanents, actif_total, frais_financiers,
+                       chiffre_affaires, charges_personnel, valeur_ajoutee, realisable_disponible=0.3):
+    """
+    Score de défaillance Conan-Holder et ses cinq ratios. Faute de détail de
+    l'actif, le ratio (réalisable + disponible) / actif total vaut 0,3.
+    """
+    def rapport(numerateur, denominateur):
+        denominateur = np.asarray(denominateur, dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(denominateur > 0, np.asarray(numerateur, dtype=float) / denominateur, 0.0)
+
+    x1 = rapport(ebe, endettement_global)
+    x2 = rapport(capitaux_permanents, actif_total)
+    x3 = np.asarray(realisable_disponible, dtype=float)
+    x4 = rapport(frais_financiers, chiffre_affaires)
+    x5 = rapport(charges_personnel, valeur_ajoutee)
+    score = 24 * x1 + 22 * x2 + 16 * x3 - 87 * x4 - 10 * x5
+    return {
+        'score': score,
+        'situation': np.select(
+            [score > SEUIL_SCORE_SAIN, score > SEUIL_SCORE_RISQUE], ['saine', 'a_surveiller'], 'risquee'
+        ),
+        'x1': x1, 'x2': x2, 'x3': x3 * np.ones_like(score), 'x4': x4, 'x5': x5,
+    }
+
+
+# =============================================================================
+# DIAGNOSTICS DES ÉTATS FINANCIERS
+# =============================================================================
+
+# Postes attendus (mêmes noms que series_temporelles et etats_financiers).
+# Les dettes à court terme incluent les concours bancaires (découverts, crédits de trésorerie).
+POSTES_BILAN = ['actif_immobilise', 'stocks', 'clients', 'disponibilites',
+                'capital', 'reserves', 'resultat_net', 'dettes_lt', 'dettes_ct', 'concours_bancaires']
+POSTES_RESULTAT = ['chiffre_affaires', 'achats', 'charges_personnel', 'autres_charges',
+                   'dotations', 'charges_financieres']
+POSTES_FLUX = ['resultat_net', 'dotations', 'variation_bfr', 'acquisitions', 'emprunts', 'remboursements']
+POSTES = list(dict.fromkeys(POSTES_BILAN + POSTES_RESULTAT + POSTES_FLUX))
+
+# Contrôles du bilan : indicateur, sens favorable, seuil, point fort, point de vigilance
+CONTROLES_BILAN = [
+    ('frng', '>', 0, "FRNG positif - Bon équilibre financier", "FRNG négatif - Risque de structure"),
+    ('tresorerie', '>', 0, "Trésorerie excédentaire", "Trésorerie déficitaire"),
+    ('taux_endettement', '<', 100, "Endettement maîtrisé", "Endettement élevé"),
+    ('liquidite_generale', '>', 100, "Bonne liquidité", "Liquidité insuffisante"),
+]
+
+# Normes de rentabilité (%) : minimum acceptable, bon niveau
+NORMES_RENTABILITE = {
+    'taux_marge': (30, 40),
+    'taux_ebe': (10, 15),
+    'taux_resultat_exploitation': (5, 8),
+}
+
+
+def _taux(numerateur, denominateur):
+    """Taux en %, 0 lorsque le dénominateur n'est pas positif, NaN lorsqu'il est inconnu"""
+    denominateur = np.asarray(denominateur, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        taux = np.where(denominateur > 0, np.asarray(numerateur, dtype=float) / denominateur * 100, 0.0)
+    return np.where(np.isnan(denominateur), np.nan, taux)
+
+
+def analyser_bilan(actif_immobilise, stocks, clients, disponibilites, capital, reserves,
+                   resultat_net, dettes_lt, dettes_ct, concours_bancaires=0.0):
+    """
+    Totaux, équilibre financier et ratios de structure. Le BFR oppose stocks
+    et créances clients aux dettes d'exploitation (dettes à court terme hors
+    concours bancaires) ; la trésorerie nette est celle des comptes
+    (disponibilités - concours bancaires), égale à FRNG - BFR lorsque le
+    bilan est équilibré.
+    """
+    capitaux_propres = capital + reserves + resultat_net
+    actif_circulant = stocks + clients + disponibilites
+    total_actif = actif_immobilise + actif_circulant
+    total_passif = capitaux_propres + dettes_lt + dettes_ct
+
+    frng = capitaux_propres + dettes_lt - actif_immobilise
+    bfr = stocks + clients - (dettes_ct - concours_bancaires)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        taux_endettement = np.asarray(dettes_lt + dettes_ct, dtype=float) / capitaux_propres * 100
+        autonomie_financiere = np.asarray(capitaux_propres, dtype=float) / total_passif * 100
+        liquidite_generale = np.asarray(actif_circulant, dtype=float) / dettes_ct * 100
+    return {
+        'total_actif': total_actif,
+        'total_passif': total_passif,
+        'ecart_bilan': total_actif - total_passif,
+        'frng': frng,
+        'bfr': bfr,
+        'tresorerie': disponibilites - concours_bancaires,
+        'taux_endettement': taux_endettement,
+        'autonomie_financiere': autonomie_financiere,
+        'liquidite_generale': liquidite_generale,
+    }
+
+
+def controler_bilan(analyse):
+    """
+    Résultat de chaque contrôle de CONTROLES_BILAN : 1.0 = point fort,
+    0.0 = point de vigilance, NaN lorsque l'indicateur n'est pas calculable
+    (poste manquant) et que le contrôle est donc ignoré.
+    """
+    controles = {}
+    for indicateur, sens, seuil, _, _ in CONTROLES_BILAN:
+        valeur = np.asarray(analyse[indicateur], dtype=float)
+        controles[indicateur] = np.where(np.isnan(valeur), np.nan, valeur > seuil if sens == '>' else valeur < seuil)
+    return controles
+
+
+def diagnostic_bilan(analyse):
+    """Points forts et points de vigilance d'un bilan (contrôles non calculables ignorés)"""
+    controles = controler_bilan(analyse)
+    points_forts, points_faibles = [], []
+    for indicateur, _, _, point_fort, point_faible in CONTROLES_BILAN:
+        if controles[indicateur] == 1:
+            points_forts.append(point_fort)
+        elif controles[indicateur] == 0:
+            points_faibles.append(point_faible)
+    return points_forts, points_faibles
+
+
+def analyser_compte_resultat(chiffre_affaires, achats, charges_personnel, autres_charges, dotations, charges_financieres):
+    """Soldes intermédiaires de gestion et leurs taux (en % du chiffre d'affaires)"""
+    marge_commerciale = chiffre_affaires - achats
+    valeur_ajoutee = marge_commerciale - autres_charges
+    ebe = valeur_ajoutee - charges_personnel
+    resultat_exploitation = ebe - dotations
+    resultat_courant = resultat_exploitation - charges_financieres
+    return {
+        'marge_commerciale': marge_commerciale,
+        'valeur_ajoutee': valeur_ajoutee,
+        'ebe': ebe,
+        'resultat_exploitation': resultat_exploitation,
+        'resultat_courant': resultat_courant,
+        'taux_marge': _taux(marge_commerciale, chiffre_affaires),
+        'taux_valeur_ajoutee': _taux(valeur_ajoutee, chiffre_affaires),
+        'taux_ebe': _taux(ebe, chiffre_affaires),
+        'taux_resultat_exploitation': _taux(resultat_exploitation, chiffre_affaires),
+        'taux_resultat_courant': _taux(resultat_courant, chiffre_affaires),
+    }
+
+
+def niveaux_rentabilite(analyse):
+    """Niveau ('bon', 'acceptable', 'faible', 'n.d.' si inconnu) de chaque taux au regard de NORMES_RENTABILITE"""
+    niveaux = {}
+    for taux, (minimum, bon) in NORMES_RENTABILITE.items():
+        valeur = np.asarray(analyse[taux], dtype=float)
+        niveaux[taux] = np.select([np.isnan(valeur), valeur >= bon, valeur >= minimum], ['n.d.', 'bon', 'acceptable'], 'faible')
+    return niveaux
+
+
+def analyser_flux(resultat_net, dotations, variation_bfr, acquisitions, emprunts, remboursements):
+    """
+    Flux d'exploitation, d'investissement et de financement. Les sorties
+    (acquisitions, remboursements, hausse du BFR) sont saisies en négatif.
+    """
+    flux_exploitation = resultat_net + dotations + variation_bfr
+    flux_investissement = acquisitions
+    flux_financement = emprunts + remboursements
+    return {
+        'flux_exploitation': flux_exploitation,
+        'flux_investissement': flux_investissement,
+        'flux_financement': flux_financement,
+        'variation_tresorerie': flux_exploitation + flux_investissement + flux_financement,
+    }
+
+
+def diagnostic_complet(postes):
+    """
+    Diagnostic de nombreuses entités en une passe : `postes` contient une
+    ligne par entité et une colonne par poste de POSTES. Un poste absent
+    reste inconnu (NaN) : les indicateurs qui en dépendent valent NaN et les
+    contrôles correspondants sont ignorés plutôt que jugés sur un zéro ;
+    seuls les concours bancaires (détail des dettes à court terme, absents
+    de la plupart des bilans) valent 0 par défaut. Retourne les indicateurs du bilan, les SIG, les flux, les niveaux de
+    rentabilité et les points forts / de vigilance.
+    """
+    postes = postes.reindex(columns=POSTES).astype(float)
+    postes['concours_bancaires'] = postes['concours_bancaires'].fillna(0.0)
+    colonnes = {nom: postes[nom].to_numpy() for nom in POSTES}
+
+    bilan = analyser_bilan(**{nom: colonnes[nom] for nom in POSTES_BILAN})
+    resultat = analyser_compte_resultat(**{nom: colonnes[nom] for nom in POSTES_RESULTAT})
+    flux = analyser_flux(**{nom: colonnes[nom] for nom in POSTES_FLUX})
+    diagnostic = pd.DataFrame({**bilan, **resultat, **flux}, index=postes.index)
+
+    for taux, niveau in niveaux_rentabilite(resultat).items():
+        diagnostic[f"niveau_{taux}"] = niveau
+
+    controles = controler_bilan(bilan)
+    forts = pd.Series("", index=postes.index)
+    faibles = pd.Series("", index=postes.index)
+    for indicateur, _, _, point_fort, point_faible in CONTROLES_BILAN:
+        forts = forts.where(controles[indicateur] != 1, forts + point_fort + " ; ")
+        faibles = faibles.where(controles[indicateur] != 0, faibles + point_faible + " ; ")
+    diagnostic['points_forts'] = forts.str.rstrip(" ; ")
+    diagnostic['points_vigilance'] = faibles.str.rstrip(" ; ")
+    return diagnostic
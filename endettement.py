@@ -0,0 +1,275 @@
+"""
+🏦 FINANCELAB - Échéanciers d'emprunts et portefeuille de dette
+Description: Calcule les tableaux d'amortissement d'un portefeuille d'emprunts
+(annuités constantes, amortissement constant, in fine, avec différé
+d'amortissement) à taux fixe ou variable indexé sur une courbe de taux locale.
+Tous les emprunts sont traités ensemble, période par période, sous forme de
+tableaux numpy : plusieurs milliers d'emprunts en quelques millisecondes. Les
+échéanciers sont agrégés par année (intérêts, remboursements, encours) pour
+alimenter le levier financier, la CAF et les flux de financement. Montants en
+k€, taux en %.
+"""
+
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+# =============================================================================
+# PARAMÈTRES
+# =============================================================================
+
+TYPES = {
+    'annuite': "Annuités constantes",
+    'amortissement_constant': "Amortissement constant",
+    'in_fine': "In fine",
+}
+PERIODICITES = {12: "Mensuelle", 4: "Trimestrielle", 2: "Semestrielle", 1: "Annuelle"}
+
+# Taux index anticipé (%) selon l'horizon en années : taux des emprunts variables = index + marge
+COURBE_DEFAUT = {0: 3.0, 1: 2.6, 2: 2.4, 3: 2.45, 5: 2.6, 7: 2.8, 10: 3.0, 20: 3.3}
+
+# Colonnes d'un portefeuille et valeurs par défaut des colonnes facultatives
+COLONNES = ['montant', 'taux', 'duree', 'type', 'differe', 'periodicite', 'variable', 'debut']
+DEFAUTS = {'type': 'annuite', 'differe': 0.0, 'periodicite': 12, 'variable': False}
+
+
+def taux_index(horizons, courbe=None):
+    """Taux index (%) interpolé sur la courbe pour des horizons en années (extrapolation plate)"""
+    courbe = COURBE_DEFAUT if courbe is None else courbe
+    maturites = np.array(sorted(courbe), dtype=float)
+    return np.interp(horizons, maturites, [courbe[m] for m in sorted(courbe)])
+
+
+# =============================================================================
+# PORTEFEUILLE
+# =============================================================================
+
+def normaliser_portefeuille(portefeuille):
+    """
+    Complète et contrôle un portefeuille d'emprunts (une ligne par emprunt) :
+    montant (k€), taux (%, marge sur l'index pour un taux variable), duree
+    (années), type, differe (années d'amortissement différé, intérêts seuls),
+    periodicite (échéances par an), variable, debut (date de déblocage).
+    """
+    portefeuille = pd.DataFrame(portefeuille).copy()
+    portefeuille.columns = [str(c).strip().lower() for c in portefeuille.columns]
+    manquantes = {'montant', 'taux', 'duree'} - set(portefeuille.columns)
+    if manquantes:
+        raise ValueError(f"Colonnes manquantes : {', '.join(sorted(manquantes))}")
+
+    for colonne, defaut in DEFAUTS.items():
+        if colonne not in portefeuille:
+            portefeuille[colonne] = defaut
+    if 'debut' not in portefeuille:
+        portefeuille['debut'] = pd.Timestamp(pd.Timestamp.today().year, 1, 1)
+
+    portefeuille['type'] = portefeuille['type'].astype(str).str.strip().str.lower()
+    inconnus = set(portefeuille['type']) - set(TYPES)
+    if inconnus:
+        raise ValueError(f"Type d'emprunt inconnu : {', '.join(sorted(inconnus))} (attendu : {', '.join(TYPES)})")
+    portefeuille['periodicite'] = portefeuille['periodicite'].astype(int)
+    if not portefeuille['periodicite'].isin(list(PERIODICITES)).all():
+        raise ValueError(f"Périodicité invalide (attendu : {', '.join(map(str, PERIODICITES))} échéances par an)")
+    portefeuille['variable'] = portefeuille['variable'].astype(bool)
+    if not pd.api.types.is_datetime64_any_dtype(portefeuille['debut']):
+        debut = portefeuille['debut'].astype(str).str.strip()
+        # ISO (AAAA-MM-JJ) : `dayfirst` inverserait jour et mois
+        iso = debut.str.match(r"\d{4}-\d{2}-\d{2}").all()
+        portefeuille['debut'] = pd.to_datetime(debut, format="ISO8601") if iso else pd.to_datetime(debut, dayfirst=True)
+    for colonne in ['montant', 'taux', 'duree', 'differe']:
+        portefeuille[colonne] = portefeuille[colonne].astype(float)
+    return portefeuille[COLONNES].reset_index(drop=True)
+
+
+def charger_portefeuille(contenu, nom_fichier):
+    """Lit un portefeuille d'emprunts (CSV, Excel ou Parquet)"""
+    if nom_fichier.lower().endswith('.parquet'):
+        brut = pd.read_parquet(BytesIO(contenu))
+    elif nom_fichier.lower().endswith(('.xlsx', '.xls')):
+        brut = pd.read_excel(BytesIO(contenu))
+    else:
+        brut = pd.read_csv(BytesIO(contenu), sep=None, engine='python', decimal=',')
+    return normaliser_portefeuille(brut)
+
+
+def exemple_portefeuille(nb=2_000, graine=0, annee=None):
+    """Portefeuille fictif de `nb` emprunts débloqués au cours des dix dernières années"""
+    rng = np.random.default_rng(graine)
+    annee = pd.Timestamp.today().year if annee is None else annee
+    debut = pd.Timestamp(annee - 10, 1, 1) + pd.to_timedelta(rng.integers(0, 10 * 365, nb), unit='D')
+    variable = rng.random(nb) < 0.3
+    return normaliser_portefeuille({
+        'montant': np.round(np.exp(rng.normal(5, 1, nb)), 1),
+        'taux': np.where(variable, rng.uniform(0.8, 2.0, nb), rng.uniform(1.0, 5.5, nb)).round(2),
+        'duree': rng.choice([3, 5, 7, 10, 15, 20], nb),
+        'type': rng.choice(list(TYPES), nb, p=[0.7, 0.2, 0.1]),
+        'differe': np.where(rng.random(nb) < 0.15, rng.choice([0.5, 1, 2], nb), 0.0),
+        'periodicite': rng.choice([12, 4, 1], nb, p=[0.6, 0.3, 0.1]),
+        'variable': variable,
+        'debut': debut,
+    })
+
+
+# =============================================================================
+# ÉCHÉANCIERS
+# =============================================================================
+
+def echeancier(portefeuille, courbe=None, date_reference=None):
+    """
+    Tableaux d'amortissement de tous les emprunts du portefeuille. Les
+    échéances sont calculées période par période pour l'ensemble des emprunts
+    à la fois : l'annuité est recalculée sur le capital restant dû et le
+    nombre d'échéances restantes, ce qui couvre le différé et les taux
+    variables (index de la courbe à l'horizon de la période + marge, fixé en
+    début de période). Retourne des matrices (emprunts x échéances) :
+    interets, amortissement, capital_restant (après l'échéance), taux (%),
+    mois (mois de paiement, en mois depuis l'an 0) et actif (échéance réelle).
+    Les taux variables sont projetés depuis `date_reference` (aujourd'hui
+    par défaut).
+    """
+    portefeuille = normaliser_portefeuille(portefeuille)
+    montant = portefeuille['montant'].to_numpy()
+    taux = portefeuille['taux'].to_numpy()
+    frequence = portefeuille['periodicite'].to_numpy()
+    variable = portefeuille['variable'].to_numpy()
+    type_emprunt = portefeuille['type'].to_numpy()
+
+    nb_periodes = np.maximum(np.round(portefeuille['duree'].to_numpy() * frequence), 1).astype(int)
+    differe = np.minimum(np.round(portefeuille['differe'].to_numpy() * frequence).astype(int), nb_periodes - 1)
+    debut = portefeuille['debut']
+    mois_debut = (debut.dt.year * 12 + debut.dt.month - 1).to_numpy()
+    reference = pd.Timestamp.today() if date_reference is None else pd.Timestamp(date_reference)
+    decalage = (mois_debut - (reference.year * 12 + reference.month - 1)) / 12
+
+    horizon_total = int(nb_periodes.max()) if len(portefeuille) else 0
+    forme = (len(portefeuille), horizon_total)
+    interets, amortissement, capital_restant, taux_periode = (np.zeros(forme) for _ in range(4))
+    crd = montant.copy()
+    annuite, constant, in_fine = (type_emprunt == t for t in TYPES)
+    part_constante = montant / (nb_periodes - differe)
+
+    for k in range(horizon_total):
+        actif = k < nb_periodes
+        taux_annuel = np.where(variable, taux_index(decalage + k / frequence, courbe) + taux, taux)
+        r = taux_annuel / 100 / frequence
+        interet = crd * r
+        restantes = np.maximum(nb_periodes - k, 1)
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            echeance_constante = np.where(r > 0, crd * r / (1 - (1 + r) ** -restantes), crd / restantes)
+        principal = np.select([annuite, constant, in_fine],
+                              [echeance_constante - interet, part_constante, np.where(restantes == 1, crd, 0.0)])
+        principal = np.where(actif & (k >= differe), np.minimum(principal, crd), 0.0)
+
+        interets[:, k] = np.where(actif, interet, 0.0)
+        amortissement[:, k] = principal
+        crd = crd - principal
+        capital_restant[:, k] = crd
+        taux_periode[:, k] = np.where(actif, taux_annuel, np.nan)
+
+    periodes = np.arange(1, horizon_total + 1)
+    return {
+        'portefeuille': portefeuille,
+        'interets': interets,
+        'amortissement': amortissement,
+        'capital_restant': capital_restant,
+        'taux': taux_periode,
+        'mois': mois_debut[:, None] + periodes[None, :] * 12 // frequence[:, None],
+        'actif': periodes[None, :] <= nb_periodes[:, None],
+    }
+
+
+def tableau_emprunt(echeanciers, ligne=0):
+    """Tableau d'amortissement détaillé d'un emprunt du portefeuille"""
+    actif = echeanciers['actif'][ligne]
+    mois = echeanciers['mois'][ligne][actif]
+    return pd.DataFrame({
+        'echeance': pd.to_datetime({'year': mois // 12, 'month': mois % 12 + 1, 'day': 1}),
+        'taux': echeanciers['taux'][ligne][actif],
+        'interets': echeanciers['interets'][ligne][actif],
+        'amortissement': echeanciers['amortissement'][ligne][actif],
+        'echeance_totale': (echeanciers['interets'] + echeanciers['amortissement'])[ligne][actif],
+        'capital_restant': echeanciers['capital_restant'][ligne][actif],
+    })
+
+
+def echeances_datees(echeanciers, jour=1):
+    """Échéances (intérêts + capital) de tout le portefeuille, payées le `jour` du mois : DataFrame (date, montant)"""
+    actif = echeanciers['actif']
+    mois = echeanciers['mois'][actif]
+    echeances = pd.DataFrame({
+        'date': pd.to_datetime({'year': mois // 12, 'month': mois % 12 + 1, 'day': min(int(jour), 28)}),
+        'montant': (echeanciers['interets'] + echeanciers['amortissement'])[actif],
+    })
+    return echeances.groupby('date', as_index=False)['montant'].sum()
+
+
+def par_annee(echeanciers):
+    """
+    Agrégat annuel du portefeuille : nouveaux emprunts, intérêts,
+    remboursements en capital, annuités, dette en début et fin d'année et
+    taux apparent (intérêts / encours moyen, %).
+    """
+    portefeuille = echeanciers['portefeuille']
+    if portefeuille.empty:
+        return pd.DataFrame(columns=['nouveaux_emprunts', 'interets', 'remboursements', 'annuites',
+                                     'dette_debut', 'dette_fin', 'taux_apparent'])
+    actif = echeanciers['actif']
+    annee_paiement = echeanciers['mois'][actif] // 12
+    annee_deblocage = portefeuille['debut'].dt.year.to_numpy()
+    premiere = int(min(annee_deblocage.min(), annee_paiement.min()))
+    derniere = int(max(annee_deblocage.max(), annee_paiement.max()))
+    taille = derniere - premiere + 1
+
+    def cumul(annees, montants):
+        return np.bincount(annees - premiere, weights=montants, minlength=taille)
+
+    annuel = pd.DataFrame({
+        'nouveaux_emprunts': cumul(annee_deblocage, portefeuille['montant'].to_numpy()),
+        'interets': cumul(annee_paiement, echeanciers['interets'][actif]),
+        'remboursements': cumul(annee_paiement, echeanciers['amortissement'][actif]),
+    }, index=pd.RangeIndex(premiere, derniere + 1, name='annee'))
+    annuel['annuites'] = annuel['interets'] + annuel['remboursements']
+    dette_fin = (annuel['nouveaux_emprunts'] - annuel['remboursements']).cumsum().clip(lower=0)
+    annuel['dette_debut'] = dette_fin.shift(fill_value=0.0)
+    annuel['dette_fin'] = dette_fin
+    encours_moyen = (annuel['dette_debut'] + annuel['dette_fin']) / 2
+    annuel['taux_apparent'] = (annuel['interets'] / encours_moyen.where(encours_moyen > 0) * 100)
+    return annuel
+
+
+def annee_courante(annuel, annee=None):
+    """Ligne de l'agrégat annuel pour `annee` (par défaut l'année en cours, sinon la première année)"""
+    annee = pd.Timestamp.today().year if annee is None else annee
+    return annuel.loc[annee] if annee in annuel.index else annuel.iloc[0]
+
+
+# =============================================================================
+# IMPACT SUR LA CAF ET LES FLUX
+# =============================================================================
+
+def impact_financier(annuel, ebe, dotations=0.0, taux_imposition=25.0):
+    """
+    Effet de l'échéancier sur les comptes de chaque année, pour un EBE et des
+    dotations donnés (scalaires ou un montant par année) : résultat courant,
+    impôt, CAF, couverture des annuités par la CAF, capacité de remboursement
+    (dette / CAF, en années) et flux de financement (emprunts - remboursements).
+    """
+    ebe = np.asarray(ebe, dtype=float)
+    resultat_courant = ebe - np.asarray(dotations, dtype=float) - annuel['interets']
+    impot = np.maximum(resultat_courant, 0) * taux_imposition / 100
+    caf = ebe - annuel['interets'] - impot
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        couverture = np.where(annuel['annuites'] > 0, caf / annuel['annuites'], np.nan)
+        capacite = np.where(caf > 0, annuel['dette_fin'] / caf, np.nan)
+    return pd.DataFrame({
+        'charges_financieres': annuel['interets'],
+        'resultat_courant': resultat_courant,
+        'caf': caf,
+        'annuites': annuel['annuites'],
+        'couverture_annuites': couverture,
+        'capacite_remboursement': capacite,
+        'flux_financement': annuel['nouveaux_emprunts'] - annuel['remboursements'],
+        'dette_fin': annuel['dette_fin'],
+    }, index=annuel.index)
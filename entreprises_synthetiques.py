@@ -0,0 +1,251 @@
+"""
+🏭 FINANCELAB - Générateur d'entreprises synthétiques
+Description: Produit des entreprises fictives mais cohérentes pour éprouver à
+grande échelle les moteurs en lot (diagnostic, historiques, référentiel
+sectoriel, screener, rapports) : bilans équilibrés, compte de résultat et SIG
+cohérents, flux de trésorerie qui expliquent exactement la variation de
+trésorerie d'un exercice à l'autre, sur plusieurs exercices et par secteur.
+La génération est reproductible (graine) et vectorisée par blocs d'entreprises,
+ce qui permet d'écrire un million d'entreprises en Parquet en quelques secondes.
+Montants en k€.
+
+Usage :
+    python entreprises_synthetiques.py --nb 1000000 --annees 5 --sortie entreprises.parquet
+    python entreprises_synthetiques.py --nb 50000 --indicateurs --sortie referentiel.parquet
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import calculs_financiers
+import series_temporelles
+
+# =============================================================================
+# PARAMÈTRES
+# =============================================================================
+
+TAILLE_BLOC = 50_000   # Entreprises par bloc ; chaque bloc a sa propre graine
+TAUX_IMPOSITION = 0.25
+
+# Profil de chaque secteur : achats, personnel et autres charges en % du CA,
+# délais stocks / clients / fournisseurs en jours de CA, immobilisations en
+# années de CA, durée d'amortissement, croissance moyenne (%)
+SECTEURS = {
+    'Industrie': {'achats': 45, 'personnel': 24, 'autres': 14, 'stocks': 60, 'clients': 60, 'fournisseurs': 55,
+                  'immobilisations': 0.55, 'amortissement': 10, 'croissance': 3},
+    'Commerce de détail': {'achats': 68, 'personnel': 12, 'autres': 11, 'stocks': 45, 'clients': 5, 'fournisseurs': 50,
+                           'immobilisations': 0.25, 'amortissement': 8, 'croissance': 2},
+    'Agroalimentaire': {'achats': 58, 'personnel': 17, 'autres': 13, 'stocks': 35, 'clients': 45, 'fournisseurs': 50,
+                        'immobilisations': 0.40, 'amortissement': 10, 'croissance': 2},
+    'BTP': {'achats': 40, 'personnel': 32, 'autres': 18, 'stocks': 15, 'clients': 75, 'fournisseurs': 65,
+            'immobilisations': 0.20, 'amortissement': 6, 'croissance': 2},
+    'Transport': {'achats': 30, 'personnel': 35, 'autres': 22, 'stocks': 5, 'clients': 50, 'fournisseurs': 40,
+                  'immobilisations': 0.50, 'amortissement': 7, 'croissance': 2},
+    'Services informatiques': {'achats': 8, 'personnel': 55, 'autres': 22, 'stocks': 0, 'clients': 70, 'fournisseurs': 35,
+                               'immobilisations': 0.15, 'amortissement': 4, 'croissance': 8},
+    'Conseil': {'achats': 5, 'personnel': 60, 'autres': 20, 'stocks': 0, 'clients': 65, 'fournisseurs': 30,
+                'immobilisations': 0.10, 'amortissement': 5, 'croissance': 4},
+    'Santé': {'achats': 35, 'personnel': 30, 'autres': 18, 'stocks': 40, 'clients': 55, 'fournisseurs': 50,
+              'immobilisations': 0.45, 'amortissement': 8, 'croissance': 5},
+    'Hôtellerie-restauration': {'achats': 30, 'personnel': 38, 'autres': 20, 'stocks': 10, 'clients': 5, 'fournisseurs': 35,
+                                'immobilisations': 0.70, 'amortissement': 10, 'croissance': 3},
+}
+
+# Postes publiés : ceux du diagnostic, plus les agrégats attendus par les historiques
+POSTES = list(dict.fromkeys(calculs_financiers.POSTES + series_temporelles.POSTES))
+COLONNES = ['entreprise', 'secteur', 'exercice'] + POSTES
+
+
+# =============================================================================
+# GÉNÉRATION
+# =============================================================================
+
+def _profils(numeros_secteur):
+    """Tableau (entreprises × paramètre) des profils sectoriels"""
+    profils = pd.DataFrame.from_dict(SECTEURS, orient='index')
+    return {nom: profils[nom].to_numpy(dtype=float)[numeros_secteur] for nom in profils}
+
+
+def _bloc(graine, numero_bloc, annees, premier_exercice):
+    """Génère les TAILLE_BLOC entreprises d'un bloc sur `annees` exercices (une ligne par entreprise et exercice)"""
+    rng = np.random.default_rng([graine, numero_bloc])
+    nb = TAILLE_BLOC
+    secteurs = rng.integers(len(SECTEURS), size=nb)
+    p = _profils(secteurs)
+
+    def bruit(ecart, taille=nb):
+        return rng.normal(0, ecart, taille)
+
+    # Caractéristiques propres à chaque entreprise, stables d'un exercice à l'autre
+    ca = np.clip(np.exp(rng.normal(np.log(3000), 1.4, nb)), 50, 5e6)
+    croissance = (p['croissance'] + bruit(4)) / 100
+    taux = {nom: np.clip(p[nom] * (1 + bruit(0.15)), 0, None) / 100 for nom in ('achats', 'personnel', 'autres')}
+    delais = {nom: np.clip(p[nom] * (1 + bruit(0.25)), 0, None) / 365 for nom in ('stocks', 'clients', 'fournisseurs')}
+    taux_dettes_exploitation = rng.uniform(0.06, 0.14, nb)   # Dettes fiscales et sociales, en part du CA
+    taux_interet = rng.uniform(0.025, 0.06, nb)
+    duree_emprunts = rng.integers(5, 11, nb)
+
+    # Situation d'ouverture (exercice précédant le premier exercice publié)
+    actif_immobilise = ca * p['immobilisations'] * np.exp(bruit(0.3))
+    capital = ca * rng.uniform(0.03, 0.25, nb)
+    reserves = ca * rng.uniform(0.0, 0.35, nb)
+    dettes_lt = actif_immobilise * rng.uniform(0.0, 0.8, nb)
+    bfr = ca * (delais['stocks'] + delais['clients'] - delais['fournisseurs'] - taux_dettes_exploitation)
+    tresorerie = capital + reserves + dettes_lt - actif_immobilise - bfr
+
+    colonnes = {nom: np.empty((annees, nb)) for nom in POSTES}
+    for annee in range(annees):
+        ca = ca * (1 + croissance + bruit(0.05))
+        achats = ca * np.clip(taux['achats'] + bruit(0.01), 0, None)
+        charges_personnel = ca * np.clip(taux['personnel'] + bruit(0.01), 0, None)
+        autres_charges = ca * np.clip(taux['autres'] + bruit(0.01), 0, None)
+        dotations = actif_immobilise / p['amortissement']
+        charges_financieres = dettes_lt * taux_interet
+        resultat_courant = ca - achats - charges_personnel - autres_charges - dotations - charges_financieres
+        resultat_net = resultat_courant - np.maximum(resultat_courant, 0) * TAUX_IMPOSITION
+
+        # Investissements de renouvellement et de croissance, financés en partie par emprunt
+        acquisitions = dotations * np.clip(1 + croissance + bruit(0.3), 0, None)
+        emprunts = acquisitions * rng.uniform(0, 0.8, nb) * (rng.random(nb) < 0.5)
+        remboursements = np.minimum(dettes_lt, dettes_lt / duree_emprunts)
+
+        stocks = ca * delais['stocks']
+        clients = ca * delais['clients']
+        fournisseurs = ca * delais['fournisseurs']
+        dettes_exploitation = ca * taux_dettes_exploitation
+        nouveau_bfr = stocks + clients - fournisseurs - dettes_exploitation
+        variation_bfr = bfr - nouveau_bfr
+
+        # Résultat mis en réserve (pas de distribution) : la variation de trésorerie est celle des flux
+        tresorerie = tresorerie + resultat_net + dotations + variation_bfr - acquisitions + emprunts - remboursements
+        actif_immobilise = actif_immobilise + acquisitions - dotations
+        dettes_lt = dettes_lt + emprunts - remboursements
+        reserves_ouverture, reserves = reserves, reserves + resultat_net
+        bfr = nouveau_bfr
+
+        # Trésorerie négative : concours bancaires au passif
+        disponibilites = np.maximum(tresorerie, 0)
+        concours_bancaires = np.maximum(-tresorerie, 0)
+        dettes_ct = fournisseurs + dettes_exploitation + concours_bancaires
+        capitaux_propres = capital + reserves
+        actif_circulant = stocks + clients + disponibilites
+
+        valeurs = {
+            'actif_immobilise': actif_immobilise, 'stocks': stocks, 'clients': clients, 'disponibilites': disponibilites,
+            'capital': capital, 'reserves': reserves_ouverture, 'resultat_net': resultat_net,
+            'dettes_lt': dettes_lt, 'dettes_ct': dettes_ct, 'concours_bancaires': concours_bancaires,
+            'chiffre_affaires': ca, 'achats': achats, 'charges_personnel': charges_personnel,
+            'autres_charges': autres_charges, 'dotations': dotations, 'charges_financieres': charges_financieres,
+            'variation_bfr': variation_bfr, 'acquisitions': -acquisitions, 'emprunts': emprunts,
+            'remboursements': -remboursements,
+            'actif_circulant': actif_circulant, 'total_actif': actif_immobilise + actif_circulant,
+            'capitaux_propres': capitaux_propres, 'dettes_financieres': dettes_lt + concours_bancaires,
+            'fournisseurs': fournisseurs,
+        }
+        for nom in POSTES:
+            colonnes[nom][annee] = valeurs[nom]
+
+    # Une ligne par (entreprise, exercice), exercices consécutifs d'une même entreprise
+    numeros = numero_bloc * TAILLE_BLOC + np.arange(nb)
+    return {
+        'entreprise': np.repeat(numeros, annees),
+        'secteur': np.repeat(secteurs, annees),
+        'exercice': np.tile(np.arange(premier_exercice, premier_exercice + annees), nb),
+        **{nom: np.round(colonnes[nom].T.ravel(), 2) for nom in POSTES},
+    }
+
+
+def _controler(nb, annees):
+    if nb < 1 or annees < 1:
+        raise ValueError(f"Au moins une entreprise et un exercice à générer (nb={nb}, annees={annees})")
+
+
+def _blocs(nb, annees, graine, premier_exercice):
+    """Blocs successifs ; une même graine donne les mêmes entreprises quel que soit `nb`"""
+    for numero_bloc, debut in enumerate(range(0, nb, TAILLE_BLOC)):
+        bloc = _bloc(graine, numero_bloc, annees, premier_exercice)
+        nb_lignes = min(TAILLE_BLOC, nb - debut) * annees
+        yield {nom: valeurs[:nb_lignes] for nom, valeurs in bloc.items()}
+
+
+def _en_dataframe(bloc):
+    df = pd.DataFrame(bloc)
+    df['entreprise'] = "SYN" + df['entreprise'].astype(str).str.zfill(7)
+    df['secteur'] = pd.Categorical.from_codes(df['secteur'], categories=list(SECTEURS))
+    return df[COLONNES]
+
+
+def generer_entreprises(nb, annees=1, graine=0, premier_exercice=2020, indicateurs=False):
+    """
+    Retourne `nb` entreprises sur `annees` exercices consécutifs (une ligne
+    par entreprise et exercice, colonnes COLONNES). Avec `indicateurs`, les
+    SIG, l'équilibre et les ratios de series_temporelles sont ajoutés (format
+    attendu par le référentiel sectoriel et le screener). Lève ValueError
+    si `nb` ou `annees` est inférieur à 1.
+    """
+    _controler(nb, annees)
+    df = pd.concat([_en_dataframe(bloc) for bloc in _blocs(nb, annees, graine, premier_exercice)], ignore_index=True)
+    if indicateurs:
+        df = pd.concat([df, series_temporelles.calculer_indicateurs(df)], axis=1)
+    return df
+
+
+def ecrire_parquet(chemin, nb, annees=1, graine=0, premier_exercice=2020, indicateurs=False, progression=None):
+    """
+    Écrit les entreprises dans un fichier Parquet bloc par bloc (mémoire
+    bornée quel que soit `nb`). Retourne le nombre de lignes écrites.
+    """
+    _controler(nb, annees)
+    nb_blocs = -(-nb // TAILLE_BLOC)
+    ecrivain, nb_lignes = None, 0
+    try:
+        for numero, bloc in enumerate(_blocs(nb, annees, graine, premier_exercice), 1):
+            df = _en_dataframe(bloc)
+            if indicateurs:
+                df = pd.concat([df, series_temporelles.calculer_indicateurs(df)], axis=1)
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if ecrivain is None:
+                ecrivain = pq.ParquetWriter(chemin, table.schema)
+            ecrivain.write_table(table)
+            nb_lignes += len(df)
+            if progression is not None:
+                progression(numero / nb_blocs, f"{numero * TAILLE_BLOC:,} / {nb:,} entreprises")
+    finally:
+        if ecrivain is not None:
+            ecrivain.close()
+    return nb_lignes
+
+
+def derniers_exercices(entreprises):
+    """Dernier exercice de chaque entreprise, indexé par entreprise (format de l'analyse en lot et des rapports)"""
+    return entreprises.sort_values('exercice').groupby('entreprise', observed=True).tail(1).set_index('entreprise')
+
+
+# =============================================================================
+# LIGNE DE COMMANDE
+# =============================================================================
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Génère des entreprises synthétiques cohérentes au format Parquet")
+    parser.add_argument("--nb", type=int, default=100_000, help="Nombre d'entreprises")
+    parser.add_argument("--annees", type=int, default=3, help="Exercices par entreprise")
+    parser.add_argument("--graine", type=int, default=0)
+    parser.add_argument("--premier-exercice", type=int, default=2020)
+    parser.add_argument("--indicateurs", action="store_true", help="Ajoute SIG, équilibre et ratios")
+    parser.add_argument("--sortie", required=True, help="Fichier Parquet de sortie")
+    args = parser.parse_args(arguments)
+
+    debut = time.perf_counter()
+    nb_lignes = ecrire_parquet(args.sortie, args.nb, args.annees, args.graine, args.premier_exercice, args.indicateurs)
+    print(f"✅ {args.nb:,} entreprises ({nb_lignes:,} lignes) -> {args.sortie} ({time.perf_counter() - debut:.1f} s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
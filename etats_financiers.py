@@ -0,0 +1,295 @@
+"""
+📑 FINANCELAB - États financiers des sociétés cotées
+Description: Récupère via la passerelle de marché les comptes de résultat, bilans et tableaux de
+flux (annuels ou trimestriels), les conserve dans un cache local et les transpose
+dans le modèle de l'application : bilan fonctionnel (actif immobilisé, actif
+circulant, capitaux propres...), soldes intermédiaires de gestion et flux.
+"""
+
+import os
+import pickle
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+import passerelle_marche
+
+# =============================================================================
+# PARAMÈTRES
+# =============================================================================
+
+DOSSIER_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "donnees", "etats_financiers")
+
+FREQUENCES = {
+    'annuel': {'duree': timedelta(days=365), 'delai_publication': timedelta(days=75)},
+    'trimestriel': {'duree': timedelta(days=91), 'delai_publication': timedelta(days=45)},
+}
+
+NB_THREADS = 8
+
+# Postes de l'application -> libellés yfinance candidats (le premier trouvé est retenu)
+POSTES_BILAN = {
+    'immobilisations_incorporelles': ['Goodwill And Other Intangible Assets', 'Other Intangible Assets', 'Goodwill'],
+    'immobilisations_corporelles': ['Net PPE'],
+    'immobilisations_financieres': ['Investments And Advances', 'Long Term Equity Investment'],
+    'actif_immobilise': ['Total Non Current Assets'],
+    'stocks': ['Inventory'],
+    'clients': ['Accounts Receivable', 'Receivables'],
+    'disponibilites': ['Cash And Cash Equivalents', 'Cash Cash Equivalents And Short Term Investments'],
+    'actif_circulant': ['Current Assets'],
+    'total_actif': ['Total Assets'],
+    'capitaux_propres': ['Stockholders Equity', 'Total Equity Gross Minority Interest'],
+    'dettes_lt': ['Long Term Debt', 'Long Term Debt And Capital Lease Obligation'],
+    'dettes_financieres': ['Total Debt'],
+    'fournisseurs': ['Accounts Payable', 'Payables'],
+    'dettes_ct': ['Current Liabilities'],
+    'concours_bancaires': ['Current Debt', 'Current Debt And Capital Lease Obligation'],
+}
+
+POSTES_RESULTAT = {
+    'chiffre_affaires': ['Total Revenue', 'Operating Revenue'],
+    'achats': ['Cost Of Revenue', 'Reconciled Cost Of Revenue'],
+    'marge_brute': ['Gross Profit'],
+    'charges_personnel': ['Salaries And Wages'],
+    'ebe': ['EBITDA', 'Normalized EBITDA'],
+    'dotations': ['Reconciled Depreciation', 'Depreciation And Amortization In Income Statement'],
+    'resultat_exploitation': ['Operating Income', 'EBIT'],
+    'charges_financieres': ['Interest Expense', 'Interest Expense Non Operating'],
+    'resultat_courant': ['Pretax Income'],
+    'impots': ['Tax Provision'],
+    'resultat_net': ['Net Income', 'Net Income Common Stockholders'],
+}
+
+POSTES_FLUX = {
+    'flux_exploitation': ['Operating Cash Flow'],
+    'flux_investissement': ['Investing Cash Flow'],
+    'flux_financement': ['Financing Cash Flow'],
+    'acquisitions': ['Capital Expenditure'],
+    'emprunts': ['Issuance Of Debt', 'Long Term Debt Issuance'],
+    'remboursements': ['Repayment Of Debt', 'Long Term Debt Payments'],
+    'variation_bfr': ['Change In Working Capital'],
+    'free_cash_flow': ['Free Cash Flow'],
+}
+
+
+# =============================================================================
+# CACHE LOCAL
+# =============================================================================
+
+def _chemin_cache(ticker, frequence):
+    return os.path.join(DOSSIER_CACHE, f"{ticker.upper()}_{frequence}.pkl")
+
+
+def _lire_cache(ticker, frequence):
+    chemin = _chemin_cache(ticker, frequence)
+    if not os.path.exists(chemin):
+        return None
+    with open(chemin, 'rb') as fichier:
+        return pickle.load(fichier)
+
+
+def _ecrire_cache(ticker, frequence, etats):
+    os.makedirs(DOSSIER_CACHE, exist_ok=True)
+    chemin_temporaire = _chemin_cache(ticker, frequence) + ".tmp"
+    with open(chemin_temporaire, 'wb') as fichier:
+        pickle.dump(etats, fichier)
+    os.replace(chemin_temporaire, _chemin_cache(ticker, frequence))
+
+
+def _derniere_periode(etats):
+    """Date de clôture la plus récente présente dans les états"""
+    dates = [df.columns.max() for df in (etats['resultat'], etats['bilan'], etats['flux']) if not df.empty]
+    return pd.Timestamp(max(dates)).to_pydatetime() if dates else None
+
+
+def nouvelle_periode_attendue(etats, frequence, maintenant=None):
+    """
+    Indique si une nouvelle période peut avoir été publiée depuis la dernière
+    vérification : clôture suivante + délai de publication dépassés, et pas
+    plus d'une vérification par jour.
+    """
+    maintenant = maintenant or datetime.now()
+    derniere = _derniere_periode(etats)
+    if derniere is None:
+        return maintenant - etats['date_verification'] > timedelta(days=1)
+
+    parametres = FREQUENCES[frequence]
+    publication_attendue = derniere + parametres['duree'] + parametres['delai_publication']
+    return maintenant >= publication_attendue and maintenant - etats['date_verification'] > timedelta(days=1)
+
+
+# =============================================================================
+# RÉCUPÉRATION
+# =============================================================================
+
+def charger_etats(ticker, frequence='annuel', forcer=False):
+    """
+    Retourne les états bruts yfinance d'un ticker, depuis le cache local si
+    aucune nouvelle période n'est attendue.
+    """
+    ticker = ticker.strip().upper()
+    etats = None if forcer else _lire_cache(ticker, frequence)
+
+    if etats is not None and not nouvelle_periode_attendue(etats, frequence):
+        return etats
+
+    try:
+        nouveaux = dict(passerelle_marche.etats(
+            ticker, frequence, fraicheur=0 if forcer else passerelle_marche.FRAICHEUR['etats']
+        ))
+    except passerelle_marche.SourceIndisponible:
+        if etats is not None:
+            return etats  # Source indisponible : on sert la dernière version connue
+        raise ValueError(f"Aucun état financier disponible pour {ticker}")
+    nouveaux['date_verification'] = datetime.now()
+
+    if etats is not None and _derniere_periode(nouveaux) == _derniere_periode(etats):
+        # Pas de nouvelle période : on conserve les états et on note la vérification
+        etats['date_verification'] = nouveaux['date_verification']
+    else:
+        etats = nouveaux
+    _ecrire_cache(ticker, frequence, etats)
+    return etats
+
+
+# =============================================================================
+# TRANSPOSITION DANS LE MODÈLE FINANCELAB
+# =============================================================================
+
+def _extraire(etat, postes):
+    """Sélectionne les postes demandés (une ligne par période, en k€)"""
+    resultat = pd.DataFrame(index=etat.columns)
+    for poste, libelles in postes.items():
+        libelle = next((l for l in libelles if l in etat.index), None)
+        resultat[poste] = etat.loc[libelle].astype(float) / 1000 if libelle else np.nan
+    return resultat
+
+
+def transposer_etats(etats):
+    """
+    Transpose les états yfinance en un DataFrame indexé par date de clôture,
+    avec les postes du bilan, les SIG et les flux de l'application (k€).
+    """
+    bilan = _extraire(etats['bilan'], POSTES_BILAN)
+    resultat = _extraire(etats['resultat'], POSTES_RESULTAT)
+    flux = _extraire(etats['flux'], POSTES_FLUX)
+
+    # Compléments lorsque le poste agrégé n'est pas publié
+    bilan['actif_immobilise'] = bilan['actif_immobilise'].fillna(bilan['total_actif'] - bilan['actif_circulant'])
+    bilan['dettes_lt'] = bilan['dettes_lt'].fillna(bilan['dettes_financieres'] - bilan['concours_bancaires'])
+    resultat['marge_brute'] = resultat['marge_brute'].fillna(resultat['chiffre_affaires'] - resultat['achats'])
+    resultat['ebe'] = resultat['ebe'].fillna(resultat['resultat_exploitation'] + resultat['dotations'])
+    resultat['valeur_ajoutee'] = resultat['ebe'] + resultat['charges_personnel']
+    resultat['charges_financieres'] = resultat['charges_financieres'].abs()
+    flux['caf'] = resultat['resultat_net'].reindex(flux.index) + resultat['dotations'].reindex(flux.index)
+
+    modele = bilan.join(resultat, how='outer').join(flux, how='outer')
+    modele.index = pd.to_datetime(modele.index)
+    modele.index.name = 'cloture'
+    return modele.sort_index()
+
+
+def etats_financelab(ticker, frequence='annuel', forcer=False):
+    """États d'un ticker au format de l'application"""
+    return transposer_etats(charger_etats(ticker, frequence, forcer))
+
+
+def charger_watchlist(tickers, frequence='annuel', progression=None):
+    """
+    Charge en parallèle les états de toute une watchlist.
+    Retourne (dictionnaire ticker -> DataFrame, dictionnaire ticker -> erreur).
+    `progression(fraction, message)` est appelée après chaque société.
+    """
+    def charger(ticker):
+        try:
+            return ticker, etats_financelab(ticker, frequence), None
+        except Exception as e:
+            return ticker, None, str(e)
+
+    resultats, erreurs = {}, {}
+    if not tickers:
+        return resultats, erreurs
+
+    executor = ThreadPoolExecutor(max_workers=min(NB_THREADS, len(tickers)))
+    try:
+        futures = [executor.submit(charger, ticker) for ticker in tickers]
+        for nb_charges, future in enumerate(as_completed(futures), 1):
+            ticker, modele, erreur = future.result()
+            if erreur is None:
+                resultats[ticker] = modele
+            else:
+                erreurs[ticker] = erreur
+            if progression is not None:
+                progression(nb_charges / len(tickers), f"{ticker} ({nb_charges}/{len(tickers)})")
+    except BaseException:
+        # Annulation (levée par `progression`) ou erreur : les sociétés pas encore commencées ne sont pas chargées
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    executor.shutdown()
+    return resultats, erreurs
+
+
+def analyser_watchlist(tickers, frequence='annuel', progression=None):
+    """Synthèse de la watchlist et erreurs par ticker (exécutable en arrière-plan)"""
+    modeles, erreurs = charger_watchlist(tickers, frequence, progression)
+    return synthese_watchlist(modeles) if modeles else pd.DataFrame(), erreurs
+
+
+def synthese_watchlist(modeles):
+    """Dernière période de chaque société de la watchlist, une ligne par ticker"""
+    lignes = {
+        ticker: modele.dropna(how='all').iloc[-1]
+        for ticker, modele in modeles.items()
+        if not modele.dropna(how='all').empty
+    }
+    return pd.DataFrame(lignes).T
+
+
+# Widgets des pages d'analyse alimentés par une période -> poste du modèle
+CHAMPS_PAGES = {
+    'ca_ratios': 'chiffre_affaires',
+    'res_net_ratios': 'resultat_net',
+    'res_expl_ratios': 'resultat_exploitation',
+    'cap_propres_ratios': 'capitaux_propres',
+    'actif_total_ratios': 'total_actif',
+    'dette_fin_struct': 'dettes_financieres',
+    'cap_propres_struct': 'capitaux_propres',
+    'act_immobilise_struct': 'actif_immobilise',
+    'ca_activite': 'chiffre_affaires',
+    'clients_moyens': 'clients',
+    'stocks_moyens': 'stocks',
+    'fournisseurs_moyens': 'fournisseurs',
+    'actif_circulant': 'actif_circulant',
+    'stocks_liquidite': 'stocks',
+    'disponibilites': 'disponibilites',
+    'passif_courant': 'dettes_ct',
+    'act_immobilise': 'actif_immobilise',
+    'stocks_equilibre': 'stocks',
+    'clients_equilibre': 'clients',
+    'fournisseurs_equilibre': 'fournisseurs',
+    'dispo_equilibre': 'disponibilites',
+    'concours_equilibre': 'concours_bancaires',
+    'res_expl_levier': 'resultat_exploitation',
+    'charges_fin_levier': 'charges_financieres',
+    'cap_propres_levier': 'capitaux_propres',
+    'dette_fin_levier': 'dettes_financieres',
+}
+
+
+def valeurs_pour_pages(periode):
+    """
+    Valeurs (entiers, k€) à injecter dans les widgets des pages d'analyse pour
+    une période du modèle. Les postes non publiés sont ignorés.
+    """
+    valeurs = {
+        cle: int(round(periode[poste]))
+        for cle, poste in CHAMPS_PAGES.items()
+        if poste in periode and pd.notna(periode[poste])
+    }
+    capitaux_permanents = periode.get('capitaux_propres', np.nan) + periode.get('dettes_lt', np.nan)
+    if pd.notna(capitaux_permanents):
+        valeurs['cap_permanents_struct'] = int(round(capitaux_permanents))
+        valeurs['cap_permanents'] = int(round(capitaux_permanents))
+    return valeurs
@@ -0,0 +1,260 @@
+"""
+📤 FINANCELAB - Exports Excel
+Description: Écriture des classeurs exportés par l'application. Les tableaux
+de résultats sont écrits ligne à ligne en mode `constant_memory` de xlsxwriter
+(mémoire constante quel que soit le nombre de lignes), avec un format de
+nombre par colonne. Les modèles (bilan, compte de résultat, flux) sont des
+rapports multi-feuilles dont les totaux et ratios sont de vraies formules
+Excel ; statiques, ils ne sont générés qu'une fois par processus.
+"""
+
+import re
+from functools import lru_cache
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+import xlsxwriter
+
+MIME_XLSX = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+TAILLE_BLOC = 10_000  # Lignes converties à la fois lors de l'écriture en flux
+
+FORMATS_NOMBRE = {
+    'entier': '#,##0',
+    'decimal': '#,##0.00',
+    'pourcentage': '0.0" %"',
+    'date': 'dd/mm/yyyy',
+    'keur': '#,##0" k€";[Red]-#,##0" k€"',
+}
+
+
+def _format_colonne(nom, serie):
+    """Format de nombre d'une colonne selon son type et son nom"""
+    nom = str(nom).lower()
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return 'date'
+    if not pd.api.types.is_numeric_dtype(serie) or pd.api.types.is_bool_dtype(serie):
+        return None
+    if nom.startswith(('taux', 'marge_securite', 'autonomie', 'liquidite_generale')) or '%' in nom:
+        return 'pourcentage'
+    if pd.api.types.is_integer_dtype(serie):
+        return 'entier'
+    return 'decimal'
+
+
+def _ecriture_colonne(feuille, serie):
+    """Méthode d'écriture xlsxwriter adaptée au type de la colonne"""
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return feuille.write_datetime
+    if pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+        return feuille.write_number
+    return feuille.write
+
+
+def _valeurs_bloc(serie):
+    """Valeurs Python d'un bloc de colonne, None pour les manquants et les infinis"""
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        if serie.dt.tz is not None:
+            serie = serie.dt.tz_localize(None)
+        return [None if pd.isna(v) else v.to_pydatetime() for v in serie]
+    if pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+        valeurs = serie.to_numpy(dtype='float64', na_value=np.nan)
+        manquants = ~np.isfinite(valeurs)
+        liste = valeurs.tolist()
+        for i in np.flatnonzero(manquants):
+            liste[i] = None
+        return liste
+    return [None if v is None or (isinstance(v, float) and not np.isfinite(v)) or v is pd.NA else v
+            for v in serie.tolist()]
+
+
+# =============================================================================
+# TABLEAUX DE RÉSULTATS (ÉCRITURE EN FLUX)
+# =============================================================================
+
+def ecrire_tableaux(feuilles, destination=None):
+    """
+    Écrit un ou plusieurs DataFrames (`{nom de feuille: DataFrame}`), ligne à
+    ligne et bloc par bloc, sans matérialiser le classeur en mémoire.
+    `destination` est un chemin ; sans destination, retourne les octets.
+    """
+    tampon = BytesIO() if destination is None else None
+    classeur = xlsxwriter.Workbook(
+        destination or tampon,
+        {'constant_memory': True, 'default_date_format': FORMATS_NOMBRE['date']}
+    )
+    entete = classeur.add_format({'bold': True, 'bg_color': '#1f77b4', 'font_color': 'white', 'border': 1})
+    formats = {nom: classeur.add_format({'num_format': motif}) for nom, motif in FORMATS_NOMBRE.items()}
+
+    for nom_feuille, df in feuilles.items():
+        feuille = classeur.add_worksheet(str(nom_feuille)[:31])
+        feuille.freeze_panes(1, 0)
+        for colonne, nom in enumerate(df.columns):
+            format_colonne = _format_colonne(nom, df[nom])
+            largeur = min(max(len(str(nom)) + 2, 12), 50)
+            feuille.set_column(colonne, colonne, largeur, formats.get(format_colonne))
+            feuille.write(0, colonne, str(nom), entete)
+
+        # Une méthode d'écriture typée par colonne, les valeurs converties par bloc
+        ecritures = [_ecriture_colonne(feuille, df[nom]) for nom in df.columns]
+        for debut in range(0, len(df), TAILLE_BLOC):
+            bloc = df.iloc[debut:debut + TAILLE_BLOC]
+            colonnes = [_valeurs_bloc(bloc.iloc[:, i]) for i in range(len(df.columns))]
+            for decalage, ligne in enumerate(zip(*colonnes), 1):
+                for colonne, valeur in enumerate(ligne):
+                    if valeur is not None:
+                        ecritures[colonne](debut + decalage, colonne, valeur)
+        if len(df):
+            feuille.autofilter(0, 0, len(df), max(len(df.columns) - 1, 0))
+
+    classeur.close()
+    return tampon.getvalue() if tampon is not None else destination
+
+
+# =============================================================================
+# RAPPORTS MULTI-FEUILLES AVEC FORMULES
+# =============================================================================
+
+_REFERENCE = re.compile(r"\{(\w+)\}")
+
+
+def ecrire_rapport(feuilles, destination=None):
+    """
+    Écrit un rapport structuré. `feuilles` associe à chaque nom de feuille
+    une liste de lignes `(identifiant, libellé, valeur, style)` :
+    - `valeur` est un nombre, None, ou une formule ('=SUM({a}:{b})') dont les
+      `{identifiant}` sont remplacés par l'adresse de la ligne correspondante,
+      y compris sur une autre feuille ;
+    - `style` parmi None, 'section', 'total', 'pourcentage', 'texte'.
+    """
+    adresses = {}
+    for nom_feuille, lignes in feuilles.items():
+        for rang, (identifiant, _, _, _) in enumerate(lignes, 1):
+            if identifiant:
+                adresses[identifiant] = (nom_feuille, f"B{rang + 1}")
+
+    def resoudre(formule, feuille_courante):
+        def adresse(correspondance):
+            nom_feuille, cellule = adresses[correspondance.group(1)]
+            return cellule if nom_feuille == feuille_courante else f"'{nom_feuille}'!{cellule}"
+        return _REFERENCE.sub(adresse, formule)
+
+    tampon = BytesIO() if destination is None else None
+    classeur = xlsxwriter.Workbook(destination or tampon)
+    styles = {
+        'titre': classeur.add_format({'bold': True, 'bg_color': '#1f77b4', 'font_color': 'white'}),
+        'section': classeur.add_format({'bold': True, 'bg_color': '#e8f4f8'}),
+        'total': classeur.add_format({'bold': True, 'top': 1, 'num_format': FORMATS_NOMBRE['keur']}),
+        'pourcentage': classeur.add_format({'num_format': '0.0%'}),
+        'texte': classeur.add_format({}),
+        None: classeur.add_format({'num_format': FORMATS_NOMBRE['keur']}),
+    }
+
+    for nom_feuille, lignes in feuilles.items():
+        feuille = classeur.add_worksheet(nom_feuille[:31])
+        feuille.set_column(0, 0, 38)
+        feuille.set_column(1, 1, 16)
+        feuille.write_row(0, 0, [nom_feuille.upper(), "Montant"], styles['titre'])
+        for rang, (_, libelle, valeur, style) in enumerate(lignes, 1):
+            format_ligne = styles[style]
+            feuille.write(rang, 0, libelle, styles['section'] if style == 'section' else format_ligne)
+            if isinstance(valeur, str) and valeur.startswith('='):
+                feuille.write_formula(rang, 1, resoudre(valeur, nom_feuille), format_ligne)
+            elif valeur is not None:
+                feuille.write(rang, 1, valeur, format_ligne)
+
+    classeur.close()
+    return tampon.getvalue() if tampon is not None else destination
+
+
+# Modèles téléchargeables : saisies en k€, totaux et ratios calculés par Excel
+MODELES = {
+    'bilan': {
+        'Actif': [
+            (None, "ACTIF IMMOBILISÉ", None, 'section'),
+            ('immob_incorp', "Immobilisations incorporelles", 500, None),
+            ('immob_corp', "Immobilisations corporelles", 1500, None),
+            ('immob_fin', "Immobilisations financières", 300, None),
+            ('total_immob', "TOTAL ACTIF IMMOBILISÉ", "=SUM({immob_incorp}:{immob_fin})", 'total'),
+            (None, "ACTIF CIRCULANT", None, 'section'),
+            ('stocks', "Stocks", 800, None),
+            ('clients', "Créances clients", 1200, None),
+            ('dispo', "Disponibilités", 300, None),
+            ('total_circulant', "TOTAL ACTIF CIRCULANT", "=SUM({stocks}:{dispo})", 'total'),
+            ('total_actif', "TOTAL ACTIF", "={total_immob}+{total_circulant}", 'total'),
+        ],
+        'Passif': [
+            (None, "CAPITAUX PROPRES", None, 'section'),
+            ('capital', "Capital social", 1000, None),
+            ('reserves', "Réserves", 800, None),
+            ('resultat', "Résultat de l'exercice", 200, None),
+            ('total_cp', "TOTAL CAPITAUX PROPRES", "=SUM({capital}:{resultat})", 'total'),
+            (None, "DETTES", None, 'section'),
+            ('dettes_lt', "Dettes financières LT", 1000, None),
+            ('fournisseurs', "Dettes fournisseurs", 800, None),
+            ('autres_dettes', "Autres dettes", 800, None),
+            ('total_dettes', "TOTAL DETTES", "=SUM({dettes_lt}:{autres_dettes})", 'total'),
+            ('total_passif', "TOTAL PASSIF", "={total_cp}+{total_dettes}", 'total'),
+        ],
+        'Analyse': [
+            ('frng', "FRNG", "={total_cp}+{dettes_lt}-{total_immob}", None),
+            ('bfr', "BFR", "={stocks}+{clients}-{fournisseurs}-{autres_dettes}", None),
+            ('tresorerie', "Trésorerie nette", "={frng}-{bfr}", None),
+            (None, "Taux d'endettement", "={total_dettes}/{total_cp}", 'pourcentage'),
+            (None, "Autonomie financière", "={total_cp}/{total_passif}", 'pourcentage'),
+            (None, "Contrôle actif - passif", "={total_actif}-{total_passif}", 'total'),
+        ],
+    },
+    'compte_resultat': {
+        'Compte de résultat': [
+            (None, "PRODUITS", None, 'section'),
+            ('ca', "Chiffre d'affaires", 5000, None),
+            ('autres_produits', "Autres produits", 200, None),
+            ('total_produits', "TOTAL PRODUITS", "=SUM({ca}:{autres_produits})", 'total'),
+            (None, "CHARGES", None, 'section'),
+            ('achats', "Achats consommés", 3000, None),
+            ('personnel', "Charges de personnel", 1200, None),
+            ('autres_charges', "Autres charges", 300, None),
+            ('dotations', "Dotations aux amortissements", 200, None),
+            ('charges_fin', "Charges financières", 100, None),
+            ('total_charges', "TOTAL CHARGES", "=SUM({achats}:{charges_fin})", 'total'),
+            ('resultat_net', "RÉSULTAT NET", "={total_produits}-{total_charges}", 'total'),
+        ],
+        'SIG': [
+            ('marge', "Marge commerciale", "={ca}-{achats}", None),
+            ('va', "Valeur ajoutée", "={marge}-{autres_charges}", None),
+            ('ebe', "EBE", "={va}-{personnel}", None),
+            ('rex', "Résultat d'exploitation", "={ebe}-{dotations}", None),
+            ('rcai', "Résultat courant", "={rex}-{charges_fin}", None),
+            (None, "Taux de marge", "={marge}/{ca}", 'pourcentage'),
+            (None, "Taux d'EBE", "={ebe}/{ca}", 'pourcentage'),
+            (None, "Taux de résultat d'exploitation", "={rex}/{ca}", 'pourcentage'),
+        ],
+    },
+    'flux': {
+        'Tableau des flux': [
+            (None, "FLUX D'EXPLOITATION", None, 'section'),
+            ('resultat_net', "Résultat net", 400, None),
+            ('dotations', "Dotations aux amortissements", 200, None),
+            ('variation_bfr', "Variation du BFR", -150, None),
+            ('flux_exploitation', "FLUX NET EXPLOITATION", "=SUM({resultat_net}:{variation_bfr})", 'total'),
+            (None, "FLUX D'INVESTISSEMENT", None, 'section'),
+            ('acquisitions', "Acquisitions d'immobilisations", -1000, None),
+            ('cessions', "Cessions d'immobilisations", 50, None),
+            ('flux_investissement', "FLUX NET INVESTISSEMENT", "=SUM({acquisitions}:{cessions})", 'total'),
+            (None, "FLUX DE FINANCEMENT", None, 'section'),
+            ('augmentation_capital', "Augmentations de capital", 0, None),
+            ('emprunts', "Emprunts nouveaux", 500, None),
+            ('remboursements', "Remboursements d'emprunts", -300, None),
+            ('flux_financement', "FLUX NET FINANCEMENT", "=SUM({augmentation_capital}:{remboursements})", 'total'),
+            (None, "VARIATION DE TRÉSORERIE", "={flux_exploitation}+{flux_investissement}+{flux_financement}", 'total'),
+        ],
+    },
+}
+
+
+@lru_cache(maxsize=None)
+def modele_excel(nom):
+    """Octets du modèle `nom` de MODELES (générés une seule fois par processus)"""
+    return ecrire_rapport(MODELES[nom])
@@ -0,0 +1,464 @@
+"""
+🔌 FINANCELAB - Fournisseurs de données de marché
+Description: Interface commune des sources de cours, de profils (`info`) et
+d'états financiers, avec trois implémentations interchangeables : Yahoo
+Finance en direct, une source locale qui rejoue des historiques et des profils
+enregistrés (et les enregistre au besoin depuis une autre source), et un
+générateur synthétique déterministe (mouvement brownien géométrique avec
+sauts) capable de produire des milliers de tickers sur plusieurs décennies.
+Les tests et les bancs d'essai tournent ainsi sans réseau.
+
+Usage :
+    python fournisseurs_marche.py enregistrer AAPL MSFT --dossier fixtures
+    python fournisseurs_marche.py synthetiser --nb-tickers 5000 --annees 30 --dossier bench
+"""
+
+import argparse
+import json
+import os
+import pickle
+import sys
+import time
+import zlib
+from datetime import datetime
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+# =============================================================================
+# PARAMÈTRES
+# =============================================================================
+
+# Variable d'environnement qui choisit la source : "yahoo", "fichiers:<dossier>", "synthetique[:graine]"
+VARIABLE_SOURCE = "FINANCELAB_DONNEES"
+
+PERIODES = {
+    '1d': pd.DateOffset(days=1), '5d': pd.DateOffset(days=5), '1mo': pd.DateOffset(months=1),
+    '3mo': pd.DateOffset(months=3), '6mo': pd.DateOffset(months=6), '1y': pd.DateOffset(years=1),
+    '2y': pd.DateOffset(years=2), '5y': pd.DateOffset(years=5), '10y': pd.DateOffset(years=10),
+}
+
+COLONNES_HISTORIQUE = ['Open', 'High', 'Low', 'Close', 'Volume', 'Dividends', 'Stock Splits']
+ETATS = ('resultat', 'bilan', 'flux')
+
+SECTEURS = ['Technology', 'Communication Services', 'Consumer Cyclical', 'Consumer Defensive', 'Industrials',
+            'Healthcare', 'Energy', 'Financial Services', 'Basic Materials', 'Utilities', 'Real Estate']
+
+
+def debut_periode(fin, periode):
+    """Première date incluse dans une période yfinance ("1y", "ytd", "max"...) se terminant à `fin`"""
+    if periode == 'max':
+        return pd.Timestamp.min
+    if periode == 'ytd':
+        return pd.Timestamp(year=fin.year, month=1, day=1)
+    return fin - PERIODES[periode]
+
+
+def _restreindre(historique, periode):
+    if historique.empty or periode == 'max':
+        return historique
+    return historique[historique.index > debut_periode(historique.index[-1], periode)]
+
+
+# =============================================================================
+# INTERFACE
+# =============================================================================
+
+class DonneesAbsentes(LookupError):
+    """La source n'a aucune donnée pour ce ticker (ce n'est pas une panne de la source)"""
+
+
+class FournisseurMarche:
+    """
+    Source de données de marché. `debit` (appels par seconde) et `rafale`
+    indiquent la limite à respecter ; None pour une source locale, illimitée.
+    """
+
+    nom = "abstrait"
+    debit = None
+    rafale = None
+
+    def historique(self, ticker, periode="1y"):
+        """Cours quotidiens (colonnes de `Ticker.history`), indexés par date"""
+        raise NotImplementedError
+
+    def info(self, ticker):
+        """Profil et multiples du ticker (dictionnaire `Ticker.info`)"""
+        raise NotImplementedError
+
+    def etats(self, ticker, frequence='annuel'):
+        """États bruts : {'resultat', 'bilan', 'flux'} au format yfinance (postes en lignes, clôtures en colonnes)"""
+        raise NotImplementedError
+
+    def cours_cloture(self, tickers, periode="1y"):
+        """Cours de clôture de plusieurs tickers (une colonne par ticker)"""
+        return pd.DataFrame({ticker: self.historique(ticker, periode)['Close'] for ticker in tickers})
+
+
+# =============================================================================
+# YAHOO FINANCE EN DIRECT
+# =============================================================================
+
+class FournisseurYahoo(FournisseurMarche):
+    """Yahoo Finance via yfinance (réseau requis)"""
+
+    nom = "yahoo"
+    debit = 2.0
+    rafale = 5
+
+    def historique(self, ticker, periode="1y"):
+        return yf.Ticker(ticker).history(period=periode)
+
+    def info(self, ticker):
+        return yf.Ticker(ticker).info
+
+    def etats(self, ticker, frequence='annuel'):
+        societe = yf.Ticker(ticker)
+        if frequence == 'trimestriel':
+            resultat, bilan, flux = societe.quarterly_income_stmt, societe.quarterly_balance_sheet, societe.quarterly_cashflow
+        else:
+            resultat, bilan, flux = societe.income_stmt, societe.balance_sheet, societe.cashflow
+        return {
+            'resultat': resultat if resultat is not None else pd.DataFrame(),
+            'bilan': bilan if bilan is not None else pd.DataFrame(),
+            'flux': flux if flux is not None else pd.DataFrame(),
+        }
+
+    def cours_cloture(self, tickers, periode="1y"):
+        cloture = yf.download(list(tickers), period=periode, progress=False, auto_adjust=True)['Close']
+        return cloture.to_frame(tickers[0]) if isinstance(cloture, pd.Series) else cloture
+
+
+# =============================================================================
+# REJEU DE DONNÉES ENREGISTRÉES
+# =============================================================================
+
+class FournisseurFichiers(FournisseurMarche):
+    """
+    Rejoue des données enregistrées dans `dossier` : un sous-dossier par
+    ticker avec historique.parquet (historique complet, restreint à la
+    période demandée), info.json et etats_<frequence>.pkl. Avec une `source`,
+    les données absentes y sont obtenues puis enregistrées (mode
+    enregistrement, au débit de la source) ; sans source, une donnée absente
+    lève DonneesAbsentes.
+    """
+
+    nom = "fichiers"
+
+    def __init__(self, dossier, source=None):
+        self.dossier = dossier
+        self.source = source
+        if source is not None:
+            self.debit, self.rafale = source.debit, source.rafale
+
+    def _chemin(self, ticker, fichier):
+        return os.path.join(self.dossier, ticker.strip().upper(), fichier)
+
+    def _lire_ou_enregistrer(self, chemin, lire, obtenir, ecrire):
+        if os.path.exists(chemin):
+            return lire(chemin)
+        if self.source is None:
+            raise DonneesAbsentes(f"Aucune donnée enregistrée : {chemin}")
+        donnees = obtenir()
+        os.makedirs(os.path.dirname(chemin), exist_ok=True)
+        temporaire = chemin + ".tmp"
+        ecrire(donnees, temporaire)
+        os.replace(temporaire, chemin)
+        return donnees
+
+    def historique(self, ticker, periode="1y"):
+        historique = self._lire_ou_enregistrer(
+            self._chemin(ticker, "historique.parquet"),
+            pd.read_parquet,
+            lambda: self.source.historique(ticker, "max"),
+            lambda historique, chemin: historique.to_parquet(chemin),
+        )
+        return _restreindre(historique, periode)
+
+    def info(self, ticker):
+        def lire(chemin):
+            with open(chemin, encoding='utf-8') as f:
+                return json.load(f)
+
+        def ecrire(info, chemin):
+            with open(chemin, 'w', encoding='utf-8') as f:
+                json.dump(info, f, ensure_ascii=False, default=str)
+
+        return self._lire_ou_enregistrer(self._chemin(ticker, "info.json"), lire, lambda: self.source.info(ticker), ecrire)
+
+    def etats(self, ticker, frequence='annuel'):
+        def lire(chemin):
+            with open(chemin, 'rb') as f:
+                return pickle.load(f)
+
+        def ecrire(etats, chemin):
+            with open(chemin, 'wb') as f:
+                pickle.dump(etats, f)
+
+        return self._lire_ou_enregistrer(
+            self._chemin(ticker, f"etats_{frequence}.pkl"), lire, lambda: self.source.etats(ticker, frequence), ecrire
+        )
+
+    def tickers(self):
+        """Tickers enregistrés"""
+        if not os.path.isdir(self.dossier):
+            return []
+        return sorted(nom for nom in os.listdir(self.dossier) if os.path.isdir(os.path.join(self.dossier, nom)))
+
+
+# =============================================================================
+# GÉNÉRATEUR SYNTHÉTIQUE
+# =============================================================================
+
+class FournisseurSynthetique(FournisseurMarche):
+    """
+    Données synthétiques déterministes : chaque ticker a ses propres
+    paramètres (dérive, volatilité, secteur, structure financière) tirés d'un
+    générateur initialisé par (graine, ticker), si bien qu'un même ticker
+    donne toujours la même série, quel que soit le lot demandé. Les cours
+    suivent un mouvement brownien géométrique avec sauts de Poisson (Merton).
+    """
+
+    nom = "synthetique"
+
+    def __init__(self, graine=0, debut="1990-01-01", fin=None, intensite_sauts=0.5, taille_sauts=0.08):
+        self.graine = graine
+        self.debut = pd.Timestamp(debut)
+        self.fin = pd.Timestamp(fin) if fin is not None else pd.Timestamp.today().normalize()
+        self.intensite_sauts = intensite_sauts  # Sauts par an
+        self.taille_sauts = taille_sauts        # Écart-type du log-saut
+        jours = np.arange(self.debut.to_datetime64(), self.fin.to_datetime64() + np.timedelta64(1, 'D'), dtype='datetime64[D]')
+        self.calendrier = pd.DatetimeIndex(jours[np.is_busday(jours)], name='Date').as_unit('ns')
+        self._trajectoire = lru_cache(maxsize=256)(self._trajectoire)
+
+    def _generateur(self, ticker, flux):
+        return np.random.default_rng([self.graine, zlib.crc32(ticker.encode()), flux])
+
+    def parametres(self, ticker):
+        """Paramètres propres au ticker"""
+        rng = self._generateur(ticker, 0)
+        return {
+            'derive': rng.uniform(-0.02, 0.15),
+            'volatilite': rng.uniform(0.12, 0.55),
+            'prix_initial': float(np.exp(rng.uniform(np.log(5), np.log(300)))),
+            'secteur': SECTEURS[rng.integers(len(SECTEURS))],
+            'chiffre_affaires': float(np.exp(rng.uniform(np.log(5e7), np.log(2e11)))),
+            'croissance': rng.uniform(-0.03, 0.15),
+            'taux_achats': rng.uniform(0.30, 0.65),
+            'taux_personnel': rng.uniform(0.10, 0.30),
+            'taux_autres_charges': rng.uniform(0.03, 0.12),
+            'taux_dotations': rng.uniform(0.02, 0.07),
+            'rotation_actif': rng.uniform(0.6, 1.6),
+            'autonomie': rng.uniform(0.25, 0.65),
+            'endettement': rng.uniform(0.10, 0.35),
+            'prix_ventes': rng.uniform(0.5, 6.0),
+        }
+
+    def _clotures(self, ticker, p, rng):
+        """Cours de clôture sur tout le calendrier"""
+        n, dt = len(self.calendrier), 1 / 252
+        sauts = rng.poisson(self.intensite_sauts * dt, n) * rng.normal(-self.taille_sauts / 4, self.taille_sauts, n)
+        rendements = (p['derive'] - p['volatilite'] ** 2 / 2) * dt + p['volatilite'] * np.sqrt(dt) * rng.standard_normal(n) + sauts
+        rendements[0] = 0.0
+        return p['prix_initial'] * np.exp(np.cumsum(rendements))
+
+    def _trajectoire(self, ticker):
+        """Historique complet (jours ouvrés de `debut` à `fin`) d'un ticker"""
+        p = self.parametres(ticker)
+        rng = self._generateur(ticker, 1)
+        cloture = self._clotures(ticker, p, rng)
+        n, dt = len(cloture), 1 / 252
+
+        ouverture = np.concatenate([[cloture[0]], cloture[:-1]]) * np.exp(rng.normal(0, p['volatilite'] * np.sqrt(dt) / 4, n))
+        amplitude = np.abs(rng.normal(0, p['volatilite'] * np.sqrt(dt) / 2, (2, n)))
+        volume = np.round(np.exp(rng.normal(np.log(p['chiffre_affaires'] / cloture.mean() / 200), 0.4, n)))
+        return pd.DataFrame({
+            'Open': ouverture,
+            'High': np.maximum(ouverture, cloture) * np.exp(amplitude[0]),
+            'Low': np.minimum(ouverture, cloture) * np.exp(-amplitude[1]),
+            'Close': cloture,
+            'Volume': volume,
+            'Dividends': 0.0,
+            'Stock Splits': 0.0,
+        }, index=self.calendrier)
+
+    def historique(self, ticker, periode="1y"):
+        return _restreindre(self._trajectoire(ticker.strip().upper()), periode).copy()
+
+    def cours_cloture(self, tickers, periode="1y"):
+        # Seules les clôtures sont simulées : le tirage est le même que pour l'historique complet
+        tickers = [ticker.strip().upper() for ticker in tickers]
+        debut = 0 if periode == 'max' else self.calendrier.searchsorted(debut_periode(self.calendrier[-1], periode), 'right')
+        clotures = np.empty((len(self.calendrier) - debut, len(tickers)))
+        for j, ticker in enumerate(tickers):
+            clotures[:, j] = self._clotures(ticker, self.parametres(ticker), self._generateur(ticker, 1))[debut:]
+        return pd.DataFrame(clotures, index=self.calendrier[debut:], columns=tickers)
+
+    def etats(self, ticker, frequence='annuel'):
+        ticker = ticker.strip().upper()
+        p = self.parametres(ticker)
+        rng = self._generateur(ticker, 2 if frequence == 'annuel' else 3)
+        if frequence == 'trimestriel':
+            clotures = pd.date_range(end=self.fin - pd.offsets.QuarterEnd(1), periods=5, freq='QE')[::-1]
+            echelle, croissance = 0.25, (1 + p['croissance']) ** 0.25 - 1
+        else:
+            clotures = pd.date_range(end=self.fin - pd.offsets.YearEnd(1), periods=4, freq='YE')[::-1]
+            echelle, croissance = 1.0, p['croissance']
+
+        # Les clôtures vont de la plus récente à la plus ancienne, comme dans yfinance
+        anciennete = np.arange(len(clotures))
+        ca = p['chiffre_affaires'] * echelle * (1 + croissance) ** -anciennete * np.exp(rng.normal(0, 0.03, len(clotures)))
+        achats = ca * p['taux_achats']
+        personnel = ca * p['taux_personnel']
+        ebitda = ca - achats - personnel - ca * p['taux_autres_charges']
+        dotations = ca * p['taux_dotations']
+        ebit = ebitda - dotations
+
+        total_actif = ca / echelle / p['rotation_actif']
+        capitaux_propres = total_actif * p['autonomie']
+        dette = total_actif * p['endettement']
+        interets = dette * 0.045 * echelle
+        avant_impot = ebit - interets
+        impots = np.maximum(avant_impot, 0) * 0.25
+        resultat_net = avant_impot - impots
+
+        actif_circulant = total_actif * 0.45
+        stocks, clients = ca / echelle * 0.08, ca / echelle * 0.15
+        fournisseurs = ca / echelle * 0.10
+        dettes_lt = dette * 0.75
+        variation_bfr = -ca * 0.01
+        capex = -dotations * 1.2
+        emissions, remboursements = dette * 0.10 * echelle, -dette * 0.08 * echelle
+        flux_exploitation = resultat_net + dotations + variation_bfr
+
+        def etat(lignes):
+            return pd.DataFrame(lignes, index=clotures).T
+
+        return {
+            'resultat': etat({
+                'Total Revenue': ca, 'Cost Of Revenue': achats, 'Gross Profit': ca - achats,
+                'Salaries And Wages': personnel, 'EBITDA': ebitda, 'Reconciled Depreciation': dotations,
+                'Operating Income': ebit, 'Interest Expense': interets, 'Pretax Income': avant_impot,
+                'Tax Provision': impots, 'Net Income': resultat_net,
+            }),
+            'bilan': etat({
+                'Total Non Current Assets': total_actif - actif_circulant, 'Inventory': stocks,
+                'Accounts Receivable': clients,
+                'Cash And Cash Equivalents': np.maximum(actif_circulant - stocks - clients, total_actif * 0.02),
+                'Current Assets': actif_circulant, 'Total Assets': total_actif,
+                'Stockholders Equity': capitaux_propres, 'Long Term Debt': dettes_lt, 'Total Debt': dette,
+                'Accounts Payable': fournisseurs, 'Current Liabilities': total_actif - capitaux_propres - dettes_lt,
+                'Current Debt': dette - dettes_lt,
+            }),
+            'flux': etat({
+                'Operating Cash Flow': flux_exploitation, 'Investing Cash Flow': capex,
+                'Financing Cash Flow': emissions + remboursements, 'Capital Expenditure': capex,
+                'Issuance Of Debt': emissions, 'Repayment Of Debt': remboursements,
+                'Change In Working Capital': variation_bfr, 'Free Cash Flow': flux_exploitation + capex,
+            }),
+        }
+
+    def info(self, ticker):
+        ticker = ticker.strip().upper()
+        p = self.parametres(ticker)
+        prix = float(self._trajectoire(ticker)['Close'].iloc[-1])
+        dernier = {nom: etat.iloc[:, 0] for nom, etat in self.etats(ticker).items()}
+        ca = float(dernier['resultat']['Total Revenue'])
+        capitalisation = ca * p['prix_ventes']
+        tresorerie = float(dernier['bilan']['Cash And Cash Equivalents'])
+        valeur_entreprise = capitalisation + float(dernier['bilan']['Total Debt']) - tresorerie
+        resultat_net = float(dernier['resultat']['Net Income'])
+        ebitda = float(dernier['resultat']['EBITDA'])
+        return {
+            'symbol': ticker,
+            'shortName': f"{ticker} (synthétique)",
+            'longName': f"Société synthétique {ticker}",
+            'sector': p['secteur'],
+            'industry': p['secteur'],
+            'currency': "USD",
+            'currentPrice': prix,
+            'marketCap': capitalisation,
+            'sharesOutstanding': capitalisation / prix,
+            'enterpriseValue': valeur_entreprise,
+            'totalRevenue': ca,
+            'ebitda': ebitda,
+            'trailingPE': capitalisation / resultat_net if resultat_net > 0 else None,
+            'priceToBook': capitalisation / float(dernier['bilan']['Stockholders Equity']),
+            'enterpriseToRevenue': valeur_entreprise / ca,
+            'enterpriseToEbitda': valeur_entreprise / ebitda if ebitda > 0 else None,
+            'beta': round(p['volatilite'] / 0.2, 2),
+        }
+
+
+# =============================================================================
+# CHOIX DE LA SOURCE
+# =============================================================================
+
+def depuis_configuration(configuration=None):
+    """
+    Fournisseur décrit par `configuration` (par défaut la variable
+    d'environnement FINANCELAB_DONNEES) : "yahoo", "fichiers:<dossier>",
+    "enregistrement:<dossier>" (rejeu, enregistrement depuis Yahoo des
+    données absentes) ou "synthetique[:graine]".
+    """
+    configuration = configuration or os.environ.get(VARIABLE_SOURCE, "yahoo")
+    nom, _, argument = configuration.partition(":")
+    if nom == "yahoo":
+        return FournisseurYahoo()
+    if nom == "fichiers":
+        return FournisseurFichiers(argument)
+    if nom == "enregistrement":
+        return FournisseurFichiers(argument, source=FournisseurYahoo())
+    if nom == "synthetique":
+        return FournisseurSynthetique(graine=int(argument or 0))
+    raise ValueError(f"Source de données inconnue : {configuration}")
+
+
+# =============================================================================
+# LIGNE DE COMMANDE
+# =============================================================================
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Enregistrement et génération de données de marché hors ligne")
+    commandes = parser.add_subparsers(dest="commande", required=True)
+
+    enregistrer = commandes.add_parser("enregistrer", help="Enregistre depuis Yahoo Finance les données de tickers")
+    enregistrer.add_argument("tickers", nargs="+")
+    enregistrer.add_argument("--dossier", required=True)
+
+    synthetiser = commandes.add_parser("synthetiser", help="Écrit des tickers synthétiques au format de rejeu")
+    synthetiser.add_argument("--nb-tickers", type=int, default=1000)
+    synthetiser.add_argument("--annees", type=int, default=30)
+    synthetiser.add_argument("--graine", type=int, default=0)
+    synthetiser.add_argument("--dossier", required=True)
+    args = parser.parse_args(arguments)
+
+    debut = time.perf_counter()
+    if args.commande == "enregistrer":
+        source = FournisseurFichiers(args.dossier, source=FournisseurYahoo())
+        tickers = [ticker.strip().upper() for ticker in args.tickers]
+    else:
+        synthetique = FournisseurSynthetique(
+            graine=args.graine, debut=datetime.today() - pd.DateOffset(years=args.annees)
+        )
+        source = FournisseurFichiers(args.dossier, source=synthetique)
+        tickers = [f"SYN{i:05d}" for i in range(args.nb_tickers)]
+
+    erreurs = 0
+    for ticker in tickers:
+        try:
+            source.historique(ticker, "max")
+            source.info(ticker)
+            for frequence in ('annuel', 'trimestriel'):
+                source.etats(ticker, frequence)
+        except Exception as e:
+            erreurs += 1
+            print(f"⚠️ {ticker} : {e}")
+    print(f"✅ {len(tickers) - erreurs} ticker(s) -> {args.dossier} ({time.perf_counter() - debut:.1f} s)")
+    return 1 if erreurs == len(tickers) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+"""
+🧠 FINANCELAB - Budget mémoire des sessions
+Description: Les objets volumineux (historiques de cours, dictionnaires `info`,
+états financiers, panels de comparables) sont déposés une seule fois dans un
+cache partagé par toutes les sessions ; chaque session n'en conserve que la
+clé. Un plafond par session et un plafond global libèrent les objets les moins
+récemment utilisés.
+"""
+
+import pickle
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+
+import pandas as pd
+
+PLAFOND_GLOBAL = 512 * 1024 ** 2   # Octets pour l'ensemble des sessions
+PLAFOND_SESSION = 64 * 1024 ** 2   # Octets référencés par une session
+TAILLE_NOTIFICATIONS = 20          # Notifications conservées par session
+NB_ANALYSES = 50                   # Analyses sauvegardées conservées par session (les plus anciennes sont écartées)
+
+
+def taille_objet(objet):
+    """Estimation de l'empreinte mémoire d'un objet (octets)"""
+    if isinstance(objet, pd.DataFrame):
+        return int(objet.memory_usage(deep=True).sum())
+    if isinstance(objet, pd.Series):
+        return int(objet.memory_usage(deep=True))
+    if isinstance(objet, dict):
+        return sys.getsizeof(objet) + sum(taille_objet(v) for v in objet.values())
+    try:
+        return len(pickle.dumps(objet, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(objet)
+
+
+def file_notifications(notifications=(), taille=TAILLE_NOTIFICATIONS):
+    """Tampon circulaire de notifications : les plus anciennes sont écartées"""
+    return deque(notifications, maxlen=taille)
+
+
+class CachePartage:
+    """Objets partagés entre sessions, libérés du moins récemment utilisé au plus récent"""
+
+    def __init__(self, plafond=PLAFOND_GLOBAL):
+        self.plafond = plafond
+        self._objets = OrderedDict()  # clé -> (objet, taille)
+        self._verrou = threading.Lock()
+        self.occupation = 0
+        self.liberations = 0
+
+    def __contains__(self, cle):
+        return cle in self._objets
+
+    def __len__(self):
+        return len(self._objets)
+
+    def deposer(self, cle, objet):
+        """Dépose (ou remplace) un objet et libère les plus anciens au-delà du plafond"""
+        taille = taille_objet(objet)
+        with self._verrou:
+            if cle in self._objets:
+                self.occupation -= self._objets.pop(cle)[1]
+            self._objets[cle] = (objet, taille)
+            self.occupation += taille
+
+            while self.occupation > self.plafond and len(self._objets) > 1:
+                _, (_, taille_liberee) = self._objets.popitem(last=False)
+                self.occupation -= taille_liberee
+                self.liberations += 1
+        return taille
+
+    def obtenir(self, cle):
+        """Retourne l'objet (None s'il a été libéré) et le marque comme récemment utilisé"""
+        with self._verrou:
+            if cle not in self._objets:
+                return None
+            self._objets.move_to_end(cle)
+            return self._objets[cle][0]
+
+    def taille(self, cle):
+        entree = self._objets.get(cle)
+        return entree[1] if entree else 0
+
+    def retirer(self, cle):
+        with self._verrou:
+            if cle in self._objets:
+                self.occupation -= self._objets.pop(cle)[1]
+
+
+class RessourcesSession:
+    """Références d'une session vers le cache partagé, avec plafond propre"""
+
+    def __init__(self, cache, plafond=PLAFOND_SESSION):
+        self.cache = cache
+        self.plafond = plafond
+        self._references = OrderedDict()  # clé -> (taille, dernière utilisation)
+
+    def __contains__(self, cle):
+        return cle in self._references and cle in self.cache
+
+    def conserver(self, cle, objet):
+        """Dépose un objet dans le cache partagé et le référence pour la session"""
+        taille = self.cache.deposer(cle, objet)
+        self._referencer(cle, taille)
+        return objet
+
+    def charger(self, cle, fabrique):
+        """
+        Retourne l'objet partagé `cle`, en le construisant avec `fabrique()`
+        seulement s'il n'est pas déjà en cache (pour cette session ou une autre).
+        """
+        objet = self.cache.obtenir(cle)
+        if objet is None:
+            return self.conserver(cle, fabrique())
+        self._referencer(cle, self.cache.taille(cle))
+        return objet
+
+    def obtenir(self, cle):
+        """Objet référencé, ou None s'il a été libéré par un plafond"""
+        objet = self.cache.obtenir(cle) if cle in self._references else None
+        if objet is None:
+            self._references.pop(cle, None)
+        else:
+            self._referencer(cle, self.cache.taille(cle))
+        return objet
+
+    def liberer(self, cle):
+        self._references.pop(cle, None)
+
+    def _referencer(self, cle, taille):
+        self._references.pop(cle, None)
+        self._references[cle] = (taille, time.time())
+        while self.empreinte() > self.plafond and len(self._references) > 1:
+            self._references.popitem(last=False)
+
+    def empreinte(self):
+        """Octets des objets partagés référencés par la session"""
+        return sum(taille for taille, _ in self._references.values())
+
+    def references(self):
+        """Tableau des objets référencés (du moins au plus récemment utilisé)"""
+        return pd.DataFrame(
+            [
+                {'cle': cle, 'taille_ko': taille / 1024, 'en_cache': cle in self.cache,
+                 'derniere_utilisation': pd.Timestamp(utilisation, unit='s')}
+                for cle, (taille, utilisation) in self._references.items()
+            ],
+            columns=['cle', 'taille_ko', 'en_cache', 'derniere_utilisation']
+        )
+
+
+def empreinte_session(etat_session):
+    """Empreinte propre d'une session (hors objets partagés), en octets"""
+    return sum(
+        taille_objet(valeur)
+        for cle, valeur in etat_session.items()
+        if not isinstance(valeur, RessourcesSession)
+    )
@@ -0,0 +1,389 @@
+"""
+🧾 FINANCELAB - Lettrage des comptes clients et fournisseurs
+Description: Rapproche les factures et les règlements d'un export de grand
+livre (CSV, Excel, Parquet ou FEC) pour mesurer les délais de paiement réels :
+lettrage par référence, puis par montant exact (index de hachage sur tiers et
+montant, dans une fenêtre de dates), puis imputation des règlements restants
+sur les factures les plus anciennes avec une tolérance d'écart (paiements
+partiels, frais bancaires). Calcule les DSO / DPO pondérés par les montants,
+les retards de paiement et l'encours non lettré. Traite plusieurs millions
+d'écritures en quelques secondes.
+"""
+
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+# =============================================================================
+# PARAMÈTRES
+# =============================================================================
+
+NATURES = ['client', 'fournisseur']
+DELAI_CONTRACTUEL = 30      # Jours accordés lorsque l'échéance n'est pas renseignée
+TOLERANCE = 1.0             # Écart (€) en deçà duquel une facture est considérée comme soldée
+FENETRE_JOURS = 180         # Délai maximal entre facture et règlement pour un lettrage par montant
+
+# Colonnes reconnues (en minuscules) -> colonne normalisée ; les noms FEC sont inclus
+ALIAS = {
+    'tiers': ['tiers', 'client', 'fournisseur', 'compauxnum', 'compte_auxiliaire', 'comptenum'],
+    'compte': ['compte', 'comptenum', 'compte_general'],
+    'date': ['date', 'ecrituredate', 'date_ecriture', 'date_piece', 'piecedate'],
+    'echeance': ['echeance', 'date_echeance', 'dateecheance'],
+    'reference': ['reference', 'ref', 'facture', 'numero_facture', 'ecriturelet', 'lettrage'],
+    'debit': ['debit'],
+    'credit': ['credit'],
+    'montant': ['montant'],
+    'nature': ['nature'],
+}
+
+# Retard (jours après l'échéance) des factures réglées
+TRANCHES_RETARD = [(-np.inf, 0, "À l'échéance"), (0, 15, "1-15 j"), (15, 30, "16-30 j"),
+                   (30, 60, "31-60 j"), (60, np.inf, "> 60 j")]
+
+METHODES = ['reference', 'montant', 'anteriorite']
+
+
+# =============================================================================
+# LECTURE ET NORMALISATION DES ÉCRITURES
+# =============================================================================
+
+def _montant(serie):
+    """Montants au format français ou anglais -> float"""
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie.astype(float).fillna(0.0)
+    texte = serie.astype(str).str.replace(r"[\s €]", "", regex=True).str.replace(",", ".")
+    return pd.to_numeric(texte, errors='coerce').fillna(0.0)
+
+
+def _date(serie):
+    """Dates AAAAMMJJ (FEC) ou usuelles -> datetime"""
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie
+    texte = serie.astype(str).str.strip()
+    if texte.str.fullmatch(r"\d{8}").all():
+        return pd.to_datetime(texte, format="%Y%m%d", errors='coerce')
+    # ISO (AAAA-MM-JJ) : `dayfirst` inverserait jour et mois
+    if texte[serie.notna()].str.match(r"\d{4}-\d{2}-\d{2}").all():
+        return pd.to_datetime(texte, format="ISO8601", errors='coerce')
+    return pd.to_datetime(texte, dayfirst=True, errors='coerce')
+
+
+def _colonne(brut, nom):
+    """Première colonne de `brut` correspondant à un alias de `nom`"""
+    for alias in ALIAS[nom]:
+        if alias in brut:
+            return brut[alias]
+    return None
+
+
+def normaliser_ecritures(brut, delai_contractuel=DELAI_CONTRACTUEL):
+    """
+    Convertit un export de grand livre en écritures normalisées : nature
+    (client / fournisseur), tiers, date, échéance, référence, montant positif
+    et type (facture / reglement). La nature vient de la colonne `nature` ou
+    du compte (40x fournisseurs, 41x clients) ; un avoir est traité comme un
+    règlement.
+    """
+    brut = brut.rename(columns=lambda c: str(c).strip().lower())
+    compte = _colonne(brut, 'compte')
+    compte = compte.astype(str).str.strip() if compte is not None else pd.Series("", index=brut.index)
+
+    nature = _colonne(brut, 'nature')
+    if nature is not None:
+        nature = nature.astype(str).str.strip().str.lower().str.rstrip('s')
+    else:
+        nature = pd.Series(np.select([compte.str.startswith('40'), compte.str.startswith('41')],
+                                     ['fournisseur', 'client'], ''), index=brut.index)
+        if not (nature != '').any():
+            nature[:] = 'client'  # Export sans compte : balance clients
+
+    montant = _colonne(brut, 'montant')
+    if montant is not None:
+        solde = _montant(montant)
+    else:
+        solde = _montant(_colonne(brut, 'debit')) - _montant(_colonne(brut, 'credit'))
+    # Factures au débit des clients et au crédit des fournisseurs
+    solde = solde.where(nature == 'client', -solde)
+
+    tiers = _colonne(brut, 'tiers')
+    reference = _colonne(brut, 'reference')
+    date = _date(_colonne(brut, 'date'))
+    echeance = _colonne(brut, 'echeance')
+    echeance = _date(echeance).fillna(date + pd.Timedelta(days=delai_contractuel)) if echeance is not None \
+        else date + pd.Timedelta(days=delai_contractuel)
+
+    ecritures = pd.DataFrame({
+        'nature': nature,
+        'tiers': tiers.astype(str).str.strip() if tiers is not None else compte,
+        'date': date,
+        'echeance': echeance,
+        'reference': reference.fillna("").astype(str).str.strip() if reference is not None else "",
+        'montant': solde.abs(),
+        'type': np.where(solde > 0, 'facture', 'reglement'),
+    })
+    ecritures = ecritures[ecritures['nature'].isin(NATURES) & (ecritures['montant'] > 0) & ecritures['date'].notna()]
+    ecritures['nature'] = pd.Categorical(ecritures['nature'], categories=NATURES)
+    return ecritures.reset_index(drop=True)
+
+
+def charger_grand_livre(contenu, nom_fichier, delai_contractuel=DELAI_CONTRACTUEL):
+    """Lit un export CSV / TXT (séparateur détecté, FEC compris), Excel ou Parquet et normalise les écritures"""
+    nom = nom_fichier.lower()
+    if nom.endswith('.parquet'):
+        brut = pd.read_parquet(BytesIO(contenu))
+    elif nom.endswith(('.xlsx', '.xls')):
+        brut = pd.read_excel(BytesIO(contenu))
+    else:
+        entete = contenu[:4096].decode('utf-8', errors='ignore').splitlines()[0] if contenu else ""
+        separateur = max(['\t', '|', ';', ','], key=entete.count)
+        brut = pd.read_csv(BytesIO(contenu), sep=separateur, dtype=str, encoding_errors='ignore')
+    return normaliser_ecritures(brut, delai_contractuel)
+
+
+# =============================================================================
+# LETTRAGE
+# =============================================================================
+
+def _cumul_groupe(valeurs, groupes):
+    """Somme cumulée de `valeurs` à l'intérieur de groupes contigus"""
+    cumul = np.cumsum(valeurs)
+    debut_groupe = np.r_[True, groupes[1:] != groupes[:-1]]
+    avant = np.where(debut_groupe, cumul - valeurs, 0.0)
+    return cumul - np.maximum.accumulate(avant)
+
+
+def _par_reference(f, r, tolerance):
+    """Règlements portant la référence d'une facture du même tiers"""
+    factures = f[f['cle_reference'] >= 0]
+    reglements = r[r['cle_reference'] >= 0]
+    if factures.empty or reglements.empty:
+        return
+
+    payes = reglements.groupby('cle_reference').agg(paye=('disponible', 'sum'), date_paye=('date', 'max'))
+    factures = factures.join(payes, on='cle_reference', how='inner')
+    if factures.empty:
+        return
+    factures = factures.iloc[np.lexsort((factures['date'].to_numpy(), factures['cle_reference'].to_numpy()))]
+
+    # Plusieurs factures de même référence : les règlements soldent la plus ancienne d'abord
+    reste = factures['reste'].to_numpy()
+    fin = _cumul_groupe(reste, factures['cle_reference'].to_numpy())
+    affecte = np.clip(factures['paye'].to_numpy() - (fin - reste), 0, reste)
+    f.loc[factures.index, 'reste'] = reste - affecte
+    soldees = reste - affecte <= tolerance
+    f.loc[factures.index[soldees], 'date_reglement'] = factures['date_paye'].to_numpy()[soldees]
+    f.loc[factures.index[soldees], 'methode'] = 'reference'
+
+    # Les règlements les plus anciens de chaque référence sont consommés en premier
+    consomme = pd.Series(affecte).groupby(factures['cle_reference'].to_numpy()).sum()
+    reglements = reglements.iloc[np.lexsort((reglements['date'].to_numpy(), reglements['cle_reference'].to_numpy()))]
+    deja = consomme.reindex(reglements['cle_reference'].to_numpy()).fillna(0).to_numpy()
+    cumul = _cumul_groupe(reglements['disponible'].to_numpy(), reglements['cle_reference'].to_numpy())
+    r.loc[reglements.index, 'disponible'] = np.clip(cumul - deja, 0, reglements['disponible'].to_numpy())
+
+
+def _par_montant(f, r, tolerance, fenetre_jours):
+    """Règlement du montant exact d'une facture du même tiers, dans la fenêtre de dates"""
+    ouvertes = f[f['reste'] > tolerance]
+    ouvertes = ouvertes[np.isclose(ouvertes['reste'], ouvertes['montant'])]
+    libres = r[np.isclose(r['disponible'], r['montant']) & (r['disponible'] > 0)]
+    if ouvertes.empty or libres.empty:
+        return
+
+    # Index de hachage (tiers, montant en centimes) ; la k-ième facture va avec le k-ième règlement
+    gauche = ouvertes.assign(centimes=np.round(ouvertes['reste'] * 100).astype('int64')).sort_values('date')
+    droite = libres.assign(centimes=np.round(libres['disponible'] * 100).astype('int64')).sort_values('date')
+    gauche['rang'] = gauche.groupby(['cle', 'centimes'], sort=False).cumcount()
+    droite['rang'] = droite.groupby(['cle', 'centimes'], sort=False).cumcount()
+    paires = gauche[['cle', 'centimes', 'rang', 'date']].reset_index().merge(
+        droite[['cle', 'centimes', 'rang', 'date']].reset_index(), on=['cle', 'centimes', 'rang'], suffixes=('_f', '_r')
+    )
+    ecart = (paires['date_r'] - paires['date_f']).dt.days
+    paires = paires[(ecart >= 0) & (ecart <= fenetre_jours)]
+
+    f.loc[paires['index_f'], 'reste'] = 0.0
+    f.loc[paires['index_f'], 'date_reglement'] = paires['date_r'].to_numpy()
+    f.loc[paires['index_f'], 'methode'] = 'montant'
+    r.loc[paires['index_r'], 'disponible'] = 0.0
+
+
+def _par_anteriorite(f, r, tolerance):
+    """Règlements restants imputés aux factures ouvertes les plus anciennes de chaque tiers"""
+    ouvertes = f[f['reste'] > tolerance].sort_values(['cle', 'date'])
+    libres = r[r['disponible'] > 0].sort_values(['cle', 'date'])
+    if ouvertes.empty or libres.empty:
+        return
+
+    cles_f = ouvertes['cle'].to_numpy()
+    reste = ouvertes['reste'].to_numpy()
+    fin = _cumul_groupe(reste, cles_f)
+    libres = libres.assign(cumul=_cumul_groupe(libres['disponible'].to_numpy(), libres['cle'].to_numpy()))
+    total = libres.groupby('cle')['cumul'].max()
+
+    # Facture soldée par le règlement qui fait franchir au cumul des règlements la fin de la facture
+    disponible_total = total.reindex(cles_f).fillna(0).to_numpy()
+    affecte = np.clip(disponible_total - (fin - reste), 0, reste)
+    seuils = ouvertes[['cle']].assign(seuil=fin - tolerance, position=np.arange(len(ouvertes)))
+    soldage = pd.merge_asof(
+        seuils.sort_values('seuil'), libres[['cle', 'cumul', 'date']].sort_values('cumul'),
+        left_on='seuil', right_on='cumul', by='cle', direction='forward'
+    ).sort_values('position')
+
+    f.loc[ouvertes.index, 'reste'] = reste - affecte
+    soldees = soldage['date'].notna().to_numpy()
+    f.loc[ouvertes.index[soldees], 'date_reglement'] = soldage['date'].to_numpy()[soldees]
+    f.loc[ouvertes.index[soldees], 'methode'] = 'anteriorite'
+
+    consomme = pd.Series(affecte, index=ouvertes.index).groupby(ouvertes['cle']).sum()
+    deja = consomme.reindex(libres['cle']).fillna(0).to_numpy()
+    r.loc[libres.index, 'disponible'] = np.clip(libres['cumul'].to_numpy() - deja, 0, libres['disponible'].to_numpy())
+
+
+def lettrer(ecritures, tolerance=TOLERANCE, fenetre_jours=FENETRE_JOURS):
+    """
+    Lettre les écritures normalisées. Retourne (factures, reglements) :
+    chaque facture avec son montant réglé, son reste, sa date de règlement
+    complet, son délai de paiement, son retard sur l'échéance et la méthode
+    de lettrage ; chaque règlement avec son montant non affecté.
+    """
+    ecritures = ecritures.copy()
+    # Clés entières (tiers, puis tiers et référence) : les regroupements et jointures se font sur des entiers
+    ecritures['cle'] = ecritures.groupby(['nature', 'tiers'], observed=True, sort=False).ngroup()
+    codes_reference, references = pd.factorize(ecritures['reference'].where(ecritures['reference'] != ""))
+    ecritures['cle_reference'] = np.where(codes_reference >= 0,
+                                          ecritures['cle'].to_numpy() * np.int64(len(references)) + codes_reference, -1)
+    est_facture = (ecritures['type'] == 'facture').to_numpy()
+
+    f = ecritures[est_facture].drop(columns='type').reset_index(drop=True)
+    f['reste'] = f['montant']
+    f['date_reglement'] = pd.Series(pd.NaT, index=f.index, dtype=f['date'].dtype)
+    f['methode'] = pd.Series(None, index=f.index, dtype=object)
+    r = ecritures[~est_facture].drop(columns=['type', 'echeance']).reset_index(drop=True)
+    r['disponible'] = r['montant']
+
+    _par_reference(f, r, tolerance)
+    _par_montant(f, r, tolerance, fenetre_jours)
+    _par_anteriorite(f, r, tolerance)
+
+    f['reste'] = f['reste'].where(f['reste'] > tolerance, 0.0)
+    f['regle'] = f['montant'] - f['reste']
+    f['delai_paiement'] = (f['date_reglement'] - f['date']).dt.days
+    f['retard'] = (f['date_reglement'] - f['echeance']).dt.days
+    f['methode'] = pd.Categorical(f['methode'], categories=METHODES)
+    colonnes_f = ['nature', 'tiers', 'reference', 'date', 'echeance', 'montant', 'regle', 'reste',
+                  'date_reglement', 'delai_paiement', 'retard', 'methode']
+    colonnes_r = ['nature', 'tiers', 'reference', 'date', 'montant', 'disponible']
+    return f[colonnes_f], r[colonnes_r]
+
+
+# =============================================================================
+# INDICATEURS
+# =============================================================================
+
+def _moyenne_ponderee(valeurs, poids):
+    poids = poids[valeurs.notna()]
+    return float((valeurs.dropna() * poids).sum() / poids.sum()) if poids.sum() > 0 else np.nan
+
+
+def indicateurs_delais(factures, reglements=None, date_reference=None, jours_periode=365):
+    """
+    Délais réels par nature (client : DSO, fournisseur : DPO) :
+    - delai_pondere : délai de paiement moyen des factures soldées, pondéré par les montants
+    - retard_pondere : retard moyen sur l'échéance des factures soldées
+    - part_en_retard : part (en montant) des factures soldées après l'échéance
+    - delai_encours : encours / facturation des `jours_periode` derniers jours × jours (méthode du bilan)
+    - taux_lettrage : part (en montant) des factures soldées
+    """
+    date_reference = pd.Timestamp(date_reference) if date_reference is not None else factures['date'].max()
+    lignes = []
+    for nature in NATURES:
+        fn = factures[factures['nature'] == nature]
+        if fn.empty:
+            continue
+        soldees = fn[fn['date_reglement'].notna()]
+        recentes = fn[fn['date'] > date_reference - pd.Timedelta(days=jours_periode)]
+        emises = fn[fn['date'] <= date_reference]
+        # Encours à la date de référence : les factures soldées plus tard étaient encore dues
+        encours = float(emises['montant'].where(emises['date_reglement'] > date_reference, emises['reste']).sum())
+        facture_periode = float(recentes['montant'].sum())
+        lignes.append({
+            'nature': nature,
+            'nb_factures': len(fn),
+            'montant_facture': float(fn['montant'].sum()),
+            'encours': encours,
+            'delai_pondere': _moyenne_ponderee(soldees['delai_paiement'], soldees['montant']),
+            'retard_pondere': _moyenne_ponderee(soldees['retard'].clip(lower=0), soldees['montant']),
+            'part_en_retard': float(soldees.loc[soldees['retard'] > 0, 'montant'].sum() / soldees['montant'].sum() * 100)
+            if len(soldees) else np.nan,
+            'delai_encours': encours / facture_periode * jours_periode if facture_periode > 0 else np.nan,
+            'taux_lettrage': float(soldees['montant'].sum() / fn['montant'].sum() * 100),
+            'reglements_non_affectes': float(reglements.loc[reglements['nature'] == nature, 'disponible'].sum())
+            if reglements is not None else np.nan,
+        })
+    return pd.DataFrame(lignes).set_index('nature') if lignes else pd.DataFrame()
+
+
+def distribution_retards(factures):
+    """Nombre et montant des factures soldées par tranche de retard, par nature"""
+    soldees = factures[factures['date_reglement'].notna()]
+    bornes = [TRANCHES_RETARD[0][0]] + [fin for _, fin, _ in TRANCHES_RETARD]
+    tranche = pd.cut(soldees['retard'], bornes, labels=[libelle for _, _, libelle in TRANCHES_RETARD])
+    return soldees.groupby([soldees['nature'], tranche], observed=False).agg(
+        nb=('montant', 'size'), montant=('montant', 'sum')
+    )
+
+
+def retards_par_tiers(factures, nb=20):
+    """Tiers dont les retards pèsent le plus (montant × jours de retard des factures soldées)"""
+    soldees = factures[factures['date_reglement'].notna()].assign(
+        poids=lambda df: df['montant'] * df['retard'].clip(lower=0)
+    )
+    par_tiers = soldees.groupby(['nature', 'tiers'], observed=True).agg(
+        montant=('montant', 'sum'), poids=('poids', 'sum'), nb_factures=('montant', 'size')
+    )
+    par_tiers['retard_pondere'] = par_tiers['poids'] / par_tiers['montant']
+    return par_tiers.drop(columns='poids').sort_values('retard_pondere', ascending=False).head(nb)
+
+
+# =============================================================================
+# GRAND LIVRE D'EXEMPLE
+# =============================================================================
+
+def exemple_grand_livre(nb_factures=20_000, nb_tiers=400, graine=0, debut="2024-01-01", jours=365):
+    """
+    Grand livre fictif (format générique : nature, tiers, date, echeance,
+    reference, debit, credit) mêlant règlements référencés, règlements sans
+    référence, paiements fractionnés et factures impayées.
+    """
+    rng = np.random.default_rng(graine)
+    nature = np.where(rng.random(nb_factures) < 0.55, 'client', 'fournisseur')
+    tiers = rng.integers(nb_tiers, size=nb_factures)
+    # Chaque tiers a son propre comportement de paiement (délai moyen)
+    delai_tiers = rng.gamma(4, 12, nb_tiers)
+    date = pd.Timestamp(debut) + pd.to_timedelta(rng.integers(jours, size=nb_factures), unit='D')
+    echeance = date + pd.to_timedelta(np.where(nature == 'client', 45, 60), unit='D')
+    montant = np.round(np.exp(rng.normal(7.5, 1.2, nb_factures)), 2)
+    reference = np.char.add('F', np.arange(nb_factures).astype(str))
+
+    delai = np.round(rng.normal(delai_tiers[tiers], 8)).clip(0).astype(int)
+    paiement = date + pd.to_timedelta(delai, unit='D')
+    mode = rng.choice(['reference', 'sans_reference', 'fractionne', 'impaye'], size=nb_factures, p=[0.55, 0.3, 0.1, 0.05])
+
+    factures = pd.DataFrame({'nature': nature, 'tiers': tiers, 'date': date, 'echeance': echeance,
+                             'reference': reference, 'montant': montant})
+    payes = factures[mode != 'impaye'].assign(date=paiement[mode != 'impaye'], echeance=pd.NaT)
+    # Paiements fractionnés (acompte puis solde quinze jours plus tard), sans référence
+    fractionnes = mode[mode != 'impaye'] == 'fractionne'
+    payes.loc[(mode[mode != 'impaye'] == 'sans_reference') | fractionnes, 'reference'] = ""
+    acomptes = payes[fractionnes].assign(montant=lambda df: np.round(df['montant'] * 0.4, 2),
+                                         date=lambda df: df['date'] - pd.Timedelta(days=15))
+    payes.loc[fractionnes, 'montant'] = np.round(payes.loc[fractionnes, 'montant'] * 0.6, 2)
+
+    lignes = pd.concat([factures.assign(sens=1), payes.assign(sens=-1), acomptes.assign(sens=-1)], ignore_index=True)
+    # Factures au débit des clients et au crédit des fournisseurs
+    signe = lignes['sens'] * np.where(lignes['nature'] == 'client', 1, -1)
+    lignes['debit'] = np.where(signe > 0, lignes['montant'], 0.0)
+    lignes['credit'] = np.where(signe < 0, lignes['montant'], 0.0)
+    lignes['tiers'] = np.where(lignes['nature'] == 'client', "C", "F") + lignes['tiers'].astype(str).str.zfill(4)
+    return lignes.drop(columns=['montant', 'sens']).sort_values('date', ignore_index=True)
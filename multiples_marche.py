@@ -0,0 +1,227 @@
+"""
+📊 FINANCELAB - Moteur d'évaluation par les multiples de marché
+Description: Construit un panel de sociétés comparables, récupère leurs multiples
+(EV/EBITDA, EV/Sales, P/E, P/B) en une seule passe, les met en cache et les
+applique à l'entreprise cible pour obtenir une fourchette de valorisation.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import passerelle_marche
+
+# =============================================================================
+# PARAMÈTRES
+# =============================================================================
+
+# Multiple affiché -> clé du dictionnaire `info` de yfinance
+MULTIPLES = {
+    'EV/EBITDA': 'enterpriseToEbitda',
+    'EV/Sales': 'enterpriseToRevenue',
+    'P/E': 'trailingPE',
+    'P/B': 'priceToBook',
+}
+
+# Multiples de valeur d'entreprise (les autres portent sur les capitaux propres)
+MULTIPLES_VE = ['EV/EBITDA', 'EV/Sales']
+
+# Agrégat de la cible auquel s'applique chaque multiple
+AGREGATS = {
+    'EV/EBITDA': 'ebitda',
+    'EV/Sales': 'chiffre_affaires',
+    'P/E': 'resultat_net',
+    'P/B': 'capitaux_propres',
+}
+
+# Univers de comparables par secteur (libellés `sector` de yfinance)
+UNIVERS_SECTORIEL = {
+    'Technology': ['AAPL', 'MSFT', 'NVDA', 'ORCL', 'SAP', 'CAP.PA', 'DSY.PA', 'STMPA.PA', 'IBM', 'ADBE'],
+    'Communication Services': ['GOOGL', 'META', 'NFLX', 'DIS', 'ORA.PA', 'PUB.PA', 'VIV.PA', 'TMUS'],
+    'Consumer Cyclical': ['AMZN', 'TSLA', 'MC.PA', 'KER.PA', 'RMS.PA', 'NKE', 'HD', 'RNO.PA', 'STLAP.PA'],
+    'Consumer Defensive': ['OR.PA', 'BN.PA', 'RI.PA', 'CA.PA', 'PG', 'KO', 'PEP', 'NESN.SW'],
+    'Industrials': ['AIR.PA', 'SAF.PA', 'SU.PA', 'DG.PA', 'HO.PA', 'SGO.PA', 'BA', 'GE', 'CAT'],
+    'Healthcare': ['SAN.PA', 'EL.PA', 'JNJ', 'PFE', 'MRK', 'NOVN.SW', 'ROG.SW'],
+    'Energy': ['TTE.PA', 'XOM', 'CVX', 'SHEL', 'BP', 'ENI.MI'],
+    'Financial Services': ['BNP.PA', 'GLE.PA', 'ACA.PA', 'CS.PA', 'JPM', 'BAC', 'ALV.DE'],
+    'Basic Materials': ['AI.PA', 'LIN', 'BAS.DE', 'RIO', 'BHP'],
+    'Utilities': ['ENGI.PA', 'VIE.PA', 'IBE.MC', 'ENEL.MI', 'NEE'],
+    'Real Estate': ['URW.PA', 'GFC.PA', 'LI.PA', 'PLD', 'SPG'],
+}
+
+DUREE_CACHE = 6 * 3600  # Durée de validité des multiples en cache (secondes)
+NB_THREADS = 8
+
+# Cache du processus : ticker -> (horodatage, données du comparable)
+_cache_comparables = {}
+
+
+# =============================================================================
+# RÉCUPÉRATION DES DONNÉES DES COMPARABLES
+# =============================================================================
+
+def _valeur_positive(valeur):
+    """Retourne la valeur en float si elle est finie et positive, NaN sinon"""
+    try:
+        valeur = float(valeur)
+    except (TypeError, ValueError):
+        return np.nan
+    return valeur if np.isfinite(valeur) and valeur > 0 else np.nan
+
+
+def extraire_comparable(ticker, info):
+    """Extrait d'un dictionnaire `info` les champs utiles au panel"""
+    comparable = {
+        'ticker': ticker,
+        'nom': info.get('shortName', ticker),
+        'secteur': info.get('sector'),
+        'industrie': info.get('industry'),
+        'capitalisation': _valeur_positive(info.get('marketCap')),
+    }
+    for multiple, cle in MULTIPLES.items():
+        comparable[multiple] = _valeur_positive(info.get(cle))
+    return comparable
+
+
+def _telecharger_info(ticker, forcer=False):
+    """Télécharge le dictionnaire `info` d'un ticker (vide en cas d'erreur)"""
+    try:
+        if forcer:
+            return passerelle_marche.info(ticker, fraicheur=0) or {}
+        return passerelle_marche.info(ticker) or {}
+    except passerelle_marche.SourceIndisponible:
+        return {}
+
+
+def charger_comparables(tickers, forcer=False):
+    """
+    Retourne un DataFrame des multiples des comparables.
+
+    Les tickers absents du cache (ou expirés) sont téléchargés ensemble en une
+    seule passe parallèle ; les autres sont servis depuis le cache.
+    """
+    tickers = list(dict.fromkeys(t.strip().upper() for t in tickers if t and t.strip()))
+    maintenant = time.time()
+
+    manquants = [
+        t for t in tickers
+        if forcer or t not in _cache_comparables or maintenant - _cache_comparables[t][0] > DUREE_CACHE
+    ]
+
+    if manquants:
+        with ThreadPoolExecutor(max_workers=min(NB_THREADS, len(manquants))) as executor:
+            infos = list(executor.map(_telecharger_info, manquants, [forcer] * len(manquants)))
+        for ticker, info in zip(manquants, infos):
+            if info:
+                _cache_comparables[ticker] = (maintenant, extraire_comparable(ticker, info))
+
+    lignes = [_cache_comparables[t][1] for t in tickers if t in _cache_comparables]
+    colonnes = ['ticker', 'nom', 'secteur', 'industrie', 'capitalisation'] + list(MULTIPLES)
+    return pd.DataFrame(lignes, columns=colonnes)
+
+
+def construire_panel(ticker_reference=None, mode="secteur", liste_personnalisee=None):
+    """
+    Construit la liste des comparables.
+
+    mode = "secteur"   : univers du secteur de la société de référence
+    mode = "industrie" : même univers, filtré sur l'industrie de la référence
+    mode = "liste"     : liste fournie par l'utilisateur
+    """
+    if mode == "liste":
+        return charger_comparables(liste_personnalisee or [])
+
+    reference = charger_comparables([ticker_reference])
+    if reference.empty or not reference.loc[0, 'secteur']:
+        return reference.iloc[0:0]
+
+    secteur = reference.loc[0, 'secteur']
+    univers = [t for t in UNIVERS_SECTORIEL.get(secteur, []) if t != reference.loc[0, 'ticker']]
+    panel = charger_comparables(univers)
+
+    if mode == "industrie":
+        panel = panel[panel['industrie'] == reference.loc[0, 'industrie']]
+
+    return panel.reset_index(drop=True)
+
+
+def vider_cache():
+    """Vide le cache des comparables"""
+    _cache_comparables.clear()
+
+
+# =============================================================================
+# STATISTIQUES ET VALORISATION
+# =============================================================================
+
+def statistiques_multiples(panel, coefficient_iqr=1.5):
+    """
+    Calcule pour chaque multiple : médiane, quartiles et moyenne écrêtée
+    (moyenne des valeurs comprises dans [Q1 - k×IQR ; Q3 + k×IQR]).
+    """
+    lignes = []
+    for multiple in MULTIPLES:
+        valeurs = panel[multiple].to_numpy(dtype=float) if multiple in panel else np.array([])
+        valeurs = valeurs[np.isfinite(valeurs)]
+
+        if valeurs.size == 0:
+            lignes.append({'multiple': multiple, 'nb': 0, 'q1': np.nan, 'mediane': np.nan,
+                           'q3': np.nan, 'moyenne_ecretee': np.nan})
+            continue
+
+        q1, mediane, q3 = np.percentile(valeurs, [25, 50, 75])
+        ecart = q3 - q1
+        conserves = valeurs[(valeurs >= q1 - coefficient_iqr * ecart) & (valeurs <= q3 + coefficient_iqr * ecart)]
+
+        lignes.append({
+            'multiple': multiple,
+            'nb': int(valeurs.size),
+            'q1': q1,
+            'mediane': mediane,
+            'q3': q3,
+            'moyenne_ecretee': conserves.mean() if conserves.size else mediane,
+        })
+
+    return pd.DataFrame(lignes).set_index('multiple')
+
+
+def valoriser_par_multiples(cible, statistiques, dette_nette=0.0):
+    """
+    Applique les multiples du panel aux agrégats de la cible.
+
+    `cible` contient les clés ebitda, chiffre_affaires, resultat_net et
+    capitaux_propres. Retourne un DataFrame (une ligne par multiple) avec la
+    valeur d'entreprise et la valeur des actions en bas (Q1), central
+    (médiane) et haut (Q3) de fourchette.
+    """
+    stats = statistiques.reindex(list(MULTIPLES))
+    agregats = np.array([cible.get(AGREGATS[m], np.nan) for m in stats.index], dtype=float)
+    agregats[agregats <= 0] = np.nan
+
+    niveaux = stats[['q1', 'mediane', 'q3', 'moyenne_ecretee']].to_numpy(dtype=float)
+    valeurs = niveaux * agregats[:, None]
+
+    est_ve = np.array([m in MULTIPLES_VE for m in stats.index])
+    valeur_entreprise = np.where(est_ve[:, None], valeurs, valeurs + dette_nette)
+    valeur_actions = valeur_entreprise - dette_nette
+
+    resultat = pd.DataFrame(index=stats.index)
+    resultat['agregat'] = agregats
+    for i, niveau in enumerate(['bas', 'central', 'haut', 'ecretee']):
+        resultat[f've_{niveau}'] = valeur_entreprise[:, i]
+        resultat[f'actions_{niveau}'] = valeur_actions[:, i]
+    return resultat
+
+
+def fourchette_valorisation(valorisation):
+    """Synthétise la fourchette globale de valeur des actions"""
+    valides = valorisation.dropna(subset=['actions_central'])
+    if valides.empty:
+        return None
+    return {
+        'bas': float(valides['actions_bas'].min()),
+        'central': float(valides['actions_central'].median()),
+        'haut': float(valides['actions_haut'].max()),
+    }
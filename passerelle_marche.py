@@ -0,0 +1,376 @@
+"""
+🌐 FINANCELAB - Passerelle des données de marché
+Description: Point de passage unique, pour tout le processus, des appels vers
+la source de données de marché (Yahoo Finance par défaut, voir
+fournisseurs_marche). Les requêtes identiques en vol sont fusionnées (un seul appel,
+un résultat partagé par toutes les sessions qui l'attendent), le débit est
+lissé par un seau à jetons, les échecs sont retentés avec un délai
+exponentiel, et un disjoncteur par point d'accès sert la dernière valeur
+connue tant que la source est défaillante. Une réponse vide (ticker inconnu)
+est un résultat propre à sa clé, mémorisé sans compter comme une panne de la
+source. Latences et erreurs sont comptées par point d'accès.
+"""
+
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+
+import numpy as np
+import pandas as pd
+
+import fournisseurs_marche
+
+# =============================================================================
+# PARAMÈTRES
+# =============================================================================
+
+DEBIT = 2.0                 # Appels par seconde vers la source (moyenne)
+RAFALE = 5                  # Appels autorisés d'affilée
+ATTENTE_JETON_MAX = 30.0    # Secondes d'attente maximale d'un jeton
+NB_TENTATIVES = 3           # Tentatives par appel
+DELAI_BASE = 0.5            # Secondes avant la première nouvelle tentative (doublé ensuite)
+SEUIL_DISJONCTEUR = 5       # Échecs consécutifs qui ouvrent le disjoncteur
+DELAI_REOUVERTURE = 60.0    # Secondes avant un appel d'essai, disjoncteur ouvert
+TAILLE_DERNIERES_VALEURS = 512
+TAILLE_LATENCES = 500       # Latences conservées par point d'accès pour les percentiles
+
+# Durée (secondes) pendant laquelle une valeur obtenue est resservie sans appel
+FRAICHEUR = {'historique': 15 * 60, 'info': 6 * 3600, 'etats': 3600, 'cours': 15 * 60}
+
+FERME, OUVERT, SEMI_OUVERT = "ferme", "ouvert", "semi_ouvert"
+
+
+class SourceIndisponible(Exception):
+    """La source a échoué (ou le disjoncteur est ouvert) et aucune valeur connue n'est disponible"""
+
+
+class DonneesAbsentes(SourceIndisponible, fournisseurs_marche.DonneesAbsentes):
+    """La source répond mais n'a aucune donnée pour cette clé (ticker mal saisi, fixture absente...)"""
+
+
+# =============================================================================
+# BRIQUES : SEAU À JETONS, DISJONCTEUR, COMPTEURS
+# =============================================================================
+
+class SeauJetons:
+    """Limiteur de débit : `debit` jetons par seconde, au plus `capacite` en réserve"""
+
+    def __init__(self, debit=DEBIT, capacite=RAFALE):
+        self.debit = debit
+        self.capacite = capacite
+        self._jetons = float(capacite)
+        self._derniere_recharge = time.monotonic()
+        self._verrou = threading.Lock()
+
+    def prendre(self, attente_max=ATTENTE_JETON_MAX):
+        """Prend un jeton en attendant au besoin ; False si l'attente dépasserait `attente_max`"""
+        limite = time.monotonic() + attente_max
+        while True:
+            with self._verrou:
+                maintenant = time.monotonic()
+                self._jetons = min(self.capacite, self._jetons + (maintenant - self._derniere_recharge) * self.debit)
+                self._derniere_recharge = maintenant
+                if self._jetons >= 1:
+                    self._jetons -= 1
+                    return True
+                attente = (1 - self._jetons) / self.debit
+            if maintenant + attente > limite:
+                return False
+            time.sleep(attente)
+
+
+class Disjoncteur:
+    """
+    Fermé : les appels passent. Ouvert après `seuil` échecs consécutifs : les
+    appels sont refusés pendant `delai` secondes, puis un seul appel d'essai
+    (semi-ouvert) décide de la refermeture.
+    """
+
+    def __init__(self, seuil=SEUIL_DISJONCTEUR, delai=DELAI_REOUVERTURE):
+        self.seuil = seuil
+        self.delai = delai
+        self.etat = FERME
+        self.echecs = 0
+        self._ouverture = 0.0
+        self._verrou = threading.Lock()
+
+    def autorise(self):
+        with self._verrou:
+            if self.etat == OUVERT and time.monotonic() - self._ouverture >= self.delai:
+                self.etat = SEMI_OUVERT
+                return True  # Appel d'essai
+            return self.etat == FERME
+
+    def succes(self):
+        with self._verrou:
+            self.etat, self.echecs = FERME, 0
+
+    def abandon(self):
+        """L'appel autorisé n'a pas eu lieu : un appel d'essai non effectué est rendu"""
+        with self._verrou:
+            if self.etat == SEMI_OUVERT:
+                self.etat = OUVERT  # Délai déjà écoulé : le prochain appel sera l'essai
+
+    def echec(self):
+        with self._verrou:
+            self.echecs += 1
+            if self.etat == SEMI_OUVERT or self.echecs >= self.seuil:
+                self.etat, self._ouverture = OUVERT, time.monotonic()
+
+
+class Compteurs:
+    """Compteurs et latences d'un point d'accès"""
+
+    def __init__(self):
+        self.appels = 0          # Demandes reçues
+        self.source = 0          # Appels effectivement envoyés à la source (tentatives comprises)
+        self.erreurs = 0         # Tentatives en échec
+        self.fusionnees = 0      # Demandes servies par un appel identique déjà en vol
+        self.cache = 0           # Demandes servies par une valeur encore fraîche
+        self.perimees = 0        # Demandes servies par une valeur périmée (source défaillante)
+        self.absentes = 0        # Demandes sans donnée pour leur clé (réponse vide de la source)
+        self.rejets = 0          # Demandes refusées par le disjoncteur ou le limiteur
+        self.latences = deque(maxlen=TAILLE_LATENCES)
+
+
+# =============================================================================
+# PASSERELLE
+# =============================================================================
+
+class PasserelleMarche:
+    """Appels vers la source partagés par toutes les sessions du processus"""
+
+    def __init__(self, debit=DEBIT, rafale=RAFALE, nb_tentatives=NB_TENTATIVES, delai_base=DELAI_BASE,
+                 seuil_disjoncteur=SEUIL_DISJONCTEUR, delai_reouverture=DELAI_REOUVERTURE):
+        self.limiteur = SeauJetons(debit, rafale) if debit else None
+        self.nb_tentatives = nb_tentatives
+        self.delai_base = delai_base
+        self._parametres_disjoncteur = (seuil_disjoncteur, delai_reouverture)
+        self._disjoncteurs = {}
+        self._compteurs = {}
+        self._en_vol = {}                    # clé -> Future partagé par les demandes identiques
+        self._valeurs = OrderedDict()        # clé -> (horodatage, valeur), du moins au plus récent
+        self._absentes = OrderedDict()       # clé -> horodatage de la dernière réponse vide
+        self._verrou = threading.Lock()
+
+    def _point_acces(self, point_acces):
+        with self._verrou:
+            if point_acces not in self._compteurs:
+                self._compteurs[point_acces] = Compteurs()
+                self._disjoncteurs[point_acces] = Disjoncteur(*self._parametres_disjoncteur)
+            return self._compteurs[point_acces], self._disjoncteurs[point_acces]
+
+    def _derniere_valeur(self, cle):
+        with self._verrou:
+            if cle in self._valeurs:
+                self._valeurs.move_to_end(cle)
+                return self._valeurs[cle]
+            return None
+
+    def _memoriser(self, cle, valeur):
+        with self._verrou:
+            self._valeurs[cle] = (time.time(), valeur)
+            self._valeurs.move_to_end(cle)
+            while len(self._valeurs) > TAILLE_DERNIERES_VALEURS:
+                self._valeurs.popitem(last=False)
+            self._absentes.pop(cle, None)
+
+    def _memoriser_absence(self, cle):
+        with self._verrou:
+            self._absentes[cle] = time.time()
+            self._absentes.move_to_end(cle)
+            while len(self._absentes) > TAILLE_DERNIERES_VALEURS:
+                self._absentes.popitem(last=False)
+
+    def _absence_recente(self, cle, fraicheur):
+        with self._verrou:
+            horodatage = self._absentes.get(cle)
+        return horodatage is not None and time.time() - horodatage < fraicheur
+
+    def appeler(self, point_acces, cle, fonction, *args, fraicheur=0, valide=None, **kwargs):
+        """
+        Obtient `fonction(*args, **kwargs)` pour la clé `cle` :
+        valeur fraîche connue, sinon appel déjà en vol pour la même clé, sinon
+        nouvel appel limité, retenté et protégé par le disjoncteur du point
+        d'accès. En cas d'échec, la dernière valeur connue est servie ; à
+        défaut, SourceIndisponible est levée. `valide(resultat)` rejette les
+        réponses vides que la source renvoie au lieu d'une erreur : elles lèvent
+        DonneesAbsentes, sont mémorisées pour la clé pendant `fraicheur` et ne
+        comptent pas comme un échec du disjoncteur.
+        """
+        compteurs, disjoncteur = self._point_acces(point_acces)
+        compteurs.appels += 1
+
+        connue = self._derniere_valeur(cle)
+        if connue is not None and time.time() - connue[0] < fraicheur:
+            compteurs.cache += 1
+            return connue[1]
+        if self._absence_recente(cle, fraicheur):
+            compteurs.absentes += 1
+            raise DonneesAbsentes(f"{point_acces} : aucune donnée pour {cle}")
+
+        with self._verrou:
+            vol = self._en_vol.get(cle)
+            meneur = vol is None
+            if meneur:
+                vol = self._en_vol[cle] = Future()
+        if not meneur:
+            compteurs.fusionnees += 1
+            return vol.result()
+
+        try:
+            resultat = self._executer(compteurs, disjoncteur, fonction, args, kwargs, valide)
+            self._memoriser(cle, resultat)
+        except Exception as e:
+            if isinstance(e, DonneesAbsentes):
+                compteurs.absentes += 1
+                self._memoriser_absence(cle)
+            connue = self._derniere_valeur(cle)
+            if connue is not None:
+                compteurs.perimees += 1
+                resultat = connue[1]
+            else:
+                erreur = e if isinstance(e, SourceIndisponible) else SourceIndisponible(f"{point_acces} : {e}")
+                vol.set_exception(erreur)
+                raise erreur from e
+        finally:
+            with self._verrou:
+                self._en_vol.pop(cle, None)
+        vol.set_result(resultat)
+        return resultat
+
+    def _executer(self, compteurs, disjoncteur, fonction, args, kwargs, valide):
+        """Appel à la source avec limiteur, nouvelles tentatives et disjoncteur"""
+        derniere_erreur = None
+        for tentative in range(self.nb_tentatives):
+            if not disjoncteur.autorise():
+                compteurs.rejets += 1
+                raise SourceIndisponible("disjoncteur ouvert")
+            if self.limiteur is not None and not self.limiteur.prendre():
+                disjoncteur.abandon()
+                compteurs.rejets += 1
+                raise SourceIndisponible("débit maximal atteint")
+
+            compteurs.source += 1
+            debut = time.perf_counter()
+            try:
+                resultat = fonction(*args, **kwargs)
+            except fournisseurs_marche.DonneesAbsentes as e:
+                # La source a répondu : pas de panne, pas de nouvelle tentative
+                compteurs.latences.append(time.perf_counter() - debut)
+                disjoncteur.succes()
+                if isinstance(e, DonneesAbsentes):
+                    raise
+                raise DonneesAbsentes(str(e)) from e
+            except Exception as e:
+                compteurs.latences.append(time.perf_counter() - debut)
+                compteurs.erreurs += 1
+                disjoncteur.echec()
+                derniere_erreur = e
+                if tentative + 1 < self.nb_tentatives:
+                    # Délai exponentiel avec gigue pour désynchroniser les sessions
+                    time.sleep(self.delai_base * 2 ** tentative * (1 + random.random()))
+                continue
+            compteurs.latences.append(time.perf_counter() - debut)
+            disjoncteur.succes()
+            if valide is not None and not valide(resultat):
+                raise DonneesAbsentes("réponse vide")
+            return resultat
+        raise derniere_erreur
+
+    def vider(self):
+        """Oublie les valeurs connues (changement de source)"""
+        with self._verrou:
+            self._valeurs.clear()
+            self._absentes.clear()
+
+    def metriques(self):
+        """Compteurs, latences (ms) et état du disjoncteur de chaque point d'accès"""
+        lignes = []
+        with self._verrou:
+            points = list(self._compteurs.items())
+        for point_acces, c in points:
+            latences = np.array(c.latences) * 1000
+            lignes.append({
+                'point_acces': point_acces,
+                'appels': c.appels,
+                'source': c.source,
+                'erreurs': c.erreurs,
+                'fusionnees': c.fusionnees,
+                'cache': c.cache,
+                'perimees': c.perimees,
+                'absentes': c.absentes,
+                'rejets': c.rejets,
+                'latence_p50_ms': float(np.percentile(latences, 50)) if latences.size else np.nan,
+                'latence_p95_ms': float(np.percentile(latences, 95)) if latences.size else np.nan,
+                'disjoncteur': self._disjoncteurs[point_acces].etat,
+            })
+        return pd.DataFrame(lignes, columns=[
+            'point_acces', 'appels', 'source', 'erreurs', 'fusionnees', 'cache', 'perimees', 'absentes', 'rejets',
+            'latence_p50_ms', 'latence_p95_ms', 'disjoncteur'
+        ])
+
+
+# Source active et instance unique du processus : toutes les sessions Streamlit et tous les modules les partagent
+FOURNISSEUR = fournisseurs_marche.depuis_configuration()
+PASSERELLE = PasserelleMarche(FOURNISSEUR.debit, FOURNISSEUR.rafale)
+
+
+def definir_fournisseur(fournisseur):
+    """Remplace la source de données (rejeu, synthétique...) et adapte le limiteur à son débit"""
+    global FOURNISSEUR
+    FOURNISSEUR = fournisseur
+    PASSERELLE.limiteur = SeauJetons(fournisseur.debit, fournisseur.rafale) if fournisseur.debit else None
+    PASSERELLE.vider()
+
+
+# =============================================================================
+# POINTS D'ACCÈS
+# =============================================================================
+
+def _non_vide(resultat):
+    return resultat is not None and len(resultat) > 0
+
+
+def historique(ticker, periode="1y", fraicheur=FRAICHEUR['historique']):
+    """Historique de cours d'un ticker (`Ticker.history`)"""
+    ticker = ticker.strip().upper()
+    return PASSERELLE.appeler(
+        'historique', ('historique', ticker, periode),
+        lambda: FOURNISSEUR.historique(ticker, periode),
+        fraicheur=fraicheur, valide=_non_vide
+    )
+
+
+def info(ticker, fraicheur=FRAICHEUR['info']):
+    """Dictionnaire `info` d'un ticker"""
+    ticker = ticker.strip().upper()
+    return PASSERELLE.appeler(
+        'info', ('info', ticker), lambda: FOURNISSEUR.info(ticker),
+        fraicheur=fraicheur, valide=_non_vide
+    )
+
+
+def cours_cloture(tickers, periode="1y"):
+    """Cours de clôture ajustés de plusieurs tickers en un seul appel"""
+    tickers = sorted({t.strip().upper() for t in tickers})
+    return PASSERELLE.appeler(
+        'cours', ('cours', tuple(tickers), periode), lambda: FOURNISSEUR.cours_cloture(tickers, periode),
+        fraicheur=FRAICHEUR['cours'], valide=lambda cloture: not cloture.dropna(how='all').empty
+    )
+
+
+def etats(ticker, frequence='annuel', fraicheur=FRAICHEUR['etats']):
+    """États financiers bruts d'un ticker (au moins un état non vide)"""
+    ticker = ticker.strip().upper()
+    return PASSERELLE.appeler(
+        'etats', ('etats', ticker, frequence), lambda: FOURNISSEUR.etats(ticker, frequence),
+        fraicheur=fraicheur,
+        valide=lambda etats: any(not etats[nom].empty for nom in ('resultat', 'bilan', 'flux'))
+    )
+
+
+def metriques():
+    return PASSERELLE.metriques()
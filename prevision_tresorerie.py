@@ -0,0 +1,253 @@
+"""
+📆 FINANCELAB - Prévision de trésorerie à 13 semaines
+Description: Projette semaine par semaine la trésorerie à partir des factures
+clients et fournisseurs ouvertes (encaissées selon le retard de paiement
+historique de chaque tiers), de la paie et des charges sociales, du
+calendrier fiscal (TVA, acomptes d'impôt sur les sociétés), des échéances
+d'emprunt et des flux récurrents. Chaque source est un vecteur hebdomadaire
+recalculé seulement quand ses hypothèses changent, et le solde n'est
+recalculé qu'à partir de la première semaine modifiée.
+"""
+
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+# =============================================================================
+# PARAMÈTRES
+# =============================================================================
+
+NB_SEMAINES = 13
+FREQUENCES = ['hebdomadaire', 'mensuel', 'trimestriel']
+MOIS_ACOMPTES_IS = [3, 6, 9, 12]   # Acomptes d'impôt sur les sociétés, le 15 du mois
+
+# Catégorie de chaque source (ordre d'affichage)
+CATEGORIES = {
+    'encaissements_clients': "Encaissements clients",
+    'fournisseurs': "Fournisseurs",
+    'salaires': "Salaires",
+    'charges_sociales': "Charges sociales",
+    'tva': "TVA",
+    'impot_societes': "Impôt sur les sociétés",
+    'emprunts': "Échéances d'emprunts",
+}
+
+
+# =============================================================================
+# RETARDS DE PAIEMENT HISTORIQUES
+# =============================================================================
+
+def retards_historiques(factures):
+    """
+    Retard moyen (jours après l'échéance, négatif si payé en avance) de
+    chaque tiers, pondéré par les montants des factures soldées d'un lettrage.
+    """
+    soldees = factures[factures['date_reglement'].notna()]
+    poids = soldees['montant'] * soldees['retard']
+    groupes = [soldees['nature'], soldees['tiers']]
+    return (poids.groupby(groupes, observed=True).sum()
+            / soldees['montant'].groupby(groupes, observed=True).sum()).rename('retard')
+
+
+def dates_paiement_prevues(ouvertes, retards=None, retard_defaut=0.0):
+    """
+    Date de paiement attendue des pièces ouvertes : échéance décalée du
+    retard historique du tiers (ou du retard par défaut pour un tiers sans
+    historique).
+    """
+    if retards is not None and len(retards):
+        cles = pd.MultiIndex.from_arrays([ouvertes['nature'].astype(str), ouvertes['tiers'].astype(str)])
+        retards = retards.copy()
+        retards.index = pd.MultiIndex.from_arrays([retards.index.get_level_values(0).astype(str),
+                                                   retards.index.get_level_values(1).astype(str)])
+        retard = retards.reindex(cles).fillna(retard_defaut).to_numpy()
+    else:
+        retard = np.full(len(ouvertes), float(retard_defaut))
+    return pd.DatetimeIndex(ouvertes['echeance']) + pd.to_timedelta(np.round(retard), unit='D')
+
+
+def empreinte(donnees):
+    """
+    Empreinte du contenu d'un DataFrame ou d'une Series (None si absent) :
+    deux tables de même contenu ont la même empreinte, quel que soit l'objet.
+    """
+    if donnees is None:
+        return None
+    hachage = hashlib.sha1(pd.util.hash_pandas_object(donnees).to_numpy().tobytes())
+    noms = list(donnees.columns) if isinstance(donnees, pd.DataFrame) else [donnees.name]
+    hachage.update(repr(noms).encode())
+    return hachage.hexdigest()
+
+
+# =============================================================================
+# PRÉVISION
+# =============================================================================
+
+class PrevisionTresorerie:
+    """
+    Trésorerie prévisionnelle sur `nb_semaines` semaines (lundi au dimanche)
+    à partir de la semaine de `debut`. Encaissements positifs, décaissements
+    négatifs.
+    """
+
+    def __init__(self, debut, tresorerie_initiale=0.0, nb_semaines=NB_SEMAINES):
+        self.debut = pd.Timestamp(debut).normalize() - pd.Timedelta(days=pd.Timestamp(debut).weekday())
+        self.semaines = pd.date_range(self.debut, periods=nb_semaines, freq='W-MON')
+        self.tresorerie_initiale = float(tresorerie_initiale)
+        self._flux = {}          # source -> montants hebdomadaires
+        self._cles = {}          # source -> hypothèses du dernier calcul
+        self._net = np.zeros(nb_semaines)
+        self._solde = np.full(nb_semaines, self.tresorerie_initiale)
+        self.derniere_mise_a_jour = (None, 0)   # (source, nombre de semaines recalculées)
+
+    @property
+    def fin(self):
+        """Lendemain du dernier jour de l'horizon"""
+        return self.debut + pd.Timedelta(weeks=len(self.semaines))
+
+    def _par_semaine(self, dates, montants, retard_en_semaine_1=False):
+        """
+        Montants ventilés par semaine. Les dates antérieures au début sont
+        ignorées, ou reportées en première semaine (`retard_en_semaine_1`,
+        pour les pièces en retard qui restent dues) ; celles au-delà de
+        l'horizon sont ignorées.
+        """
+        jours = (pd.DatetimeIndex(dates) - self.debut).days.to_numpy()
+        semaine = np.floor_divide(jours, 7)
+        if retard_en_semaine_1:
+            semaine = np.maximum(semaine, 0)
+        dans_horizon = (semaine >= 0) & (semaine < len(self.semaines))
+        return np.bincount(semaine[dans_horizon], weights=np.asarray(montants, dtype=float)[dans_horizon],
+                           minlength=len(self.semaines))
+
+    def _dates_mensuelles(self, jour, mois=None, decalage_mois=0):
+        """Dates du `jour` de chaque mois couvert par l'horizon (mois éventuellement filtrés)"""
+        debut_mois = pd.date_range(self.debut - pd.offsets.MonthBegin(1), self.fin, freq='MS') + pd.DateOffset(months=decalage_mois)
+        if mois is not None:
+            debut_mois = debut_mois[debut_mois.month.isin(mois)]
+        fin_mois = debut_mois + pd.offsets.MonthEnd(0)
+        return pd.DatetimeIndex(np.minimum(debut_mois + pd.Timedelta(days=jour - 1), fin_mois))
+
+    def _mensuel(self, montant, jour, mois=None, decalage_mois=0):
+        """Montant versé le `jour` de chaque mois de l'horizon, ventilé par semaine"""
+        dates = self._dates_mensuelles(jour, mois, decalage_mois)
+        return self._par_semaine(dates, np.full(len(dates), float(montant)))
+
+    def definir(self, source, vecteur, cle=None):
+        """
+        Remplace les montants hebdomadaires d'une source. Seules les semaines
+        à partir du premier écart sont recalculées dans le solde. Retourne le
+        nombre de semaines recalculées.
+        """
+        vecteur = np.asarray(vecteur, dtype=float)
+        ecart = vecteur - self._flux.get(source, 0.0)
+        self._flux[source] = vecteur
+        self._cles[source] = cle
+        modifiees = np.flatnonzero(~np.isclose(ecart, 0))
+        if modifiees.size == 0:
+            self.derniere_mise_a_jour = (source, 0)
+            return 0
+
+        premiere = modifiees[0]
+        self._net[premiere:] += ecart[premiere:]
+        precedent = self._solde[premiere - 1] if premiere > 0 else self.tresorerie_initiale
+        self._solde[premiere:] = precedent + np.cumsum(self._net[premiere:])
+        self.derniere_mise_a_jour = (source, len(self.semaines) - premiere)
+        return len(self.semaines) - premiere
+
+    def _mettre_a_jour(self, source, cle, calcul):
+        """Recalcule une source seulement si ses hypothèses (`cle`) ont changé"""
+        if source in self._cles and self._cles[source] == cle:
+            self.derniere_mise_a_jour = (source, 0)
+            return 0
+        return self.definir(source, calcul(), cle)
+
+    def supprimer(self, source):
+        """Retire une source de la prévision"""
+        if source in self._flux:
+            self.definir(source, np.zeros(len(self.semaines)))
+            del self._flux[source], self._cles[source]
+
+    def modifier_tresorerie_initiale(self, montant):
+        """Change la trésorerie d'ouverture (décale tout le solde)"""
+        self._solde += float(montant) - self.tresorerie_initiale
+        self.tresorerie_initiale = float(montant)
+
+    # -------------------------------------------------------------------------
+    # Sources
+    # -------------------------------------------------------------------------
+
+    def pieces_ouvertes(self, source, ouvertes, retards=None, retard_defaut=0.0, signe=1):
+        """
+        Factures ouvertes (nature, tiers, echeance, montant) payées à
+        l'échéance décalée du retard historique de chaque tiers ; les pièces
+        déjà en retard sont attendues en première semaine.
+        """
+        cle = (empreinte(ouvertes), empreinte(retards), float(retard_defaut), signe)
+
+        def calcul():
+            dates = dates_paiement_prevues(ouvertes, retards, retard_defaut)
+            return signe * self._par_semaine(dates, ouvertes['montant'].to_numpy(), retard_en_semaine_1=True)
+
+        return self._mettre_a_jour(source, cle, calcul)
+
+    def encaissements_clients(self, ouvertes, retards=None, retard_defaut=0.0):
+        return self.pieces_ouvertes('encaissements_clients', ouvertes, retards, retard_defaut, 1)
+
+    def fournisseurs(self, ouvertes, retards=None, retard_defaut=0.0):
+        return self.pieces_ouvertes('fournisseurs', ouvertes, retards, retard_defaut, -1)
+
+    def paie(self, salaires_nets, jour_paie=28, taux_charges=0.45, jour_charges=15):
+        """Salaires nets mensuels versés le `jour_paie`, charges sociales payées le `jour_charges` du mois suivant"""
+        nb = self._mettre_a_jour('salaires', (float(salaires_nets), jour_paie),
+                                 lambda: -self._mensuel(salaires_nets, jour_paie))
+        return max(nb, self._mettre_a_jour('charges_sociales', (float(salaires_nets), float(taux_charges), jour_charges),
+                                           lambda: -self._mensuel(salaires_nets * taux_charges, jour_charges, decalage_mois=1)))
+
+    def fiscalite(self, tva_mensuelle=0.0, jour_tva=24, acompte_is=0.0):
+        """TVA nette payée chaque mois le `jour_tva`, acomptes d'IS le 15 des mois de MOIS_ACOMPTES_IS"""
+        nb = self._mettre_a_jour('tva', (float(tva_mensuelle), jour_tva),
+                                 lambda: -self._mensuel(tva_mensuelle, jour_tva))
+        return max(nb, self._mettre_a_jour('impot_societes', float(acompte_is),
+                                           lambda: -self._mensuel(acompte_is, 15, MOIS_ACOMPTES_IS)))
+
+    def emprunts(self, echeances):
+        """Échéancier d'emprunts : DataFrame (date, montant) des annuités ou mensualités à payer"""
+        return self._mettre_a_jour(
+            'emprunts', empreinte(echeances),
+            lambda: -self._par_semaine(echeances['date'], echeances['montant'].to_numpy())
+        )
+
+    def recurrent(self, libelle, montant, frequence='mensuel', jour=1):
+        """Flux récurrent (loyer, abonnement, redevance...) : positif pour une recette, négatif pour une dépense"""
+        def calcul():
+            if frequence == 'hebdomadaire':
+                dates = self.semaines + pd.Timedelta(days=jour - 1)
+                return self._par_semaine(dates, np.full(len(dates), float(montant)))
+            return self._mensuel(montant, jour, [1, 4, 7, 10] if frequence == 'trimestriel' else None)
+
+        return self._mettre_a_jour(libelle, (float(montant), frequence, jour), calcul)
+
+    # -------------------------------------------------------------------------
+    # Résultats
+    # -------------------------------------------------------------------------
+
+    def tableau(self):
+        """Flux par source et par semaine, flux net et solde de fin de semaine"""
+        tableau = pd.DataFrame(
+            {CATEGORIES.get(source, source): flux for source, flux in self._flux.items()},
+            index=pd.Index(self.semaines, name='semaine')
+        )
+        tableau['Flux net'] = self._net
+        tableau['Trésorerie fin de semaine'] = self._solde
+        return tableau
+
+    def alertes(self, seuil=0.0):
+        """Semaines dont le solde passe sous `seuil` (découvert ou trésorerie minimale)"""
+        return pd.Series(self._solde, index=self.semaines)[self._solde < seuil]
+
+    def point_bas(self):
+        """Semaine et montant du solde le plus bas de l'horizon"""
+        position = int(np.argmin(self._solde))
+        return self.semaines[position], float(self._solde[position])
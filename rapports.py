@@ -0,0 +1,664 @@
+"""
+📑 FINANCELAB - Rapports de diagnostic
+Description: Produit le rapport de diagnostic complet d'une entreprise (bilan,
+SIG, ratios, équilibre financier, score de défaillance) en HTML autonome et en
+PDF, graphiques compris : SVG dans le HTML, tracés vectoriels dans le PDF, sans
+navigateur ni moteur de rendu externe. Un portefeuille entier est rendu en
+parallèle dans un pool de processus ; chaque section rendue est conservée sur
+disque sous l'empreinte de ses données, si bien qu'une section inchangée n'est
+pas recalculée d'une génération à l'autre.
+"""
+
+import hashlib
+import html
+import json
+import multiprocessing
+import os
+import re
+import zipfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+import calculs_financiers
+import series_temporelles
+
+# =============================================================================
+# PARAMÈTRES
+# =============================================================================
+
+CHEMIN_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "donnees", "cache_rapports")
+VERSION_GABARIT = "1"  # À incrémenter à chaque changement de mise en page (invalide le cache)
+
+FORMATS = ('html', 'pdf')
+MIME = {'html': "text/html", 'pdf': "application/pdf"}
+
+SECTIONS = {
+    'synthese': "Synthèse",
+    'bilan': "Bilan",
+    'sig': "Soldes intermédiaires de gestion",
+    'ratios': "Ratios",
+    'equilibre': "Équilibre financier",
+    'score': "Score de défaillance",
+}
+
+COULEURS = {'positif': "#2ca02c", 'negatif': "#d62728", 'actif': "#1f77b4", 'passif': "#ff7f0e", 'neutre': "#7f7f7f"}
+
+LIBELLES = {
+    'actif_immobilise': "Actif immobilisé", 'stocks': "Stocks", 'clients': "Créances clients",
+    'disponibilites': "Disponibilités", 'capital': "Capital", 'reserves': "Réserves",
+    'resultat_net': "Résultat net", 'dettes_lt': "Dettes à long terme", 'dettes_ct': "Dettes à court terme",
+    'concours_bancaires': "dont concours bancaires",
+    'chiffre_affaires': "Chiffre d'affaires", 'achats': "Achats consommés", 'charges_personnel': "Charges de personnel",
+    'autres_charges': "Autres charges externes", 'dotations': "Dotations aux amortissements",
+    'charges_financieres': "Charges financières", 'variation_bfr': "Variation du BFR",
+    'acquisitions': "Acquisitions d'immobilisations", 'emprunts': "Nouveaux emprunts",
+    'remboursements': "Remboursements d'emprunts",
+    'roe': "ROE (%)", 'roa': "ROA (%)", 'ros': "ROS (%)", 'marge_ebit': "Marge d'exploitation (%)",
+    'endettement': "Ratio d'endettement", 'autonomie_financiere': "Autonomie financière (%)",
+    'couverture_immobilisations': "Couverture des immobilisations", 'delai_clients': "Délai clients (jours)",
+    'delai_stocks': "Délai stocks (jours)", 'delai_fournisseurs': "Délai fournisseurs (jours)",
+    'liquidite_generale': "Liquidité générale", 'liquidite_reduite': "Liquidité réduite",
+    'liquidite_immediate': "Liquidité immédiate",
+}
+
+# Entreprise d'exemple (k€) : bilan équilibré, sorties de trésorerie en négatif
+EXEMPLE = {
+    'actif_immobilise': 1200, 'stocks': 300, 'clients': 450, 'disponibilites': 150,
+    'capital': 500, 'reserves': 400, 'resultat_net': 120, 'dettes_lt': 600, 'dettes_ct': 480, 'concours_bancaires': 60,
+    'chiffre_affaires': 3000, 'achats': 1500, 'charges_personnel': 700, 'autres_charges': 450,
+    'dotations': 120, 'charges_financieres': 40,
+    'variation_bfr': -30, 'acquisitions': -200, 'emprunts': 150, 'remboursements': -100,
+}
+
+
+# =============================================================================
+# DONNÉES DES RAPPORTS
+# =============================================================================
+
+def _montant(valeur):
+    return "n.d." if not np.isfinite(valeur) else f"{valeur:,.0f} k€".replace(",", " ")
+
+
+def _pourcentage(valeur):
+    return "n.d." if not np.isfinite(valeur) else f"{valeur:.1f} %"
+
+
+def _nombre(valeur):
+    return "n.d." if not np.isfinite(valeur) else f"{valeur:.2f}"
+
+
+def _exercice(exercice):
+    if pd.isna(exercice):
+        return "n.d."
+    if isinstance(exercice, (float, np.floating)) and float(exercice).is_integer():
+        return f"{exercice:.0f}"
+    return str(exercice)
+
+
+def _ton(valeur):
+    return None if not np.isfinite(valeur) else 'positif' if valeur >= 0 else 'negatif'
+
+
+def _barres(titre, libelles, valeurs, couleurs=None, format_valeur=_montant):
+    """Spécification d'un diagramme en barres (couleur selon le signe par défaut)"""
+    valeurs = [float(v) if np.isfinite(v) else 0.0 for v in valeurs]
+    return {
+        'titre': titre,
+        'libelles': list(libelles),
+        'valeurs': valeurs,
+        'etiquettes': [format_valeur(v) for v in valeurs],
+        'couleurs': list(couleurs) if couleurs else [COULEURS[_ton(v)] for v in valeurs],
+    }
+
+
+def _ratios(postes):
+    """Ratios de series_temporelles à partir des postes de calculs_financiers"""
+    capitaux_propres = postes['capital'] + postes['reserves'] + postes['resultat_net']
+    actif_circulant = postes['stocks'] + postes['clients'] + postes['disponibilites']
+    equivalents = postes.assign(
+        capitaux_propres=capitaux_propres,
+        actif_circulant=actif_circulant,
+        total_actif=postes['actif_immobilise'] + actif_circulant,
+        dettes_financieres=postes['dettes_lt'],
+    )
+    return series_temporelles.calculer_indicateurs(equivalents)[series_temporelles.INDICATEURS_RATIOS]
+
+
+def preparer_rapports(postes):
+    """
+    Données de chaque rapport, calculées en une passe vectorisée pour tout le
+    portefeuille : `postes` contient une ligne par entreprise, indexée par son
+    nom, une colonne par poste de calculs_financiers.POSTES (k€) et
+    éventuellement une colonne `exercice`. Retourne {entreprise: {section: données}}.
+    """
+    if postes.index.has_duplicates:
+        raise ValueError("Une seule ligne par entreprise est attendue")
+    exercices = postes['exercice'] if 'exercice' in postes else pd.Series(None, index=postes.index)
+    # Postes manquants inconnus pour le diagnostic (contrôles ignorés), nuls pour le score
+    diagnostics = calculs_financiers.diagnostic_complet(postes)
+    postes = postes.reindex(columns=calculs_financiers.POSTES).astype(float).fillna(0.0)
+    ratios = _ratios(postes)
+    capitaux_propres = postes['capital'] + postes['reserves'] + postes['resultat_net']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        realisable_disponible = np.where(
+            diagnostics['total_actif'] > 0,
+            (postes['clients'] + postes['disponibilites']) / diagnostics['total_actif'], 0.0
+        )
+    scores = pd.DataFrame(calculs_financiers.score_conan_holder(
+        diagnostics['ebe'], postes['dettes_lt'] + postes['dettes_ct'], capitaux_propres + postes['dettes_lt'],
+        diagnostics['total_actif'], postes['charges_financieres'], postes['chiffre_affaires'],
+        postes['charges_personnel'], diagnostics['valeur_ajoutee'], realisable_disponible
+    ), index=postes.index)
+
+    return {
+        entreprise: _sections(postes.loc[entreprise], diagnostics.loc[entreprise], ratios.loc[entreprise],
+                              scores.loc[entreprise], exercices.loc[entreprise])
+        for entreprise in postes.index
+    }
+
+
+def _sections(p, d, r, s, exercice):
+    """Données (tableaux, listes et graphiques) des sections du rapport d'une entreprise"""
+    points_forts = [point for point in d['points_forts'].split(" ; ") if point]
+    points_vigilance = [point for point in d['points_vigilance'].split(" ; ") if point]
+    situation = {'saine': "Saine", 'a_surveiller': "À surveiller", 'risquee': "Risquée"}[s['situation']]
+    ton_score = {'saine': 'positif', 'a_surveiller': None, 'risquee': 'negatif'}[s['situation']]
+    niveaux = {'bon': 'positif', 'acceptable': None, 'faible': 'negatif', 'n.d.': None}
+
+    synthese = {
+        'tableau': [
+            ["Exercice", _exercice(exercice), None],
+            ["Chiffre d'affaires", _montant(p['chiffre_affaires']), None],
+            ["Excédent brut d'exploitation", _montant(d['ebe']), _ton(d['ebe'])],
+            ["Résultat net", _montant(p['resultat_net']), _ton(p['resultat_net'])],
+            ["Trésorerie nette", _montant(d['tresorerie']), _ton(d['tresorerie'])],
+            ["Score Conan-Holder", f"{_nombre(s['score'])} ({situation})", ton_score],
+        ],
+        'listes': [["Points forts", points_forts, 'positif'], ["Points de vigilance", points_vigilance, 'negatif']],
+        'graphique': None,
+    }
+
+    postes_actif = ['actif_immobilise', 'stocks', 'clients', 'disponibilites']
+    postes_passif = ['capital', 'reserves', 'resultat_net', 'dettes_lt', 'dettes_ct', 'concours_bancaires']
+    bilan = {
+        'tableau': (
+            [[LIBELLES[nom], _montant(p[nom]), None] for nom in postes_actif]
+            + [["Total actif", _montant(d['total_actif']), None]]
+            + [[LIBELLES[nom], _montant(p[nom]), None] for nom in postes_passif]
+            + [["Total passif", _montant(d['total_passif']), None],
+               ["Écart actif - passif", _montant(d['ecart_bilan']), None if d['ecart_bilan'] == 0 else 'negatif']]
+        ),
+        'listes': [],
+        'graphique': _barres(
+            "Structure du bilan (k€)",
+            ["Immobilisé", "Stocks", "Clients", "Dispo.", "Cap. propres", "Dettes LT", "Dettes CT"],
+            [*(p[nom] for nom in postes_actif), p['capital'] + p['reserves'] + p['resultat_net'],
+             p['dettes_lt'], p['dettes_ct']],
+            [COULEURS['actif']] * 4 + [COULEURS['passif']] * 3
+        ),
+    }
+
+    soldes = [
+        ("Marge commerciale", 'marge_commerciale', 'taux_marge'),
+        ("Valeur ajoutée", 'valeur_ajoutee', 'taux_valeur_ajoutee'),
+        ("Excédent brut d'exploitation", 'ebe', 'taux_ebe'),
+        ("Résultat d'exploitation", 'resultat_exploitation', 'taux_resultat_exploitation'),
+        ("Résultat courant", 'resultat_courant', 'taux_resultat_courant'),
+    ]
+    sig = {
+        'tableau': [[LIBELLES['chiffre_affaires'], _montant(p['chiffre_affaires']), None]] + [
+            [libelle, f"{_montant(d[solde])} ({_pourcentage(d[taux])} du CA)",
+             niveaux[d[f"niveau_{taux}"]] if f"niveau_{taux}" in d else _ton(d[solde])]
+            for libelle, solde, taux in soldes
+        ],
+        'listes': [],
+        'graphique': _barres(
+            "Soldes intermédiaires de gestion (k€)",
+            ["CA", "Marge", "VA", "EBE", "Rés. expl.", "Rés. courant"],
+            [p['chiffre_affaires'], *(d[solde] for _, solde, _ in soldes)]
+        ),
+    }
+
+    ratios = {
+        'tableau': [
+            [LIBELLES[nom], _pourcentage(r[nom]) if "(%)" in LIBELLES[nom] else
+             f"{r[nom]:.0f} j" if nom.startswith('delai') and np.isfinite(r[nom]) else _nombre(r[nom]), None]
+            for nom in series_temporelles.INDICATEURS_RATIOS
+        ],
+        'listes': [],
+        'graphique': _barres(
+            "Rentabilité (%)", ["ROE", "ROA", "ROS", "Marge expl.", "Autonomie"],
+            [r['roe'], r['roa'], r['ros'], r['marge_ebit'], r['autonomie_financiere']],
+            format_valeur=_pourcentage
+        ),
+    }
+
+    equilibre = {
+        'tableau': [
+            ["Fonds de roulement net global", _montant(d['frng']), _ton(d['frng'])],
+            ["Besoin en fonds de roulement", _montant(d['bfr']), None],
+            ["Trésorerie nette", _montant(d['tresorerie']), _ton(d['tresorerie'])],
+            ["Flux de trésorerie d'exploitation", _montant(d['flux_exploitation']), _ton(d['flux_exploitation'])],
+            ["Flux d'investissement", _montant(d['flux_investissement']), None],
+            ["Flux de financement", _montant(d['flux_financement']), None],
+            ["Variation de trésorerie", _montant(d['variation_tresorerie']), _ton(d['variation_tresorerie'])],
+        ],
+        'listes': [["Points forts", points_forts, 'positif'], ["Points de vigilance", points_vigilance, 'negatif']],
+        'graphique': _barres("Équilibre financier (k€)", ["FRNG", "BFR", "Trésorerie"],
+                             [d['frng'], d['bfr'], d['tresorerie']]),
+    }
+
+    score = {
+        'tableau': [
+            ["Score Conan-Holder", _nombre(s['score']), ton_score],
+            ["Situation", situation, ton_score],
+            ["X1 - EBE / endettement global", _nombre(s['x1']), None],
+            ["X2 - Capitaux permanents / actif", _nombre(s['x2']), None],
+            ["X3 - Réalisable et disponible / actif", _nombre(s['x3']), None],
+            ["X4 - Frais financiers / CA", _nombre(s['x4']), None],
+            ["X5 - Charges de personnel / VA", _nombre(s['x5']), None],
+        ],
+        'listes': [["Lecture", [
+            f"Score supérieur à {calculs_financiers.SEUIL_SCORE_SAIN} : situation saine",
+            f"Score inférieur à {calculs_financiers.SEUIL_SCORE_RISQUE} : risque de défaillance élevé",
+        ], None]],
+        'graphique': _barres(
+            "Contributions au score", ["24 X1", "22 X2", "16 X3", "-87 X4", "-10 X5"],
+            [24 * s['x1'], 22 * s['x2'], 16 * s['x3'], -87 * s['x4'], -10 * s['x5']],
+            format_valeur=_nombre
+        ),
+    }
+
+    return {'synthese': synthese, 'bilan': bilan, 'sig': sig, 'ratios': ratios,
+            'equilibre': equilibre, 'score': score}
+
+
+# =============================================================================
+# GRAPHIQUES
+# =============================================================================
+
+def _geometrie(graphique, largeur, hauteur):
+    """
+    Rectangles, traits et textes d'un diagramme en barres, dans un repère
+    d'origine en haut à gauche (commun au SVG et au PDF).
+    """
+    valeurs = np.asarray(graphique['valeurs'], dtype=float)
+    marge_haut, marge_bas, marge_cote = 26.0, 30.0, 10.0
+    bas, haut = min(valeurs.min(), 0.0), max(valeurs.max(), 0.0)
+    if haut == bas:
+        haut = bas + 1.0
+    echelle = (hauteur - marge_haut - marge_bas - 12) / (haut - bas)
+    zero = marge_haut + 12 + haut * echelle
+    pas = (largeur - 2 * marge_cote) / len(valeurs)
+
+    rectangles = []
+    textes = [(largeur / 2, 14.0, graphique['titre'], 'milieu', 11, True)]
+    for i, (libelle, valeur, etiquette, couleur) in enumerate(
+            zip(graphique['libelles'], valeurs, graphique['etiquettes'], graphique['couleurs'])):
+        x = marge_cote + i * pas + 0.15 * pas
+        h = abs(valeur) * echelle
+        y = zero - h if valeur >= 0 else zero
+        rectangles.append((x, y, 0.7 * pas, h, couleur))
+        textes.append((x + 0.35 * pas, y - 3 if valeur >= 0 else y + h + 10, etiquette, 'milieu', 8, False))
+        textes.append((x + 0.35 * pas, hauteur - 8, libelle, 'milieu', 8, False))
+    traits = [(marge_cote, zero, largeur - marge_cote, zero, "#333333")]
+    return rectangles, traits, textes
+
+
+_GRAS = ' font-weight="bold"'
+
+
+def graphique_svg(graphique, largeur=560, hauteur=240):
+    """Diagramme en barres au format SVG (image statique intégrée au HTML)"""
+    rectangles, traits, textes = _geometrie(graphique, largeur, hauteur)
+    ancrages = {'milieu': "middle", 'gauche': "start", 'droite': "end"}
+    elements = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{largeur}" height="{hauteur}" '
+                f'viewBox="0 0 {largeur} {hauteur}" font-family="Helvetica, Arial, sans-serif">']
+    elements += [f'<rect x="{x:.1f}" y="{y:.1f}" width="{w:.1f}" height="{h:.1f}" fill="{c}"/>'
+                 for x, y, w, h, c in rectangles]
+    elements += [f'<line x1="{x1:.1f}" y1="{y1:.1f}" x2="{x2:.1f}" y2="{y2:.1f}" stroke="{c}"/>'
+                 for x1, y1, x2, y2, c in traits]
+    elements += [
+        f'<text x="{x:.1f}" y="{y:.1f}" font-size="{taille}" text-anchor="{ancrages[ancrage]}"'
+        f'{_GRAS if gras else ""}>{html.escape(texte)}</text>'
+        for x, y, texte, ancrage, taille, gras in textes
+    ]
+    elements.append("</svg>")
+    return "".join(elements)
+
+
+# =============================================================================
+# RENDU HTML
+# =============================================================================
+
+_STYLE_HTML = """
+body { font-family: Helvetica, Arial, sans-serif; color: #222; max-width: 900px; margin: 2rem auto; }
+h1 { color: #1f77b4; border-bottom: 3px solid #1f77b4; padding-bottom: .5rem; }
+h2 { background: #1f77b4; color: white; padding: .4rem .8rem; font-size: 1.1rem; }
+table { border-collapse: collapse; width: 100%; margin-bottom: 1rem; }
+td { padding: .3rem .6rem; border-bottom: 1px solid #e5e5e5; }
+td.valeur { text-align: right; white-space: nowrap; }
+.positif { color: #2ca02c; font-weight: bold; }
+.negatif { color: #d62728; font-weight: bold; }
+section { page-break-after: always; }
+.pied { color: #888; font-size: .8rem; }
+"""
+
+_PUCES = {'positif': "✅", 'negatif': "⚠️", None: "•"}
+
+
+def section_html(entreprise, cle, donnees):
+    """Fragment HTML d'une section"""
+    lignes = "".join(
+        f'<tr><td>{html.escape(libelle)}</td>'
+        f'<td class="valeur{" " + ton if ton else ""}">{html.escape(valeur)}</td></tr>'
+        for libelle, valeur, ton in donnees['tableau']
+    )
+    listes = "".join(
+        f"<h3>{html.escape(titre)}</h3><ul>"
+        + "".join(f"<li>{_PUCES[ton]} {html.escape(element)}</li>" for element in elements)
+        + "</ul>"
+        for titre, elements, ton in donnees['listes'] if elements
+    )
+    graphique = graphique_svg(donnees['graphique']) if donnees['graphique'] else ""
+    return (f'<section id="{cle}"><h2>{html.escape(SECTIONS[cle])}</h2>'
+            f'<table>{lignes}</table>{listes}{graphique}</section>')
+
+
+def _document_html(entreprise, fragments):
+    return (
+        '<!DOCTYPE html><html lang="fr"><head><meta charset="utf-8">'
+        f'<title>Diagnostic financier - {html.escape(entreprise)}</title><style>{_STYLE_HTML}</style></head><body>'
+        f'<h1>📑 Diagnostic financier - {html.escape(entreprise)}</h1>'
+        + "".join(fragments)
+        + f'<p class="pied">Rapport généré par FinanceLab le {datetime.now():%d/%m/%Y à %H:%M}</p></body></html>'
+    )
+
+
+# =============================================================================
+# RENDU PDF
+# =============================================================================
+
+LARGEUR_PAGE, HAUTEUR_PAGE, MARGE_PAGE = 595.0, 842.0, 50.0  # A4 en points
+
+
+def _rgb(couleur):
+    couleur = couleur.lstrip("#")
+    return " ".join(f"{int(couleur[i:i + 2], 16) / 255:.3f}" for i in (0, 2, 4))
+
+
+def _texte_pdf(texte):
+    """Chaîne PDF littérale en WinAnsi (les caractères hors Latin-1 sont remplacés)"""
+    octets = texte.encode('cp1252', errors='replace')
+    return b"(" + octets.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+
+class PagePDF:
+    """Opérations de dessin d'une page, dans un repère d'origine en haut à gauche"""
+
+    def __init__(self):
+        self.operations = []
+
+    def rectangle(self, x, y, largeur, hauteur, couleur):
+        self.operations.append(
+            f"{_rgb(couleur)} rg {x:.2f} {HAUTEUR_PAGE - y - hauteur:.2f} {largeur:.2f} {hauteur:.2f} re f".encode()
+        )
+
+    def trait(self, x1, y1, x2, y2, couleur, epaisseur=0.8):
+        self.operations.append(
+            f"{_rgb(couleur)} RG {epaisseur} w {x1:.2f} {HAUTEUR_PAGE - y1:.2f} m "
+            f"{x2:.2f} {HAUTEUR_PAGE - y2:.2f} l S".encode()
+        )
+
+    def texte(self, x, y, texte, taille=10, gras=False, ancrage='gauche', couleur="#222222"):
+        largeur = 0.52 * taille * len(texte)  # Largeur moyenne d'un caractère Helvetica
+        x -= {'gauche': 0, 'milieu': largeur / 2, 'droite': largeur}[ancrage]
+        self.operations.append(
+            f"BT {_rgb(couleur)} rg /{'F2' if gras else 'F1'} {taille} Tf {x:.2f} {HAUTEUR_PAGE - y:.2f} Td ".encode()
+            + _texte_pdf(texte) + b" Tj ET"
+        )
+
+    def graphique(self, graphique, x0, y0, largeur, hauteur):
+        rectangles, traits, textes = _geometrie(graphique, largeur, hauteur)
+        for x, y, w, h, couleur in rectangles:
+            self.rectangle(x0 + x, y0 + y, w, h, couleur)
+        for x1, y1, x2, y2, couleur in traits:
+            self.trait(x0 + x1, y0 + y1, x0 + x2, y0 + y2, couleur)
+        for x, y, texte, ancrage, taille, gras in textes:
+            self.texte(x0 + x, y0 + y, texte, taille, gras, ancrage)
+
+    def contenu(self):
+        return b"\n".join(self.operations)
+
+
+def section_pdf(entreprise, cle, donnees):
+    """Flux de dessin (non compressé) de la page PDF d'une section"""
+    page = PagePDF()
+    largeur_utile = LARGEUR_PAGE - 2 * MARGE_PAGE
+    page.rectangle(MARGE_PAGE, MARGE_PAGE, largeur_utile, 28, COULEURS['actif'])
+    page.texte(MARGE_PAGE + 10, MARGE_PAGE + 19, SECTIONS[cle], 14, True, couleur="#ffffff")
+    page.texte(LARGEUR_PAGE - MARGE_PAGE - 10, MARGE_PAGE + 19, entreprise, 10, ancrage='droite', couleur="#ffffff")
+
+    y = MARGE_PAGE + 50
+    for i, (libelle, valeur, ton) in enumerate(donnees['tableau']):
+        if i % 2 == 0:
+            page.rectangle(MARGE_PAGE, y - 12, largeur_utile, 17, "#f0f2f6")
+        page.texte(MARGE_PAGE + 8, y, libelle, 10)
+        page.texte(LARGEUR_PAGE - MARGE_PAGE - 8, y, valeur, 10, ton is not None, 'droite',
+                   COULEURS[ton] if ton else "#222222")
+        y += 17
+
+    for titre, elements, ton in donnees['listes']:
+        if not elements:
+            continue
+        y += 14
+        page.texte(MARGE_PAGE, y, titre, 11, True)
+        for element in elements:
+            y += 15
+            page.texte(MARGE_PAGE + 8, y, {'positif': "+ ", 'negatif': "! "}.get(ton, "- ") + element, 10,
+                       couleur=COULEURS[ton] if ton else "#222222")
+        y += 4
+
+    if donnees['graphique']:
+        page.graphique(donnees['graphique'], MARGE_PAGE, max(y + 20, HAUTEUR_PAGE - MARGE_PAGE - 280),
+                       largeur_utile, 260)
+    return page.contenu()
+
+
+def _document_pdf(entreprise, pages):
+    """Assemble les flux de pages en un document PDF (polices standard Helvetica)"""
+    objets = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # Arbre des pages, écrit une fois les pages numérotées
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>",
+        b"<< /Title " + _texte_pdf(f"Diagnostic financier - {entreprise}") + b" /Producer (FinanceLab) /CreationDate "
+        + _texte_pdf(f"D:{datetime.now():%Y%m%d%H%M%S}") + b" >>",
+    ]
+    references = []
+    for contenu in pages:
+        flux = zlib.compress(contenu)
+        objets.append(b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(flux) + flux + b"\nendstream")
+        objets.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Contents %d 0 R "
+            b"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> >>" % (LARGEUR_PAGE, HAUTEUR_PAGE, len(objets))
+        )
+        references.append(b"%d 0 R" % len(objets))
+    objets[1] = b"<< /Type /Pages /Kids [" + b" ".join(references) + b"] /Count %d >>" % len(references)
+
+    document = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    positions = []
+    for numero, objet in enumerate(objets, 1):
+        positions.append(len(document))
+        document += b"%d 0 obj\n" % numero + objet + b"\nendobj\n"
+    debut_xref = len(document)
+    document += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objets) + 1)
+    document += b"".join(b"%010d 00000 n \n" % position for position in positions)
+    document += b"trailer\n<< /Size %d /Root 1 0 R /Info 5 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objets) + 1, debut_xref
+    )
+    return bytes(document)
+
+
+# =============================================================================
+# CACHE DES SECTIONS ET ASSEMBLAGE
+# =============================================================================
+
+_RENDUS = {
+    'html': lambda entreprise, cle, donnees: section_html(entreprise, cle, donnees).encode('utf-8'),
+    'pdf': section_pdf,
+}
+
+
+def _empreinte(entreprise, cle, donnees, format_rendu):
+    contenu = json.dumps([VERSION_GABARIT, format_rendu, entreprise, cle, donnees], ensure_ascii=False)
+    return hashlib.sha256(contenu.encode('utf-8')).hexdigest()
+
+
+def _section_rendue(entreprise, cle, donnees, format_rendu, dossier_cache):
+    """Rendu d'une section, lu dans le cache s'il existe : (octets, tiré du cache)"""
+    if dossier_cache is None:
+        return _RENDUS[format_rendu](entreprise, cle, donnees), False
+
+    empreinte = _empreinte(entreprise, cle, donnees, format_rendu)
+    chemin = os.path.join(dossier_cache, empreinte[:2], f"{empreinte}.{format_rendu}")
+    try:
+        with open(chemin, 'rb') as f:
+            return f.read(), True
+    except FileNotFoundError:
+        pass
+
+    rendu = _RENDUS[format_rendu](entreprise, cle, donnees)
+    os.makedirs(os.path.dirname(chemin), exist_ok=True)
+    temporaire = f"{chemin}.{os.getpid()}.tmp"  # Écriture atomique : plusieurs processus peuvent rendre la même section
+    with open(temporaire, 'wb') as f:
+        f.write(rendu)
+    os.replace(temporaire, chemin)
+    return rendu, False
+
+
+def rendre_rapport(entreprise, sections, formats=FORMATS, dossier_cache=CHEMIN_CACHE):
+    """
+    Rapport d'une entreprise à partir de ses données (preparer_rapports).
+    Retourne ({format: octets}, nombre de sections tirées du cache).
+    """
+    documents, depuis_cache = {}, 0
+    for format_rendu in formats:
+        rendus = []
+        for cle in SECTIONS:
+            rendu, en_cache = _section_rendue(entreprise, cle, sections[cle], format_rendu, dossier_cache)
+            rendus.append(rendu)
+            depuis_cache += en_cache
+        if format_rendu == 'html':
+            documents['html'] = _document_html(entreprise, [r.decode('utf-8') for r in rendus]).encode('utf-8')
+        else:
+            documents['pdf'] = _document_pdf(entreprise, rendus)
+    return documents, depuis_cache
+
+
+def rapport_entreprise(entreprise, postes, formats=FORMATS, dossier_cache=CHEMIN_CACHE):
+    """Rapport d'une seule entreprise à partir de ses postes (dictionnaire, k€) : {format: octets}"""
+    donnees = preparer_rapports(pd.DataFrame([postes], index=[entreprise]))
+    return rendre_rapport(entreprise, donnees[entreprise], formats, dossier_cache)[0]
+
+
+# =============================================================================
+# PORTEFEUILLE
+# =============================================================================
+
+def nom_fichier(entreprise):
+    """Nom de fichier sûr pour le rapport d'une entreprise"""
+    return re.sub(r"[^\w.-]+", "_", str(entreprise)).strip("._") or "entreprise"
+
+
+def _rendre_et_ecrire(entreprise, sections, formats, dossier_sortie, dossier_cache):
+    """Exécuté dans le pool : (entreprise, fichiers écrits, sections tirées du cache, erreur)"""
+    try:
+        documents, depuis_cache = rendre_rapport(entreprise, sections, formats, dossier_cache)
+        fichiers = []
+        for format_rendu, contenu in documents.items():
+            chemin = os.path.join(dossier_sortie, f"{nom_fichier(entreprise)}.{format_rendu}")
+            with open(chemin, 'wb') as f:
+                f.write(contenu)
+            fichiers.append(os.path.basename(chemin))
+        return entreprise, ", ".join(fichiers), depuis_cache, None
+    except Exception as e:
+        return entreprise, "", 0, f"{type(e).__name__}: {e}"
+
+
+def generer_rapports(postes, dossier_sortie, formats=FORMATS, processus=None,
+                     dossier_cache=CHEMIN_CACHE, progression=None):
+    """
+    Rapports de tout un portefeuille (une ligne de `postes` par entreprise),
+    rendus en parallèle et écrits dans `dossier_sortie`. Retourne un tableau
+    (entreprise, fichiers, sections_en_cache, erreur).
+    """
+    os.makedirs(dossier_sortie, exist_ok=True)
+    donnees = preparer_rapports(postes)
+    processus = min(processus or os.cpu_count() or 1, max(1, len(donnees)))
+    if progression is not None:
+        progression(0.05, f"Rendu de {len(donnees)} rapport(s)")
+
+    resultats = []
+    if processus == 1:
+        for i, (entreprise, sections) in enumerate(donnees.items(), 1):
+            resultats.append(_rendre_et_ecrire(entreprise, sections, formats, dossier_sortie, dossier_cache))
+            if progression is not None:
+                progression(i / len(donnees), f"{i}/{len(donnees)} rapport(s)")
+    else:
+        # « spawn » : le moteur peut être appelé depuis le serveur Streamlit, multithreadé
+        executor = ProcessPoolExecutor(max_workers=processus, mp_context=multiprocessing.get_context("spawn"))
+        try:
+            futures = [
+                executor.submit(_rendre_et_ecrire, entreprise, sections, formats, dossier_sortie, dossier_cache)
+                for entreprise, sections in donnees.items()
+            ]
+            for i, future in enumerate(as_completed(futures), 1):
+                resultats.append(future.result())
+                if progression is not None:
+                    progression(i / len(futures), f"{i}/{len(futures)} rapport(s)")
+        finally:
+            executor.shutdown(cancel_futures=True)
+        ordre = {entreprise: i for i, entreprise in enumerate(donnees)}
+        resultats.sort(key=lambda resultat: ordre[resultat[0]])
+
+    return pd.DataFrame(resultats, columns=['entreprise', 'fichiers', 'sections_en_cache', 'erreur'])
+
+
+def charger_portefeuille(contenu, nom_fichier_source):
+    """
+    Portefeuille lu depuis un fichier CSV, Excel ou Parquet (par exemple le
+    fichier consolidé de analyse_lot.py) : une colonne `entreprise` (ou
+    `fichier`) et une colonne par poste. Seul le dernier exercice de chaque
+    entreprise est conservé.
+    """
+    fichier = BytesIO(contenu)
+    extension = os.path.splitext(nom_fichier_source)[1].lower()
+    if extension == '.parquet':
+        tableau = pd.read_parquet(fichier)
+    elif extension in ('.xlsx', '.xls'):
+        tableau = pd.read_excel(fichier)
+    else:
+        tableau = pd.read_csv(fichier, sep=None, engine='python')
+
+    identifiant = next((colonne for colonne in ('entreprise', 'fichier') if colonne in tableau), tableau.columns[0])
+    if not set(tableau.columns) & set(calculs_financiers.POSTES):
+        raise ValueError("Aucune colonne de poste reconnue")
+    tableau[identifiant] = tableau[identifiant].astype(str)
+    colonnes = [c for c in ['exercice', *calculs_financiers.POSTES] if c in tableau]
+    return tableau.groupby(identifiant, sort=False).tail(1).set_index(identifiant)[colonnes]
+
+
+def archiver(dossier):
+    """Archive ZIP (octets) des rapports d'un dossier"""
+    tampon = BytesIO()
+    with zipfile.ZipFile(tampon, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for nom in sorted(os.listdir(dossier)):
+            if nom.endswith(tuple(f".{f}" for f in FORMATS)):
+                archive.write(os.path.join(dossier, nom), nom)
+    return tampon.getvalue()
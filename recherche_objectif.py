@@ -0,0 +1,132 @@
+"""
+🎯 FINANCELAB - Recherche d'objectif (valeur cible)
+Description: Trouve la valeur d'une hypothèse qui donne un résultat cible
+(« quel délai clients dégage 500 k€ de trésorerie ? ») pour tout calculateur
+pur et vectorisé de calculs_financiers. Une grille sur l'intervalle de
+recherche est évaluée en un seul appel pour encadrer toutes les solutions
+(fonctions non monotones comprises), puis chaque encadrement est affiné par
+dichotomie, tous en même temps. Sur deux hypothèses, la frontière des
+combinaisons qui atteignent la cible est calculée de la même façon.
+"""
+
+import numpy as np
+import pandas as pd
+
+import calculs_financiers
+
+# =============================================================================
+# PARAMÈTRES
+# =============================================================================
+
+NB_POINTS = 512         # Points de la grille d'encadrement
+ITERATIONS = 60         # Dichotomies (précision relative ~ 1e-18 de l'intervalle)
+AFFINAGES = 6           # Zooms successifs lorsque la cible n'est pas atteinte
+
+
+def _evaluer(calculateur, entrees, sortie, valeurs):
+    """Résultat pour chaque jeu d'hypothèses, les hypothèses de `valeurs` (tableaux) remplaçant celles d'`entrees`"""
+    arguments = {**{nom: float(valeur) for nom, valeur in entrees.items()}, **valeurs}
+    forme = np.broadcast_shapes(*(np.shape(v) for v in valeurs.values()))
+    return np.broadcast_to(calculs_financiers.resultat_calculateur(calculateur(**arguments), sortie), forme)
+
+
+def _dichotomie(calculateur, entrees, sortie, cible, variable, bas, haut, autres=None, iterations=ITERATIONS):
+    """Affine en parallèle des encadrements [bas, haut] où résultat - cible change de signe"""
+    autres = autres or {}
+    signe_bas = np.sign(_evaluer(calculateur, entrees, sortie, {variable: bas, **autres}) - cible)
+    for _ in range(iterations):
+        milieu = (bas + haut) / 2
+        signe = np.sign(_evaluer(calculateur, entrees, sortie, {variable: milieu, **autres}) - cible)
+        meme = signe == signe_bas
+        bas = np.where(meme, milieu, bas)
+        haut = np.where(meme, haut, milieu)
+    return (bas + haut) / 2
+
+
+# =============================================================================
+# UNE HYPOTHÈSE
+# =============================================================================
+
+def chercher(calculateur, entrees, variable, cible, bornes, sortie=None, nb_points=NB_POINTS):
+    """
+    Valeurs de `variable` dans `bornes` (min, max) pour lesquelles le
+    résultat vaut `cible`, les autres hypothèses restant celles d'`entrees`.
+    Retourne un dictionnaire : solutions (toutes, croissantes), solution
+    (la plus proche de la valeur actuelle), atteint (bool) et resultat (à la
+    solution). Si la cible n'est jamais atteinte, `solution` est la valeur
+    qui s'en approche le plus (grille resserrée autour du meilleur point).
+    """
+    minimum, maximum = map(float, bornes)
+    grille = np.linspace(minimum, maximum, nb_points)
+    ecart = _evaluer(calculateur, entrees, sortie, {variable: grille}) - cible
+    if not np.isfinite(ecart).any():
+        raise ValueError("Résultat non calculable sur tout l'intervalle de recherche")
+    signe = np.sign(ecart)
+
+    exactes = grille[signe == 0]
+    changements = np.flatnonzero((signe[:-1] * signe[1:] < 0) & np.isfinite(ecart[:-1]) & np.isfinite(ecart[1:]))
+    solutions = np.concatenate([
+        exactes,
+        _dichotomie(calculateur, entrees, sortie, cible, variable, grille[changements], grille[changements + 1]),
+    ])
+    solutions = np.unique(solutions)
+
+    actuelle = float(entrees[variable])
+    if solutions.size:
+        solution = float(solutions[np.abs(solutions - actuelle).argmin()])
+        atteint = True
+    else:
+        # Cible hors d'atteinte : grille resserrée autour du point le plus proche
+        pas = grille[1] - grille[0]
+        solution = float(grille[np.nanargmin(np.abs(ecart))])
+        for _ in range(AFFINAGES):
+            fine = np.clip(np.linspace(solution - pas, solution + pas, 65), minimum, maximum)
+            ecart_fin = np.abs(_evaluer(calculateur, entrees, sortie, {variable: fine}) - cible)
+            solution, pas = float(fine[np.nanargmin(ecart_fin)]), pas / 32
+        atteint = False
+
+    resultat = float(_evaluer(calculateur, entrees, sortie, {variable: np.array([solution])})[0])
+    return {'solutions': solutions, 'solution': solution, 'atteint': atteint, 'resultat': resultat}
+
+
+# =============================================================================
+# DEUX HYPOTHÈSES
+# =============================================================================
+
+def frontiere(calculateur, entrees, variables, cible, bornes, sortie=None, nb_points=200):
+    """
+    Combinaisons de deux hypothèses qui atteignent la cible : pour chaque
+    valeur de la première (grille de `nb_points` sur ses bornes), la valeur
+    de la seconde, la plus proche de sa valeur actuelle lorsqu'il y en a
+    plusieurs (NaN si aucune). Toute la grille est évaluée en un seul appel,
+    puis les encadrements sont affinés ensemble. La colonne `effort` mesure
+    l'écart relatif total aux valeurs actuelles ; la combinaison d'effort
+    minimal est signalée par `minimal`.
+    """
+    x, y = variables
+    grille_x = np.linspace(*map(float, bornes[x]), nb_points)
+    grille_y = np.linspace(*map(float, bornes[y]), nb_points)
+    ecart = _evaluer(calculateur, entrees, sortie, {x: grille_x[:, None], y: grille_y[None, :]}) - cible
+    signe = np.sign(ecart)
+
+    # Encadrement de chaque ligne le plus proche de la valeur actuelle de y
+    changement = (signe[:, :-1] * signe[:, 1:] <= 0) & np.isfinite(ecart[:, :-1]) & np.isfinite(ecart[:, 1:])
+    distance = np.where(changement, np.abs(grille_y[:-1] - float(entrees[y]))[None, :], np.inf)
+    colonne = distance.argmin(axis=1)
+    trouve = np.isfinite(distance[np.arange(nb_points), colonne])
+
+    valeurs_y = np.full(nb_points, np.nan)
+    if trouve.any():
+        valeurs_y[trouve] = _dichotomie(
+            calculateur, entrees, sortie, cible, y,
+            grille_y[colonne[trouve]], grille_y[colonne[trouve] + 1], autres={x: grille_x[trouve]}
+        )
+
+    courbe = pd.DataFrame({x: grille_x, y: valeurs_y})
+    with np.errstate(divide='ignore', invalid='ignore'):
+        effort = sum(np.abs(courbe[nom] - float(entrees[nom])) / (abs(float(entrees[nom])) or 1.0) for nom in (x, y))
+    courbe['effort'] = effort * 100
+    courbe['minimal'] = False
+    if courbe['effort'].notna().any():
+        courbe.loc[courbe['effort'].idxmin(), 'minimal'] = True
+    return courbe
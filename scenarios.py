@@ -0,0 +1,341 @@
+"""
+🧪 FINANCELAB - Gestionnaire de scénarios
+Description: Enregistre sous un nom toutes les hypothèses d'un calculateur
+(DCF, seuil, levier, BFR...) ou d'un modèle d'entreprise (postes du bilan,
+du compte de résultat et des flux). Les scénarios d'un modèle forment une
+table (une ligne par scénario, une colonne par hypothèse) : ils sont évalués
+ensemble en un seul appel vectorisé, et l'écart entre deux scénarios est
+décomposé hypothèse par hypothèse (valeurs de Shapley) pour désigner celle
+qui l'explique. Chaque table est stockée en parquet et n'est lue qu'au
+premier accès.
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+from contextlib import contextmanager
+from math import factorial
+
+try:
+    import fcntl
+except ImportError:     # Windows : pas de verrou entre processus
+    fcntl = None
+
+import numpy as np
+import pandas as pd
+
+import calculs_financiers
+
+# =============================================================================
+# PARAMÈTRES
+# =============================================================================
+
+DOSSIER_SCENARIOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "donnees", "scenarios")
+SHAPLEY_MAX = 10    # Au-delà de 10 hypothèses modifiées (1 024 combinaisons), décomposition approchée
+
+
+def _diagnostic(**postes):
+    """Diagnostic complet d'autant d'entités que de valeurs reçues pour chaque poste"""
+    colonnes = np.broadcast_arrays(*(np.atleast_1d(np.asarray(v, dtype=float)) for v in postes.values()))
+    return calculs_financiers.diagnostic_complet(pd.DataFrame(dict(zip(postes, colonnes))))
+
+
+# Modèles disponibles : calculateur vectorisé, hypothèses et résultats suivis (avec libellés),
+# valeur des hypothèses absentes lors d'un import (None : hypothèse obligatoire)
+MODELES = {
+    'dcf': {
+        'libelle': "Valorisation DCF",
+        'calculateur': calculs_financiers.valoriser_dcf,
+        'entrees': {'fcf_actuel': "FCF actuel", 'croissance': "Croissance 5 ans",
+                    'croissance_perpetuite': "Croissance à perpétuité", 'wacc': "WACC", 'dette_nette': "Dette nette"},
+        'sorties': {'valeur_actions': "Valeur des actions", 'valeur_entreprise': "Valeur de l'entreprise",
+                    'valeur_terminale_actualisee': "Valeur terminale actualisée"},
+        'defaut': None,
+    },
+    'seuil': {
+        'libelle': "Seuil de rentabilité",
+        'calculateur': calculs_financiers.seuil_rentabilite,
+        'entrees': {'couts_fixes': "Coûts fixes", 'cout_variable_unitaire': "Coût variable unitaire",
+                    'prix_vente_unitaire': "Prix de vente unitaire", 'volume_reference': "Capacité"},
+        'sorties': {'seuil_ca': "Seuil (CA)", 'seuil_volume': "Seuil (unités)", 'marge_securite': "Marge de sécurité (%)"},
+        'defaut': None,
+    },
+    'levier': {
+        'libelle': "Levier financier",
+        'calculateur': calculs_financiers.effet_levier,
+        'entrees': {'resultat_exploitation': "Résultat d'exploitation", 'charges_financieres': "Charges financières",
+                    'capitaux_propres': "Capitaux propres", 'dette_financiere': "Dettes financières",
+                    'taux_imposition': "Taux d'imposition"},
+        'sorties': {'roe_avec_dette': "ROE avec dette (%)", 'roe_sans_dette': "ROE sans dette (%)",
+                    'effet_levier': "Effet de levier (points)"},
+        'defaut': None,
+    },
+    'startup': {
+        'libelle': "Startup en croissance",
+        'calculateur': calculs_financiers.cas_startup,
+        'entrees': {'ca': "Chiffre d'affaires", 'croissance': "Croissance", 'marge_brute': "Marge brute",
+                    'frais_fixes': "Frais fixes", 'besoin_bfr': "BFR (mois de CA)"},
+        'sorties': {'resultat_operationnel': "Résultat opérationnel", 'bfr': "BFR", 'ca_suivant': "CA suivant"},
+        'defaut': None,
+    },
+    'bfr': {
+        'libelle': "Optimisation du BFR",
+        'calculateur': calculs_financiers.gains_bfr,
+        'entrees': {'delai_clients': "Délai clients", 'delai_stocks': "Délai stocks",
+                    'delai_fournisseurs': "Délai fournisseurs", 'ca_journalier': "CA journalier",
+                    'objectif_clients': "Objectif clients", 'objectif_stocks': "Objectif stocks",
+                    'objectif_fournisseurs': "Objectif fournisseurs"},
+        'sorties': {'gain_total': "Gain total de trésorerie", 'gain_clients': "Gain sur clients",
+                    'gain_stocks': "Gain sur stocks", 'gain_fournisseurs': "Gain sur fournisseurs"},
+        'defaut': None,
+    },
+    'entreprise': {
+        'libelle': "Modèle d'entreprise (postes)",
+        'calculateur': _diagnostic,
+        'entrees': {poste: poste.replace('_', ' ').capitalize() for poste in calculs_financiers.POSTES},
+        'sorties': {'tresorerie': "Trésorerie nette", 'frng': "FRNG", 'bfr': "BFR", 'ebe': "EBE",
+                    'resultat_exploitation': "Résultat d'exploitation", 'resultat_courant': "Résultat courant",
+                    'taux_endettement': "Taux d'endettement (%)", 'liquidite_generale': "Liquidité générale",
+                    'variation_tresorerie': "Variation de trésorerie"},
+        'defaut': None,
+    },
+}
+
+
+def dossier_utilisateur(identifiant, racine=DOSSIER_SCENARIOS):
+    """
+    Dossier des scénarios d'un utilisateur sous `racine` : l'identifiant
+    (saisie libre) est réduit à un nom sûr, suivi d'une empreinte de
+    l'identifiant exact pour que deux identifiants distincts ne partagent
+    jamais un dossier.
+    """
+    identifiant = str(identifiant)
+    nom = re.sub(r"[^\w.-]+", "_", identifiant).strip("._")[:40] or "utilisateur"
+    return os.path.join(racine, f"{nom}-{hashlib.sha1(identifiant.encode()).hexdigest()[:12]}")
+
+
+def _modele(modele):
+    if modele not in MODELES:
+        raise ValueError(f"Modèle inconnu : {modele}")
+    return MODELES[modele]
+
+
+# =============================================================================
+# ÉVALUATION GROUPÉE
+# =============================================================================
+
+def evaluer_table(modele, table, sorties=None):
+    """
+    Résultats de tous les scénarios d'une table (une ligne par scénario) en
+    un seul appel du calculateur, chaque hypothèse étant passée comme un
+    tableau. Retourne un DataFrame (une colonne par résultat) de même index.
+    """
+    definition = _modele(modele)
+    sorties = list(sorties or definition['sorties'])
+    if table.empty:
+        return pd.DataFrame(columns=sorties, index=table.index, dtype=float)
+    resultat = definition['calculateur'](**{nom: table[nom].to_numpy(dtype=float) for nom in definition['entrees']})
+    return pd.DataFrame({sortie: np.broadcast_to(calculs_financiers.resultat_calculateur(resultat, sortie), (len(table),)) for sortie in sorties},
+                        index=table.index)
+
+
+def decomposer_ecart(modele, depart, arrivee, sortie):
+    """
+    Décompose l'écart d'un résultat entre deux jeux d'hypothèses (`depart`
+    puis `arrivee`, dictionnaires ou Series) en contributions de chaque
+    hypothèse modifiée. Avec au plus SHAPLEY_MAX hypothèses modifiées, toutes
+    les combinaisons sont évaluées en un seul appel et les contributions sont
+    les valeurs de Shapley (leur somme est exactement l'écart). Au-delà, la
+    contribution est la moyenne des effets de l'hypothèse changée seule en
+    partant de chaque scénario, et le reste est affecté aux interactions.
+    Retourne (résultat de départ, résultat d'arrivée, tableau trié par
+    contribution absolue décroissante).
+    """
+    definition = _modele(modele)
+    noms = list(definition['entrees'])
+    a = np.array([float(depart[nom]) for nom in noms])
+    b = np.array([float(arrivee[nom]) for nom in noms])
+    modifiees = np.flatnonzero(~((a == b) | (np.isnan(a) & np.isnan(b))))
+    k = len(modifiees)
+
+    def evaluer_lignes(masques):
+        # Une ligne par combinaison : hypothèses de départ, celles du masque prises à l'arrivée
+        lignes = np.tile(a, (len(masques), 1))
+        colonnes = np.broadcast_to(modifiees, masques.shape)
+        lignes[:, modifiees] = np.where(masques, b[colonnes], a[colonnes])
+        return evaluer_table(modele, pd.DataFrame(lignes, columns=noms), [sortie])[sortie].to_numpy()
+
+    if k <= SHAPLEY_MAX:
+        masques = ((np.arange(2 ** k)[:, None] >> np.arange(k)) & 1).astype(bool)
+        valeurs = evaluer_lignes(masques)
+        taille = masques.sum(axis=1)
+        poids = np.array([factorial(s) * factorial(k - s - 1) / factorial(k) for s in range(k)]) if k else np.array([])
+        contributions = np.zeros(k)
+        for i in range(k):
+            sans = np.flatnonzero(~masques[:, i])
+            contributions[i] = (poids[taille[sans]] * (valeurs[sans | (1 << i)] - valeurs[sans])).sum()
+        resultat_depart, resultat_arrivee = valeurs[0], valeurs[-1]
+        interactions = 0.0
+    else:
+        # Départ, arrivée, chaque hypothèse seule à l'arrivée, puis chaque hypothèse seule au départ
+        masques = np.vstack([np.zeros(k, bool), np.ones(k, bool), np.eye(k, dtype=bool), ~np.eye(k, dtype=bool)])
+        valeurs = evaluer_lignes(masques)
+        resultat_depart, resultat_arrivee = valeurs[0], valeurs[1]
+        contributions = ((valeurs[2:2 + k] - resultat_depart) + (resultat_arrivee - valeurs[2 + k:])) / 2
+        interactions = resultat_arrivee - resultat_depart - contributions.sum()
+
+    ecart = resultat_arrivee - resultat_depart
+    tableau = pd.DataFrame({
+        'hypothese': [definition['entrees'][noms[i]] for i in modifiees],
+        'depart': a[modifiees],
+        'arrivee': b[modifiees],
+        'contribution': contributions,
+    })
+    if k > SHAPLEY_MAX:
+        tableau.loc[len(tableau)] = ["Interactions", np.nan, np.nan, interactions]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        tableau['part'] = tableau['contribution'] / ecart * 100 if ecart else np.nan
+    tableau = tableau.reindex(tableau['contribution'].abs().sort_values(ascending=False).index).reset_index(drop=True)
+    return float(resultat_depart), float(resultat_arrivee), tableau
+
+
+# =============================================================================
+# RECUEIL DE SCÉNARIOS
+# =============================================================================
+
+class RecueilScenarios:
+    """
+    Scénarios nommés de chaque modèle : une table par modèle (index = nom du
+    scénario, une colonne par hypothèse), enregistrée dans `dossier` sous
+    <modele>.parquet. Une table n'est lue sur disque qu'au premier accès ;
+    seules les tables modifiées sont réécrites par `enregistrer`, qui
+    fusionne les ajouts et suppressions de cette session avec la version sur
+    disque (une autre session a pu l'enregistrer entre-temps).
+    """
+
+    def __init__(self, dossier=DOSSIER_SCENARIOS):
+        self.dossier = dossier
+        self._tables = {}
+        self._ajouts = {}           # modèle -> scénarios ajoutés ou remplacés depuis le dernier enregistrement
+        self._suppressions = {}     # modèle -> scénarios supprimés depuis le dernier enregistrement
+
+    def _chemin(self, modele):
+        return os.path.join(self.dossier, f"{modele}.parquet")
+
+    def modeles(self):
+        """Modèles ayant au moins un scénario, en mémoire ou sur disque (sans lire les tables)"""
+        return [modele for modele in MODELES
+                if (modele in self._tables and not self._tables[modele].empty)
+                or (modele not in self._tables and self.dossier and os.path.exists(self._chemin(modele)))]
+
+    def _lire(self, modele):
+        chemin = self._chemin(modele) if self.dossier else None
+        if chemin and os.path.exists(chemin):
+            table = pd.read_parquet(chemin)
+        else:
+            table = pd.DataFrame(columns=list(_modele(modele)['entrees']), dtype=float)
+        table.index.name = 'scenario'
+        return table
+
+    def table(self, modele):
+        """Hypothèses de tous les scénarios du modèle (lues sur disque au premier accès)"""
+        _modele(modele)
+        if modele not in self._tables:
+            self._tables[modele] = self._lire(modele)
+        return self._tables[modele]
+
+    def noms(self, modele):
+        return list(self.table(modele).index)
+
+    def scenario(self, modele, nom):
+        return self.table(modele).loc[nom]
+
+    def ajouter(self, modele, nom, entrees):
+        """Enregistre (ou remplace) le scénario `nom` ; toutes les hypothèses du modèle sont requises"""
+        self.importer(modele, pd.DataFrame([entrees], index=[str(nom)]))
+
+    def importer(self, modele, donnees):
+        """
+        Ajoute (ou remplace) plusieurs scénarios : une ligne par scénario,
+        nommée par l'index, une colonne par hypothèse. Les hypothèses absentes
+        prennent la valeur par défaut du modèle ; lève ValueError si le modèle
+        n'en a pas ou si une valeur n'est pas numérique.
+        """
+        definition = _modele(modele)
+        donnees = pd.DataFrame(donnees).copy()
+        donnees.columns = [str(c).strip().lower() for c in donnees.columns]
+        manquantes = [nom for nom in definition['entrees'] if nom not in donnees]
+        if manquantes and definition['defaut'] is None:
+            raise ValueError(f"Hypothèses manquantes : {', '.join(manquantes)}")
+        for nom in manquantes:
+            donnees[nom] = definition['defaut']
+        nouvelles = donnees[list(definition['entrees'])].apply(pd.to_numeric, errors='coerce').astype(float)
+        if nouvelles.isna().any().any():
+            raise ValueError("Hypothèse non numérique")
+        nouvelles.index = nouvelles.index.astype(str)
+        nouvelles = nouvelles[~nouvelles.index.duplicated(keep='last')]
+
+        self._tables[modele] = _remplacer(self.table(modele), nouvelles)
+        self._ajouts.setdefault(modele, set()).update(nouvelles.index)
+        self._suppressions.setdefault(modele, set()).difference_update(nouvelles.index)
+
+    def supprimer(self, modele, nom):
+        self._tables[modele] = self.table(modele).drop(nom, errors='ignore')
+        self._suppressions.setdefault(modele, set()).add(nom)
+        self._ajouts.setdefault(modele, set()).discard(nom)
+
+    def evaluer(self, modele, noms=None, sorties=None):
+        """Résultats des scénarios `noms` (tous par défaut), évalués en un seul calcul"""
+        table = self.table(modele)
+        return evaluer_table(modele, table if noms is None else table.loc[list(noms)], sorties)
+
+    def comparer(self, modele, depart, arrivee, sortie):
+        """Écart d'un résultat entre deux scénarios et hypothèses qui l'expliquent (voir decomposer_ecart)"""
+        return decomposer_ecart(modele, self.scenario(modele, depart), self.scenario(modele, arrivee), sortie)
+
+    def enregistrer(self):
+        """
+        Écrit les tables modifiées : sous verrou, la version sur disque est
+        relue et reçoit les ajouts et suppressions de cette session, puis
+        remplace le fichier via un fichier temporaire (remplacement atomique).
+        """
+        if not self.dossier:
+            return
+        os.makedirs(self.dossier, exist_ok=True)
+        for modele in set(self._ajouts) | set(self._suppressions):
+            ajouts = sorted(self._ajouts.pop(modele, set()))
+            suppressions = list(self._suppressions.pop(modele, set()))
+            chemin = self._chemin(modele)
+            with _verrou(f"{chemin}.lock"):
+                table = self._lire(modele).drop(suppressions, errors='ignore')
+                table = _remplacer(table, self._tables[modele].loc[ajouts])
+                descripteur, temporaire = tempfile.mkstemp(dir=self.dossier, suffix='.tmp')
+                try:
+                    with os.fdopen(descripteur, 'wb') as fichier:
+                        table.to_parquet(fichier)
+                    os.replace(temporaire, chemin)
+                except BaseException:
+                    os.remove(temporaire)
+                    raise
+            self._tables[modele] = table
+
+
+def _remplacer(table, nouvelles):
+    """Table où les scénarios de `nouvelles` sont ajoutés ou remplacent ceux de même nom"""
+    table = pd.concat([table.drop(nouvelles.index, errors='ignore'), nouvelles])
+    table.index.name = 'scenario'
+    return table
+
+
+@contextmanager
+def _verrou(chemin):
+    """Verrou exclusif entre processus sur le fichier `chemin` (sans effet si fcntl est absent)"""
+    with open(chemin, 'a') as fichier:
+        if fcntl is not None:
+            fcntl.flock(fichier, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fichier, fcntl.LOCK_UN)
@@ -0,0 +1,145 @@
+"""
+🔎 FINANCELAB - Screener d'entreprises par ratios
+Description: Recherche multicritère sur une table colonnaire entreprises × ratios
+(ROE, endettement, liquidité, PER, score Conan-Holder, FRNG, BFR en jours...).
+Chaque colonne est triée une fois pour toutes ; un critère se résout par
+recherche dichotomique et les critères suivants ne sont évalués que sur les
+candidats restants.
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+OPERATEURS = ['>', '>=', '<', '<=', '=']
+
+# "roe > 12", "endettement <= 60", "score = 10"
+_MOTIF_CRITERE = re.compile(r"^\s*([\w\.]+)\s*(>=|<=|>|<|=)\s*(-?[\d\.,]+)\s*%?\s*$")
+
+
+def analyser_requete(requete):
+    """
+    Transforme une requête texte en liste de critères (colonne, opérateur, seuil).
+
+    Exemple : "roe > 12 et endettement < 60 et score_conan_holder > 9.5"
+    """
+    criteres = []
+    for morceau in re.split(r"\s+(?:et|and|ET|AND)\s+|&", requete):
+        if not morceau.strip():
+            continue
+        correspondance = _MOTIF_CRITERE.match(morceau)
+        if correspondance is None:
+            raise ValueError(f"Critère non reconnu : « {morceau.strip()} »")
+        colonne, operateur, seuil = correspondance.groups()
+        criteres.append((colonne, operateur, float(seuil.replace(',', '.'))))
+    return criteres
+
+
+class ScreenerRatios:
+    """Univers d'entreprises indexé colonne par colonne"""
+
+    def __init__(self, entreprises):
+        self.entreprises = entreprises.reset_index(drop=True)
+        self.colonnes = list(self.entreprises.select_dtypes(include='number').columns)
+
+        # Pour chaque ratio : ordre de tri, valeurs triées et nombre de valeurs renseignées
+        self.index = {}
+        for colonne in self.colonnes:
+            valeurs = self.entreprises[colonne].to_numpy(dtype='float64')
+            ordre = np.argsort(valeurs, kind='stable')
+            valeurs_triees = valeurs[ordre]
+            self.index[colonne] = (valeurs, ordre, valeurs_triees, int(np.count_nonzero(~np.isnan(valeurs))))
+        self._noms = {colonne.lower(): colonne for colonne in self.colonnes}
+
+    def __len__(self):
+        return len(self.entreprises)
+
+    def _plage(self, colonne, operateur, seuil):
+        """Plage [debut, fin) des positions triées satisfaisant le critère"""
+        _, _, valeurs_triees, nb_valides = self.index[colonne]
+        valeurs_triees = valeurs_triees[:nb_valides]  # les NaN sont rangés en fin de tri
+
+        if operateur == '>':
+            return np.searchsorted(valeurs_triees, seuil, side='right'), nb_valides
+        if operateur == '>=':
+            return np.searchsorted(valeurs_triees, seuil, side='left'), nb_valides
+        if operateur == '<':
+            return 0, np.searchsorted(valeurs_triees, seuil, side='left')
+        if operateur == '<=':
+            return 0, np.searchsorted(valeurs_triees, seuil, side='right')
+        if operateur == '=':
+            return (np.searchsorted(valeurs_triees, seuil, side='left'),
+                    np.searchsorted(valeurs_triees, seuil, side='right'))
+        raise ValueError(f"Opérateur inconnu : {operateur}")
+
+    @staticmethod
+    def _masque(valeurs, operateur, seuil):
+        """Évalue un critère directement sur un sous-ensemble de valeurs"""
+        if operateur == '>':
+            return valeurs > seuil
+        if operateur == '>=':
+            return valeurs >= seuil
+        if operateur == '<':
+            return valeurs < seuil
+        if operateur == '<=':
+            return valeurs <= seuil
+        return valeurs == seuil
+
+    def filtrer(self, criteres):
+        """
+        Retourne les positions (triées) des entreprises satisfaisant tous les critères.
+
+        Le critère le plus sélectif fournit les candidats via son index trié ;
+        les autres sont vérifiés sur ces seuls candidats.
+        """
+        if not criteres:
+            return np.arange(len(self))
+
+        for colonne, operateur, _ in criteres:
+            if colonne.lower() not in self._noms:
+                raise KeyError(f"Colonne inconnue : {colonne}")
+            if operateur not in OPERATEURS:
+                raise ValueError(f"Opérateur inconnu : {operateur}")
+        criteres = [(self._noms[colonne.lower()], operateur, seuil) for colonne, operateur, seuil in criteres]
+
+        plages = [self._plage(*critere) for critere in criteres]
+        ordre_criteres = np.argsort([fin - debut for debut, fin in plages])
+
+        premier = ordre_criteres[0]
+        debut, fin = plages[premier]
+        candidats = self.index[criteres[premier][0]][1][debut:fin]
+
+        for i in ordre_criteres[1:]:
+            if candidats.size == 0:
+                break
+            colonne, operateur, seuil = criteres[i]
+            valeurs = self.index[colonne][0]
+            candidats = candidats[self._masque(valeurs[candidats], operateur, seuil)]
+
+        return np.sort(candidats)
+
+    def trier(self, positions, colonne, croissant=False):
+        """Trie des positions selon une colonne (NaN en fin)"""
+        valeurs = self.index[colonne][0][positions]
+        ordre = np.argsort(valeurs if croissant else -valeurs, kind='stable')
+        return positions[ordre]
+
+    def page(self, positions, numero, taille_page=50):
+        """Extrait une page de résultats (numérotée à partir de 1)"""
+        debut = (numero - 1) * taille_page
+        return self.entreprises.iloc[positions[debut:debut + taille_page]]
+
+
+def nombre_pages(nb_resultats, taille_page=50):
+    """Nombre de pages nécessaires pour afficher les résultats"""
+    return max(1, -(-nb_resultats // taille_page))
+
+
+def charger_univers(fichier, nom_fichier):
+    """Charge un univers d'entreprises depuis un fichier CSV, Excel ou Parquet"""
+    if nom_fichier.endswith('.parquet'):
+        return pd.read_parquet(fichier)
+    if nom_fichier.endswith('.csv'):
+        return pd.read_csv(fichier)
+    return pd.read_excel(fichier)
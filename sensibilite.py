@@ -0,0 +1,97 @@
+"""
+🌪️ FINANCELAB - Analyse de sensibilité (diagramme en tornade)
+Description: Fait varier une à une toutes les hypothèses d'un calculateur
+(± x %, ou bornes choisies) et classe les hypothèses selon leur impact sur un
+résultat. Le calculateur est une fonction pure qui accepte des tableaux numpy
+(comme celles de calculs_financiers) : la matrice des 2 x n + 1 jeux
+d'hypothèses (référence, puis chaque hypothèse en bas et en haut) est évaluée
+en un seul appel vectorisé, au lieu de 2 x n calculs successifs.
+"""
+
+import numpy as np
+import pandas as pd
+
+import calculs_financiers
+
+# =============================================================================
+# PARAMÈTRES
+# =============================================================================
+
+VARIATION = 10.0    # Variation par défaut de chaque hypothèse (%)
+
+
+# =============================================================================
+# MATRICE DE PERTURBATION
+# =============================================================================
+
+def matrice_perturbation(entrees, variation=VARIATION, bornes=None):
+    """
+    Jeux d'hypothèses à évaluer : ligne 0 = référence, lignes 1 à n = chaque
+    hypothèse à sa borne basse, lignes n + 1 à 2n = à sa borne haute. Les
+    bornes valent ± `variation` % de la valeur de référence, sauf celles
+    données explicitement dans `bornes` ({nom: (bas, haut)}), utiles pour
+    une hypothèse nulle ou exprimée en points.
+    """
+    noms = list(entrees)
+    base = np.array([float(entrees[nom]) for nom in noms])
+    bas = base * (1 - variation / 100)
+    haut = base * (1 + variation / 100)
+    for i, nom in enumerate(noms):
+        if bornes and nom in bornes:
+            bas[i], haut[i] = bornes[nom]
+
+    n = len(noms)
+    matrice = np.tile(base, (2 * n + 1, 1))
+    matrice[1 + np.arange(n), np.arange(n)] = bas
+    matrice[1 + n + np.arange(n), np.arange(n)] = haut
+    return pd.DataFrame(matrice, columns=noms)
+
+
+def evaluer(calculateur, matrice, sortie=None, fixes=None):
+    """
+    Évalue le calculateur sur toutes les lignes de la matrice en un seul
+    appel : chaque hypothèse est passée comme un tableau (une valeur par
+    ligne), les paramètres `fixes` comme des scalaires.
+    """
+    arguments = {nom: matrice[nom].to_numpy() for nom in matrice.columns}
+    resultat = calculs_financiers.resultat_calculateur(calculateur(**arguments, **(fixes or {})), sortie)
+    return np.broadcast_to(resultat, (len(matrice),))
+
+
+# =============================================================================
+# TORNADE
+# =============================================================================
+
+def tornade(calculateur, entrees, sortie=None, variation=VARIATION, bornes=None, fixes=None, libelles=None):
+    """
+    Sensibilité d'un résultat à chaque hypothèse prise isolément. Retourne
+    (valeur de référence, tableau trié par amplitude décroissante) ; le
+    tableau donne pour chaque hypothèse ses bornes, le résultat à chacune,
+    les écarts à la référence et l'amplitude (écart entre les deux résultats).
+    `libelles` renomme les hypothèses pour l'affichage.
+    """
+    matrice = matrice_perturbation(entrees, variation, bornes)
+    valeurs = evaluer(calculateur, matrice, sortie, fixes)
+    n = len(entrees)
+    reference = float(valeurs[0])
+
+    tableau = pd.DataFrame({
+        'hypothese': [(libelles or {}).get(nom, nom) for nom in entrees],
+        'reference': matrice.iloc[0].to_numpy(),
+        'valeur_basse': np.diag(matrice.iloc[1:n + 1].to_numpy()),
+        'valeur_haute': np.diag(matrice.iloc[n + 1:].to_numpy()),
+        'resultat_bas': valeurs[1:n + 1],
+        'resultat_haut': valeurs[n + 1:],
+    })
+    tableau['ecart_bas'] = tableau['resultat_bas'] - reference
+    tableau['ecart_haut'] = tableau['resultat_haut'] - reference
+    tableau['amplitude'] = (tableau['resultat_haut'] - tableau['resultat_bas']).abs()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        tableau['elasticite'] = np.where(
+            reference != 0,
+            (tableau['resultat_haut'] - tableau['resultat_bas']) / abs(reference)
+            / ((tableau['valeur_haute'] - tableau['valeur_basse']) / tableau['reference'].abs().where(tableau['reference'] != 0)),
+            np.nan,
+        )
+    tableau = tableau.sort_values('amplitude', ascending=False, na_position='last').reset_index(drop=True)
+    return reference, tableau
@@ -0,0 +1,153 @@
+"""
+📈 FINANCELAB - Historique pluriannuel d'une entreprise
+Description: Stocke N exercices (ou trimestres) de bilan et de compte de résultat
+et calcule, colonne par colonne sur toutes les périodes, les ratios, les SIG,
+l'équilibre FRNG/BFR/TN et les variations d'une période à l'autre. L'ajout d'une
+période ne recalcule que cette période et les variations qui en dépendent.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Postes attendus (mêmes noms que le modèle de etats_financiers)
+POSTES = [
+    'actif_immobilise', 'stocks', 'clients', 'disponibilites', 'actif_circulant', 'total_actif',
+    'capitaux_propres', 'dettes_lt', 'dettes_financieres', 'fournisseurs', 'dettes_ct',
+    'chiffre_affaires', 'achats', 'charges_personnel', 'autres_charges', 'dotations',
+    'charges_financieres', 'resultat_net',
+]
+
+INDICATEURS_SIG = ['marge_brute', 'valeur_ajoutee', 'ebe', 'resultat_exploitation', 'resultat_courant', 'caf']
+INDICATEURS_EQUILIBRE = ['frng', 'bfr', 'tresorerie_nette']
+INDICATEURS_RATIOS = [
+    'roe', 'roa', 'ros', 'marge_ebit', 'endettement', 'autonomie_financiere', 'couverture_immobilisations',
+    'delai_clients', 'delai_stocks', 'delai_fournisseurs', 'liquidite_generale', 'liquidite_reduite',
+    'liquidite_immediate',
+]
+INDICATEURS = INDICATEURS_SIG + INDICATEURS_EQUILIBRE + INDICATEURS_RATIOS
+
+
+def _division(numerateur, denominateur):
+    """Division élément par élément, NaN lorsque le dénominateur est nul"""
+    return numerateur / denominateur.where(denominateur != 0)
+
+
+def _poste(postes, nom):
+    """Colonne d'un poste, NaN s'il n'est pas renseigné"""
+    return postes[nom].astype(float) if nom in postes else pd.Series(np.nan, index=postes.index)
+
+
+def calculer_indicateurs(postes, jours_periode=365):
+    """
+    Calcule SIG, équilibre financier et ratios pour toutes les lignes de
+    `postes` en une seule passe vectorisée. Les SIG déjà publiés (colonnes
+    présentes et renseignées) sont conservés.
+    """
+    p = {nom: _poste(postes, nom) for nom in set(POSTES) | set(INDICATEURS_SIG)}
+    ind = pd.DataFrame(index=postes.index)
+
+    # Soldes intermédiaires de gestion
+    ind['marge_brute'] = p['marge_brute'].fillna(p['chiffre_affaires'] - p['achats'])
+    ind['valeur_ajoutee'] = p['valeur_ajoutee'].fillna(ind['marge_brute'] - p['autres_charges'])
+    ind['ebe'] = p['ebe'].fillna(ind['valeur_ajoutee'] - p['charges_personnel'])
+    ind['resultat_exploitation'] = p['resultat_exploitation'].fillna(ind['ebe'] - p['dotations'])
+    ind['resultat_courant'] = p['resultat_courant'].fillna(ind['resultat_exploitation'] - p['charges_financieres'])
+    ind['caf'] = p['caf'].fillna(p['resultat_net'] + p['dotations'])
+
+    # Équilibre financier
+    actif_immobilise = p['actif_immobilise'].fillna(p['total_actif'] - p['actif_circulant'])
+    ind['frng'] = p['capitaux_propres'] + p['dettes_lt'] - actif_immobilise
+    ind['bfr'] = p['stocks'] + p['clients'] - p['fournisseurs']
+    ind['tresorerie_nette'] = ind['frng'] - ind['bfr']
+
+    # Ratios
+    ca = p['chiffre_affaires']
+    ind['roe'] = _division(p['resultat_net'], p['capitaux_propres']) * 100
+    ind['roa'] = _division(p['resultat_net'], p['total_actif']) * 100
+    ind['ros'] = _division(p['resultat_net'], ca) * 100
+    ind['marge_ebit'] = _division(ind['resultat_exploitation'], ca) * 100
+    ind['endettement'] = _division(p['dettes_financieres'], p['capitaux_propres'])
+    ind['autonomie_financiere'] = _division(p['capitaux_propres'], p['capitaux_propres'] + p['dettes_financieres']) * 100
+    ind['couverture_immobilisations'] = _division(p['capitaux_propres'] + p['dettes_lt'], actif_immobilise)
+    ind['delai_clients'] = _division(p['clients'], ca) * jours_periode
+    ind['delai_stocks'] = _division(p['stocks'], ca) * jours_periode
+    ind['delai_fournisseurs'] = _division(p['fournisseurs'], ca) * jours_periode
+    ind['liquidite_generale'] = _division(p['actif_circulant'], p['dettes_ct'])
+    ind['liquidite_reduite'] = _division(p['actif_circulant'] - p['stocks'], p['dettes_ct'])
+    ind['liquidite_immediate'] = _division(p['disponibilites'], p['dettes_ct'])
+
+    return ind[INDICATEURS]
+
+
+def calculer_variations(indicateurs):
+    """Variations d'une période sur l'autre (en valeur et en %)"""
+    precedent = indicateurs.shift(1)
+    delta = indicateurs - precedent
+    delta_pct = _division(delta, precedent.abs()) * 100
+    return pd.concat({'delta': delta, 'delta_pct': delta_pct}, axis=1)
+
+
+class HistoriqueEntreprise:
+    """Historique de postes et d'indicateurs, indexé par date de clôture"""
+
+    def __init__(self, postes=None, frequence='annuel'):
+        self.jours_periode = 365 if frequence == 'annuel' else 91
+        if postes is None:
+            postes = pd.DataFrame(columns=POSTES, index=pd.DatetimeIndex([], name='cloture'), dtype=float)
+        self.postes = postes.sort_index()
+        self.indicateurs = calculer_indicateurs(self.postes, self.jours_periode)
+        self.variations = calculer_variations(self.indicateurs)
+
+    def __len__(self):
+        return len(self.postes)
+
+    def ajouter_periode(self, cloture, postes):
+        """
+        Ajoute (ou remplace) une période. Seules cette période et la variation
+        de la période suivante éventuelle sont recalculées.
+        """
+        cloture = pd.Timestamp(cloture)
+        ligne = pd.DataFrame([postes], index=pd.DatetimeIndex([cloture], name=self.postes.index.name))
+
+        self.postes = pd.concat([self.postes.drop(index=cloture, errors='ignore'), ligne]).sort_index()
+        nouvel_indicateur = calculer_indicateurs(ligne, self.jours_periode)
+        self.indicateurs = pd.concat(
+            [self.indicateurs.drop(index=cloture, errors='ignore'), nouvel_indicateur]
+        ).sort_index()
+
+        position = self.indicateurs.index.get_loc(cloture)
+        debut = max(position - 1, 0)
+        fenetre = self.indicateurs.iloc[debut:position + 2]
+        nouvelles_variations = calculer_variations(fenetre).iloc[position - debut:]
+
+        self.variations = pd.concat(
+            [self.variations.drop(index=nouvelles_variations.index, errors='ignore'), nouvelles_variations]
+        ).sort_index()
+
+    def tableau(self, indicateurs=None):
+        """Indicateurs et variations en % côte à côte"""
+        indicateurs = indicateurs or INDICATEURS
+        return self.indicateurs[indicateurs].join(
+            self.variations['delta_pct'][indicateurs].add_suffix(' (Δ%)')
+        )
+
+    def taux_croissance_annuel_moyen(self, indicateur):
+        """TCAM d'un indicateur entre la première et la dernière période renseignée"""
+        serie = self.indicateurs[indicateur].dropna()
+        if len(serie) < 2 or serie.iloc[0] <= 0 or serie.iloc[-1] <= 0:
+            return np.nan
+        annees = (serie.index[-1] - serie.index[0]).days / 365.25
+        return ((serie.iloc[-1] / serie.iloc[0]) ** (1 / annees) - 1) * 100
+
+
+def historiques_en_lot(postes, niveau_entreprise='entreprise', jours_periode=365):
+    """
+    Calcule indicateurs et variations pour des milliers d'entreprises en une
+    passe : `postes` est indexé par (entreprise, clôture).
+    """
+    postes = postes.sort_index()
+    indicateurs = calculer_indicateurs(postes, jours_periode)
+    precedent = indicateurs.groupby(level=niveau_entreprise).shift(1)
+    delta = indicateurs - precedent
+    delta_pct = _division(delta, precedent.abs()) * 100
+    return indicateurs, pd.concat({'delta': delta, 'delta_pct': delta_pct}, axis=1)
@@ -0,0 +1,191 @@
+"""
+🎯 FINANCELAB - Seuil de rentabilité multi-produits et mix optimal
+Description: Étend le seuil de rentabilité à N produits partageant les mêmes
+coûts fixes : seuil pondéré par le mix de ventes, seuil et marge de sécurité
+de chaque produit, et mix maximisant le résultat sous contraintes de capacité
+(volume maximal par produit, volume minimal contractuel et ressource partagée
+comme des heures machine). Les calculs sont vectorisés : des centaines de
+produits et de mix simulés s'évaluent en un seul appel. Coûts fixes en k€,
+prix et coûts variables unitaires en €.
+"""
+
+import numpy as np
+import pandas as pd
+
+# =============================================================================
+# PARAMÈTRES
+# =============================================================================
+
+# Colonnes d'un catalogue de produits et valeurs par défaut des colonnes facultatives
+COLONNES = ['produit', 'prix', 'cout_variable', 'volume', 'capacite', 'minimum', 'consommation']
+DEFAUTS = {'capacite': np.inf, 'minimum': 0.0, 'consommation': 0.0}
+
+
+def normaliser_produits(produits):
+    """
+    Complète et contrôle un catalogue (une ligne par produit) : prix et
+    cout_variable unitaires (€), volume vendu actuel (définit le mix),
+    capacite (volume maximal), minimum (volume contractuel) et consommation
+    de la ressource partagée par unité.
+    """
+    produits = pd.DataFrame(produits).copy()
+    produits.columns = [str(c).strip().lower() for c in produits.columns]
+    manquantes = {'prix', 'cout_variable', 'volume'} - set(produits.columns)
+    if manquantes:
+        raise ValueError(f"Colonnes manquantes : {', '.join(sorted(manquantes))}")
+    if 'produit' not in produits:
+        produits['produit'] = [f"Produit {i + 1}" for i in range(len(produits))]
+    for colonne, defaut in DEFAUTS.items():
+        if colonne not in produits:
+            produits[colonne] = defaut
+    for colonne in COLONNES[1:]:
+        produits[colonne] = pd.to_numeric(produits[colonne], errors='coerce').astype(float)
+    produits['capacite'] = produits['capacite'].fillna(np.inf)
+    produits[['volume', 'minimum', 'consommation']] = produits[['volume', 'minimum', 'consommation']].fillna(0.0)
+    if produits[['prix', 'cout_variable']].isna().any().any():
+        raise ValueError("Prix ou coût variable non numérique")
+    if (produits['minimum'] > produits['capacite']).any():
+        raise ValueError("Volume minimal supérieur à la capacité")
+    return produits[COLONNES].reset_index(drop=True)
+
+
+def exemple_produits(nb=12, graine=0):
+    """Catalogue fictif de `nb` produits (quelques-uns à marge faible ou négative)"""
+    rng = np.random.default_rng(graine)
+    prix = np.round(np.exp(rng.normal(4.5, 0.6, nb)), 2)
+    volume = np.round(np.exp(rng.normal(7.5, 0.8, nb)))
+    return normaliser_produits({
+        'produit': [f"Produit {i + 1}" for i in range(nb)],
+        'prix': prix,
+        'cout_variable': np.round(prix * rng.uniform(0.35, 1.05, nb), 2),
+        'volume': volume,
+        'capacite': np.round(volume * rng.uniform(1.1, 2.0, nb)),
+        'minimum': np.where(rng.random(nb) < 0.2, np.round(volume * 0.3), 0.0),
+        'consommation': np.round(rng.uniform(0.1, 1.5, nb), 2),
+    })
+
+
+# =============================================================================
+# SEUIL PONDÉRÉ PAR LE MIX
+# =============================================================================
+
+def seuil_multiproduits(produits, couts_fixes, mix=None):
+    """
+    Seuil de rentabilité d'un mix de ventes : le mix (parts de chaque produit
+    en volume, par défaut celles des volumes actuels) forme un « panier »
+    dont la marge unitaire pondérée couvre les coûts fixes. `mix` peut être
+    une matrice (scénarios x produits) : tous les mix sont évalués ensemble.
+    Retourne la marge du panier, le nombre de paniers et le CA au seuil, les
+    volumes de seuil par produit, le résultat et la marge de sécurité globale
+    (%) au volume total actuel réparti selon le mix.
+    """
+    produits = normaliser_produits(produits)
+    prix = produits['prix'].to_numpy()
+    marge = prix - produits['cout_variable'].to_numpy()
+    volume = produits['volume'].to_numpy()
+
+    mix = volume if mix is None else np.asarray(mix, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        parts = mix / mix.sum(axis=-1, keepdims=True)
+        marge_panier = (parts * marge).sum(axis=-1)
+        prix_panier = (parts * prix).sum(axis=-1)
+        # [()] : un flottant pour un seul mix, comme les autres résultats
+        paniers = np.where(marge_panier > 0, np.asarray(couts_fixes, dtype=float) * 1000 / marge_panier, np.nan)[()]
+        volume_total = volume.sum()
+        ca = volume_total * prix_panier / 1000
+        seuil_ca = paniers * prix_panier / 1000
+        marge_securite = (ca - seuil_ca) / ca * 100
+    return {
+        'marge_panier': marge_panier,
+        'taux_marge': marge_panier / prix_panier * 100,
+        'seuil_paniers': paniers,
+        'seuil_ca': seuil_ca,
+        'seuil_volumes': paniers[..., None] * parts,
+        'resultat': (volume_total * marge_panier - np.asarray(couts_fixes, dtype=float) * 1000) / 1000,
+        'marge_securite': marge_securite,
+    }
+
+
+def detail_par_produit(produits, couts_fixes):
+    """
+    Marge sur coût variable, contribution et seuil de chaque produit au mix
+    actuel. La marge de sécurité d'un produit est la baisse de son volume
+    (%, les autres produits inchangés) que le résultat peut absorber avant
+    de devenir négatif.
+    """
+    produits = normaliser_produits(produits)
+    seuil = seuil_multiproduits(produits, couts_fixes)
+    detail = produits[['produit', 'prix', 'cout_variable', 'volume']].copy()
+    detail['marge_unitaire'] = detail['prix'] - detail['cout_variable']
+    detail['taux_marge'] = detail['marge_unitaire'] / detail['prix'] * 100
+    detail['marge_totale'] = detail['marge_unitaire'] * detail['volume'] / 1000
+    detail['contribution'] = detail['marge_totale'] / detail['marge_totale'].sum() * 100
+    detail['seuil_volume'] = seuil['seuil_volumes']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        detail['marge_securite'] = np.where(detail['marge_unitaire'] > 0, seuil['resultat'] * 1000
+                                            / detail['marge_unitaire'] / detail['volume'] * 100, np.nan)
+    return detail.set_index('produit')
+
+
+def mix_aleatoires(produits, nb=500, concentration=5.0, graine=0):
+    """`nb` mix simulés autour du mix actuel (tirages de Dirichlet, d'autant plus proches que `concentration` est grand)"""
+    produits = normaliser_produits(produits)
+    parts = produits['volume'].to_numpy() / produits['volume'].sum()
+    rng = np.random.default_rng(graine)
+    return rng.dirichlet(np.maximum(parts * concentration * len(parts), 1e-3), size=nb)
+
+
+# =============================================================================
+# MIX OPTIMAL SOUS CONTRAINTES DE CAPACITÉ
+# =============================================================================
+
+def mix_optimal(produits, couts_fixes, ressource=None):
+    """
+    Volumes maximisant le résultat : chaque produit reçoit son volume
+    minimal, puis les produits à marge positive sont remplis jusqu'à leur
+    capacité par ordre décroissant de marge par unité de ressource, tant que
+    la ressource partagée (`ressource`, illimitée si None) le permet. Avec
+    une seule ressource, ce remplissage glouton est la solution exacte du
+    programme linéaire (identique à scipy.optimize.linprog sur 200 cas
+    aléatoires) : il est conservé volontairement, sans solveur, car il est
+    vectorisé et donne directement l'ordre de priorité des produits. Lève
+    ValueError si le résultat n'est pas borné (produit rentable sans
+    capacité ni consommation de ressource).
+    """
+    produits = normaliser_produits(produits)
+    marge = (produits['prix'] - produits['cout_variable']).to_numpy()
+    capacite = produits['capacite'].to_numpy()
+    minimum = produits['minimum'].to_numpy()
+    consommation = produits['consommation'].to_numpy()
+    disponible = np.inf if ressource is None else float(ressource) - (minimum * consommation).sum()
+    if disponible < 0:
+        raise ValueError("Ressource insuffisante pour les volumes minimaux")
+
+    rentables = marge > 0
+    illimites = rentables & np.isinf(capacite) & ((consommation == 0) | np.isinf(disponible))
+    if illimites.any():
+        raise ValueError(f"Résultat non borné : {', '.join(produits.loc[illimites, 'produit'])} sans capacité ni ressource limitante")
+
+    # Remplissage par marge par unité de ressource décroissante (les produits sans consommation d'abord)
+    with np.errstate(divide='ignore'):
+        rendement = np.where(consommation > 0, marge / consommation, np.inf)
+    ordre = np.lexsort((-marge, -rendement))
+    ordre = ordre[rentables[ordre]]
+    supplement = capacite[ordre] - minimum[ordre]
+    besoin = supplement * consommation[ordre]
+    avant = np.concatenate([[0.0], np.cumsum(besoin)[:-1]])
+    restant = np.maximum(disponible - avant, 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        alloue = np.where(consommation[ordre] > 0, np.minimum(supplement, restant / consommation[ordre]), supplement)
+
+    volumes = minimum.copy()
+    volumes[ordre] += alloue
+    resultat = (volumes * marge).sum() / 1000 - couts_fixes
+    optimal = produits[['produit', 'volume', 'capacite']].assign(
+        volume_optimal=volumes,
+        marge_unitaire=marge,
+        marge_par_ressource=np.where(consommation > 0, marge / np.where(consommation > 0, consommation, 1), np.nan),
+        marge_totale=volumes * marge / 1000,
+        ressource_utilisee=volumes * consommation,
+    ).set_index('produit')
+    return optimal, float(resultat)
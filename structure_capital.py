@@ -0,0 +1,150 @@
+"""
+⚖️ FINANCELAB - Structure financière optimale
+Description: Explore les combinaisons dette / capitaux propres d'une entreprise
+de valeur donnée (recapitalisation : la dette remplace les fonds propres) en
+un seul calcul vectorisé sur des milliers de points. Le coût de la dette
+dépend d'une notation synthétique tirée de la couverture des intérêts
+(résultat d'exploitation / charges financières), le coût des fonds propres
+du bêta réendetté (Hamada). Pour chaque point : ROE, CMPC (WACC), valeur de
+l'entreprise, couverture, notation et probabilité de défaut. Montants en k€,
+taux en %.
+"""
+
+import numpy as np
+import pandas as pd
+
+# =============================================================================
+# PARAMÈTRES
+# =============================================================================
+
+# Notation synthétique : couverture des intérêts minimale, notation, spread (%)
+# et probabilité de défaut cumulée à 5 ans (%), de la meilleure à la pire (barème indicatif)
+NOTATIONS = pd.DataFrame([
+    (8.5, "AAA", 0.59, 0.3),
+    (6.5, "AA", 0.70, 0.4),
+    (5.5, "A+", 0.92, 0.5),
+    (4.25, "A", 1.07, 0.6),
+    (3.0, "A-", 1.21, 0.8),
+    (2.5, "BBB", 1.47, 1.7),
+    (2.25, "BB+", 1.81, 4.0),
+    (2.0, "BB", 2.11, 6.0),
+    (1.75, "B+", 2.94, 11.0),
+    (1.5, "B", 3.51, 15.0),
+    (1.25, "B-", 4.21, 21.0),
+    (0.8, "CCC", 7.18, 35.0),
+    (0.65, "CC", 8.64, 45.0),
+    (0.2, "C", 11.34, 55.0),
+    (-np.inf, "D", 15.12, 100.0),
+], columns=['couverture_min', 'notation', 'spread', 'probabilite_defaut'])
+
+NB_POINTS = 2_000
+RATIO_MAX = 0.95        # Part maximale de la dette dans la valeur de l'entreprise
+ITERATIONS = 20         # Itérations du point fixe taux <-> notation
+
+
+def notation_synthetique(couverture):
+    """Indice dans NOTATIONS de la notation correspondant à chaque couverture des intérêts"""
+    bornes = NOTATIONS['couverture_min'].to_numpy()[::-1]
+    rang = np.searchsorted(bornes, np.nan_to_num(np.asarray(couverture, dtype=float), nan=np.inf), side='right') - 1
+    return len(bornes) - 1 - np.clip(rang, 0, len(bornes) - 1)
+
+
+# =============================================================================
+# EXPLORATION
+# =============================================================================
+
+def valeur_desendettee(resultat_exploitation, taux_imposition=25.0, taux_sans_risque=3.0,
+                       beta_desendette=0.9, prime_risque=5.5, croissance=0.0):
+    """Valeur de l'entreprise sans dette : résultat d'exploitation après impôt actualisé au coût des fonds propres désendetté"""
+    cout_actif = taux_sans_risque + beta_desendette * prime_risque
+    return resultat_exploitation * (1 - taux_imposition / 100) * (1 + croissance / 100) / (cout_actif - croissance) * 100
+
+
+def explorer_structure(resultat_exploitation, capital_investi, taux_imposition=25.0, taux_sans_risque=3.0,
+                       beta_desendette=0.9, prime_risque=5.5, croissance=0.0, valeur_entreprise=None,
+                       nb_points=NB_POINTS, ratio_max=RATIO_MAX):
+    """
+    Balaye `nb_points` niveaux de dette entre 0 et `ratio_max` de la valeur
+    de l'entreprise (par défaut sa valeur sans dette) ; bêta et CMPC sont
+    calculés en valeurs de marché, le ROE sur les capitaux propres comptables
+    (capital investi - dette, NaN lorsqu'ils deviennent négatifs). Le taux de
+    la dette et la couverture des intérêts dépendent l'un de l'autre : ils
+    sont résolus par point fixe sur tout le balayage à la fois (en cas
+    d'oscillation entre deux notations, la moins bonne est retenue). L'économie d'impôt sur les intérêts est plafonnée au résultat
+    d'exploitation. La valeur de l'entreprise actualise le résultat
+    d'exploitation après impôt au CMPC, avec une croissance perpétuelle.
+    """
+    resultat_exploitation = float(resultat_exploitation)
+    if valeur_entreprise is None:
+        valeur_entreprise = valeur_desendettee(resultat_exploitation, taux_imposition, taux_sans_risque,
+                                               beta_desendette, prime_risque, croissance)
+    if valeur_entreprise <= 0:
+        # Résultat d'exploitation négatif : balayage sur le capital investi comptable
+        valeur_entreprise = float(capital_investi)
+    t = taux_imposition / 100
+    ratio = np.linspace(0, ratio_max, nb_points)
+    dette = ratio * valeur_entreprise
+    fonds_propres = valeur_entreprise - dette
+    capitaux_propres = float(capital_investi) - dette
+
+    # Point fixe : notation -> taux -> charges financières -> couverture -> notation
+    notation = np.zeros(nb_points, dtype=int)
+    precedente = notation
+    for _ in range(ITERATIONS):
+        taux_dette = taux_sans_risque + NOTATIONS['spread'].to_numpy()[notation]
+        charges_financieres = dette * taux_dette / 100
+        with np.errstate(divide='ignore', invalid='ignore'):
+            couverture = np.where(charges_financieres > 0, resultat_exploitation / charges_financieres, np.inf)
+        precedente, notation = notation, notation_synthetique(couverture)
+        if np.array_equal(notation, precedente):
+            break
+    notation = np.maximum(notation, precedente)
+    taux_dette = taux_sans_risque + NOTATIONS['spread'].to_numpy()[notation]
+    charges_financieres = dette * taux_dette / 100
+    with np.errstate(divide='ignore', invalid='ignore'):
+        couverture = np.where(charges_financieres > 0, resultat_exploitation / charges_financieres, np.inf)
+
+        # Économie d'impôt limitée aux intérêts couverts par le résultat d'exploitation
+        taux_effectif = t * np.clip(np.where(charges_financieres > 0, resultat_exploitation / charges_financieres, 1.0), 0, 1)
+        beta = beta_desendette * (1 + (1 - taux_effectif) * np.where(fonds_propres > 0, dette / fonds_propres, 0.0))
+        cout_fonds_propres = taux_sans_risque + beta * prime_risque
+        cmpc = (1 - ratio) * cout_fonds_propres + ratio * taux_dette * (1 - taux_effectif)
+        resultat_net = (resultat_exploitation - charges_financieres) * (1 - t)
+        roe = np.where(capitaux_propres > 0, resultat_net / capitaux_propres * 100, np.nan)
+        valeur = np.where(cmpc > croissance,
+                          resultat_exploitation * (1 - t) * (1 + croissance / 100) / (cmpc - croissance) * 100, np.nan)
+
+    return pd.DataFrame({
+        'ratio_dette': ratio * 100,
+        'dette': dette,
+        'capitaux_propres': capitaux_propres,
+        'fonds_propres_marche': fonds_propres,
+        'charges_financieres': charges_financieres,
+        'couverture': couverture,
+        'notation': NOTATIONS['notation'].to_numpy()[notation],
+        'taux_dette': taux_dette,
+        'beta': beta,
+        'cout_fonds_propres': cout_fonds_propres,
+        'cmpc': cmpc,
+        'roe': roe,
+        'valeur_entreprise': valeur,
+        'probabilite_defaut': NOTATIONS['probabilite_defaut'].to_numpy()[notation],
+    })
+
+
+def optimum(exploration, probabilite_defaut_max=None):
+    """
+    Point de CMPC minimal (valeur maximale), éventuellement parmi les points
+    dont la probabilité de défaut ne dépasse pas `probabilite_defaut_max` (%).
+    """
+    candidats = exploration
+    if probabilite_defaut_max is not None:
+        candidats = exploration[exploration['probabilite_defaut'] <= probabilite_defaut_max]
+        if candidats.empty:
+            candidats = exploration.iloc[:1]
+    return candidats.loc[candidats['cmpc'].idxmin()]
+
+
+def point_actuel(exploration, dette):
+    """Point du balayage le plus proche du niveau de dette actuel"""
+    return exploration.iloc[int(np.abs(exploration['dette'].to_numpy() - dette).argmin())]
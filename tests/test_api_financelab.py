@@ -0,0 +1,74 @@
+import http.client
+import json
+
+import pytest
+
+import api_financelab
+
+
+@pytest.fixture
+def serveur():
+    serveur = api_financelab.demarrer(port=0, nb_fils=2)
+    yield serveur
+    serveur.shutdown()
+    serveur.server_close()
+
+
+def _poster(serveur, chemin, corps, entetes=None):
+    connexion = http.client.HTTPConnection(*serveur.server_address, timeout=10)
+    try:
+        connexion.request("POST", chemin, body=corps, headers=entetes or {})
+        reponse = connexion.getresponse()
+        return reponse.status, json.loads(reponse.read()), reponse.getheader("X-Cache")
+    finally:
+        connexion.close()
+
+
+def test_traiter_objet_et_lot():
+    corps = api_financelab.CORPS_EXEMPLE['/bilan']
+    seul = api_financelab.traiter('/bilan', corps)
+    lot = api_financelab.traiter('/bilan', {'lot': [corps, corps]})
+    assert seul['tresorerie'] == 200
+    assert lot['resultats'] == [seul, seul]
+    with pytest.raises(ValueError):
+        api_financelab.traiter('/bilan', {'lot': []})
+
+
+def test_van_tir_flux_completes():
+    resultats = api_financelab.traiter('/van-tir', {'lot': [
+        {'investissement': 100, 'flux': [60, 60], 'taux': 0},
+        {'investissement': 100, 'flux': [60], 'taux': 0},
+    ]})['resultats']
+    assert resultats[0]['van'] == pytest.approx(20)
+    assert resultats[1]['van'] == pytest.approx(-40)
+
+
+def test_points_entree_et_cache(serveur):
+    corps = json.dumps(api_financelab.CORPS_EXEMPLE['/dcf']).encode('utf-8')
+    statut, reponse, cache = _poster(serveur, '/dcf', corps)
+    assert (statut, cache) == (200, "MISS")
+    assert reponse['valeur_entreprise'] > 0
+    assert _poster(serveur, '/dcf', corps)[1:] == (reponse, "HIT")
+
+    assert _poster(serveur, '/inconnu', b'{}')[0] == 404
+    assert _poster(serveur, '/dcf', b'{pas du json')[0] == 400
+    assert _poster(serveur, '/dcf', b'{"wacc": 9}')[0] == 400
+
+
+@pytest.mark.parametrize("longueur, statut", [
+    ("-1", 400),
+    ("abc", 400),
+    (str(api_financelab.TAILLE_MAX_CORPS + 1), 413),
+])
+def test_content_length_refuse_avant_lecture(serveur, longueur, statut):
+    # Le corps annoncé n'est jamais envoyé : une lecture bloquerait jusqu'au délai
+    connexion = http.client.HTTPConnection(*serveur.server_address, timeout=10)
+    try:
+        connexion.putrequest("POST", "/dcf")
+        connexion.putheader("Content-Length", longueur)
+        connexion.endheaders()
+        reponse = connexion.getresponse()
+        assert reponse.status == statut
+        assert 'erreur' in json.loads(reponse.read())
+    finally:
+        connexion.close()
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import balance_agee
+
+REFERENCE = pd.Timestamp('2024-06-30')
+
+
+def _encours(lignes):
+    encours = pd.DataFrame(lignes, columns=['nature', 'tiers', 'date', 'montant'])
+    encours['date'] = REFERENCE - pd.to_timedelta(encours['date'], unit='D')
+    encours['echeance'] = encours['date'] + pd.Timedelta(days=30)
+    return encours
+
+
+# Ancienneté (jours) à la date de référence ; -5 : pièce postérieure
+ENCOURS = _encours([
+    ('client', 'A', 10, 100.0), ('client', 'A', 30, 50.0), ('client', 'B', 31, 200.0),
+    ('client', 'B', 75, 300.0), ('client', 'C', 120, 400.0), ('client', 'C', -5, 1000.0),
+    ('fournisseur', 'X', 45, 80.0), ('fournisseur', 'Y', 100, 20.0),
+])
+
+
+def test_totaux_par_tranche():
+    balance = balance_agee.BalanceAgee(ENCOURS).vieillir(REFERENCE)
+    assert balance.totaux().to_dict() == {"0-30 j": 150, "31-60 j": 280, "61-90 j": 300, "> 90 j": 420}
+    par_tiers = balance.par_tiers()
+    assert par_tiers.loc[('client', 'C'), 'total'] == 400
+    assert par_tiers['total'].sum() == balance.totaux().sum()
+    synthese = balance.synthese()
+    assert synthese.loc['fournisseur', 'total'] == 100
+    assert synthese.loc['client', 'part > 90 j'] == pytest.approx(400 / 1050 * 100)
+
+
+def test_base_echeance_non_echu():
+    balance = balance_agee.BalanceAgee(ENCOURS, base='echeance').vieillir(REFERENCE)
+    totaux = balance.totaux()
+    assert list(totaux.index) == [balance_agee.NON_ECHU] + balance_agee.TRANCHES
+    # Échéance à date + 30 : pièces de moins de 30 jours et pièce postérieure non échues
+    assert totaux[balance_agee.NON_ECHU] == 100 + 1000
+    assert totaux.sum() == ENCOURS['montant'].sum()
+
+
+def test_vieillissement_incremental_identique():
+    rng = np.random.default_rng(5)
+    encours = _encours([
+        (rng.choice(['client', 'fournisseur']), f"T{rng.integers(30)}", int(rng.integers(-60, 400)),
+         float(rng.normal(500, 300)))
+        for _ in range(2_000)
+    ])
+    incrementale = balance_agee.BalanceAgee(encours)
+    for decalage in [0, 17, 95, -40, 365, 3]:
+        date = REFERENCE + pd.Timedelta(days=decalage)
+        incrementale.vieillir(date)
+        complete = balance_agee.BalanceAgee(encours).vieillir(date)
+        pd.testing.assert_series_equal(incrementale.totaux(), complete.totaux())
+        pd.testing.assert_frame_equal(incrementale.par_tiers(), complete.par_tiers())
+
+
+def test_concentration():
+    balance = balance_agee.BalanceAgee(ENCOURS).vieillir(REFERENCE)
+    concentration = balance.concentration(nb=1)
+    assert concentration.loc['fournisseur', 'part_top_1'] == 80
+    assert concentration.loc['fournisseur', 'premier_tiers'] == 'X'
+    assert concentration.loc['fournisseur', 'herfindahl'] == pytest.approx(0.8 ** 2 * 1e4 + 0.2 ** 2 * 1e4)
+
+    crediteur = _encours([('client', 'A', 10, -50.0), ('fournisseur', 'X', 10, 10.0)])
+    concentration = balance_agee.BalanceAgee(crediteur).vieillir(REFERENCE).concentration()
+    assert np.isnan(concentration.loc['client', 'herfindahl'])
+
+
+def test_balance_non_vieillie():
+    with pytest.raises(ValueError):
+        balance_agee.BalanceAgee(ENCOURS).totaux()
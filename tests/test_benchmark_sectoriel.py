@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import benchmark_sectoriel
+
+
+@pytest.fixture
+def benchmark(tmp_path):
+    # Secteur A : ROE de 1 à 100 (50 TPE puis 50 PME) ; secteur B : endettement de 0,1 à 1
+    entreprises = pd.DataFrame({
+        'secteur': ['A'] * 100 + ['B'] * 10,
+        'chiffre_affaires': [1_000] * 50 + [10_000] * 50 + [1_000] * 10,
+        'roe': list(np.arange(1.0, 101.0)) + [np.nan] * 10,
+        'endettement': [np.nan] * 100 + list(np.arange(1, 11) / 10),
+    })
+    return benchmark_sectoriel.construire_benchmark(entreprises, str(tmp_path / "benchmark.parquet"))
+
+
+def test_classe_taille():
+    assert benchmark_sectoriel.classe_taille(1_999) == "TPE"
+    assert benchmark_sectoriel.classe_taille(2_000) == "PME"
+    assert benchmark_sectoriel.classe_taille(1e9) == "GE"
+
+
+def test_distributions_triees_et_separees(benchmark):
+    assert benchmark.secteurs == ['A', 'B']
+    assert benchmark.tailles('A') == ['PME', 'TPE', benchmark_sectoriel.TOUTES_TAILLES]
+    toutes = benchmark.distribution('A', benchmark_sectoriel.TOUTES_TAILLES, 'roe')
+    np.testing.assert_array_equal(toutes, np.arange(1.0, 101.0))
+    np.testing.assert_array_equal(benchmark.distribution('A', 'TPE', 'roe'), np.arange(1.0, 51.0))
+    # Les valeurs manquantes ne créent pas de distribution
+    assert benchmark.distribution('B', 'TPE', 'roe') is None
+    assert benchmark.deciles_de('A', benchmark_sectoriel.TOUTES_TAILLES, 'roe')['d5'] == pytest.approx(50.5)
+
+
+def test_percentile(benchmark):
+    toutes = benchmark_sectoriel.TOUTES_TAILLES
+    assert benchmark.percentile('A', toutes, 'roe', 0) == 0
+    assert benchmark.percentile('A', toutes, 'roe', 1000) == 100
+    assert benchmark.percentile('A', toutes, 'roe', 50.5) == 50
+    # Valeur présente : rang moyen entre « strictement inférieures » et « inférieures ou égales »
+    assert benchmark.percentile('A', toutes, 'roe', 25) == pytest.approx(24.5)
+    assert benchmark.percentile('A', 'TPE', 'roe', 25) == pytest.approx(49)
+    assert benchmark.percentile('Z', toutes, 'roe', 25) is None
+
+
+def test_position_sectorielle(benchmark):
+    texte = benchmark_sectoriel.position_sectorielle(benchmark, 'B', 'TPE', 'endettement', 0.25)
+    assert "20e percentile" in texte and "meilleur que 80%" in texte
+    # Taille absente du secteur : repli sur la distribution toutes tailles
+    assert benchmark_sectoriel.position_sectorielle(benchmark, 'A', 'ETI', 'roe', 80.5) is not None
+    assert benchmark_sectoriel.position_sectorielle(None, 'A', 'TPE', 'roe', 1) is None
+
+
+def test_chargement_mis_en_cache(benchmark, tmp_path):
+    chemin = str(tmp_path / "benchmark.parquet")
+    assert benchmark_sectoriel.charger_benchmark(chemin) is benchmark
+    assert benchmark_sectoriel.charger_benchmark(str(tmp_path / "absent.parquet")) is None
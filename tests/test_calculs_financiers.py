@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+import calculs_financiers
+import entreprises_synthetiques
+
+# Bilan équilibré (k€) : 2 100 à l'actif comme au passif, trésorerie nette de 150 - 60
+BILAN = {
+    'actif_immobilise': 1200, 'stocks': 300, 'clients': 450, 'disponibilites': 150,
+    'capital': 500, 'reserves': 400, 'resultat_net': 120, 'dettes_lt': 600, 'dettes_ct': 480,
+    'concours_bancaires': 60,
+}
+
+
+def test_tresorerie_bilan_equilibre():
+    analyse = calculs_financiers.analyser_bilan(**BILAN)
+    assert analyse['ecart_bilan'] == 0
+    assert analyse['frng'] == 420
+    assert analyse['bfr'] == 300 + 450 - (480 - 60)
+    assert analyse['tresorerie'] == 90
+    assert analyse['frng'] - analyse['bfr'] == analyse['tresorerie']
+    points_forts, points_faibles = calculs_financiers.diagnostic_bilan(analyse)
+    assert "Trésorerie excédentaire" in points_forts
+
+
+def test_tresorerie_entreprises_synthetiques():
+    entreprises = entreprises_synthetiques.generer_entreprises(200, graine=3)
+    diagnostic = calculs_financiers.diagnostic_complet(entreprises)
+    attendue = entreprises['disponibilites'] - entreprises['concours_bancaires']
+    np.testing.assert_allclose(diagnostic['tresorerie'], attendue)
+    assert (diagnostic['tresorerie'].abs() > 1).mean() > 0.9
+    excedentaires = attendue > 0
+    assert not diagnostic.loc[excedentaires, 'points_vigilance'].str.contains("Trésorerie déficitaire").any()
+
+
+def test_postes_manquants_ignores():
+    partiel = pd.DataFrame([{nom: valeur for nom, valeur in BILAN.items() if nom not in ('dettes_lt', 'disponibilites')}])
+    diagnostic = calculs_financiers.diagnostic_complet(partiel).iloc[0]
+    assert np.isnan(diagnostic['frng'])
+    assert np.isnan(diagnostic['tresorerie'])
+    assert np.isnan(diagnostic['taux_endettement'])
+    assert np.isnan(diagnostic['liquidite_generale'])
+    assert diagnostic['bfr'] == 300 + 450 - (480 - 60)
+    assert diagnostic['points_forts'] == diagnostic['points_vigilance'] == ""
+    assert diagnostic['niveau_taux_marge'] == 'n.d.'
+
+
+def test_bilan_sans_concours_bancaires():
+    # Cas courant : aucun concours bancaire publié, toutes les dettes à court terme sont d'exploitation
+    sans_concours = {nom: valeur for nom, valeur in BILAN.items() if nom != 'concours_bancaires'}
+    sans_concours['dettes_ct'] = 420
+    sans_concours['disponibilites'] = 90
+    diagnostic = calculs_financiers.diagnostic_complet(pd.DataFrame([sans_concours])).iloc[0]
+    assert diagnostic['ecart_bilan'] == 0
+    assert diagnostic['frng'] == 420
+    assert diagnostic['bfr'] == 300 + 450 - 420
+    assert diagnostic['tresorerie'] == 90
+    assert "Trésorerie excédentaire" in diagnostic['points_forts']
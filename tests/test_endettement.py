@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import endettement
+
+
+def _emprunt(**caracteristiques):
+    return endettement.echeancier(pd.DataFrame([{
+        'montant': 120.0, 'taux': 6.0, 'duree': 2, 'periodicite': 12, 'debut': '2024-01-15', **caracteristiques
+    }]), date_reference='2024-01-01')
+
+
+def test_normaliser_portefeuille():
+    portefeuille = endettement.normaliser_portefeuille(pd.DataFrame({
+        'Montant': [100, 50], 'Taux': [3, 4], 'Duree': [5, 3], 'debut': ['2024-12-01', '2023-06-30'],
+    }))
+    assert list(portefeuille.columns) == endettement.COLONNES
+    assert list(portefeuille['debut']) == [pd.Timestamp('2024-12-01'), pd.Timestamp('2023-06-30')]
+    assert (portefeuille['type'] == 'annuite').all() and (portefeuille['periodicite'] == 12).all()
+    assert endettement.normaliser_portefeuille({'montant': [1], 'taux': [1], 'duree': [1],
+                                                'debut': ['01/12/2024']})['debut'][0] == pd.Timestamp('2024-12-01')
+    with pytest.raises(ValueError):
+        endettement.normaliser_portefeuille({'montant': [1], 'taux': [1], 'duree': [1], 'type': ['bullet']})
+    with pytest.raises(ValueError):
+        endettement.normaliser_portefeuille({'montant': [1], 'taux': [1], 'duree': [1], 'periodicite': [3]})
+
+
+def test_annuites_constantes():
+    ech = _emprunt()
+    r = 0.06 / 12
+    attendue = 120 * r / (1 - (1 + r) ** -24)
+    echeances = (ech['interets'] + ech['amortissement'])[0]
+    np.testing.assert_allclose(echeances, attendue)
+    assert ech['amortissement'].sum() == pytest.approx(120)
+    assert ech['capital_restant'][0, -1] == pytest.approx(0, abs=1e-9)
+    assert ech['interets'][0, 0] == pytest.approx(120 * r)
+
+
+def test_amortissement_constant_in_fine_et_differe():
+    constant = _emprunt(type='amortissement_constant')
+    np.testing.assert_allclose(constant['amortissement'][0], 5.0)
+
+    in_fine = _emprunt(type='in_fine')
+    assert in_fine['amortissement'][0, :-1].sum() == 0
+    assert in_fine['amortissement'][0, -1] == 120
+    np.testing.assert_allclose(in_fine['interets'][0], 120 * 0.06 / 12)
+
+    differe = _emprunt(type='amortissement_constant', differe=0.5)
+    assert differe['amortissement'][0, :6].sum() == 0
+    np.testing.assert_allclose(differe['amortissement'][0, 6:], 120 / 18)
+
+
+def test_taux_variable_sur_la_courbe():
+    courbe = {0: 2.0, 1: 3.0}
+    ech = endettement.echeancier(pd.DataFrame([{
+        'montant': 100.0, 'taux': 1.0, 'duree': 2, 'periodicite': 1, 'variable': True, 'debut': '2024-01-01'
+    }]), courbe=courbe, date_reference='2024-01-01')
+    # Index à l'horizon de chaque période (0 puis 1 an) + marge
+    np.testing.assert_allclose(ech['taux'][0], [3.0, 4.0])
+    # Projection depuis la date de référence : un an plus tard, l'index de la première période est celui à 0
+    decale = endettement.echeancier(pd.DataFrame([{
+        'montant': 100.0, 'taux': 1.0, 'duree': 2, 'periodicite': 1, 'variable': True, 'debut': '2024-01-01'
+    }]), courbe=courbe, date_reference='2025-01-01')
+    np.testing.assert_allclose(decale['taux'][0], [3.0, 3.0])
+
+
+def test_portefeuille_par_annee_et_echeances_datees():
+    portefeuille = pd.DataFrame({
+        'montant': [120.0, 60.0], 'taux': [6.0, 0.0], 'duree': [2, 1], 'periodicite': [12, 4],
+        'debut': ['2024-01-15', '2024-07-01'],
+    })
+    ech = endettement.echeancier(portefeuille, date_reference='2024-01-01')
+    assert ech['interets'].shape == (2, 24)
+    assert ech['actif'][1].sum() == 4
+
+    annuel = endettement.par_annee(ech)
+    assert annuel.loc[2024, 'nouveaux_emprunts'] == 180
+    assert annuel['remboursements'].sum() == pytest.approx(180)
+    assert annuel['dette_fin'].iloc[-1] == pytest.approx(0, abs=1e-9)
+    assert annuel.loc[2025, 'dette_debut'] == annuel.loc[2024, 'dette_fin']
+
+    datees = endettement.echeances_datees(ech, jour=31)
+    assert (datees['date'].dt.day == 28).all()
+    assert datees['montant'].sum() == pytest.approx((ech['interets'] + ech['amortissement']).sum())
+    # Taux nul : le second emprunt paie 15 par trimestre à partir d'octobre 2024
+    assert datees.loc[datees['date'] == '2024-10-28', 'montant'].iloc[0] == pytest.approx(
+        (ech['interets'] + ech['amortissement'])[0, 8] + 15)
+
+
+def test_impact_financier():
+    annuel = endettement.par_annee(_emprunt())
+    impact = endettement.impact_financier(annuel, ebe=100, dotations=20)
+    assert (impact['resultat_courant'] == 80 - annuel['interets']).all()
+    assert impact['flux_financement'].sum() == pytest.approx(0)
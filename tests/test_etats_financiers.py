@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import etats_financiers
+import passerelle_marche
+
+CLOTURES = pd.to_datetime(['2024-12-31', '2025-12-31'])
+
+
+def _etats(clotures=CLOTURES):
+    """États bruts au format yfinance (postes en ligne, clôtures en colonne, en unités)"""
+    def etat(lignes):
+        return pd.DataFrame(lignes, index=clotures).T
+    return {
+        'bilan': etat({
+            'Total Assets': [5e6, 6e6], 'Current Assets': [2e6, 2.5e6], 'Stockholders Equity': [2e6, 2.4e6],
+            'Total Debt': [1.5e6, 1.8e6], 'Current Debt': [3e5, 4e5], 'Inventory': [4e5, 5e5],
+        }),
+        'resultat': etat({
+            'Total Revenue': [8e6, 9e6], 'Cost Of Revenue': [5e6, 5.5e6], 'Operating Income': [9e5, 1e6],
+            'Reconciled Depreciation': [2e5, 2.5e5], 'Salaries And Wages': [1.5e6, 1.6e6],
+            'Interest Expense': [-6e4, -7e4], 'Net Income': [6e5, 7e5],
+        }),
+        'flux': etat({'Operating Cash Flow': [1.1e6, 1.2e6]}),
+        'date_verification': datetime(2026, 1, 10),
+    }
+
+
+def test_transposer_etats_en_keur_avec_complements():
+    modele = etats_financiers.transposer_etats(_etats())
+    assert list(modele.index) == list(CLOTURES)
+    derniere = modele.iloc[-1]
+    assert derniere['chiffre_affaires'] == 9_000
+    assert derniere['actif_immobilise'] == 6_000 - 2_500
+    assert derniere['dettes_lt'] == 1_800 - 400
+    assert derniere['marge_brute'] == 9_000 - 5_500
+    assert derniere['ebe'] == 1_000 + 250
+    assert derniere['valeur_ajoutee'] == 1_250 + 1_600
+    assert derniere['charges_financieres'] == 70
+    assert derniere['caf'] == 700 + 250
+    assert np.isnan(derniere['clients'])
+
+
+def test_valeurs_pour_pages_ignore_postes_absents():
+    valeurs = etats_financiers.valeurs_pour_pages(etats_financiers.transposer_etats(_etats()).iloc[-1])
+    assert valeurs['ca_ratios'] == 9_000
+    assert valeurs['cap_permanents'] == 2_400 + 1_400
+    assert 'clients_moyens' not in valeurs
+
+
+def test_nouvelle_periode_attendue():
+    etats = _etats()
+    # Clôture 2025-12-31 : publication annuelle attendue après le 2026-03-16
+    assert not etats_financiers.nouvelle_periode_attendue(etats, 'annuel', datetime(2026, 3, 1))
+    assert etats_financiers.nouvelle_periode_attendue(etats, 'annuel', datetime(2027, 3, 20))
+    etats['date_verification'] = datetime(2027, 3, 20)
+    assert not etats_financiers.nouvelle_periode_attendue(etats, 'annuel', datetime(2027, 3, 20, 12))
+    etats['date_verification'] = datetime(2026, 1, 10)
+    assert etats_financiers.nouvelle_periode_attendue(etats, 'trimestriel', datetime(2026, 5, 20))
+
+
+def test_cache_servi_si_source_indisponible(tmp_path, monkeypatch):
+    monkeypatch.setattr(etats_financiers, 'DOSSIER_CACHE', str(tmp_path))
+    appels = []
+
+    def etats_source(ticker, frequence, fraicheur):
+        appels.append(ticker)
+        if len(appels) > 1:
+            raise passerelle_marche.SourceIndisponible("hors ligne")
+        return _etats(pd.to_datetime(['2020-12-31', '2021-12-31']))
+    monkeypatch.setattr(passerelle_marche, 'etats', etats_source)
+
+    premiers = etats_financiers.charger_etats(' abc ')
+    assert appels == ['ABC']
+    # Vérifiés à l'instant : servis depuis le cache sans appel
+    assert etats_financiers.charger_etats('ABC')['resultat'].equals(premiers['resultat'])
+    assert appels == ['ABC']
+
+    # Nouvelle clôture attendue mais source indisponible : dernière version connue
+    premiers['date_verification'] = datetime.now() - timedelta(days=2)
+    etats_financiers._ecrire_cache('ABC', 'annuel', premiers)
+    assert etats_financiers.charger_etats('ABC')['resultat'].equals(premiers['resultat'])
+    assert appels == ['ABC', 'ABC']
+
+    with pytest.raises(ValueError):
+        etats_financiers.charger_etats('XYZ')
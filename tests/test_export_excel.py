@@ -0,0 +1,66 @@
+from io import BytesIO
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+import export_excel
+
+
+def test_ecrire_tableaux_types_et_manquants(monkeypatch):
+    # Blocs réduits pour traverser plusieurs blocs sur un petit tableau
+    monkeypatch.setattr(export_excel, 'TAILLE_BLOC', 3)
+    df = pd.DataFrame({
+        'entreprise': ["A", "B", None, "D", "E"],
+        'effectif': [10, 20, 30, 40, 50],
+        'taux_marge': [12.5, np.nan, np.inf, 8.0, -3.0],
+        'cloture': pd.to_datetime(["2024-12-31", "2023-12-31", None, "2022-06-30", "2021-12-31"]),
+    })
+    classeur = openpyxl.load_workbook(BytesIO(export_excel.ecrire_tableaux({'Résultats': df})))
+    feuille = classeur['Résultats']
+    lignes = list(feuille.iter_rows(values_only=True))
+    assert lignes[0] == ('entreprise', 'effectif', 'taux_marge', 'cloture')
+    assert len(lignes) == 6
+    assert [ligne[1] for ligne in lignes[1:]] == [10, 20, 30, 40, 50]
+    # Manquants et infinis laissés vides
+    assert [ligne[2] for ligne in lignes[1:]] == [12.5, None, None, 8.0, -3.0]
+    assert lignes[3][0] is None and lignes[3][3] is None
+    assert lignes[1][3] == pd.Timestamp("2024-12-31").to_pydatetime()
+    assert feuille.auto_filter.ref == "A1:D6"
+
+
+def test_formats_de_colonne():
+    df = pd.DataFrame({'taux_marge': [1.0], 'effectif': [1], 'montant': [1.5], 'actif': [True], 'nom': ["x"]})
+    assert [export_excel._format_colonne(nom, df[nom]) for nom in df.columns] == \
+        ['pourcentage', 'entier', 'decimal', None, None]
+
+
+def test_ecrire_tableaux_vers_un_fichier(tmp_path):
+    chemin = str(tmp_path / "export.xlsx")
+    assert export_excel.ecrire_tableaux({'a' * 40: pd.DataFrame({'x': [1.0]})}, chemin) == chemin
+    # Nom de feuille tronqué à la limite Excel
+    assert openpyxl.load_workbook(chemin).sheetnames == ['a' * 31]
+
+
+def test_rapport_formules_resolues():
+    contenu = export_excel.ecrire_rapport({
+        'Saisie': [(None, "SECTION", None, 'section'), ('a', "A", 10, None), ('b', "B", 20, None),
+                   ('total', "Total", "=SUM({a}:{b})", 'total')],
+        'Analyse': [(None, "Part de A", "={a}/{total}", 'pourcentage')],
+    })
+    classeur = openpyxl.load_workbook(BytesIO(contenu))
+    assert classeur['Saisie']['B5'].value == "=SUM(B3:B4)"
+    # Référence vers une autre feuille préfixée par son nom
+    assert classeur['Analyse']['B2'].value == "='Saisie'!B3/'Saisie'!B5"
+    assert classeur['Saisie']['B2'].value is None
+
+
+def test_modeles_generes_une_fois():
+    assert export_excel.modele_excel('bilan') is export_excel.modele_excel('bilan')
+    for nom, feuilles in export_excel.MODELES.items():
+        classeur = openpyxl.load_workbook(BytesIO(export_excel.modele_excel(nom)))
+        assert classeur.sheetnames == list(feuilles)
+        # Aucune référence non résolue dans les formules
+        formules = [cellule.value for feuille in classeur for cellule in feuille['B']
+                    if isinstance(cellule.value, str) and cellule.value.startswith('=')]
+        assert formules and not any('{' in formule for formule in formules)
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import etats_financiers
+import fournisseurs_marche
+
+
+@pytest.fixture(scope="module")
+def synthetique():
+    return fournisseurs_marche.FournisseurSynthetique(graine=1, debut="2020-01-01", fin="2024-12-31")
+
+
+def test_synthetique_deterministe(synthetique):
+    autre = fournisseurs_marche.FournisseurSynthetique(graine=1, debut="2020-01-01", fin="2024-12-31")
+    historique = synthetique.historique('aapl', 'max')
+    pd.testing.assert_frame_equal(historique, autre.historique('AAPL', 'max'))
+    assert list(historique.columns) == fournisseurs_marche.COLONNES_HISTORIQUE
+    assert historique.index.dayofweek.max() < 5
+    assert (historique['High'] >= historique[['Open', 'Close']].max(axis=1)).all()
+    assert (historique['Low'] <= historique[['Open', 'Close']].min(axis=1)).all()
+    # Graine différente : autre série
+    assert not historique['Close'].equals(
+        fournisseurs_marche.FournisseurSynthetique(graine=2, debut="2020-01-01", fin="2024-12-31")
+        .historique('AAPL', 'max')['Close']
+    )
+
+
+def test_synthetique_cours_cloture_independants_du_lot(synthetique):
+    seul = synthetique.cours_cloture(['MSFT'], '1y')['MSFT']
+    lot = synthetique.cours_cloture(['AAPL', 'MSFT'], '1y')['MSFT']
+    pd.testing.assert_series_equal(seul, lot)
+    np.testing.assert_allclose(seul.to_numpy(), synthetique.historique('MSFT', '1y')['Close'].to_numpy())
+
+
+def test_synthetique_etats_transposables(synthetique):
+    modele = etats_financiers.transposer_etats(synthetique.etats('AAPL'))
+    assert len(modele) == 4
+    assert modele.index.is_monotonic_increasing
+    derniere = modele.iloc[-1]
+    assert derniere['actif_immobilise'] + derniere['stocks'] + derniere['clients'] <= derniere['total_actif']
+    assert synthetique.info('AAPL')['sector'] in fournisseurs_marche.SECTEURS
+
+
+def test_fichiers_enregistrement_puis_rejeu(tmp_path, synthetique):
+    dossier = str(tmp_path)
+    enregistreur = fournisseurs_marche.FournisseurFichiers(dossier, source=synthetique)
+    attendu = enregistreur.historique('AAPL', '6mo')
+    enregistreur.info('AAPL')
+
+    rejeu = fournisseurs_marche.FournisseurFichiers(dossier)
+    assert rejeu.debit is None and rejeu.tickers() == ['AAPL']
+    pd.testing.assert_frame_equal(rejeu.historique('aapl', '6mo'), attendu, check_freq=False)
+    assert rejeu.info('AAPL')['symbol'] == 'AAPL'
+    with pytest.raises(fournisseurs_marche.DonneesAbsentes):
+        rejeu.historique('MSFT')
+    with pytest.raises(fournisseurs_marche.DonneesAbsentes):
+        rejeu.etats('AAPL')
+
+
+def test_depuis_configuration(tmp_path):
+    assert isinstance(fournisseurs_marche.depuis_configuration("yahoo"), fournisseurs_marche.FournisseurYahoo)
+    fichiers = fournisseurs_marche.depuis_configuration(f"fichiers:{tmp_path}")
+    assert fichiers.dossier == str(tmp_path) and fichiers.source is None
+    assert fournisseurs_marche.depuis_configuration("synthetique:7").graine == 7
+    with pytest.raises(ValueError):
+        fournisseurs_marche.depuis_configuration("inconnue")
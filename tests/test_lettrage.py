@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import lettrage
+
+# Grand livre : compte, tiers, date, référence, débit, crédit (format français)
+GRAND_LIVRE = pd.DataFrame([
+    ('411', 'C1', '01/01/2024', 'F1', '1 000,00', ''),      # Réglée par référence
+    ('411', 'C1', '20/01/2024', 'F1', '', '1 000,00'),
+    ('411', 'C1', '05/01/2024', '', '500,00', ''),          # Réglée par montant exact
+    ('411', 'C1', '10/02/2024', '', '', '500,00'),
+    ('411', 'C2', '01/02/2024', '', '300,00', ''),          # Règlement de 350 : la plus ancienne d'abord
+    ('411', 'C2', '15/02/2024', '', '200,00', ''),
+    ('411', 'C2', '10/03/2024', '', '', '350,00'),
+    ('411', 'C3', '01/03/2024', 'F5', '1 000,50', ''),      # Frais bancaires sous la tolérance
+    ('411', 'C3', '31/03/2024', 'F5', '', '1 000,00'),
+    ('401', 'F1', '01/01/2024', 'A9', '', '800,00'),        # Facture fournisseur au crédit
+    ('401', 'F1', '15/03/2024', 'A9', '800,00', ''),
+    ('512', 'BQ', '15/03/2024', '', '', '800,00'),          # Compte de banque : ignoré
+], columns=['Compte', 'Tiers', 'Date', 'Reference', 'Debit', 'Credit'])
+
+
+@pytest.fixture
+def lettrees():
+    return lettrage.lettrer(lettrage.normaliser_ecritures(GRAND_LIVRE))
+
+
+def test_normaliser_ecritures():
+    ecritures = lettrage.normaliser_ecritures(GRAND_LIVRE)
+    assert len(ecritures) == 11
+    assert (ecritures['type'] == 'facture').sum() == 6
+    fournisseur = ecritures[ecritures['nature'] == 'fournisseur']
+    assert list(fournisseur['type']) == ['facture', 'reglement']
+    assert ecritures.loc[7, 'montant'] == 1000.5
+    # Échéance absente : date + délai contractuel
+    assert (ecritures['echeance'] - ecritures['date']).dt.days.eq(lettrage.DELAI_CONTRACTUEL).all()
+
+
+def test_lettrer_methodes(lettrees):
+    factures, reglements = lettrees
+    factures = factures.set_index(['tiers', 'montant'])
+    assert factures.loc[('C1', 1000.0), 'methode'] == 'reference'
+    assert factures.loc[('C1', 1000.0), 'delai_paiement'] == 19
+    assert factures.loc[('C1', 500.0), 'methode'] == 'montant'
+    assert factures.loc[('C1', 500.0), 'delai_paiement'] == 36
+    assert factures.loc[('C2', 300.0), 'methode'] == 'anteriorite'
+    assert factures.loc[('C2', 300.0), 'date_reglement'] == pd.Timestamp('2024-03-10')
+    # Paiement partiel : 50 imputés, la facture reste ouverte
+    assert factures.loc[('C2', 200.0), 'reste'] == 150
+    assert pd.isna(factures.loc[('C2', 200.0), 'date_reglement'])
+    assert factures.loc[('C3', 1000.5), 'reste'] == 0
+    assert factures.loc[('F1', 800.0), 'retard'] == 74 - lettrage.DELAI_CONTRACTUEL
+    assert reglements['disponible'].sum() == 0
+
+
+def test_reglement_hors_fenetre_impute_par_anteriorite():
+    ecritures = lettrage.normaliser_ecritures(pd.DataFrame({
+        'tiers': ['C1', 'C1'], 'date': ['2024-01-01', '2024-12-01'], 'montant': [100.0, -100.0],
+    }))
+    factures, _ = lettrage.lettrer(ecritures, fenetre_jours=30)
+    assert factures.loc[0, 'methode'] == 'anteriorite'
+
+
+def test_indicateurs_delais(lettrees):
+    factures, reglements = lettrees
+    indicateurs = lettrage.indicateurs_delais(factures, reglements, date_reference='2024-03-31')
+    clients = indicateurs.loc['client']
+    soldees = factures[(factures['nature'] == 'client') & factures['date_reglement'].notna()]
+    attendu = np.average(soldees['delai_paiement'], weights=soldees['montant'])
+    assert clients['delai_pondere'] == pytest.approx(attendu)
+    assert clients['encours'] == 150
+    assert clients['taux_lettrage'] == pytest.approx((3000.5 - 200) / 3000.5 * 100)
+    assert indicateurs.loc['fournisseur', 'part_en_retard'] == 100
+
+    distribution = lettrage.distribution_retards(factures)
+    assert distribution['nb'].sum() == 5
+
+
+def test_exemple_grand_livre_largement_lettre():
+    ecritures = lettrage.normaliser_ecritures(lettrage.exemple_grand_livre(nb_factures=2_000, nb_tiers=50))
+    factures, reglements = lettrage.lettrer(ecritures)
+    assert (factures['regle'] + factures['reste']).sub(factures['montant']).abs().max() < 1e-6
+    assert (reglements['disponible'] >= 0).all()
+    assert lettrage.indicateurs_delais(factures, reglements)['taux_lettrage'].min() > 50
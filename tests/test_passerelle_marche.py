@@ -0,0 +1,125 @@
+import threading
+import time
+
+import pytest
+
+import fournisseurs_marche
+import passerelle_marche
+
+
+def _passerelle(**parametres):
+    # Sans limiteur ni délai entre tentatives
+    return passerelle_marche.PasserelleMarche(debit=None, delai_base=0, **parametres)
+
+
+class Source:
+    """Fonction de source qui échoue `nb_echecs` fois avant de répondre"""
+
+    def __init__(self, nb_echecs=0, valeur=42):
+        self.nb_echecs = nb_echecs
+        self.valeur = valeur
+        self.appels = 0
+
+    def __call__(self):
+        self.appels += 1
+        if self.appels <= self.nb_echecs:
+            raise ConnectionError("source en panne")
+        return self.valeur
+
+
+def test_nouvelles_tentatives_puis_succes():
+    passerelle = _passerelle(nb_tentatives=3)
+    source = Source(nb_echecs=2)
+    assert passerelle.appeler('info', 'A', source) == 42
+    ligne = passerelle.metriques().iloc[0]
+    assert (ligne['appels'], ligne['source'], ligne['erreurs']) == (1, 3, 2)
+    assert ligne['disjoncteur'] == passerelle_marche.FERME
+
+
+def test_valeur_fraiche_puis_valeur_perimee():
+    passerelle = _passerelle(nb_tentatives=1)
+    assert passerelle.appeler('info', 'A', Source(valeur=1), fraicheur=60) == 1
+    assert passerelle.appeler('info', 'A', Source(valeur=2), fraicheur=60) == 1
+    # Valeur périmée servie quand la source échoue
+    assert passerelle.appeler('info', 'A', Source(nb_echecs=1), fraicheur=0) == 1
+    with pytest.raises(passerelle_marche.SourceIndisponible):
+        passerelle.appeler('info', 'B', Source(nb_echecs=1))
+    ligne = passerelle.metriques().iloc[0]
+    assert (ligne['cache'], ligne['perimees']) == (1, 1)
+
+
+def test_disjoncteur_ouvert_puis_essai():
+    passerelle = _passerelle(nb_tentatives=1, seuil_disjoncteur=2, delai_reouverture=0.05)
+    panne = Source(nb_echecs=10)
+    for _ in range(2):
+        with pytest.raises(passerelle_marche.SourceIndisponible):
+            passerelle.appeler('historique', 'A', panne)
+    # Ouvert : la source n'est plus sollicitée
+    with pytest.raises(passerelle_marche.SourceIndisponible, match="disjoncteur"):
+        passerelle.appeler('historique', 'A', panne)
+    assert panne.appels == 2
+    assert passerelle.metriques().iloc[0]['disjoncteur'] == passerelle_marche.OUVERT
+
+    # Après le délai, un appel d'essai réussi referme le disjoncteur
+    time.sleep(0.06)
+    assert passerelle.appeler('historique', 'A', Source()) == 42
+    assert passerelle.metriques().iloc[0]['disjoncteur'] == passerelle_marche.FERME
+
+
+def test_essai_en_echec_rouvre():
+    disjoncteur = passerelle_marche.Disjoncteur(seuil=1, delai=0)
+    disjoncteur.echec()
+    assert disjoncteur.etat == passerelle_marche.OUVERT
+    assert disjoncteur.autorise()
+    assert disjoncteur.etat == passerelle_marche.SEMI_OUVERT
+    disjoncteur.echec()
+    assert disjoncteur.etat == passerelle_marche.OUVERT
+    # Essai rendu sans appel (limiteur) : l'essai suivant reste possible
+    assert disjoncteur.autorise()
+    disjoncteur.abandon()
+    assert disjoncteur.etat == passerelle_marche.OUVERT and disjoncteur.autorise()
+
+
+def test_donnees_absentes_sans_panne():
+    passerelle = _passerelle(nb_tentatives=3, seuil_disjoncteur=1)
+
+    def absente():
+        raise fournisseurs_marche.DonneesAbsentes("ticker inconnu")
+    for _ in range(2):
+        with pytest.raises(passerelle_marche.DonneesAbsentes):
+            passerelle.appeler('info', 'ZZZ', absente, fraicheur=60)
+    with pytest.raises(passerelle_marche.DonneesAbsentes):
+        passerelle.appeler('info', 'VIDE', lambda: {}, valide=passerelle_marche._non_vide)
+
+    ligne = passerelle.metriques().iloc[0]
+    # Une seule tentative par appel, absence mémorisée, disjoncteur resté fermé
+    assert (ligne['source'], ligne['absentes'], ligne['erreurs']) == (2, 3, 0)
+    assert ligne['disjoncteur'] == passerelle_marche.FERME
+
+
+def test_appels_identiques_fusionnes():
+    passerelle = _passerelle()
+    debut = threading.Event()
+
+    def lente():
+        debut.set()
+        time.sleep(0.2)
+        return "cours"
+    resultats = []
+    meneur = threading.Thread(target=lambda: resultats.append(passerelle.appeler('cours', 'A', lente)))
+    meneur.start()
+    debut.wait()
+    suiveur = threading.Thread(target=lambda: resultats.append(passerelle.appeler('cours', 'A', lente)))
+    suiveur.start()
+    meneur.join()
+    suiveur.join()
+
+    assert resultats == ["cours", "cours"]
+    ligne = passerelle.metriques().iloc[0]
+    assert (ligne['source'], ligne['fusionnees']) == (1, 1)
+
+
+def test_seau_jetons_refuse_au_dela_de_l_attente():
+    seau = passerelle_marche.SeauJetons(debit=1, capacite=2)
+    assert seau.prendre(0) and seau.prendre(0)
+    assert not seau.prendre(attente_max=0.1)
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import prevision_tresorerie
+
+
+def _ouvertes(echeances, montants, tiers=None):
+    return pd.DataFrame({
+        'nature': 'client',
+        'tiers': tiers or ['A'] * len(echeances),
+        'echeance': pd.to_datetime(echeances),
+        'montant': montants,
+    })
+
+
+def test_semaines_du_lundi_au_dimanche():
+    # Mercredi 5 juin 2024 : la prévision démarre le lundi 3
+    prevision = prevision_tresorerie.PrevisionTresorerie('2024-06-05', tresorerie_initiale=1000, nb_semaines=4)
+    assert prevision.debut == pd.Timestamp('2024-06-03')
+    assert prevision.fin == pd.Timestamp('2024-07-01')
+
+    # En retard -> semaine 1 ; dimanche 9 -> semaine 1 ; lundi 10 -> semaine 2 ; au-delà de l'horizon -> ignorée
+    ouvertes = _ouvertes(['2024-05-01', '2024-06-09', '2024-06-10', '2024-07-01'], [10, 20, 40, 80])
+    prevision.encaissements_clients(ouvertes)
+    tableau = prevision.tableau()
+    np.testing.assert_array_equal(tableau['Encaissements clients'], [30, 40, 0, 0])
+    np.testing.assert_array_equal(tableau['Trésorerie fin de semaine'], [1030, 1070, 1070, 1070])
+
+
+def test_retards_historiques_decalent_les_encaissements():
+    factures = pd.DataFrame({
+        'nature': ['client'] * 3, 'tiers': ['A', 'A', 'B'], 'montant': [100.0, 300.0, 50.0],
+        'retard': [4, 12, -3], 'date_reglement': pd.to_datetime(['2024-01-10'] * 3),
+    })
+    retards = prevision_tresorerie.retards_historiques(factures)
+    assert retards[('client', 'A')] == pytest.approx(10)
+
+    ouvertes = _ouvertes(['2024-06-03', '2024-06-03', '2024-06-03'], [1, 1, 1], tiers=['A', 'B', 'Z'])
+    dates = prevision_tresorerie.dates_paiement_prevues(ouvertes, retards, retard_defaut=7)
+    assert list(dates.day) == [13, 31, 10]
+
+
+def test_recalcul_incremental_identique_au_calcul_complet():
+    prevision = prevision_tresorerie.PrevisionTresorerie('2024-06-03', tresorerie_initiale=5000)
+    prevision.paie(3000)
+    prevision.fiscalite(tva_mensuelle=800, acompte_is=1500)
+    prevision.recurrent("Loyer", -1200, frequence='trimestriel', jour=5)
+    # Loyer du 5 juillet (5e semaine) déplacé au 20 : seules les semaines à partir de la 5e sont recalculées
+    assert prevision.recurrent("Loyer", -1200, frequence='trimestriel', jour=20) == prevision_tresorerie.NB_SEMAINES - 4
+
+    complete = prevision_tresorerie.PrevisionTresorerie('2024-06-03', tresorerie_initiale=5000)
+    complete.recurrent("Loyer", -1200, frequence='trimestriel', jour=20)
+    complete.fiscalite(tva_mensuelle=800, acompte_is=1500)
+    complete.paie(3000)
+    np.testing.assert_allclose(prevision.tableau()['Trésorerie fin de semaine'],
+                               complete.tableau()['Trésorerie fin de semaine'])
+
+    prevision.supprimer("Loyer")
+    prevision.modifier_tresorerie_initiale(0)
+    sans_loyer = prevision.tableau()
+    assert "Loyer" not in sans_loyer
+    np.testing.assert_allclose(sans_loyer['Trésorerie fin de semaine'], np.cumsum(sans_loyer['Flux net']))
+
+
+def test_hypotheses_inchangees_sans_recalcul():
+    prevision = prevision_tresorerie.PrevisionTresorerie('2024-06-03')
+    ouvertes = _ouvertes(['2024-06-20'], [500.0])
+    assert prevision.fournisseurs(ouvertes) > 0
+    # Même contenu, autre objet : pas de recalcul ; contenu modifié : recalcul
+    assert prevision.fournisseurs(ouvertes.copy()) == 0
+    assert prevision.fournisseurs(ouvertes.assign(montant=600.0)) > 0
+    assert prevision_tresorerie.empreinte(ouvertes) == prevision_tresorerie.empreinte(ouvertes.copy())
+    assert prevision_tresorerie.empreinte(None) is None
+
+
+def test_emprunts_point_bas_et_alertes():
+    prevision = prevision_tresorerie.PrevisionTresorerie('2024-06-03', tresorerie_initiale=1000, nb_semaines=6)
+    prevision.emprunts(pd.DataFrame({'date': pd.to_datetime(['2024-06-14', '2024-06-28']), 'montant': [800.0, 800.0]}))
+    prevision.recurrent("Ventes", 100, frequence='hebdomadaire')
+    semaine, solde = prevision.point_bas()
+    assert semaine == pd.Timestamp('2024-06-24')
+    assert solde == pytest.approx(1000 - 1600 + 4 * 100)
+    assert list(prevision.alertes().index) == [pd.Timestamp('2024-06-24'), pd.Timestamp('2024-07-01')]
@@ -0,0 +1,81 @@
+import os
+import zipfile
+from io import BytesIO
+
+import pandas as pd
+import pytest
+
+import rapports
+
+
+def _portefeuille():
+    return pd.DataFrame([rapports.EXEMPLE, {**rapports.EXEMPLE, 'resultat_net': -80, 'reserves': 600}],
+                        index=["Alpha", "Bêta"]).assign(exercice=[2024, 2023])
+
+
+def test_preparer_rapports_sections():
+    donnees = rapports.preparer_rapports(_portefeuille())
+    assert list(donnees) == ["Alpha", "Bêta"]
+    assert list(donnees["Alpha"]) == list(rapports.SECTIONS)
+    assert donnees["Alpha"]['synthese']['tableau'][0] == ["Exercice", "2024", None]
+    # Résultat net négatif signalé comme tel
+    resultat = next(ligne for ligne in donnees["Bêta"]['synthese']['tableau'] if ligne[0] == "Résultat net")
+    assert resultat[2] == 'negatif'
+    with pytest.raises(ValueError, match="Une seule ligne"):
+        rapports.preparer_rapports(pd.concat([_portefeuille(), _portefeuille()]))
+
+
+def test_rendu_html_et_pdf():
+    documents = rapports.rapport_entreprise("Alpha <SA>", rapports.EXEMPLE, dossier_cache=None)
+    page = documents['html'].decode('utf-8')
+    assert page.startswith("<!DOCTYPE html>")
+    assert "Alpha &lt;SA&gt;" in page and "<svg" in page
+    assert page.count("<section") == len(rapports.SECTIONS)
+    pdf = documents['pdf']
+    assert pdf.startswith(b"%PDF-1.4") and pdf.rstrip().endswith(b"%%EOF")
+    assert b"/Count %d" % len(rapports.SECTIONS) in pdf
+
+
+def test_sections_tirees_du_cache(tmp_path):
+    cache = str(tmp_path / "cache")
+    sections = rapports.preparer_rapports(_portefeuille())["Alpha"]
+    _, depuis_cache = rapports.rendre_rapport("Alpha", sections, dossier_cache=cache)
+    assert depuis_cache == 0
+    _, depuis_cache = rapports.rendre_rapport("Alpha", sections, dossier_cache=cache)
+    assert depuis_cache == len(rapports.SECTIONS) * len(rapports.FORMATS)
+
+    # Une seule section modifiée : seule elle est rendue à nouveau
+    sections = {**sections, 'score': {**sections['score'], 'listes': []}}
+    _, depuis_cache = rapports.rendre_rapport("Alpha", sections, formats=('html',), dossier_cache=cache)
+    assert depuis_cache == len(rapports.SECTIONS) - 1
+    fichiers = [nom for _, _, noms in os.walk(cache) for nom in noms]
+    assert not [nom for nom in fichiers if nom.endswith('.tmp')]
+
+
+def test_generer_rapports_et_archiver(tmp_path):
+    sortie = str(tmp_path / "rapports")
+    etapes = []
+    resultats = rapports.generer_rapports(_portefeuille(), sortie, processus=1, dossier_cache=None,
+                                          progression=lambda avancement, message: etapes.append(avancement))
+    assert list(resultats['entreprise']) == ["Alpha", "Bêta"]
+    assert resultats['erreur'].isna().all()
+    assert resultats.loc[1, 'fichiers'] == "Bêta.html, Bêta.pdf"
+    assert etapes[-1] == 1
+    with zipfile.ZipFile(BytesIO(rapports.archiver(sortie))) as archive:
+        assert archive.namelist() == ["Alpha.html", "Alpha.pdf", "Bêta.html", "Bêta.pdf"]
+
+
+def test_nom_fichier():
+    assert rapports.nom_fichier("../SARL Dupont & Fils") == "SARL_Dupont_Fils"
+    assert rapports.nom_fichier("...") == "entreprise"
+
+
+def test_charger_portefeuille_dernier_exercice():
+    csv = ("entreprise;exercice;chiffre_affaires;resultat_net;inconnue\n"
+           "A;2022;100;5;x\nA;2023;120;8;y\nB;2023;50;-2;z\n").encode()
+    portefeuille = rapports.charger_portefeuille(csv, "lot.csv")
+    assert list(portefeuille.index) == ["A", "B"]
+    assert set(portefeuille.columns) == {'exercice', 'chiffre_affaires', 'resultat_net'}
+    assert portefeuille.loc["A", 'chiffre_affaires'] == 120
+    with pytest.raises(ValueError, match="Aucune colonne"):
+        rapports.charger_portefeuille(b"entreprise;autre\nA;1\n", "lot.csv")
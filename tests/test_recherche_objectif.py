@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+import calculs_financiers
+import recherche_objectif
+
+STARTUP = {'ca': 1200, 'croissance': 30, 'marge_brute': 40, 'frais_fixes': 600, 'besoin_bfr': 2}
+
+
+def parabole(x, decalage):
+    """Calculateur non monotone : (x - 2)² + décalage"""
+    return {'y': (np.asarray(x, dtype=float) - 2) ** 2 + decalage}
+
+
+def test_cible_atteinte_calculateur_lineaire():
+    # Marge brute qui amène le résultat opérationnel à 0 : 600 / 1200 = 50 %
+    recherche = recherche_objectif.chercher(calculs_financiers.cas_startup, STARTUP, 'marge_brute', 0, (0, 100),
+                                            sortie='resultat_operationnel')
+    assert recherche['atteint']
+    assert recherche['solution'] == pytest.approx(50)
+    assert recherche['resultat'] == pytest.approx(0, abs=1e-9)
+
+
+def test_plusieurs_solutions_la_plus_proche_retenue():
+    recherche = recherche_objectif.chercher(parabole, {'x': 2.6, 'decalage': 0}, 'x', 1, (-5, 5), sortie='y')
+    np.testing.assert_allclose(recherche['solutions'], [1, 3])
+    assert recherche['solution'] == pytest.approx(3)
+    recherche = recherche_objectif.chercher(parabole, {'x': 0, 'decalage': 0}, 'x', 1, (-5, 5), sortie='y')
+    assert recherche['solution'] == pytest.approx(1)
+
+
+def test_cible_hors_d_atteinte():
+    recherche = recherche_objectif.chercher(parabole, {'x': 0, 'decalage': 0.5}, 'x', 0, (-5, 5), sortie='y')
+    assert not recherche['atteint']
+    assert recherche['solutions'].size == 0
+    # Valeur qui s'approche le plus de la cible : le minimum de la parabole
+    assert recherche['solution'] == pytest.approx(2, abs=1e-4)
+    assert recherche['resultat'] == pytest.approx(0.5, abs=1e-6)
+
+
+def test_resultat_non_calculable():
+    with pytest.raises(ValueError):
+        recherche_objectif.chercher(lambda x: np.full(np.shape(x), np.nan), {'x': 1}, 'x', 0, (0, 1))
+
+
+def test_frontiere_deux_hypotheses():
+    courbe = recherche_objectif.frontiere(
+        calculs_financiers.cas_startup, STARTUP, ('marge_brute', 'frais_fixes'), 0,
+        {'marge_brute': (30, 60), 'frais_fixes': (0, 1000)}, sortie='resultat_operationnel', nb_points=31
+    )
+    # Résultat nul : frais fixes = CA × marge
+    np.testing.assert_allclose(courbe['frais_fixes'], 1200 * courbe['marge_brute'] / 100, atol=1e-6)
+    minimal = courbe[courbe['minimal']]
+    assert len(minimal) == 1
+    assert minimal['effort'].iloc[0] == courbe['effort'].min()
+
+
+def test_frontiere_sans_solution_nan():
+    courbe = recherche_objectif.frontiere(
+        calculs_financiers.cas_startup, STARTUP, ('marge_brute', 'frais_fixes'), 0,
+        {'marge_brute': (30, 60), 'frais_fixes': (0, 400)}, sortie='resultat_operationnel', nb_points=31
+    )
+    # Frais fixes plafonnés à 400 : une marge au-delà de 400 / 1200 n'atteint jamais un résultat nul
+    assert courbe.loc[courbe['marge_brute'] > 400 / 12 + 1, 'frais_fixes'].isna().all()
+    assert courbe.loc[courbe['marge_brute'] < 400 / 12 - 1, 'frais_fixes'].notna().all()
@@ -0,0 +1,77 @@
+import os
+
+import pandas as pd
+import pytest
+
+import scenarios
+
+STARTUP = {'ca': 1200, 'croissance': 30, 'marge_brute': 40, 'frais_fixes': 300, 'besoin_bfr': 2}
+
+
+def test_enregistrer_fusionne_les_sessions(tmp_path):
+    premiere = scenarios.RecueilScenarios(str(tmp_path))
+    seconde = scenarios.RecueilScenarios(str(tmp_path))
+    premiere.ajouter('startup', "Base", STARTUP)
+    premiere.enregistrer()
+
+    # Les deux sessions ont lu la même version, puis modifient chacune la leur
+    assert seconde.noms('startup') == ["Base"]
+    premiere.ajouter('startup', "Prudent", {**STARTUP, 'croissance': 10})
+    seconde.ajouter('startup', "Ambitieux", {**STARTUP, 'croissance': 60})
+    seconde.supprimer('startup', "Base")
+    premiere.enregistrer()
+    seconde.enregistrer()
+
+    # Aucun ajout perdu, la suppression n'est pas annulée par la session qui ne l'a pas faite
+    relu = scenarios.RecueilScenarios(str(tmp_path))
+    assert sorted(relu.noms('startup')) == ["Ambitieux", "Prudent"]
+    assert relu.scenario('startup', "Prudent")['croissance'] == 10
+    assert sorted(seconde.noms('startup')) == ["Ambitieux", "Prudent"]
+    assert [nom for nom in os.listdir(tmp_path) if nom.endswith('.tmp')] == []
+
+
+def test_remplacement_du_meme_nom(tmp_path):
+    premiere = scenarios.RecueilScenarios(str(tmp_path))
+    seconde = scenarios.RecueilScenarios(str(tmp_path))
+    premiere.ajouter('startup', "Base", STARTUP)
+    premiere.enregistrer()
+    seconde.ajouter('startup', "Base", {**STARTUP, 'ca': 2000})
+    seconde.enregistrer()
+    assert scenarios.RecueilScenarios(str(tmp_path)).scenario('startup', "Base")['ca'] == 2000
+
+
+def test_importer_et_evaluer_en_un_calcul():
+    recueil = scenarios.RecueilScenarios(dossier=None)
+    recueil.importer('startup', pd.DataFrame([STARTUP, {**STARTUP, 'marge_brute': 50}], index=["A", "B"]))
+    resultats = recueil.evaluer('startup', sorties=['resultat_operationnel'])
+    assert list(resultats['resultat_operationnel']) == [1200 * 0.4 - 300, 1200 * 0.5 - 300]
+    with pytest.raises(ValueError, match="manquantes"):
+        recueil.ajouter('startup', "Incomplet", {'ca': 100})
+    with pytest.raises(ValueError, match="non numérique"):
+        recueil.ajouter('startup', "Texte", {**STARTUP, 'ca': "beaucoup"})
+    with pytest.raises(ValueError, match="inconnu"):
+        recueil.table('inconnu')
+
+
+def test_decomposition_shapley():
+    depart = STARTUP
+    arrivee = {**STARTUP, 'ca': 1500, 'marge_brute': 50, 'frais_fixes': 350}
+    resultat_depart, resultat_arrivee, tableau = scenarios.decomposer_ecart(
+        'startup', depart, arrivee, 'resultat_operationnel')
+    assert resultat_arrivee - resultat_depart == pytest.approx(1500 * 0.5 - 350 - (1200 * 0.4 - 300))
+    assert tableau['contribution'].sum() == pytest.approx(resultat_arrivee - resultat_depart)
+    assert tableau['part'].sum() == pytest.approx(100)
+    # Interaction CA × marge répartie à parts égales : 300 × 0,40 + (300 × 0,10) / 2
+    contributions = tableau.set_index('hypothese')['contribution']
+    assert contributions["Chiffre d'affaires"] == pytest.approx(300 * 0.4 + 300 * 0.1 / 2)
+    assert contributions["Frais fixes"] == pytest.approx(-50)
+
+
+def test_dossier_utilisateur(tmp_path):
+    racine = str(tmp_path)
+    dossier = scenarios.dossier_utilisateur("../../etc/passwd", racine)
+    assert os.path.dirname(dossier) == racine
+    assert ".." not in os.path.basename(dossier) and "/" not in os.path.basename(dossier)
+    # Identifiants distincts réduits au même nom : dossiers distincts
+    assert scenarios.dossier_utilisateur("a b", racine) != scenarios.dossier_utilisateur("a/b", racine)
+    assert scenarios.dossier_utilisateur("", racine).startswith(os.path.join(racine, "utilisateur-"))
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import screener_ratios
+
+
+@pytest.fixture
+def univers():
+    rng = np.random.default_rng(7)
+    entreprises = pd.DataFrame({
+        'nom': [f"E{i}" for i in range(500)],
+        'roe': rng.normal(10, 8, 500).round(1),
+        'endettement': rng.uniform(0, 150, 500).round(0),
+        'score_conan_holder': rng.integers(-5, 15, 500).astype(float),
+    })
+    entreprises.loc[::17, 'roe'] = np.nan
+    return entreprises
+
+
+def test_analyser_requete():
+    assert screener_ratios.analyser_requete("roe > 12 et Endettement <= 60,5 & score = -2") == [
+        ('roe', '>', 12.0), ('Endettement', '<=', 60.5), ('score', '=', -2.0)
+    ]
+    assert screener_ratios.analyser_requete("  ") == []
+    with pytest.raises(ValueError):
+        screener_ratios.analyser_requete("roe >> 12")
+
+
+@pytest.mark.parametrize("requete, attendu", [
+    ("roe > 12", lambda df: df['roe'] > 12),
+    ("roe <= 5 et endettement >= 100", lambda df: (df['roe'] <= 5) & (df['endettement'] >= 100)),
+    ("score_conan_holder = 3 et roe < 10", lambda df: (df['score_conan_holder'] == 3) & (df['roe'] < 10)),
+    ("endettement < 0", lambda df: df['endettement'] < 0),
+])
+def test_filtrer_comme_un_masque(univers, requete, attendu):
+    screener = screener_ratios.ScreenerRatios(univers)
+    positions = screener.filtrer(screener_ratios.analyser_requete(requete))
+    # Les NaN ne satisfont aucun critère
+    np.testing.assert_array_equal(positions, np.flatnonzero(attendu(univers).to_numpy()))
+
+
+def test_filtrer_colonne_inconnue(univers):
+    screener = screener_ratios.ScreenerRatios(univers)
+    np.testing.assert_array_equal(screener.filtrer([]), np.arange(len(univers)))
+    assert screener.filtrer([('ROE', '>', 12)]).size == (univers['roe'] > 12).sum()
+    with pytest.raises(KeyError):
+        screener.filtrer([('per', '<', 15)])
+
+
+def test_tri_et_pages(univers):
+    screener = screener_ratios.ScreenerRatios(univers)
+    positions = screener.trier(screener.filtrer([]), 'roe')
+    roe = univers['roe'].to_numpy()[positions]
+    valides = roe[~np.isnan(roe)]
+    assert (np.diff(valides) <= 0).all()
+    assert np.isnan(roe[len(valides):]).all()
+
+    assert screener_ratios.nombre_pages(0) == 1
+    assert screener_ratios.nombre_pages(500, 50) == 10
+    assert screener_ratios.nombre_pages(501, 50) == 11
+    assert list(screener.page(positions, 1, 50)['roe']) == list(univers['roe'].iloc[positions[:50]])
+    assert len(screener.page(positions, 10, 50)) == 50
+    assert screener.page(positions, 11, 50).empty
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+import calculs_financiers
+import sensibilite
+
+
+def test_matrice_perturbation():
+    matrice = sensibilite.matrice_perturbation({'a': 100, 'b': 0, 'c': 10}, variation=10, bornes={'b': (-1, 2)})
+    assert matrice.shape == (7, 3)
+    np.testing.assert_array_equal(matrice.iloc[0], [100, 0, 10])
+    np.testing.assert_allclose(np.diag(matrice.iloc[1:4]), [90, -1, 9])
+    np.testing.assert_allclose(np.diag(matrice.iloc[4:]), [110, 2, 11])
+    # Une seule hypothèse modifiée par ligne
+    assert ((matrice.iloc[1:] != matrice.iloc[0]).sum(axis=1) == 1).all()
+
+
+def test_tornade_un_seul_appel():
+    appels = []
+
+    def calculateur(prix, volume, couts_fixes):
+        appels.append(np.shape(prix))
+        return prix * volume - couts_fixes
+
+    reference, tableau = sensibilite.tornade(calculateur, {'prix': 10, 'volume': 100, 'couts_fixes': 300},
+                                             bornes={'volume': (95, 105)}, libelles={'couts_fixes': "Coûts fixes"})
+    assert appels == [(7,)]
+    assert reference == 700
+    assert list(tableau['hypothese']) == ['prix', 'volume', "Coûts fixes"]
+    np.testing.assert_allclose(tableau['amplitude'], [200, 100, 60])
+    assert tableau.loc[2, 'ecart_haut'] == pytest.approx(-30)
+    # Élasticité : variation relative du résultat / variation relative de l'hypothèse
+    np.testing.assert_allclose(tableau['elasticite'], [1000 / 700, 1000 / 700, -300 / 700])
+
+
+def test_tornade_calculateur_du_repo():
+    entrees = {'ca': 1200, 'croissance': 30, 'marge_brute': 40, 'frais_fixes': 300, 'besoin_bfr': 2}
+    reference, tableau = sensibilite.tornade(calculs_financiers.cas_startup, entrees, sortie='resultat_operationnel')
+    assert reference == pytest.approx(1200 * 0.4 - 300)
+    # Hypothèses sans effet sur le résultat opérationnel en fin de tableau
+    assert set(tableau['hypothese'].iloc[-2:]) == {'croissance', 'besoin_bfr'}
+    assert (tableau['amplitude'].iloc[-2:] == 0).all()
+
+    _, fixes = sensibilite.tornade(calculs_financiers.cas_startup,
+                                   {nom: valeur for nom, valeur in entrees.items() if nom != 'frais_fixes'},
+                                   sortie='resultat_operationnel', fixes={'frais_fixes': 300})
+    assert 'frais_fixes' not in set(fixes['hypothese'])
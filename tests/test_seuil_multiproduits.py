@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import seuil_multiproduits
+
+# Marges unitaires 40, 10 et -5 ; mix actuel 50 % / 40 % / 10 %
+PRODUITS = pd.DataFrame({
+    'produit': ['A', 'B', 'C'],
+    'prix': [100.0, 50.0, 20.0],
+    'cout_variable': [60.0, 40.0, 25.0],
+    'volume': [500.0, 400.0, 100.0],
+    'capacite': [800.0, 1000.0, 300.0],
+    'minimum': [0.0, 0.0, 50.0],
+    'consommation': [2.0, 0.5, 1.0],
+})
+
+
+def test_seuil_mix_actuel():
+    seuil = seuil_multiproduits.seuil_multiproduits(PRODUITS, couts_fixes=12)
+    marge_panier = 0.5 * 40 + 0.4 * 10 + 0.1 * -5
+    assert isinstance(seuil['seuil_paniers'], float)
+    assert seuil['marge_panier'] == pytest.approx(marge_panier)
+    assert seuil['seuil_paniers'] == pytest.approx(12_000 / marge_panier)
+    np.testing.assert_allclose(seuil['seuil_volumes'], seuil['seuil_paniers'] * np.array([0.5, 0.4, 0.1]))
+    assert seuil['resultat'] == pytest.approx(1000 * marge_panier / 1000 - 12)
+    # Au volume de seuil, le résultat est nul
+    volumes = seuil['seuil_volumes']
+    assert (volumes * (PRODUITS['prix'] - PRODUITS['cout_variable'])).sum() == pytest.approx(12_000)
+
+
+def test_plusieurs_mix_evalues_ensemble():
+    mix = np.array([[1, 0, 0], [0, 1, 0], [0, 0, 1], [5, 4, 1]])
+    seuil = seuil_multiproduits.seuil_multiproduits(PRODUITS, 12, mix)
+    np.testing.assert_allclose(seuil['seuil_paniers'][:2], [300, 1200])
+    # Panier à marge négative : pas de seuil
+    assert np.isnan(seuil['seuil_paniers'][2])
+    assert seuil['seuil_paniers'][3] == pytest.approx(seuil_multiproduits.seuil_multiproduits(PRODUITS, 12)['seuil_paniers'])
+    assert seuil_multiproduits.mix_aleatoires(PRODUITS, nb=50).sum(axis=1) == pytest.approx(np.ones(50))
+
+
+def test_detail_par_produit():
+    detail = seuil_multiproduits.detail_par_produit(PRODUITS, 12)
+    assert detail['contribution'].sum() == pytest.approx(100)
+    resultat = seuil_multiproduits.seuil_multiproduits(PRODUITS, 12)['resultat']
+    # Baisse de volume de A absorbable : résultat / marge totale de A
+    assert detail.loc['A', 'marge_securite'] == pytest.approx(resultat * 1000 / (40 * 500) * 100)
+    assert np.isnan(detail.loc['C', 'marge_securite'])
+
+
+def test_mix_optimal_sans_ressource():
+    optimal, resultat = seuil_multiproduits.mix_optimal(PRODUITS, 12)
+    # Produits rentables à capacité, produit déficitaire à son minimum
+    assert list(optimal['volume_optimal']) == [800, 1000, 50]
+    assert resultat == pytest.approx((800 * 40 + 1000 * 10 - 50 * 5) / 1000 - 12)
+
+
+def test_mix_optimal_egal_au_programme_lineaire():
+    linprog = pytest.importorskip("scipy.optimize").linprog
+    for graine in range(20):
+        produits = seuil_multiproduits.exemple_produits(nb=8, graine=graine)
+        ressource = float((produits['volume'] * produits['consommation']).sum())
+        optimal, resultat = seuil_multiproduits.mix_optimal(produits, 50, ressource)
+        marge = (produits['prix'] - produits['cout_variable']).to_numpy()
+        solution = linprog(-marge, A_ub=[produits['consommation'].to_numpy()], b_ub=[ressource],
+                           bounds=list(zip(produits['minimum'], produits['capacite'])))
+        assert resultat == pytest.approx(-solution.fun / 1000 - 50, rel=1e-6)
+        assert optimal['ressource_utilisee'].sum() <= ressource * (1 + 1e-9)
+
+
+def test_mix_optimal_erreurs():
+    with pytest.raises(ValueError, match="non borné"):
+        seuil_multiproduits.mix_optimal(PRODUITS.drop(columns='capacite'), 12)
+    with pytest.raises(ValueError, match="Ressource insuffisante"):
+        seuil_multiproduits.mix_optimal(PRODUITS, 12, ressource=10)
+    with pytest.raises(ValueError):
+        seuil_multiproduits.normaliser_produits(PRODUITS.drop(columns='prix'))
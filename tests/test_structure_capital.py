@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+import structure_capital
+
+
+def _rang(notations):
+    return notations.map({notation: i for i, notation in enumerate(structure_capital.NOTATIONS['notation'])})
+
+
+def test_notation_synthetique():
+    notations = structure_capital.NOTATIONS['notation'].to_numpy()
+    indices = structure_capital.notation_synthetique([20, 8.5, 8.4, 2.6, 0.7, -1, np.nan])
+    assert list(notations[indices]) == ["AAA", "AAA", "AA", "BBB", "CC", "D", "AAA"]
+
+
+def test_sans_dette_cout_de_l_actif():
+    exploration = structure_capital.explorer_structure(100, 800)
+    sans_dette = exploration.iloc[0]
+    assert sans_dette['cmpc'] == pytest.approx(3 + 0.9 * 5.5)
+    assert sans_dette['beta'] == pytest.approx(0.9)
+    assert sans_dette['valeur_entreprise'] == pytest.approx(structure_capital.valeur_desendettee(100))
+    assert exploration['dette'].iloc[-1] == pytest.approx(structure_capital.RATIO_MAX * sans_dette['valeur_entreprise'])
+
+
+def test_notation_coherente_avec_la_couverture():
+    exploration = structure_capital.explorer_structure(100, 800)
+    rang = _rang(exploration['notation']).to_numpy()
+    # Point fixe atteint : la notation est celle de la couverture obtenue avec son propre taux
+    np.testing.assert_array_equal(rang, structure_capital.notation_synthetique(exploration['couverture']))
+    assert (np.diff(rang) >= 0).all()
+    assert (exploration['taux_dette'] == 3 + structure_capital.NOTATIONS['spread'].to_numpy()[rang]).all()
+
+
+def test_optimum_et_plafond_de_defaut():
+    exploration = structure_capital.explorer_structure(100, 800)
+    optimal = structure_capital.optimum(exploration)
+    assert optimal['cmpc'] == exploration['cmpc'].min()
+    assert 0 < optimal['ratio_dette'] < exploration['ratio_dette'].max()
+
+    prudent = structure_capital.optimum(exploration, probabilite_defaut_max=0.5)
+    assert prudent['probabilite_defaut'] <= 0.5
+    assert prudent['ratio_dette'] < optimal['ratio_dette']
+    # Aucun point admissible : structure sans dette
+    assert structure_capital.optimum(exploration, probabilite_defaut_max=0.1)['dette'] == 0
+
+    actuel = structure_capital.point_actuel(exploration, 300)
+    assert abs(actuel['dette'] - 300) <= exploration['dette'].diff().max()
+
+
+def test_economie_d_impot_plafonnee():
+    # Valeur élevée au regard du résultat : les intérêts dépassent le résultat d'exploitation en fin de balayage
+    exploration = structure_capital.explorer_structure(100, 800, valeur_entreprise=5_000)
+    couverts = exploration[exploration['couverture'] < 1]
+    assert not couverts.empty
+    ratio = couverts['ratio_dette'] / 100
+    taux_effectif = 0.25 * couverts['couverture']
+    cmpc = (1 - ratio) * couverts['cout_fonds_propres'] + ratio * couverts['taux_dette'] * (1 - taux_effectif)
+    np.testing.assert_allclose(couverts['cmpc'], cmpc)
+    assert (couverts['roe'].dropna() < 0).all()
+    assert np.isnan(exploration.loc[exploration['capitaux_propres'] <= 0, 'roe']).all()
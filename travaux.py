@@ -0,0 +1,271 @@
+"""
+⏳ FINANCELAB - Travaux en arrière-plan
+Description: Exécute les calculs longs (analyse d'une watchlist, construction du
+référentiel sectoriel...) dans un pool de processus, hors du fil du script
+Streamlit. Chaque travail est suivi dans une table SQLite (statut, progression,
+résultat) : l'interface consulte la table sans bloquer et l'utilisateur peut
+continuer à naviguer, annuler un travail ou revenir chercher son résultat.
+"""
+
+import inspect
+import multiprocessing
+import os
+import pickle
+import sqlite3
+import time
+import traceback
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+# =============================================================================
+# PARAMÈTRES
+# =============================================================================
+
+CHEMIN_TRAVAUX = os.path.join(os.path.dirname(os.path.abspath(__file__)), "donnees", "travaux.sqlite")
+
+NB_PROCESSUS = max(1, min(4, (os.cpu_count() or 2) - 1))
+INTERVALLE_PROGRESSION = 0.25  # Secondes minimum entre deux écritures de progression
+CONSERVATION = timedelta(days=7)   # Durée de conservation des travaux terminés (et de leur résultat)
+INTERVALLE_PURGE = 3600            # Secondes minimum entre deux purges
+
+EN_ATTENTE, EN_COURS, TERMINE, ERREUR, ANNULE, INTERROMPU = (
+    "en_attente", "en_cours", "termine", "erreur", "annule", "interrompu"
+)
+STATUTS_ACTIFS = (EN_ATTENTE, EN_COURS)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS travaux (
+    id TEXT PRIMARY KEY,
+    nom TEXT NOT NULL,
+    proprietaire TEXT,
+    statut TEXT NOT NULL,
+    progression REAL NOT NULL DEFAULT 0,
+    message TEXT,
+    cree TEXT NOT NULL,
+    debut TEXT,
+    fin TEXT,
+    erreur TEXT,
+    annulation INTEGER NOT NULL DEFAULT 0,
+    resultat BLOB
+)
+"""
+
+COLONNES_ETAT = ['id', 'nom', 'proprietaire', 'statut', 'progression', 'message', 'cree', 'debut', 'fin', 'erreur']
+
+
+class TravailAnnule(Exception):
+    """Levée dans le processus de calcul lorsque l'annulation a été demandée"""
+
+
+# =============================================================================
+# TABLE DES TRAVAUX
+# =============================================================================
+
+@contextmanager
+def _connexion(chemin):
+    """Connexion le temps d'une transaction (validée, ou annulée sur erreur), puis fermée"""
+    connexion = sqlite3.connect(chemin, timeout=30)
+    connexion.row_factory = sqlite3.Row
+    try:
+        with connexion:
+            yield connexion
+    finally:
+        connexion.close()
+
+
+def _initialiser(chemin):
+    os.makedirs(os.path.dirname(chemin), exist_ok=True)
+    with _connexion(chemin) as connexion:
+        connexion.execute("PRAGMA journal_mode=WAL")
+        connexion.execute(_SCHEMA)
+
+
+def _maintenant():
+    return datetime.now().isoformat(timespec='seconds')
+
+
+def _mettre_a_jour(chemin, id_travail, **champs):
+    affectations = ", ".join(f"{champ} = ?" for champ in champs)
+    with _connexion(chemin) as connexion:
+        connexion.execute(f"UPDATE travaux SET {affectations} WHERE id = ?", (*champs.values(), id_travail))
+
+
+# =============================================================================
+# EXÉCUTION DANS LE PROCESSUS DE CALCUL
+# =============================================================================
+
+class Progression:
+    """
+    Rapport de progression transmis aux fonctions qui déclarent un paramètre
+    `progression` : `progression(0.4, "Étape 2/5")`. Chaque appel vérifie aussi
+    si l'annulation a été demandée.
+    """
+
+    def __init__(self, chemin, id_travail):
+        self.chemin = chemin
+        self.id_travail = id_travail
+        self._derniere_ecriture = 0.0
+
+    def __call__(self, fraction, message=None):
+        maintenant = time.monotonic()
+        if fraction < 1 and maintenant - self._derniere_ecriture < INTERVALLE_PROGRESSION:
+            return
+        self._derniere_ecriture = maintenant
+
+        with _connexion(self.chemin) as connexion:
+            ligne = connexion.execute("SELECT annulation FROM travaux WHERE id = ?", (self.id_travail,)).fetchone()
+            if ligne is not None and ligne['annulation']:
+                raise TravailAnnule()
+            connexion.execute(
+                "UPDATE travaux SET progression = ?, message = COALESCE(?, message) WHERE id = ?",
+                (min(max(float(fraction), 0.0), 1.0), message, self.id_travail)
+            )
+
+
+def _executer(chemin, id_travail, fonction, args, kwargs):
+    """Point d'entrée du processus de calcul : exécute le travail et consigne son issue"""
+    progression = Progression(chemin, id_travail)
+    try:
+        progression(0.0)  # Annulé avant même d'avoir démarré ?
+        _mettre_a_jour(chemin, id_travail, statut=EN_COURS, debut=_maintenant())
+        if 'progression' in inspect.signature(fonction).parameters:
+            kwargs = {**kwargs, 'progression': progression}
+        resultat = fonction(*args, **kwargs)
+        _mettre_a_jour(
+            chemin, id_travail,
+            statut=TERMINE, progression=1.0, fin=_maintenant(),
+            resultat=pickle.dumps(resultat, protocol=pickle.HIGHEST_PROTOCOL)
+        )
+    except TravailAnnule:
+        _mettre_a_jour(chemin, id_travail, statut=ANNULE, fin=_maintenant())
+    except Exception as e:
+        _mettre_a_jour(
+            chemin, id_travail,
+            statut=ERREUR, fin=_maintenant(), erreur=f"{e}\n{traceback.format_exc()}"
+        )
+
+
+# =============================================================================
+# GESTIONNAIRE
+# =============================================================================
+
+class GestionnaireTravaux:
+    """Soumission, suivi, annulation et résultats des travaux en arrière-plan"""
+
+    def __init__(self, chemin=CHEMIN_TRAVAUX, nb_processus=NB_PROCESSUS):
+        self.chemin = chemin
+        _initialiser(chemin)
+        # Les travaux d'une exécution précédente du serveur ne reprendront pas
+        with _connexion(chemin) as connexion:
+            connexion.execute(
+                "UPDATE travaux SET statut = ?, fin = ? WHERE statut IN (?, ?)",
+                (INTERROMPU, _maintenant(), *STATUTS_ACTIFS)
+            )
+        # « spawn » : le serveur Streamlit est multithreadé, on ne le duplique pas par fork
+        self._executor = ProcessPoolExecutor(
+            max_workers=nb_processus, mp_context=multiprocessing.get_context("spawn")
+        )
+        self._futures = {}
+        self._derniere_purge = 0.0
+        self._purger_si_necessaire()
+
+    def _purger_si_necessaire(self):
+        """Purge les anciens travaux au plus une fois par INTERVALLE_PURGE (serveur de longue durée)"""
+        if time.monotonic() - self._derniere_purge >= INTERVALLE_PURGE:
+            self._derniere_purge = time.monotonic()
+            self.purger()
+
+    def soumettre(self, fonction, *args, nom=None, proprietaire=None, **kwargs):
+        """
+        Lance `fonction(*args, **kwargs)` dans le pool et retourne l'identifiant
+        du travail. La fonction doit être définie au niveau d'un module (elle
+        est transmise au processus de calcul par pickle).
+        """
+        self._purger_si_necessaire()
+        id_travail = uuid.uuid4().hex[:12]
+        with _connexion(self.chemin) as connexion:
+            connexion.execute(
+                "INSERT INTO travaux (id, nom, proprietaire, statut, cree) VALUES (?, ?, ?, ?, ?)",
+                (id_travail, nom or fonction.__name__, proprietaire, EN_ATTENTE, _maintenant())
+            )
+        future = self._executor.submit(_executer, self.chemin, id_travail, fonction, args, kwargs)
+        future.add_done_callback(lambda f, id_travail=id_travail: self._cloturer(id_travail, f))
+        self._futures[id_travail] = future
+        return id_travail
+
+    def _cloturer(self, id_travail, future):
+        """Consigne les échecs survenus hors de la fonction (processus tué, pickle...)"""
+        self._futures.pop(id_travail, None)
+        if future.cancelled():
+            _mettre_a_jour(self.chemin, id_travail, statut=ANNULE, fin=_maintenant())
+        elif future.exception() is not None:
+            with _connexion(self.chemin) as connexion:
+                connexion.execute(
+                    "UPDATE travaux SET statut = ?, fin = ?, erreur = ? WHERE id = ? AND statut IN (?, ?)",
+                    (ERREUR, _maintenant(), repr(future.exception()), id_travail, *STATUTS_ACTIFS)
+                )
+
+    def etat(self, id_travail):
+        """Statut, progression et horodatages d'un travail (None s'il est inconnu)"""
+        with _connexion(self.chemin) as connexion:
+            ligne = connexion.execute(
+                f"SELECT {', '.join(COLONNES_ETAT)} FROM travaux WHERE id = ?", (id_travail,)
+            ).fetchone()
+        return dict(ligne) if ligne is not None else None
+
+    def resultat(self, id_travail):
+        """
+        Résultat d'un travail terminé (None tant qu'il n'est pas terminé).
+        Lève RuntimeError si le travail a échoué.
+        """
+        with _connexion(self.chemin) as connexion:
+            ligne = connexion.execute(
+                "SELECT statut, erreur, resultat FROM travaux WHERE id = ?", (id_travail,)
+            ).fetchone()
+        if ligne is None:
+            raise KeyError(f"Travail inconnu : {id_travail}")
+        if ligne['statut'] == ERREUR:
+            raise RuntimeError(ligne['erreur'].splitlines()[0] if ligne['erreur'] else "Erreur inconnue")
+        if ligne['statut'] != TERMINE:
+            return None
+        return pickle.loads(ligne['resultat'])
+
+    def annuler(self, id_travail):
+        """
+        Demande l'annulation : un travail en attente est retiré du pool, un
+        travail en cours s'arrête à son prochain rapport de progression.
+        """
+        with _connexion(self.chemin) as connexion:
+            connexion.execute(
+                "UPDATE travaux SET annulation = 1 WHERE id = ? AND statut IN (?, ?)",
+                (id_travail, *STATUTS_ACTIFS)
+            )
+        future = self._futures.get(id_travail)
+        if future is not None:
+            future.cancel()
+
+    def travaux(self, proprietaire=None):
+        """Tableau des travaux (les plus récents d'abord), éventuellement d'un seul propriétaire"""
+        requete = f"SELECT {', '.join(COLONNES_ETAT)} FROM travaux"
+        parametres = ()
+        if proprietaire is not None:
+            requete += " WHERE proprietaire = ?"
+            parametres = (proprietaire,)
+        with _connexion(self.chemin) as connexion:
+            lignes = connexion.execute(requete + " ORDER BY cree DESC", parametres).fetchall()
+        return pd.DataFrame([dict(ligne) for ligne in lignes], columns=COLONNES_ETAT)
+
+    def purger(self, anciennete=CONSERVATION):
+        """Supprime les travaux terminés depuis plus de `anciennete`"""
+        limite = (datetime.now() - anciennete).isoformat(timespec='seconds')
+        with _connexion(self.chemin) as connexion:
+            return connexion.execute(
+                "DELETE FROM travaux WHERE fin IS NOT NULL AND fin < ?", (limite,)
+            ).rowcount
+
+    def fermer(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)